@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+📈 Sistema FetalCare - Benchmark do snapshot analítico colunar
+Constrói um SnapshotAnalitico com milhões de exames sintéticos e mede as
+consultas típicas dos painéis (distribuição por status, status por faixa de
+idade gestacional, histogramas de confidence e de parâmetros)
+
+Não requer MongoDB: os lotes de colunas são gerados em memória a partir de
+Testes/Carga/dados/parametros_ml.csv.
+
+Uso (a partir do diretório back-end):
+    python Testes/Carga/scripts/benchmark_analitico.py --registros 5000000
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, Iterator, List
+
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(BACKEND_DIR))
+
+import numpy as np
+
+from banco.analitico import SnapshotAnalitico, COLUNAS_DICIONARIO
+from banco.rollups import FAIXAS_IDADE_GESTACIONAL
+from modelo.preditor import EXPECTED_FEATURES
+
+DADOS_CSV = BACKEND_DIR / "Testes" / "Carga" / "dados" / "parametros_ml.csv"
+LOTE = 100000
+
+STATUS_ML = np.array(["Normal", "Suspeito", "Patológico"], dtype=object)
+STATUS_SAUDE = np.array(["Normal", "Em Risco", "Risco Crítico"], dtype=object)
+NIVEIS = np.array(["BAIXO", "MODERADO", "CRÍTICO"], dtype=object)
+FAIXAS = np.array([rotulo for _, rotulo in FAIXAS_IDADE_GESTACIONAL], dtype=object)
+
+
+def gerar_lotes(quantidade: int, semente: int = 0) -> Iterator[Dict[str, Any]]:
+    """Lotes de colunas no formato de colunas_documentos"""
+    rng = np.random.RandomState(semente)
+    base = np.loadtxt(DADOS_CSV, delimiter=",", skiprows=1)
+    inicio_ms = int(datetime(2024, 1, 1).timestamp() * 1000)
+    for inicio in range(0, quantidade, LOTE):
+        tamanho = min(LOTE, quantidade - inicio)
+        matriz = base[rng.randint(len(base), size=tamanho)].astype(np.float32)
+        prediction = rng.choice(3, size=tamanho, p=[0.78, 0.14, 0.08])
+        confidence = rng.uniform(40, 100, size=tamanho).astype(np.float32)
+        saude = np.where(confidence <= 55, 2, np.where(confidence <= 65, 1, 0))
+        idade = rng.randint(20, 42, size=tamanho).astype(np.int16)
+        faixa = np.digitize(idade, [28, 32, 37])
+
+        colunas: Dict[str, Any] = {
+            "_id": rng.randint(0, 256, size=(tamanho, 12)).astype(np.uint8),
+            "data_exame": inicio_ms + np.sort(rng.randint(0, 365 * 86400 * 1000, size=tamanho)).astype(np.int64),
+            "dados_gestante.gestational_age": idade,
+            "dados_gestante.patient_age": rng.randint(16, 45, size=tamanho).astype(np.int16),
+            "resultado_ml.prediction": (prediction + 1).astype(np.int8),
+            "resultado_ml.confidence": confidence,
+            "resultado_ml.status": STATUS_ML[prediction].tolist(),
+            "saude_feto.status_saude": STATUS_SAUDE[saude].tolist(),
+            "saude_feto.nivel_risco": NIVEIS[saude].tolist(),
+            "dados_gestante.faixa_idade_gestacional": FAIXAS[faixa].tolist(),
+        }
+        for i, feature in enumerate(EXPECTED_FEATURES):
+            colunas[f"parametros_monitoramento.{feature}"] = matriz[:, i]
+        yield colunas
+
+
+CONSULTAS: List[Dict[str, Any]] = [
+    {"nome": "Total por status de saúde", "agrupar_por": ["saude_feto.status_saude"]},
+    {"nome": "Status por faixa de idade gestacional",
+     "agrupar_por": ["dados_gestante.faixa_idade_gestacional", "saude_feto.status_saude"]},
+    {"nome": "Histograma de confidence por status do modelo",
+     "agrupar_por": ["resultado_ml.status"],
+     "histograma": {"coluna": "resultado_ml.confidence", "bins": 30, "min": 0, "max": 100}},
+    {"nome": "Patológicos 32-36 sem.: baseline por semana",
+     "filtros": {"resultado_ml.status": "Patológico", "dados_gestante.gestational_age": {"min": 32, "max": 36}},
+     "agrupar_por": ["dados_gestante.gestational_age"], "metrica": "parametros_monitoramento.baseline_value"},
+    {"nome": "Último trimestre: histograma de ASTV",
+     "inicio": datetime(2024, 10, 1),
+     "histograma": {"coluna": "parametros_monitoramento.abnormal_short_term_variability", "bins": 50}},
+]
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="📈 Benchmark do snapshot analítico - Sistema FetalCare")
+    parser.add_argument('--registros', type=int, default=5_000_000, help='Exames no snapshot (padrão: 5000000)')
+    parser.add_argument('--repeticoes', type=int, default=10, help='Repetições por consulta (padrão: 10)')
+    args = parser.parse_args()
+
+    diretorio = tempfile.mkdtemp(prefix="snapshot_analitico_")
+    print("=" * 70)
+    print(f"📈 Snapshot analítico colunar ({args.registros} exames)")
+    print("=" * 70)
+
+    try:
+        snapshot = SnapshotAnalitico(os.path.join(diretorio, "snapshot"))
+        inicio = time.perf_counter()
+        snapshot.construir_de_lotes(gerar_lotes(args.registros))
+        tamanho_mb = sum(f.stat().st_size for f in Path(snapshot.diretorio).iterdir()) / 1024 ** 2
+        print(f"\n🏗️  Construção: {time.perf_counter() - inicio:.2f}s ({tamanho_mb:.0f} MB em disco, "
+              f"{len(COLUNAS_DICIONARIO)} colunas por dicionário)")
+
+        print("\n⏱️  Consultas (mediana de {} execuções):".format(args.repeticoes))
+        for consulta in CONSULTAS:
+            parametros = {chave: valor for chave, valor in consulta.items() if chave != "nome"}
+            snapshot.consultar(**parametros)  # aquece o page cache
+            tempos = []
+            for _ in range(args.repeticoes):
+                inicio = time.perf_counter()
+                resultado = snapshot.consultar(**parametros)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            print(f"   • {consulta['nome']:<48} {np.median(tempos):8.2f}ms  ({resultado['total']} exames)")
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+📈 Sistema FetalCare - Benchmark do formato binário de /predict
+Compara o JSON atual (21 chaves por exame) com o corpo float32 de
+modelo/binario.py: bytes por requisição, custo de decodificação e CPU do
+servidor por predição (Flask test client, sem rede)
+
+Uso (a partir do diretório back-end):
+    python Testes/Carga/scripts/benchmark_binario.py --requisicoes 500 --lote 100
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+from typing import Callable
+
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(BACKEND_DIR))
+
+import numpy as np
+
+from modelo.preditor import EXPECTED_FEATURES
+from modelo.binario import CONTENT_TYPE_BINARIO, codificar_exames, decodificar_exames
+
+DADOS_CSV = BACKEND_DIR / "Testes" / "Carga" / "dados" / "parametros_ml.csv"
+
+
+def cpu_por_chamada(funcao: Callable[[], object], repeticoes: int) -> float:
+    """CPU do processo (ms) por chamada"""
+    funcao()  # aquecimento
+    inicio = time.process_time()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.process_time() - inicio) * 1000 / repeticoes
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="📈 Benchmark do formato binário de /predict - Sistema FetalCare")
+    parser.add_argument('--requisicoes', type=int, default=500, help='Requisições medidas por formato (padrão: 500)')
+    parser.add_argument('--lote', type=int, default=100, help='Exames por requisição em lote (padrão: 100)')
+    args = parser.parse_args()
+
+    # app.py carrega IA/model.sav relativo ao diretório back-end
+    logging.disable(logging.INFO)
+    os.chdir(BACKEND_DIR)
+    import app as ml_app
+
+    client = ml_app.app.test_client()
+    base = np.loadtxt(DADOS_CSV, delimiter=",", skiprows=1)
+    exame = base[0]
+    lote = base[:args.lote]
+
+    corpo_json = json.dumps(dict(zip(EXPECTED_FEATURES, exame.tolist()))).encode()
+    corpo_binario = codificar_exames(exame[None, :])
+    corpo_lote = codificar_exames(lote)
+
+    print("=" * 70)
+    print(f"📈 Formato binário de /predict (lote de {args.lote} exames)")
+    print("=" * 70)
+
+    print("\n📦 Bytes por exame na requisição:")
+    print(f"   • JSON (21 chaves):                 {len(corpo_json):6d}")
+    print(f"   • float32 com cabeçalho:            {len(corpo_binario):6d}  ({len(corpo_json) / len(corpo_binario):.1f}x menor)")
+    print(f"   • float32 em lote (por exame):      {len(corpo_lote) / args.lote:6.1f}")
+
+    print("\n🔎 Decodificação (µs por exame):")
+    def decodificar_json():
+        dados = json.loads(corpo_json)
+        return np.array([float(dados[f]) for f in EXPECTED_FEATURES]).reshape(1, -1)
+
+    decodificacao_json = cpu_por_chamada(decodificar_json, args.requisicoes * 10)
+    decodificacao_binaria = cpu_por_chamada(lambda: decodificar_exames(corpo_binario), args.requisicoes * 10)
+    print(f"   • JSON + float() por feature:       {decodificacao_json * 1000:8.2f}")
+    print(f"   • np.frombuffer:                    {decodificacao_binaria * 1000:8.2f}")
+
+    print("\n⏱️  CPU do servidor por predição (ms):")
+    cpu_json = cpu_por_chamada(
+        lambda: client.post('/predict', data=corpo_json, content_type='application/json'), args.requisicoes)
+    cpu_binario = cpu_por_chamada(
+        lambda: client.post('/predict', data=corpo_binario, content_type=CONTENT_TYPE_BINARIO), args.requisicoes)
+    cpu_lote = cpu_por_chamada(
+        lambda: client.post('/predict', data=corpo_lote, content_type=CONTENT_TYPE_BINARIO),
+        max(1, args.requisicoes // 10)) / args.lote
+    print(f"   • JSON, 1 exame por requisição:     {cpu_json:8.3f}")
+    print(f"   • binário, 1 exame por requisição:  {cpu_binario:8.3f}  ({cpu_json / cpu_binario:.1f}x)")
+    print(f"   • {f'binário, lote de {args.lote} exames:':<34}{cpu_lote:8.3f}  ({cpu_json / cpu_lote:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+📈 Sistema FetalCare - Benchmark do RegistroExameCRUD
+Mede escritas/segundo do caminho antigo (duas idas ao banco por escrita)
+contra os métodos de ida única e os métodos em lote
+
+Requer um MongoDB acessível em MONGODB_URL. Usa um banco separado
+(fetalcare_benchmark por padrão) que é limpo ao final.
+
+Uso (a partir do diretório back-end):
+    python Testes/Carga/scripts/benchmark_crud.py --registros 2000 --lote 500
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Banco isolado para o benchmark (precisa ser definido antes de importar banco.database)
+os.environ.setdefault("DATABASE_NAME", "fetalcare_benchmark")
+
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(BACKEND_DIR))
+
+from bson import ObjectId
+
+from banco.database import connect_to_mongo, close_mongo_connection, get_collection
+from banco.crud import RegistroExameCRUD
+from banco.models import (
+    DadosGestante,
+    ParametrosMonitoramento,
+    RegistroExame,
+    RegistroExameCreate,
+    ResultadoML
+)
+
+
+def gerar_exames(quantidade: int) -> List[Tuple[RegistroExameCreate, ResultadoML]]:
+    """Gera exames sintéticos para o benchmark"""
+    exames = []
+    for i in range(quantidade):
+        dados = RegistroExameCreate(
+            dados_gestante=DadosGestante(
+                patient_id=f"BENCH{i:06d}",
+                patient_name=f"Gestante Benchmark {i}",
+                patient_cpf=f"{i:011d}",
+                gestational_age=20 + i % 20,
+                patient_age=18 + i % 25
+            ),
+            parametros_monitoramento=ParametrosMonitoramento(
+                baseline_value=120 + i % 40,
+                accelerations=i % 5,
+                fetal_movement=i % 4,
+                uterine_contractions=i % 3,
+                mean_value_of_short_term_variability=1.5,
+                mean_value_of_long_term_variability=8.5
+            )
+        )
+        resultado = ResultadoML(
+            prediction=1 + i % 3,
+            confidence=50.0 + i % 50,
+            status="Normal",
+            description="Benchmark"
+        )
+        exames.append((dados, resultado))
+    return exames
+
+
+def taxa(quantidade: int, inicio: float) -> float:
+    """Calcula operações por segundo desde o instante inicial"""
+    duracao = time.perf_counter() - inicio
+    return quantidade / duracao if duracao > 0 else float("inf")
+
+
+async def criar_duas_idas(crud: RegistroExameCRUD, dados: RegistroExameCreate, resultado: ResultadoML):
+    """Caminho antigo de criação: insert_one seguido de find_one"""
+    documento = crud._montar_documento(dados, resultado)
+    result = await crud.collection.insert_one(documento)
+    registro = await crud.collection.find_one({"_id": result.inserted_id})
+    registro["_id"] = str(registro["_id"])
+    return RegistroExame(**registro)
+
+
+async def atualizar_duas_idas(crud: RegistroExameCRUD, registro_id: str, dados: Dict):
+    """Caminho antigo de atualização: update_one seguido de buscar_por_id"""
+    await crud.collection.update_one({"_id": ObjectId(registro_id)}, {"$set": dados})
+    registro = await crud.collection.find_one({"_id": ObjectId(registro_id)})
+    registro["_id"] = str(registro["_id"])
+    return RegistroExame(**registro)
+
+
+async def executar_benchmark(quantidade: int, tamanho_lote: int) -> Dict[str, float]:
+    """Executa todos os cenários e retorna escritas/segundo por cenário"""
+    crud = RegistroExameCRUD()
+    exames = gerar_exames(quantidade)
+    resultados = {}
+
+    await get_collection().delete_many({})
+
+    # Criação
+    inicio = time.perf_counter()
+    ids_antigos = [(await criar_duas_idas(crud, d, r)).id for d, r in exames]
+    resultados["criar (insert_one + find_one)"] = taxa(quantidade, inicio)
+
+    inicio = time.perf_counter()
+    ids_novos = [(await crud.criar_registro(d, r)).id for d, r in exames]
+    resultados["criar_registro (ida única)"] = taxa(quantidade, inicio)
+
+    inicio = time.perf_counter()
+    ids_lote = []
+    for i in range(0, quantidade, tamanho_lote):
+        ids_lote += [r.id for r in await crud.criar_registros(exames[i:i + tamanho_lote])]
+    resultados["criar_registros (insert_many)"] = taxa(quantidade, inicio)
+
+    # Atualização
+    inicio = time.perf_counter()
+    for registro_id in ids_antigos:
+        await atualizar_duas_idas(crud, registro_id, {"observacoes": "antigo"})
+    resultados["atualizar (update_one + find_one)"] = taxa(quantidade, inicio)
+
+    inicio = time.perf_counter()
+    for registro_id in ids_novos:
+        await crud.atualizar_registro(registro_id, {"observacoes": "ida única"})
+    resultados["atualizar_registro (find_one_and_update)"] = taxa(quantidade, inicio)
+
+    inicio = time.perf_counter()
+    for i in range(0, quantidade, tamanho_lote):
+        await crud.atualizar_registros({rid: {"observacoes": "lote"} for rid in ids_lote[i:i + tamanho_lote]})
+    resultados["atualizar_registros (bulk_write)"] = taxa(quantidade, inicio)
+
+    # Remoção
+    inicio = time.perf_counter()
+    for registro_id in ids_antigos + ids_novos:
+        await crud.deletar_registro(registro_id)
+    resultados["deletar_registro (um a um)"] = taxa(2 * quantidade, inicio)
+
+    inicio = time.perf_counter()
+    for i in range(0, quantidade, tamanho_lote):
+        await crud.deletar_registros(ids_lote[i:i + tamanho_lote])
+    resultados["deletar_registros (delete_many)"] = taxa(quantidade, inicio)
+
+    return resultados
+
+
+async def main_async(args):
+    await connect_to_mongo()
+    try:
+        resultados = await executar_benchmark(args.registros, args.lote)
+    finally:
+        await get_collection().drop()
+        await close_mongo_connection()
+
+    print("=" * 60)
+    print(f"📈 Escritas/segundo ({args.registros} registros, lote {args.lote})")
+    print("=" * 60)
+    for cenario, valor in resultados.items():
+        print(f"   • {cenario:<42} {valor:>10.1f}")
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="📈 Benchmark do RegistroExameCRUD - Sistema FetalCare")
+    parser.add_argument('--registros', type=int, default=2000,
+                        help='Número de registros por cenário (padrão: 2000)')
+    parser.add_argument('--lote', type=int, default=500,
+                        help='Tamanho do lote dos métodos em lote (padrão: 500)')
+
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
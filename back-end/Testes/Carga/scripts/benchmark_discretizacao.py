@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+📈 Sistema FetalCare - Benchmark da floresta discretizada
+Compara predict_proba do sklearn sobre a matriz float64 com
+modelo/discretizacao.py (matriz uint8/uint16 percorrida em blocos):
+memória da entrada, pico de memória, vazão e paridade bit a bit.
+As linhas são reamostradas de parametros_ml.csv
+
+Uso (a partir do diretório back-end):
+    python Testes/Carga/scripts/benchmark_discretizacao.py --linhas 10000000
+"""
+
+import sys
+import time
+import logging
+import argparse
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(BACKEND_DIR))
+
+import numpy as np
+
+from modelo.preditor import MODEL_PATH, carregar_modelo, predict_proba
+from modelo.discretizacao import DISCRETIZACAO_BLOCO_LINHAS, FlorestaDiscretizada
+
+DADOS_CSV = BACKEND_DIR / "Testes" / "Carga" / "dados" / "parametros_ml.csv"
+
+
+def medir(funcao: Callable[[], object]) -> Tuple[object, float, int]:
+    """Executa a função medindo tempo (s) e pico de memória alocada pelo NumPy (bytes)"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    inicio = time.perf_counter()
+    resultado = funcao()
+    tempo = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, tempo, pico
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="📈 Benchmark da floresta discretizada - Sistema FetalCare")
+    parser.add_argument('--linhas', type=int, default=10_000_000, help='Linhas pontuadas (padrão: 10000000)')
+    parser.add_argument('--bloco', type=int, default=DISCRETIZACAO_BLOCO_LINHAS,
+                        help=f'Linhas por bloco da floresta discretizada (padrão: {DISCRETIZACAO_BLOCO_LINHAS})')
+    parser.add_argument('--sem-sklearn', action='store_true', help='Não medir o predict_proba do sklearn')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    model = carregar_modelo(str(BACKEND_DIR / MODEL_PATH))
+    floresta = FlorestaDiscretizada.de_modelo(model)
+
+    base = np.loadtxt(DADOS_CSV, delimiter=",", skiprows=1)
+    X = base[np.random.RandomState(0).randint(0, len(base), size=args.linhas)]
+
+    print("=" * 70)
+    print(f"📈 Floresta discretizada: {args.linhas:,} linhas, {floresta.n_arvores} árvores, "
+          f"bins {floresta.dtype.name}, bloco de {args.bloco}")
+    print("=" * 70)
+
+    bins, tempo_codificacao, pico_codificacao = medir(lambda: floresta.codificar(X))
+    print("\n📦 Matriz de entrada:")
+    print(f"   • float64:                   {X.nbytes / 2**20:10.1f} MB")
+    print(f"   • {floresta.dtype.name} (bins):{' ' * (19 - len(floresta.dtype.name))}"
+          f"{bins.nbytes / 2**20:10.1f} MB  ({X.nbytes / bins.nbytes:.0f}x menor)")
+    print(f"   • codificação:               {tempo_codificacao:10.2f} s   "
+          f"({args.linhas / tempo_codificacao / 1e6:.1f} M linhas/s, pico {pico_codificacao / 2**20:.0f} MB)")
+
+    probabilidades, tempo_bins, pico_bins = medir(lambda: floresta.predict_proba(bins, args.bloco))
+    print("\n⏱️  Pontuação:")
+    print(f"   • discretizada (blocos):     {tempo_bins:10.2f} s   "
+          f"({args.linhas / tempo_bins / 1e3:.0f} mil linhas/s, pico {pico_bins / 2**20:.0f} MB)")
+
+    if args.sem_sklearn:
+        return
+
+    del bins
+    referencia, tempo_sklearn, pico_sklearn = medir(lambda: predict_proba(model, X))
+    print(f"   • sklearn predict_proba:     {tempo_sklearn:10.2f} s   "
+          f"({args.linhas / tempo_sklearn / 1e3:.0f} mil linhas/s, pico {pico_sklearn / 2**20:.0f} MB)")
+    print(f"   • ganho:                     {tempo_sklearn / tempo_bins:10.2f}x")
+
+    iguais = np.array_equal(probabilidades, referencia)
+    print(f"\n🔒 Paridade bit a bit com predict_proba: {'✅ idêntica' if iguais else '❌ divergente'} "
+          f"(diferença máxima {np.abs(probabilidades - referencia).max():.1e})")
+
+
+if __name__ == "__main__":
+    main()
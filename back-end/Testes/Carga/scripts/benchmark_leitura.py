@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+📈 Sistema FetalCare - Benchmark do caminho de leitura
+Compara, para páginas de documentos do banco, o caminho com modelos
+(RegistroExame validado + model_dump + json), a construção sem validação
+(model_construct), o serializador pré-compilado de modelos e o caminho
+bruto de documentos confiáveis (sem montar modelos)
+
+Não requer MongoDB: os documentos são gerados em memória.
+
+Uso (a partir do diretório back-end):
+    python Testes/Carga/scripts/benchmark_leitura.py --paginas 100 1000
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(BACKEND_DIR))
+
+from bson import ObjectId
+
+from banco.models import (
+    DadosGestante,
+    ParametrosMonitoramento,
+    RegistroExame,
+    ResultadoML,
+    SaudeFeto,
+    serializar_registros,
+    serializar_documentos
+)
+
+
+def gerar_documentos(quantidade: int) -> List[Dict[str, Any]]:
+    """Gera documentos no formato de registros_exames"""
+    documentos = []
+    for i in range(quantidade):
+        documentos.append({
+            "_id": ObjectId(),
+            "dados_gestante": {
+                "patient_id": f"BENCH{i:06d}",
+                "patient_name": f"Gestante Benchmark {i}",
+                "patient_cpf": f"{i:011d}",
+                "gestational_age": 20 + i % 20,
+                "patient_age": 18 + i % 25,
+                "patient_phone": "(11) 99999-0000",
+                "patient_address": "Rua do Benchmark, 100",
+                "health_insurance": "SUS"
+            },
+            "parametros_monitoramento": {
+                "baseline_value": 120.0 + i % 40, "accelerations": i % 5, "fetal_movement": i % 4,
+                "uterine_contractions": i % 3, "light_decelerations": 0, "severe_decelerations": 0,
+                "prolongued_decelerations": 0, "abnormal_short_term_variability": 20,
+                "mean_value_of_short_term_variability": 1.5,
+                "percentage_of_time_with_abnormal_long_term_variability": 10,
+                "mean_value_of_long_term_variability": 8.5, "histogram_width": 150,
+                "histogram_min": 110, "histogram_max": 160, "histogram_number_of_peaks": 3,
+                "histogram_number_of_zeroes": 0, "histogram_mode": 140, "histogram_mean": 142,
+                "histogram_median": 141, "histogram_variance": 25, "histogram_tendency": "normal"
+            },
+            "resultado_ml": {
+                "prediction": 1, "confidence": 85.0, "status": "Normal",
+                "description": "Feto saudável - sem indicações de risco",
+                "recommendations": ["Continue o monitoramento de rotina", "Mantenha consultas pré-natais regulares"]
+            },
+            "saude_feto": {"status_saude": "Normal", "confidence_value": 85.0, "nivel_risco": "BAIXO"},
+            "data_exame": datetime.utcnow(),
+            "medico_responsavel": "Dr. Benchmark",
+            "observacoes": None
+        })
+    return documentos
+
+
+def medir(funcao: Callable[[], Any], repeticoes: int) -> float:
+    """Retorna o tempo médio em milissegundos"""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def validacao_completa(documentos: List[Dict[str, Any]]) -> List[RegistroExame]:
+    return [RegistroExame(**{**doc, "_id": str(doc["_id"])}) for doc in documentos]
+
+
+def construcao_sem_validacao(documentos: List[Dict[str, Any]]) -> List[RegistroExame]:
+    registros = []
+    for doc in documentos:
+        dados = {**doc, "id": str(doc["_id"])}
+        dados["dados_gestante"] = DadosGestante.model_construct(**doc["dados_gestante"])
+        dados["parametros_monitoramento"] = ParametrosMonitoramento.model_construct(**doc["parametros_monitoramento"])
+        dados["resultado_ml"] = ResultadoML.model_construct(**doc["resultado_ml"])
+        dados["saude_feto"] = SaudeFeto.model_construct(**doc["saude_feto"])
+        registros.append(RegistroExame.model_construct(**dados))
+    return registros
+
+
+def documentos_brutos(documentos: List[Dict[str, Any]]) -> bytes:
+    return serializar_documentos([{**doc, "_id": str(doc["_id"])} for doc in documentos])
+
+
+def serializacao_padrao(registros: List[RegistroExame]) -> str:
+    return json.dumps([r.model_dump(by_alias=True) for r in registros], default=str)
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="📈 Benchmark do caminho de leitura - Sistema FetalCare")
+    parser.add_argument('--paginas', type=int, nargs='+', default=[100, 1000],
+                        help='Tamanhos de página a medir (padrão: 100 1000)')
+    parser.add_argument('--repeticoes', type=int, default=20,
+                        help='Repetições por medição (padrão: 20)')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("📈 Caminho de leitura de RegistroExame (ms por página)")
+    print("=" * 70)
+
+    for tamanho in args.paginas:
+        documentos = gerar_documentos(tamanho)
+
+        t_modelos = medir(lambda: serializacao_padrao(validacao_completa(documentos)), args.repeticoes)
+        t_validacao = medir(lambda: validacao_completa(documentos), args.repeticoes)
+        t_construct = medir(lambda: construcao_sem_validacao(documentos), args.repeticoes)
+        t_adapter = medir(lambda: serializar_registros(validacao_completa(documentos)), args.repeticoes)
+        t_brutos = medir(lambda: documentos_brutos(documentos), args.repeticoes)
+
+        print(f"\n📄 Página com {tamanho} registros")
+        print(f"   • RegistroExame(**doc):                 {t_validacao:8.2f}ms")
+        print(f"   • model_construct (sem validação):      {t_construct:8.2f}ms")
+        print(f"   • validação + model_dump + json.dumps:  {t_modelos:8.2f}ms")
+        print(f"   • validação + serializar_registros:     {t_adapter:8.2f}ms  ({t_modelos / t_adapter:.1f}x)")
+        print(f"   • brutos + serializar_documentos:       {t_brutos:8.2f}ms  ({t_modelos / t_brutos:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
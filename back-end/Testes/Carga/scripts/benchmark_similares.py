@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+📈 Sistema FetalCare - Benchmark do índice de exames semelhantes
+Mede construção e latência de busca top-k do IndiceSimilares (memmap +
+produto interno) contra a força bruta em NumPy e, opcionalmente, contra a
+força bruta no MongoDB (pipeline de agregação que calcula a distância de
+todos os documentos e ordena)
+
+Os exames são gerados a partir de Testes/Carga/dados/parametros_ml.csv com
+ruído gaussiano. O caminho MongoDB usa um banco separado
+(fetalcare_benchmark por padrão) que é limpo ao final.
+
+Uso (a partir do diretório back-end):
+    python Testes/Carga/scripts/benchmark_similares.py --registros 1000000
+    python Testes/Carga/scripts/benchmark_similares.py --registros 1000000 --mongo
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+# Banco isolado para o benchmark (precisa ser definido antes de importar banco.database)
+os.environ.setdefault("DATABASE_NAME", "fetalcare_benchmark")
+
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(BACKEND_DIR))
+
+import numpy as np
+
+from banco.similaridade import IndiceSimilares, STATUS_SAUDE
+from modelo.preditor import EXPECTED_FEATURES
+
+DADOS_CSV = BACKEND_DIR / "Testes" / "Carga" / "dados" / "parametros_ml.csv"
+LOTE = 50000
+
+
+def carregar_base() -> np.ndarray:
+    """Exames reais de referência (mesma ordem de colunas de EXPECTED_FEATURES)"""
+    return np.loadtxt(DADOS_CSV, delimiter=",", skiprows=1)
+
+
+def gerar_lotes(base: np.ndarray, quantidade: int, semente: int = 0
+                ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Lotes sintéticos (matriz, ids, status) para construir_de_lotes"""
+    rng = np.random.RandomState(semente)
+    ruido = base.std(axis=0) * 0.05
+    for inicio in range(0, quantidade, LOTE):
+        tamanho = min(LOTE, quantidade - inicio)
+        matriz = base[rng.randint(len(base), size=tamanho)] + rng.normal(size=(tamanho, base.shape[1])) * ruido
+        ids = rng.randint(0, 256, size=(tamanho, 12)).astype(np.uint8)
+        status = rng.randint(0, len(STATUS_SAUDE), size=tamanho).astype(np.uint8)
+        yield matriz, ids, status
+
+
+def percentis(tempos: List[float]) -> str:
+    p50, p95 = np.percentile(tempos, [50, 95])
+    return f"p50 {p50:8.2f}ms | p95 {p95:8.2f}ms"
+
+
+def forca_bruta_mongo(indice: IndiceSimilares, consultas: np.ndarray, k: int, quantidade: int) -> List[float]:
+    """Insere os exames num banco isolado e mede o top-k calculado pelo próprio MongoDB"""
+    from banco.database import get_sync_database
+
+    database = get_sync_database()
+    collection = database["registros_exames_benchmark"]
+    collection.drop()
+    try:
+        print(f"\n📥 Inserindo {quantidade} exames no MongoDB...")
+        for matriz, _, status in gerar_lotes(carregar_base(), quantidade):
+            collection.insert_many([
+                {"parametros_monitoramento": dict(zip(EXPECTED_FEATURES, linha.tolist())),
+                 "saude_feto": {"status_saude": STATUS_SAUDE[codigo]}}
+                for linha, codigo in zip(matriz, status)
+            ], ordered=False)
+
+        tempos = []
+        for consulta in indice.padronizar(consultas):
+            distancia = {"$add": [
+                {"$pow": [{"$subtract": [
+                    {"$divide": [{"$subtract": [f"$parametros_monitoramento.{feature}", float(media)]}, float(desvio)]},
+                    float(q)
+                ]}, 2]}
+                for feature, media, desvio, q in zip(EXPECTED_FEATURES, indice.media, indice.desvio, consulta)
+            ]}
+            inicio = time.perf_counter()
+            list(collection.aggregate([
+                {"$project": {"saude_feto.status_saude": 1, "distancia": distancia}},
+                {"$sort": {"distancia": 1}},
+                {"$limit": k}
+            ], allowDiskUse=True))
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        return tempos
+    finally:
+        collection.drop()
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="📈 Benchmark do índice de exames semelhantes - Sistema FetalCare")
+    parser.add_argument('--registros', type=int, default=1_000_000, help='Exames indexados (padrão: 1000000)')
+    parser.add_argument('--consultas', type=int, default=50, help='Consultas medidas (padrão: 50)')
+    parser.add_argument('--k', type=int, default=10, help='Vizinhos por consulta (padrão: 10)')
+    parser.add_argument('--mongo', action='store_true', help='Mede também a força bruta no MongoDB (MONGODB_URL)')
+    args = parser.parse_args()
+
+    base = carregar_base()
+    consultas = base[np.random.RandomState(1).randint(len(base), size=args.consultas)]
+    diretorio = tempfile.mkdtemp(prefix="indice_similares_")
+
+    print("=" * 70)
+    print(f"📈 Índice de exames semelhantes ({args.registros} exames, top-{args.k})")
+    print("=" * 70)
+
+    try:
+        indice = IndiceSimilares(os.path.join(diretorio, "indice"))
+        inicio = time.perf_counter()
+        indice.construir_de_lotes(gerar_lotes(base, args.registros))
+        tempo_construcao = time.perf_counter() - inicio
+        tamanho_mb = sum(f.stat().st_size for f in Path(indice.diretorio).iterdir()) / 1024 ** 2
+        print(f"\n🏗️  Construção: {tempo_construcao:.2f}s ({tamanho_mb:.1f} MB em disco)")
+
+        parametros = [dict(zip(EXPECTED_FEATURES, consulta.tolist())) for consulta in consultas]
+        indice.buscar(parametros[0], k=args.k)  # aquece o page cache
+
+        tempos_indice = []
+        for p in parametros:
+            inicio = time.perf_counter()
+            indice.buscar(p, k=args.k)
+            tempos_indice.append((time.perf_counter() - inicio) * 1000)
+
+        vetores = np.asarray(indice.mapas()["vetores"])
+        tempos_numpy = []
+        for consulta in consultas:
+            inicio = time.perf_counter()
+            q = indice.padronizar(consulta[None, :])[0]
+            distancias = ((vetores - q) ** 2).sum(axis=1)
+            np.argsort(distancias)[:args.k]
+            tempos_numpy.append((time.perf_counter() - inicio) * 1000)
+
+        print(f"\n🧭 IndiceSimilares.buscar:            {percentis(tempos_indice)}")
+        print(f"🐢 Força bruta NumPy (argsort):       {percentis(tempos_numpy)}"
+              f"  ({np.median(tempos_numpy) / np.median(tempos_indice):.1f}x)")
+
+        if args.mongo:
+            tempos_mongo = forca_bruta_mongo(indice, consultas[:max(1, args.consultas // 10)], args.k, args.registros)
+            print(f"🐌 Força bruta MongoDB (aggregate):   {percentis(tempos_mongo)}"
+                  f"  ({np.median(tempos_mongo) / np.median(tempos_indice):.0f}x)")
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+📈 Sistema FetalCare - Benchmark da triagem com parada antecipada
+Compara modelo/triagem.py com a avaliação completa (floresta plana e
+predict_proba do sklearn) nos dados de carga: árvores avaliadas, tempo por
+lote e por exame e concordância de classe e faixa de status de saúde
+
+Uso (a partir do diretório back-end):
+    python Testes/Carga/scripts/benchmark_triagem.py --bloco 40
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+from typing import Callable
+
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(BACKEND_DIR))
+
+import numpy as np
+
+from modelo.preditor import MODEL_PATH, carregar_modelo, montar_matriz, predict_proba
+from modelo.floresta import FlorestaPlana
+from modelo.triagem import TRIAGEM_BLOCO_ARVORES, TRIAGEM_MIN_LINHAS, TriagemFloresta, faixa_confianca
+
+DADOS_DIR = BACKEND_DIR / "Testes" / "Carga" / "dados"
+
+
+def carregar_cenarios() -> np.ndarray:
+    """Cenários de teste (o JSON usa a grafia prolonged_decelerations)"""
+    with open(DADOS_DIR / "cenarios_teste.json", encoding="utf-8") as arquivo:
+        cenarios = json.load(arquivo)
+    exames = [
+        {("prolongued_decelerations" if chave == "prolonged_decelerations" else chave): valor
+         for chave, valor in caso.items()}
+        for casos in cenarios.values() for caso in casos
+    ]
+    return montar_matriz(exames)
+
+
+def tempo_por_chamada(funcao: Callable[[], object], repeticoes: int) -> float:
+    """Tempo médio (ms) por chamada"""
+    funcao()  # aquecimento
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) * 1000 / repeticoes
+
+
+def avaliar_conjunto(nome: str, matriz: np.ndarray, model, floresta: FlorestaPlana, bloco: int, min_linhas: int,
+                     individuais: int):
+    """Imprime árvores avaliadas, concordância e tempos de um conjunto de exames"""
+    probabilidades = predict_proba(model, matriz)
+    classes = model.classes_[probabilidades.argmax(axis=1)]
+    faixas = faixa_confianca(np.round(probabilidades.max(axis=1) * 100, 2))
+    total = floresta.n_arvores
+    amostra = matriz[:individuais]
+
+    print(f"\n📊 {nome} ({len(matriz)} exames)")
+    tempo_completo = tempo_por_chamada(lambda: floresta.predict_proba(matriz), 3)
+    tempo_sklearn = tempo_por_chamada(lambda: predict_proba(model, matriz), 3)
+    unitario_completo = tempo_por_chamada(lambda: [floresta.predict_proba(x[None, :]) for x in amostra], 1) / len(amostra)
+    unitario_sklearn = tempo_por_chamada(lambda: [predict_proba(model, x[None, :]) for x in amostra], 1) / len(amostra)
+    print(f"   • completa (floresta plana):        {tempo_completo:8.1f} ms/lote  {unitario_completo * 1000:7.0f} µs/exame")
+    print(f"   • completa (sklearn):               {tempo_sklearn:8.1f} ms/lote  {unitario_sklearn * 1000:7.0f} µs/exame")
+
+    for rotulo, apenas_classe in (("classe + faixa", False), ("só classe", True)):
+        triagem = TriagemFloresta(floresta, bloco=bloco, apenas_classe=apenas_classe, min_linhas=min_linhas)
+        avaliacao = triagem.avaliar(matriz)
+        arvores = avaliacao["trees_evaluated"]
+        exatas_classe = np.mean(avaliacao["prediction"] == classes) * 100
+        definidas = avaliacao["faixa"] >= 0
+        exatas_faixa = np.mean(avaliacao["faixa"][definidas] == faixas[definidas]) * 100 if definidas.any() else 100.0
+
+        tempo = tempo_por_chamada(lambda: triagem.avaliar(matriz), 3)
+        unitario = tempo_por_chamada(lambda: [triagem.avaliar(x[None, :]) for x in amostra], 1) / len(amostra)
+        print(f"   • triagem, {rotulo}:{' ' * (23 - len(rotulo))}{tempo:8.1f} ms/lote  {unitario * 1000:7.0f} µs/exame"
+              f"  (por exame: {unitario_completo / unitario:.2f}x plana, {unitario_sklearn / unitario:.1f}x sklearn)")
+        print(f"        árvores avaliadas: média {arvores.mean():.1f}/{total} "
+              f"({(1 - arvores.mean() / total) * 100:.1f}% economizadas), "
+              f"{np.mean(arvores < total) * 100:.1f}% dos exames pararam antes")
+        print(f"        concordância: classe {exatas_classe:.1f}%, faixa {exatas_faixa:.1f}% "
+              f"({definidas.mean() * 100:.1f}% com faixa definida)")
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="📈 Benchmark da triagem com parada antecipada - Sistema FetalCare")
+    parser.add_argument('--bloco', type=int, default=TRIAGEM_BLOCO_ARVORES,
+                        help=f'Árvores entre verificações de parada (padrão: {TRIAGEM_BLOCO_ARVORES})')
+    parser.add_argument('--min-linhas', type=int, default=TRIAGEM_MIN_LINHAS,
+                        help=f'Lotes menores são avaliados em uma passada completa (padrão: {TRIAGEM_MIN_LINHAS})')
+    parser.add_argument('--individuais', type=int, default=300, help='Exames avaliados um a um (padrão: 300)')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    model = carregar_modelo(str(BACKEND_DIR / MODEL_PATH))
+    floresta = FlorestaPlana.de_modelo(model)
+
+    print("=" * 70)
+    print(f"📈 Triagem com parada antecipada ({floresta.n_arvores} árvores, bloco de {args.bloco})")
+    print("=" * 70)
+
+    avaliar_conjunto("parametros_ml.csv", np.loadtxt(DADOS_DIR / "parametros_ml.csv", delimiter=",", skiprows=1),
+                     model, floresta, args.bloco, args.min_linhas, args.individuais)
+    avaliar_conjunto("cenarios_teste.json", carregar_cenarios(), model, floresta, args.bloco, args.min_linhas,
+                     args.individuais)
+
+    print("\n🔒 Garantia: classe e faixa de status iguais às da avaliação completa; a confiança")
+    print("   final está sempre dentro do intervalo [confidence_min, confidence_max]")
+    print(f"   Lotes com menos de {args.min_linhas} exames usam uma passada completa (o mesmo percurso da floresta plana)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+🚨 Sistema FetalCare - Receptor local de webhooks de alertas
+Substituto local do destino do SinkWebhook: recebe os POSTs do motor de
+alertas e imprime cada alerta com a latência desde a predição
+
+Uso (a partir do diretório back-end):
+    python Testes/Carga/scripts/receptor_webhook.py --porta 8085
+    ALERTAS_WEBHOOK_URL=http://127.0.0.1:8085/alertas python app_with_database.py
+"""
+
+import json
+import argparse
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ReceptorAlertas(BaseHTTPRequestHandler):
+    """Recebe alertas em JSON e responde 204"""
+
+    recebidos = 0
+
+    def do_POST(self):
+        tamanho = int(self.headers.get("Content-Length", 0))
+        alerta = json.loads(self.rfile.read(tamanho) or b"{}")
+        ReceptorAlertas.recebidos += 1
+
+        atraso = ""
+        if alerta.get("timestamp"):
+            atraso_ms = (datetime.now() - datetime.fromisoformat(alerta["timestamp"])).total_seconds() * 1000
+            atraso = f" (+{atraso_ms:.1f}ms)"
+        print(f"🚨 #{ReceptorAlertas.recebidos} {alerta.get('regra')} [{alerta.get('severidade')}] "
+              f"paciente {alerta.get('patient_id')}: {alerta.get('mensagem')}{atraso}")
+
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="🚨 Receptor local de webhooks de alertas - Sistema FetalCare")
+    parser.add_argument('--porta', type=int, default=8085, help='Porta HTTP (padrão: 8085)')
+    args = parser.parse_args()
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", args.porta), ReceptorAlertas)
+    print(f"📡 Aguardando alertas em http://127.0.0.1:{args.porta}/alertas")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n✅ {ReceptorAlertas.recebidos} alertas recebidos")
+
+
+if __name__ == "__main__":
+    main()
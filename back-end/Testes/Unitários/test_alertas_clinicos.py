@@ -0,0 +1,179 @@
+"""
+Testes Motor de Alertas Clínicos - Sistema FetalCare
+Avaliação incremental de regras sobre o fluxo de predições
+
+Cobertura:
+- Regras: Patológico, Suspeitos recorrentes e queda de confidence
+- Deduplicação e limite por paciente
+- Entrega assíncrona (webhook local e SSE)
+- Métricas de latência
+"""
+
+import pytest
+import json
+import threading
+import sys
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Adicionar path do projeto
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from modelo.alertas import MotorAlertas, Regra, SinkWebhook, SinkSSE
+from modelo.hub_predicoes import HubPredicoes
+
+HORA = 3600
+
+
+def predicao(prediction=1, confidence=90.0, patient_id="P1"):
+    """Predição como publicada por /predict"""
+    return {"patient_id": patient_id, "ward": "UTI", "prediction": prediction, "confidence": confidence}
+
+
+@pytest.fixture
+def motor():
+    """Motor sem thread de entrega e sem sinks"""
+    return MotorAlertas(sinks=[], iniciar=False)
+
+
+class TestRegrasAlertas:
+    """Testes das regras incrementais"""
+
+    def test_patologico(self, motor):
+        """
+        Teste: Resultado Patológico
+        Objetivo: Verificar alerta crítico para prediction == 3
+        """
+        # Act
+        alertas = motor.processar(predicao(prediction=3, confidence=92.0), instante=0)
+
+        # Assert
+        assert [a["regra"] for a in alertas] == ["patologico"]
+        assert alertas[0]["severidade"] == "critica"
+
+    def test_tres_suspeitos_em_duas_horas(self, motor):
+        """
+        Teste: Suspeitos recorrentes
+        Objetivo: Verificar alerta apenas quando 3 Suspeito caem dentro de 2h
+        """
+        # Act
+        espalhados = [motor.processar(predicao(prediction=2), instante=t * HORA) for t in (0, 1.5, 3)]
+        proximos = [motor.processar(predicao(prediction=2, patient_id="P2"), instante=t * HORA) for t in (0, 1, 1.9)]
+
+        # Assert
+        assert all(not alertas for alertas in espalhados)
+        assert [a["regra"] for a in proximos[2]] == ["suspeitos_recorrentes"]
+
+    def test_queda_confidence(self, motor):
+        """
+        Teste: Queda de confidence
+        Objetivo: Verificar alerta na transição para Risco Crítico (<= 55%), não a cada exame crítico
+        """
+        # Act
+        normal = motor.processar(predicao(confidence=80.0), instante=0)
+        queda = motor.processar(predicao(confidence=50.0), instante=1)
+        motor.intervalo_dedup = 0
+        continua_critico = motor.processar(predicao(confidence=45.0), instante=2)
+
+        # Assert
+        assert normal == []
+        assert [a["regra"] for a in queda] == ["queda_confidence"]
+        assert continua_critico == []
+
+    def test_regra_exige_avaliar(self):
+        """
+        Teste: Contrato das regras
+        Objetivo: Verificar que uma regra sem avaliar() não pode ser instanciada
+        """
+        # Arrange
+        class RegraIncompleta(Regra):
+            nome = "incompleta"
+
+        # Act & Assert
+        with pytest.raises(TypeError):
+            RegraIncompleta()
+
+    def test_deduplicacao_e_limite(self):
+        """
+        Teste: Deduplicação e limite por paciente
+        Objetivo: Verificar supressão de alertas repetidos e teto de alertas por janela
+        """
+        # Arrange
+        motor = MotorAlertas(sinks=[], iniciar=False, intervalo_dedup=600, max_por_paciente=2, janela_limite=HORA)
+
+        # Act
+        emitidos = [len(motor.processar(predicao(prediction=3), instante=t)) for t in (0, 60, 700, 1400)]
+
+        # Assert
+        assert emitidos == [1, 0, 1, 0]
+        assert motor.contadores["deduplicados"] == 1
+        assert motor.contadores["limitados"] == 1
+
+
+class TestEntregaAlertas:
+    """Testes da entrega assíncrona pelos sinks"""
+
+    def test_webhook_local_e_sse(self):
+        """
+        Teste: Entrega assíncrona
+        Objetivo: Verificar entrega ao webhook local e ao hub SSE, com métricas de latência
+        """
+        recebidos = []
+
+        class Receptor(BaseHTTPRequestHandler):
+            def do_POST(self):
+                recebidos.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        # Arrange
+        servidor = ThreadingHTTPServer(("127.0.0.1", 0), Receptor)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        hub = HubPredicoes()
+        assinante = hub.assinar(["setor:UTI"])
+        motor = MotorAlertas(sinks=[
+            SinkWebhook(f"http://127.0.0.1:{servidor.server_address[1]}/alertas"),
+            SinkSSE(hub)
+        ])
+
+        try:
+            # Act
+            motor.processar(predicao(prediction=3, confidence=40.0))
+            motor.aguardar_entregas()
+        finally:
+            servidor.shutdown()
+        metricas = motor.metricas()
+
+        # Assert
+        assert sorted(a["regra"] for a in recebidos) == ["patologico", "queda_confidence"]
+        assert assinante.pendentes() == 2
+        assert assinante.proxima(0).startswith("event: alert")
+        assert metricas["falhas_entrega"] == 0
+        assert metricas["latencia_entrega"]["total"] == 2
+        assert metricas["latencia_regras"]["patologico"]["total"] == 1
+
+        print(f"✅ Avaliação das regras: {metricas['latencia_regras']}")
+
+    @pytest.mark.performance
+    def test_latencia_avaliacao(self, motor):
+        """
+        Teste: Latência da avaliação
+        Objetivo: Verificar que a avaliação incremental custa microssegundos por predição
+        """
+        import time
+
+        # Act
+        inicio = time.perf_counter()
+        for i in range(10000):
+            motor.processar(predicao(prediction=1 + i % 3, confidence=40.0 + i % 60, patient_id=f"P{i % 500}"),
+                            instante=i)
+        tempo_us = (time.perf_counter() - inicio) * 1e6 / 10000
+
+        # Assert
+        assert tempo_us < 500
+        assert motor.metricas()["pacientes_com_estado"] == 500
+
+        print(f"✅ Avaliação incremental: {tempo_us:.1f}µs por predição")
@@ -11,6 +11,7 @@ Cobertura:
 
 import pytest
 import time
+from unittest.mock import MagicMock
 from pydantic import ValidationError
 import sys
 import os
@@ -189,4 +190,1317 @@ class TestPerformanceValidacao:
         print(f"\n📊 Performance Validação:")
         print(f"   • Validações: {num_validacoes}")
         print(f"   • Tempo médio: {tempo_medio*1000:.3f}ms")
-        print(f"   • Throughput: {num_validacoes/sum(tempos):.0f} validações/s") 
\ No newline at end of file
+        print(f"   • Throughput: {num_validacoes/sum(tempos):.0f} validações/s") 
+
+
+class TestSerializacaoRegistros:
+    """Testes dos serializadores pré-compilados de listas"""
+    
+    @pytest.fixture
+    def documento_banco(self, dados_gestante_validos, parametros_monitoramento_validos):
+        """Documento como gravado em registros_exames"""
+        from bson import ObjectId
+        from datetime import datetime
+        return {
+            '_id': ObjectId(),
+            'dados_gestante': dados_gestante_validos,
+            'parametros_monitoramento': parametros_monitoramento_validos,
+            'resultado_ml': {
+                'prediction': 1, 'confidence': 85.0, 'status': 'Normal',
+                'description': 'Feto saudável', 'recommendations': []
+            },
+            'saude_feto': {'status_saude': 'Normal', 'confidence_value': 85.0, 'nivel_risco': 'BAIXO'},
+            'data_exame': datetime(2025, 7, 3, 12, 0, 0),
+            'medico_responsavel': None,
+            'observacoes': None
+        }
+    
+    def test_documentos_brutos_equivalem_modelos(self, documento_banco):
+        """
+        Teste: Caminho bruto x modelos validados
+        Objetivo: Verificar que o JSON dos documentos brutos bate com o dos modelos
+        """
+        import json
+        from banco.models import RegistroExame, serializar_registros, serializar_documentos
+        
+        # Arrange
+        registro = RegistroExame(**{**documento_banco, '_id': str(documento_banco['_id'])})
+        
+        # Act
+        via_modelos = json.loads(serializar_registros([registro] * 3))
+        via_documentos = json.loads(serializar_documentos([documento_banco] * 3))
+        
+        # Assert
+        assert len(via_documentos) == 3
+        assert via_documentos[0]['_id'] == str(documento_banco['_id'])
+        assert via_documentos[0]['data_exame'] == '2025-07-03T12:00:00'
+        for chave in ('_id', 'parametros_monitoramento', 'saude_feto', 'data_exame'):
+            assert via_documentos[0][chave] == via_modelos[0][chave]
+
+
+
+class TestEscritasCRUD:
+    """Testes das escritas em lote do RegistroExameCRUD (collections assíncronas falsas)"""
+    
+    class ColecaoAssincronaFalsa:
+        """Collection mínima do Motor: registra as chamadas e imita insert_many/bulk_write/delete_many"""
+        
+        def __init__(self, documento_atualizado=None):
+            self.chamadas = []
+            self.documento_atualizado = documento_atualizado
+        
+        async def insert_many(self, documentos, ordered=True):
+            from bson import ObjectId
+            self.chamadas.append(("insert_many", documentos))
+            for documento in documentos:
+                documento["_id"] = ObjectId()
+            return MagicMock(inserted_ids=[documento["_id"] for documento in documentos])
+        
+        async def bulk_write(self, operacoes, ordered=True):
+            self.chamadas.append(("bulk_write", operacoes))
+            return MagicMock(modified_count=len(operacoes))
+        
+        async def delete_many(self, filtro):
+            self.chamadas.append(("delete_many", filtro))
+            return MagicMock(deleted_count=len(filtro["_id"]["$in"]))
+        
+        async def find_one_and_update(self, filtro, atualizacao, return_document=None):
+            self.chamadas.append(("find_one_and_update", filtro))
+            return self.documento_atualizado
+    
+    def criar_crud(self, tmp_path, colecao):
+        from banco.cache import CacheConsultas
+        from banco.crud import RegistroExameCRUD
+        
+        crud = RegistroExameCRUD(CacheConsultas(marcador=str(tmp_path / "marcador")))
+        crud._collection = colecao
+        crud._gestantes = self.ColecaoAssincronaFalsa()
+        crud._resumos = self.ColecaoAssincronaFalsa()
+        crud._rollups = self.ColecaoAssincronaFalsa()
+        return crud
+    
+    def test_criar_registros_na_ordem(self, tmp_path, dados_gestante_validos, parametros_monitoramento_validos):
+        """
+        Teste: Criação em lote
+        Objetivo: Verificar um único insert_many e registros devolvidos na ordem de inserted_ids
+        """
+        import asyncio
+        from banco.models import RegistroExameCreate, ResultadoML
+        
+        # Arrange
+        colecao = self.ColecaoAssincronaFalsa()
+        crud = self.criar_crud(tmp_path, colecao)
+        exames = [
+            (RegistroExameCreate(dados_gestante={**dados_gestante_validos, "patient_id": f"P{i}"},
+                                 parametros_monitoramento=parametros_monitoramento_validos),
+             ResultadoML(prediction=1, confidence=90.0 - i, status="Normal", description="Normal"))
+            for i in range(3)
+        ]
+        
+        # Act
+        registros = asyncio.run(crud.criar_registros(exames))
+        
+        # Assert
+        (metodo, documentos), = colecao.chamadas
+        assert metodo == "insert_many"
+        assert [r.id for r in registros] == [str(d["_id"]) for d in documentos]
+        assert [r.resultado_ml.confidence for r in registros] == [90.0, 89.0, 88.0]
+        assert asyncio.run(crud.criar_registros([])) == []
+    
+    def test_atualizar_registros_ignora_ids_invalidos(self, tmp_path):
+        """
+        Teste: Atualização em lote
+        Objetivo: Verificar um único bulk_write só com os ids válidos
+        """
+        import asyncio
+        from bson import ObjectId
+        
+        # Arrange
+        colecao = self.ColecaoAssincronaFalsa()
+        crud = self.criar_crud(tmp_path, colecao)
+        validos = [str(ObjectId()), str(ObjectId())]
+        
+        # Act
+        modificados = asyncio.run(crud.atualizar_registros(
+            {validos[0]: {"observacoes": "a"}, "invalido": {"observacoes": "b"}, validos[1]: {"observacoes": "c"}}
+        ))
+        
+        # Assert
+        (metodo, operacoes), = colecao.chamadas
+        assert metodo == "bulk_write"
+        assert modificados == 2
+        assert [str(op._filter["_id"]) for op in operacoes] == validos
+        assert all("ultima_atualizacao" in op._doc["$set"] for op in operacoes)
+    
+    def test_atualizar_registro_inexistente(self, tmp_path):
+        """
+        Teste: find_one_and_update sem documento
+        Objetivo: Verificar None para id inexistente e nenhuma chamada para id inválido
+        """
+        import asyncio
+        from bson import ObjectId
+        
+        # Arrange
+        colecao = self.ColecaoAssincronaFalsa(documento_atualizado=None)
+        crud = self.criar_crud(tmp_path, colecao)
+        
+        # Act
+        inexistente = asyncio.run(crud.atualizar_registro(str(ObjectId()), {"observacoes": "x"}))
+        invalido = asyncio.run(crud.atualizar_registro("invalido", {"observacoes": "x"}))
+        
+        # Assert
+        assert inexistente is None and invalido is None
+        assert [metodo for metodo, _ in colecao.chamadas] == ["find_one_and_update"]
+    
+    def test_deletar_registros(self, tmp_path):
+        """
+        Teste: Exclusão em lote
+        Objetivo: Verificar um único delete_many com os ids válidos e nenhuma chamada só com ids inválidos
+        """
+        import asyncio
+        from bson import ObjectId
+        
+        # Arrange
+        colecao = self.ColecaoAssincronaFalsa()
+        crud = self.criar_crud(tmp_path, colecao)
+        valido = ObjectId()
+        
+        # Act
+        sem_validos = asyncio.run(crud.deletar_registros(["x", "123"]))
+        chamadas_sem_validos = len(colecao.chamadas)
+        deletados = asyncio.run(crud.deletar_registros([str(valido), "x"]))
+        
+        # Assert
+        assert sem_validos == 0
+        assert chamadas_sem_validos == 0
+        assert deletados == 1
+        assert colecao.chamadas == [("delete_many", {"_id": {"$in": [valido]}})]
+
+
+class TestPlanosConsulta:
+    """Testes da verificação de planos de explain()"""
+    
+    PLANO_INDICE_ORDENADO = {
+        "stage": "LIMIT",
+        "inputStage": {"stage": "FETCH", "inputStage": {
+            "stage": "IXSCAN", "indexName": "status_data",
+            "indexBounds": {"saude_feto.status_saude": ['["Normal", "Normal"]'], "data_exame": ["[MaxKey, MinKey]"]}
+        }}
+    }
+    PLANO_SORT_COLLSCAN = {
+        "stage": "SORT",
+        "inputStage": {"stage": "COLLSCAN", "filter": {"saude_feto.nivel_risco": {"$eq": "CRÍTICO"}}}
+    }
+    PLANO_REGEX = {
+        "stage": "FETCH",
+        "inputStage": {"stage": "OR", "inputStages": [{
+            "stage": "IXSCAN",
+            "indexBounds": {"dados_gestante.patient_cpf": ['["", {})', "[/123/i, /123/i]"],
+                            "data_exame": ["[MaxKey, MinKey]"]}
+        }]}
+    }
+    
+    def test_coletar_estagios_aninhados(self):
+        """
+        Teste: Estágios de um plano
+        Objetivo: Verificar a coleta em inputStage e inputStages aninhados
+        """
+        from banco.indices import coletar_estagios
+        
+        # Act & Assert
+        assert coletar_estagios(self.PLANO_INDICE_ORDENADO) == {"LIMIT", "FETCH", "IXSCAN"}
+        assert coletar_estagios(self.PLANO_SORT_COLLSCAN) == {"SORT", "COLLSCAN"}
+        assert coletar_estagios(self.PLANO_REGEX) == {"FETCH", "OR", "IXSCAN"}
+    
+    def test_verificar_planos(self):
+        """
+        Teste: Verificação dos formatos de consulta
+        Objetivo: Verificar falha por COLLSCAN/SORT e alerta por IXSCAN sem limites em campo filtrado
+        """
+        from banco.indices import verificar_planos
+        
+        # Arrange
+        consultas = [
+            {"nome": "status", "filtro": {"saude_feto.status_saude": "Normal"}, "plano": self.PLANO_INDICE_ORDENADO},
+            {"nome": "risco", "filtro": {"saude_feto.nivel_risco": "CRÍTICO"}, "contagem": True,
+             "plano": self.PLANO_SORT_COLLSCAN},
+            {"nome": "cpf", "filtro": {"dados_gestante.patient_cpf": {"$regex": "123", "$options": "i"}},
+             "plano": self.PLANO_REGEX},
+        ]
+        database = MagicMock()
+        database.command.side_effect = [{"queryPlanner": {"winningPlan": c["plano"]}} for c in consultas]
+        
+        # Act
+        resultados = {r["nome"]: r for r in verificar_planos(database, consultas)}
+        
+        # Assert
+        assert resultados["status"]["ok"] and resultados["status"]["alertas"] == []
+        assert not resultados["risco"]["ok"]
+        assert resultados["risco"]["problemas"] == ["COLLSCAN", "SORT"]
+        assert resultados["cpf"]["ok"]
+        assert resultados["cpf"]["alertas"] == ["IXSCAN sem limites em dados_gestante.patient_cpf"]
+        assert database.command.call_args_list[1].args[1] == {
+            "count": "registros_exames", "query": {"saude_feto.nivel_risco": "CRÍTICO"}
+        }
+
+
+class TestCodecJSON:
+    """Testes do codec JSON das APIs Flask"""
+
+    @pytest.fixture
+    def resposta_registros(self, dados_gestante_validos, parametros_monitoramento_validos):
+        """Página de /records com tipos do banco e do NumPy"""
+        import numpy as np
+        from bson import ObjectId
+        from datetime import datetime, timezone
+        return {
+            "records": [
+                {
+                    "_id": ObjectId(),
+                    "dados_gestante": dados_gestante_validos,
+                    "parametros_monitoramento": parametros_monitoramento_validos,
+                    "resultado_ml": {"prediction": np.int64(1), "confidence": np.float32(85.5)},
+                    "data_exame": datetime(2025, 7, 3, 12, 0, 0, 123456)
+                }
+                for _ in range(200)
+            ],
+            "gerado_em": datetime(2025, 7, 3, 12, 0, tzinfo=timezone.utc),
+            "probabilidades": np.array([0.1, 0.2, 0.7]),
+            "contagens": {None: 1, "Normal": 2}
+        }
+
+    def test_codecs_equivalentes(self, resposta_registros):
+        """
+        Teste: orjson x biblioteca padrão
+        Objetivo: Verificar o mesmo JSON para ObjectId, datetime (UTC com Z) e NumPy
+        """
+        import json
+        from banco.json_rapido import criar_codec
+
+        # Act
+        via_orjson = json.loads(criar_codec("orjson").dumps(resposta_registros))
+        via_json = json.loads(criar_codec("json").dumps(resposta_registros))
+
+        # Assert
+        assert via_orjson == via_json
+        registro = via_orjson["records"][0]
+        assert registro["_id"] == str(resposta_registros["records"][0]["_id"])
+        assert registro["data_exame"] == "2025-07-03T12:00:00.123456Z"
+        assert registro["resultado_ml"] == {"prediction": 1, "confidence": 85.5}
+        assert via_orjson["gerado_em"] == "2025-07-03T12:00:00Z"
+        assert via_orjson["probabilidades"] == [0.1, 0.2, 0.7]
+        assert via_orjson["contagens"] == {"null": 1, "Normal": 2}
+
+    def test_fragmento_e_provedor_flask(self):
+        """
+        Teste: Fragmentos pré-serializados e provedor do Flask
+        Objetivo: Verificar que get_json/jsonify usam o codec e que o fragmento estendido é JSON válido
+        """
+        import json
+        from flask import Flask, request, jsonify
+        from banco.json_rapido import instalar_codec, criar_codec, FragmentoJSON, resposta_json
+
+        # Arrange
+        app = Flask(__name__)
+        codec = instalar_codec(app, "orjson")
+        fragmento = FragmentoJSON(codec, {"status": "Normal", "recommendations": ["Rotina"]})
+
+        @app.route('/eco', methods=['POST'])
+        def eco():
+            return jsonify(request.get_json())
+
+        @app.route('/fragmento')
+        def rota_fragmento():
+            return resposta_json(app, fragmento.com(confidence=91.5))
+
+        client = app.test_client()
+
+        # Act
+        eco_resposta = client.post('/eco', json={"cpf": "123", "valores": [1, 2.5]})
+        fragmento_resposta = client.get('/fragmento')
+
+        # Assert
+        assert eco_resposta.get_json() == {"cpf": "123", "valores": [1, 2.5]}
+        assert fragmento_resposta.mimetype == "application/json"
+        assert json.loads(fragmento_resposta.data) == {"status": "Normal", "recommendations": ["Rotina"], "confidence": 91.5}
+        assert fragmento.com() == fragmento.corpo
+        assert json.loads(FragmentoJSON(codec, {}).com(a=1)) == {"a": 1}
+        assert FragmentoJSON(criar_codec("json"), {"status": "Normal"}).com(confidence=91.5) == \
+            FragmentoJSON(codec, {"status": "Normal"}).com(confidence=91.5)
+
+    @pytest.mark.performance
+    def test_performance_codec(self, resposta_registros):
+        """
+        Teste: Custo de serializar uma página de /records
+        Objetivo: Comparar orjson com a biblioteca padrão (meta: orjson mais rápido)
+        """
+        from banco.json_rapido import criar_codec
+
+        # Arrange
+        codecs = {nome: criar_codec(nome) for nome in ("orjson", "json")}
+        tempos = {}
+
+        # Act
+        for nome, codec in codecs.items():
+            start = time.perf_counter()
+            for _ in range(20):
+                codec.dumps(resposta_registros)
+            tempos[nome] = (time.perf_counter() - start) / 20
+
+        # Assert
+        assert tempos["orjson"] < tempos["json"]
+
+        print(f"\n📊 Página de 200 registros: orjson {tempos['orjson']*1000:.2f}ms | "
+              f"json {tempos['json']*1000:.2f}ms ({tempos['json'] / tempos['orjson']:.1f}x)")
+
+
+class TestGetCondicional:
+    """Testes das respostas com ETag / If-None-Match"""
+
+    @pytest.fixture
+    def app_condicional(self):
+        """App Flask com um recurso versionado e um recurso com corpo gerado sob demanda"""
+        from flask import Flask
+        from banco.json_rapido import instalar_codec
+        from banco.condicional import RecursoVersionado, responder_condicional
+
+        app = Flask(__name__)
+        codec = instalar_codec(app, "orjson")
+        recurso = RecursoVersionado(codec, {"features": ["baseline_value"]}, versao="v1")
+        app.geracoes = 0
+
+        @app.route('/versionado')
+        def versionado():
+            return recurso.responder(app)
+
+        @app.route('/dados')
+        def dados():
+            def gerar():
+                app.geracoes += 1
+                return codec.dumps({"total_records": 10})
+            return responder_condicional(app, "stats-3", gerar, fraca=True)
+
+        return app
+
+    def test_etag_forte_e_304(self, app_condicional):
+        """
+        Teste: Recurso versionado
+        Objetivo: Verificar ETag forte, Cache-Control e 304 sem corpo para If-None-Match correspondente
+        """
+        # Arrange
+        client = app_condicional.test_client()
+
+        # Act
+        primeira = client.get('/versionado')
+        etag = primeira.headers['ETag']
+        revalidada = client.get('/versionado', headers={'If-None-Match': etag})
+        outra_versao = client.get('/versionado', headers={'If-None-Match': '"v0-abc"'})
+
+        # Assert
+        assert primeira.status_code == 200 and primeira.get_json() == {"features": ["baseline_value"]}
+        assert etag.startswith('"v1-') and not etag.startswith('W/')
+        assert primeira.headers['Cache-Control'].startswith('public')
+        assert revalidada.status_code == 304 and revalidada.data == b''
+        assert revalidada.headers['ETag'] == etag
+        assert outra_versao.status_code == 200
+
+    def test_304_sem_gerar_corpo(self, app_condicional):
+        """
+        Teste: Recurso derivado dos dados
+        Objetivo: Verificar que o 304 não gera o corpo (sem consulta ao banco) e que a ETag é fraca
+        """
+        # Arrange
+        client = app_condicional.test_client()
+
+        # Act
+        primeira = client.get('/dados')
+        revalidadas = [client.get('/dados', headers={'If-None-Match': primeira.headers['ETag']}) for _ in range(5)]
+
+        # Assert
+        assert primeira.headers['ETag'] == 'W/"stats-3"'
+        assert primeira.headers['Cache-Control'] == 'no-cache'
+        assert all(r.status_code == 304 for r in revalidadas)
+        assert app_condicional.geracoes == 1
+
+class TestNormalizacaoGestantes:
+    """Testes da separação entre exame e cadastro da gestante"""
+    
+    @pytest.mark.parametrize("cpf,chave_esperada", [
+        ('123.456.789-01', '12345678901'),
+        ('12345678901', '12345678901'),
+        ('00000000000', 'ID:TEST001'),
+        (None, 'ID:TEST001'),
+    ])
+    def test_chave_gestante(self, dados_gestante_validos, cpf, chave_esperada):
+        """
+        Teste: Chave da gestante
+        Objetivo: Verificar CPF normalizado e fallback para patient_id
+        """
+        from banco.gestantes import chave_gestante
+        
+        # Act & Assert
+        assert chave_gestante({**dados_gestante_validos, 'patient_cpf': cpf}) == chave_esperada
+    
+    @pytest.mark.parametrize("patient_id", [None, "", "   "])
+    def test_chave_gestante_sem_identificacao(self, dados_gestante_validos, patient_id):
+        """
+        Teste: Gestante sem CPF nem patient_id
+        Objetivo: Verificar que não é gerada a chave "ID:None" compartilhada
+        """
+        from banco.gestantes import chave_gestante
+        
+        # Act & Assert
+        assert chave_gestante({**dados_gestante_validos, 'patient_cpf': None, 'patient_id': patient_id}) is None
+    
+    def test_migracao_ignora_exames_sem_chave(self, dados_gestante_validos):
+        """
+        Teste: Migração de exames sem chave e sem perfil
+        Objetivo: Verificar que exames sem chave ficam como estão e que só há upsert com perfil
+        """
+        from banco.database import COLLECTION_NAME, GESTANTES_COLLECTION_NAME
+        from banco.gestantes import MigradorGestantes, CAMPOS_RESUMO
+        
+        # Arrange
+        database = {COLLECTION_NAME: MagicMock(), GESTANTES_COLLECTION_NAME: MagicMock()}
+        migrador = MigradorGestantes(database=database)
+        resumo = {campo: dados_gestante_validos[campo] for campo in CAMPOS_RESUMO}
+        documentos = [
+            {"_id": 1, "dados_gestante": {**dados_gestante_validos, "patient_cpf": None, "patient_id": ""}},
+            {"_id": 2, "dados_gestante": resumo},
+        ]
+        
+        # Act
+        migrador.migrar_lote(documentos)
+        
+        # Assert
+        migrador.gestantes.bulk_write.assert_not_called()
+        atualizacoes = migrador.exames.bulk_write.call_args[0][0]
+        assert [operacao._filter for operacao in atualizacoes] == [{"_id": 2}]
+        assert migrador.sem_chave == 1
+    
+    def test_separar_e_mesclar(self, dados_gestante_validos):
+        """
+        Teste: Resumo no exame e cadastro na collection de gestantes
+        Objetivo: Verificar que a leitura recompõe os mesmos dados_gestante
+        """
+        from banco.gestantes import separar_dados_gestante, mesclar_perfis
+        
+        # Arrange
+        completos = DadosGestante(
+            **dados_gestante_validos,
+            patient_address='Rua A, 10',
+            health_insurance='SUS'
+        ).model_dump()
+        
+        # Act
+        resumo, perfil = separar_dados_gestante(completos)
+        registro = {'gestante_id': '12345678901', 'dados_gestante': resumo}
+        mesclar_perfis([registro], {'12345678901': {'_id': '12345678901', **perfil}})
+        
+        # Assert
+        assert 'patient_address' not in resumo
+        assert perfil == {'patient_address': 'Rua A, 10', 'health_insurance': 'SUS'}
+        assert DadosGestante(**registro['dados_gestante']).model_dump() == completos
+
+
+class TestResumoGestante:
+    """Testes do resumo longitudinal mantido a cada exame"""
+    
+    def test_operacao_atualizar_resumo(self, parametros_monitoramento_validos):
+        """
+        Teste: Update incremental do resumo
+        Objetivo: Verificar contagem por status, pior status e histórico limitado
+        """
+        from bson import ObjectId
+        from banco.resumo_gestante import operacao_atualizar_resumo, TAMANHO_HISTORICO
+        
+        # Arrange
+        registro = {
+            '_id': ObjectId(),
+            'gestante_id': '12345678901',
+            'dados_gestante': {'patient_id': 'TEST001', 'patient_name': 'Maria Silva'},
+            'parametros_monitoramento': parametros_monitoramento_validos,
+            'resultado_ml': {'prediction': 2, 'confidence': 60.0},
+            'saude_feto': {'status_saude': 'Em Risco', 'confidence_value': 60.0, 'nivel_risco': 'MODERADO'}
+        }
+        
+        # Act
+        operacao = operacao_atualizar_resumo(registro)
+        atualizacao = operacao._doc
+        
+        # Assert
+        assert operacao._filter == {'_id': '12345678901'}
+        assert atualizacao['$inc']['contagem_status.Em Risco'] == 1
+        assert atualizacao['$max']['pior_gravidade'] == 1
+        assert atualizacao['$push']['historico']['$slice'] == -TAMANHO_HISTORICO
+        assert atualizacao['$push']['historico']['$each'][0]['registro_id'] == str(registro['_id'])
+    
+    def test_formatar_linha_do_tempo(self):
+        """
+        Teste: Linha do tempo a partir do resumo
+        Objetivo: Verificar médias gerais, médias móveis, pior status e tendência
+        """
+        from banco.resumo_gestante import formatar_linha_do_tempo
+        
+        # Arrange
+        historico = [
+            {'confidence': c, 'status_saude': 'Normal', 'baseline_value': 130.0,
+             'abnormal_short_term_variability': v}
+            for c, v in [(90.0, 10.0), (80.0, 20.0), (70.0, 30.0)]
+        ]
+        resumo = {
+            '_id': '12345678901', 'total_exames': 4, 'pior_gravidade': 2,
+            'contagem_status': {'Normal': 3, 'Risco Crítico': 1},
+            'soma_confidence': 290.0,
+            'soma_features': {'baseline_value': 520.0, 'abnormal_short_term_variability': 110.0},
+            'historico': historico
+        }
+        
+        # Act
+        timeline = formatar_linha_do_tempo(resumo)
+        
+        # Assert
+        assert timeline['pior_status'] == 'Risco Crítico'
+        assert timeline['confidence_media'] == 72.5
+        assert timeline['medias_gerais']['abnormal_short_term_variability'] == 27.5
+        assert timeline['medias_moveis']['abnormal_short_term_variability'] == 20.0
+        assert timeline['ultimas_confidences'] == [90.0, 80.0, 70.0]
+        assert timeline['tendencia_confidence'] == {'inclinacao': -10.0, 'direcao': 'caindo'}
+
+    def test_reconstrucao_troca_colecao(self):
+        """
+        Teste: Reconstrução dos resumos
+        Objetivo: Verificar que os resumos são montados numa collection temporária e trocados
+                  por rename, sem esvaziar a collection lida pela API
+        """
+        from datetime import datetime
+        from banco.database import COLLECTION_NAME, RESUMOS_COLLECTION_NAME
+        from banco.resumo_gestante import reconstruir_resumos
+
+        # Arrange
+        colecoes = {}
+        database = MagicMock()
+        database.__getitem__.side_effect = lambda nome: colecoes.setdefault(nome, MagicMock())
+        database.list_collection_names.return_value = [RESUMOS_COLLECTION_NAME + '_reconstrucao']
+        passadas = []
+        for quantidade in (3, 1):
+            cursor = MagicMock()
+            cursor.__iter__.return_value = iter([
+                {'_id': i, 'gestante_id': '12345678901', 'data_exame': datetime(2025, 1, 1, i)}
+                for i in range(quantidade)
+            ])
+            passadas.append(cursor)
+        database[COLLECTION_NAME].find.return_value.sort.return_value.batch_size.side_effect = passadas
+
+        # Act
+        resultado = reconstruir_resumos(database, tamanho_lote=2)
+
+        # Assert
+        temporaria = colecoes[RESUMOS_COLLECTION_NAME + '_reconstrucao']
+        assert resultado['exames_processados'] == 4
+        assert [len(chamada.args[0]) for chamada in temporaria.bulk_write.call_args_list] == [2, 1, 1]
+        temporaria.rename.assert_called_once_with(RESUMOS_COLLECTION_NAME, dropTarget=True)
+        colecoes[RESUMOS_COLLECTION_NAME].delete_many.assert_not_called()
+        filtros = [chamada.args[0]['data_exame'] for chamada in database[COLLECTION_NAME].find.call_args_list]
+        assert filtros[0] == {'$not': filtros[1]}
+
+
+class TestRollups:
+    """Testes dos agregados por período"""
+    
+    @pytest.mark.parametrize("semanas,faixa_esperada", [
+        (20, '<28'), (27, '<28'), (28, '28-31'), (36, '32-36'), (40, '37+'), (None, 'desconhecida'),
+        (0, 'desconhecida'), (-3, 'desconhecida'),
+    ])
+    def test_faixa_idade_gestacional(self, semanas, faixa_esperada):
+        """
+        Teste: Faixas de idade gestacional
+        Objetivo: Verificar os limites das faixas usadas nos agregados
+        """
+        from banco.rollups import faixa_idade_gestacional
+        
+        # Act & Assert
+        assert faixa_idade_gestacional(semanas) == faixa_esperada
+    
+    def test_operacoes_hora_e_dia(self, dados_gestante_validos):
+        """
+        Teste: Upserts incrementais de um exame
+        Objetivo: Verificar um documento por hora e um por dia com as mesmas dimensões
+        """
+        from datetime import datetime
+        from banco.rollups import operacoes_rollups
+        
+        # Arrange
+        registro = {
+            'dados_gestante': {**dados_gestante_validos, 'gestational_age': 30},
+            'resultado_ml': {'prediction': 3.0, 'confidence': 50.0},
+            'saude_feto': {'status_saude': 'Risco Crítico', 'confidence_value': 50.0, 'nivel_risco': 'CRÍTICO'},
+            'data_exame': datetime(2025, 7, 3, 14, 35, 10)
+        }
+        
+        # Act
+        operacoes = operacoes_rollups([registro])
+        
+        # Assert
+        assert [op._filter['_id'] for op in operacoes] == [
+            'hora|2025-07-03T14:00:00|Risco Crítico|CRÍTICO|28-31',
+            'dia|2025-07-03T00:00:00|Risco Crítico|CRÍTICO|28-31',
+        ]
+        assert operacoes[0]._doc['$inc'] == {'total': 1, 'soma_confidence': 50.0, 'contagem_prediction.3': 1}
+        assert operacoes[1]._doc['$setOnInsert']['inicio'] == datetime(2025, 7, 3)
+    
+    def test_consulta_invalida(self):
+        """
+        Teste: Validação da consulta por intervalo
+        Objetivo: Rejeitar dimensões desconhecidas e séries longas demais antes de consultar o banco
+        """
+        from datetime import datetime
+        from banco.rollups import consultar_rollups
+        
+        # Act & Assert
+        with pytest.raises(ValueError):
+            consultar_rollups(None, datetime(2025, 1, 1), datetime(2025, 2, 1), agrupar_por=['cpf'])
+        with pytest.raises(ValueError):
+            consultar_rollups(None, datetime(2020, 1, 1), datetime(2025, 1, 1), granularidade='hora', serie=True)
+        with pytest.raises(ValueError):
+            consultar_rollups(None, datetime(2025, 2, 1), datetime(2025, 1, 1))
+    
+    def test_consulta_alinha_intervalo(self):
+        """
+        Teste: Intervalo fora dos limites dos períodos
+        Objetivo: Verificar que a consulta usa períodos inteiros e devolve o intervalo efetivo e o solicitado
+        """
+        from datetime import datetime
+        from banco.database import ROLLUPS_COLLECTION_NAME
+        from banco.rollups import consultar_rollups
+        
+        # Arrange
+        database = {ROLLUPS_COLLECTION_NAME: MagicMock()}
+        database[ROLLUPS_COLLECTION_NAME].aggregate.return_value = [
+            {'_id': {'status_saude': 'Normal'}, 'total': 4, 'soma_confidence': 360.0}
+        ]
+        inicio, fim = datetime(2025, 1, 1, 10, 30), datetime(2025, 1, 3, 9, 15)
+        
+        # Act
+        resultado = consultar_rollups(database, inicio, fim, granularidade='dia')
+        
+        # Assert
+        filtro = database[ROLLUPS_COLLECTION_NAME].aggregate.call_args.args[0][0]['$match']
+        assert filtro['inicio'] == {'$gte': datetime(2025, 1, 1), '$lt': datetime(2025, 1, 4)}
+        assert (resultado['inicio'], resultado['fim']) == (datetime(2025, 1, 1), datetime(2025, 1, 4))
+        assert resultado['intervalo_solicitado'] == {'inicio': inicio, 'fim': fim}
+        assert resultado['grupos'] == [{'status_saude': 'Normal', 'total': 4, 'confidence_media': 90.0}]
+
+
+class TestExportacao:
+    """Testes da exportação em streaming"""
+    
+    @pytest.fixture
+    def documentos_exame(self, dados_gestante_validos, parametros_monitoramento_validos):
+        """Documentos de exame como lidos do banco"""
+        from datetime import datetime
+        from bson import ObjectId
+        
+        return [{
+            '_id': ObjectId(),
+            'gestante_id': '12345678901',
+            'dados_gestante': dados_gestante_validos,
+            'parametros_monitoramento': parametros_monitoramento_validos,
+            'resultado_ml': {'prediction': 1, 'confidence': 90.0, 'status': 'Normal', 'description': 'x'},
+            'saude_feto': {'status_saude': 'Normal', 'confidence_value': 90.0, 'nivel_risco': 'BAIXO'},
+            'data_exame': datetime(2025, 7, 3, 12, i),
+            'medico_responsavel': 'Dr. Teste'
+        } for i in range(5)]
+    
+    def test_montar_filtro(self):
+        """
+        Teste: Filtro da exportação
+        Objetivo: Verificar os mesmos filtros de /records com intervalo de datas
+        """
+        from datetime import datetime
+        from banco.exportacao import montar_filtro
+        
+        # Act
+        filtro = montar_filtro('123', 'Normal', datetime(2025, 7, 1), None)
+        
+        # Assert
+        assert filtro == {
+            'dados_gestante.patient_cpf': {'$regex': '123', '$options': 'i'},
+            'saude_feto.status_saude': 'Normal',
+            'data_exame': {'$gte': datetime(2025, 7, 1)}
+        }
+        assert montar_filtro() == {}
+    
+    def test_csv_em_blocos(self, documentos_exame):
+        """
+        Teste: CSV em blocos
+        Objetivo: Verificar cabeçalho único, colunas achatadas e blocos de tamanho fixo
+        """
+        import csv
+        import io
+        from banco.exportacao import gerar_csv, COLUNAS
+        
+        # Act
+        blocos = list(gerar_csv(iter(documentos_exame), linhas_por_bloco=2))
+        linhas = list(csv.DictReader(io.StringIO(''.join(blocos))))
+        
+        # Assert
+        assert len(blocos) == 3
+        assert len(linhas) == 5
+        assert list(linhas[0]) == COLUNAS
+        assert linhas[0]['dados_gestante.patient_cpf'] == documentos_exame[0]['dados_gestante']['patient_cpf']
+        assert linhas[0]['data_exame'] == '2025-07-03T12:00:00'
+        assert 'resultado_ml.description' not in linhas[0]
+    
+    def test_ndjson(self, documentos_exame):
+        """
+        Teste: NDJSON
+        Objetivo: Verificar um objeto JSON por linha com o _id como texto
+        """
+        import json
+        from banco.exportacao import gerar_ndjson
+        
+        # Act
+        linhas = ''.join(gerar_ndjson(iter(documentos_exame), linhas_por_bloco=2)).splitlines()
+        
+        # Assert
+        assert len(linhas) == 5
+        assert json.loads(linhas[4])['_id'] == str(documentos_exame[4]['_id'])
+        assert json.loads(linhas[4])['saude_feto.nivel_risco'] == 'BAIXO'
+
+
+class TestArquivamento:
+    """Testes da seleção de partições e da leitura do arquivo de retenção"""
+    
+    def test_particoes_do_intervalo(self, tmp_path):
+        """
+        Teste: Seleção de arquivos pelo manifesto
+        Objetivo: Verificar o descarte por intervalo de datas e por status ausente
+        """
+        from datetime import datetime
+        from banco.arquivamento import salvar_manifesto, carregar_manifesto, particoes_do_intervalo, horizonte_arquivo
+        
+        # Arrange
+        salvar_manifesto({"versao": 1, "horizonte": "2024-07-03T00:00:00", "particoes": {
+            "2024-07-01": [{"arquivo": "a.parquet", "min_data": "2024-07-01T08:00:00",
+                            "max_data": "2024-07-01T20:00:00", "status": {"Normal": 10}}],
+            "2024-07-02": [{"arquivo": "b.parquet", "min_data": "2024-07-02T08:00:00",
+                            "max_data": "2024-07-02T20:00:00", "status": {"Normal": 5, "Em Risco": 1}}],
+        }}, str(tmp_path))
+        manifesto = carregar_manifesto(str(tmp_path))
+        
+        # Act
+        por_data = particoes_do_intervalo(manifesto, datetime(2024, 7, 2), None)
+        por_status = particoes_do_intervalo(manifesto, None, None, 'Em Risco')
+        todos = particoes_do_intervalo(manifesto, datetime(2024, 6, 1), datetime(2024, 7, 3))
+        
+        # Assert
+        assert [a['arquivo'] for a in por_data] == ['b.parquet']
+        assert [a['arquivo'] for a in por_status] == ['b.parquet']
+        assert len(todos) == 2
+        assert horizonte_arquivo(str(tmp_path)) == datetime(2024, 7, 3)
+        assert horizonte_arquivo(str(tmp_path / 'vazio')) is None
+    
+    def test_desachatar(self, dados_gestante_validos):
+        """
+        Teste: Documento recomposto a partir das colunas
+        Objetivo: Verificar que desachatar desfaz o achatamento da exportação
+        """
+        from banco.exportacao import achatar
+        from banco.arquivamento import desachatar
+        
+        # Arrange
+        documento = {'_id': 'abc', 'dados_gestante': dados_gestante_validos,
+                     'saude_feto': {'status_saude': 'Normal', 'confidence_value': 90.0, 'nivel_risco': 'BAIXO'}}
+        
+        # Act
+        recomposto = desachatar(achatar(documento))
+        
+        # Assert
+        assert recomposto['_id'] == 'abc'
+        assert recomposto['saude_feto'] == documento['saude_feto']
+        assert recomposto['dados_gestante']['patient_cpf'] == dados_gestante_validos['patient_cpf']
+
+
+class TestArquivamentoParquet:
+    """Testes do arquivo Parquet da retenção (requer pyarrow)"""
+    
+    class ColecaoFalsa:
+        """Collection mínima para o ArquivadorExames (find ordenado e delete_many)"""
+        
+        def __init__(self, documentos):
+            self.documentos = documentos
+            self.excluidos = []
+        
+        def find(self, filtro, projection=None):
+            intervalo = filtro["data_exame"]
+            selecionados = sorted(
+                (d for d in self.documentos if intervalo["$gte"] <= d["data_exame"] < intervalo["$lt"]),
+                key=lambda d: d["data_exame"]
+            )
+            cursor = MagicMock()
+            cursor.sort.return_value.batch_size.return_value = cursor
+            cursor.__iter__.return_value = iter(selecionados)
+            return cursor
+        
+        def delete_many(self, filtro):
+            self.excluidos.extend(filtro["_id"]["$in"])
+    
+    @pytest.fixture
+    def documentos_completos(self, dados_gestante_validos, parametros_monitoramento_validos):
+        """Exames com campos fora das colunas da exportação"""
+        from datetime import datetime
+        from bson import ObjectId
+        
+        return [{
+            '_id': ObjectId(),
+            'gestante_id': '12345678901',
+            'dados_gestante': {**dados_gestante_validos, 'patient_age': 25.0 + i, 'endereco': 'Rua A'},
+            'parametros_monitoramento': parametros_monitoramento_validos,
+            'resultado_ml': {'prediction': 1, 'confidence': 90.0, 'status': 'Normal', 'description': 'x',
+                             'recommendations': ['a', 'b'], 'versao_modelo': 'v1'},
+            'saude_feto': {'status_saude': 'Normal' if i % 2 else 'Em Risco', 'confidence_value': 90.0,
+                           'nivel_risco': 'BAIXO'},
+            'reprocessamento': {'versao_anterior': 'v0', 'data': datetime(2024, 7, 5, 1, 2, 3, 4000)},
+            'ultima_atualizacao': datetime(2024, 7, 6),
+            'data_exame': datetime(2024, 7, 1, 12, i),
+        } for i in range(6)]
+    
+    def test_arquivar_e_consultar_documento_inteiro(self, tmp_path, documentos_completos):
+        """
+        Teste: Arquivamento sem perda de campos e consulta paginada
+        Objetivo: Verificar que o arquivo devolve os exames idênticos e que skip/limit valem sobre o total
+        """
+        pytest.importorskip("pyarrow")
+        from datetime import datetime
+        from banco.database import COLLECTION_NAME
+        from banco.arquivamento import ArquivadorExames, consultar_arquivo
+        
+        # Arrange
+        colecao = self.ColecaoFalsa(documentos_completos)
+        arquivador = ArquivadorExames(database={COLLECTION_NAME: colecao}, diretorio=str(tmp_path))
+        
+        # Act
+        arquivados = arquivador.arquivar_dia(datetime(2024, 7, 1), datetime(2024, 7, 2))
+        pagina, total = consultar_arquivo(datetime(2024, 7, 1), datetime(2024, 7, 2),
+                                          diretorio=str(tmp_path), skip=1, limit=2)
+        todos, _ = consultar_arquivo(datetime(2024, 7, 1), None, diretorio=str(tmp_path))
+        risco, total_risco = consultar_arquivo(None, None, 'Em Risco', diretorio=str(tmp_path))
+        # CPF como expressão regular, igual ao $regex dos exames no banco
+        _, total_prefixo = consultar_arquivo(None, None, cpf='^123', diretorio=str(tmp_path))
+        _, total_meio = consultar_arquivo(None, None, cpf='^234', diretorio=str(tmp_path))
+        
+        # Assert
+        assert arquivados == 6
+        assert colecao.excluidos == [d['_id'] for d in documentos_completos]
+        assert total == 6
+        assert [d['_id'] for d in pagina] == [documentos_completos[4]['_id'], documentos_completos[3]['_id']]
+        assert todos == documentos_completos[::-1]
+        assert type(todos[0]['dados_gestante']['patient_age']) is float
+        assert total_risco == 3 and len(risco) == 3
+        assert (total_prefixo, total_meio) == (6, 0)
+    
+    def test_verificacao_impede_exclusao(self, tmp_path, documentos_completos):
+        """
+        Teste: Conferência do arquivo antes da exclusão
+        Objetivo: Verificar que um arquivo que não reproduz os exames é removido e nada é excluído
+        """
+        pytest.importorskip("pyarrow")
+        from datetime import datetime
+        from unittest.mock import patch
+        from banco.database import COLLECTION_NAME
+        from banco import arquivamento
+        
+        # Arrange
+        colecao = self.ColecaoFalsa(documentos_completos)
+        arquivador = arquivamento.ArquivadorExames(database={COLLECTION_NAME: colecao}, diretorio=str(tmp_path))
+        
+        # Act & Assert
+        with patch.object(arquivamento, "recompor", side_effect=lambda linha: {}):
+            with pytest.raises(RuntimeError):
+                arquivador.arquivar_dia(datetime(2024, 7, 1), datetime(2024, 7, 2))
+        assert colecao.excluidos == []
+        assert arquivamento.carregar_manifesto(str(tmp_path))["particoes"] == {}
+        assert not any(tmp_path.rglob("*.parquet"))
+
+
+class TestIndiceSimilares:
+    """Testes do índice k-NN de exames semelhantes"""
+    
+    @staticmethod
+    def documentos(quantidade, semente=0):
+        import numpy as np
+        from bson import ObjectId
+        from modelo.preditor import EXPECTED_FEATURES
+        
+        rng = np.random.RandomState(semente)
+        valores = rng.normal(loc=100, scale=25, size=(quantidade, len(EXPECTED_FEATURES)))
+        status = ["Normal", "Em Risco", "Risco Crítico"]
+        return [{
+            "_id": ObjectId(),
+            "parametros_monitoramento": dict(zip(EXPECTED_FEATURES[:-1], linha[:-1].tolist()), histogram_tendency=0),
+            "saude_feto": {"status_saude": status[i % 3]}
+        } for i, linha in enumerate(valores)]
+    
+    def test_busca_exata(self, tmp_path):
+        """
+        Teste: Vizinhos mais próximos
+        Objetivo: Verificar paridade com força bruta no espaço padronizado e exclusão do próprio exame
+        """
+        import numpy as np
+        from banco.similaridade import IndiceSimilares, lotes_documentos
+        from modelo.preditor import montar_matriz
+        
+        # Arrange
+        documentos = self.documentos(500)
+        indice = IndiceSimilares(str(tmp_path / "indice"))
+        indice.construir_de_lotes(lotes_documentos(documentos, tamanho=128))
+        referencia = documentos[7]
+        
+        # Act
+        vizinhos = indice.buscar(referencia["parametros_monitoramento"], k=5)
+        sem_proprio = indice.buscar(referencia["parametros_monitoramento"], k=5, excluir_id=str(referencia["_id"]))
+        
+        # Assert
+        matriz = montar_matriz(d["parametros_monitoramento"] for d in documentos)
+        desvio = matriz.std(axis=0)
+        padronizada = (matriz - matriz.mean(axis=0)) / np.where(desvio > 0, desvio, 1.0)
+        esperados = np.argsort(((padronizada - padronizada[7]) ** 2).sum(axis=1))[:6]
+        assert vizinhos[0]["record_id"] == str(referencia["_id"])
+        assert vizinhos[0]["distancia"] == pytest.approx(0, abs=1e-2)
+        assert [v["record_id"] for v in sem_proprio] == [str(documentos[i]["_id"]) for i in esperados[1:]]
+        assert sem_proprio[0]["status_saude"] == documentos[esperados[1]]["saude_feto"]["status_saude"]
+    
+    def test_anexar_e_recarregar(self, tmp_path):
+        """
+        Teste: Anexação incremental e persistência
+        Objetivo: Verificar que exames anexados são encontrados e sobrevivem à reabertura do índice
+        """
+        from banco.similaridade import IndiceSimilares, lotes_documentos
+        
+        # Arrange
+        diretorio = str(tmp_path / "indice")
+        indice = IndiceSimilares(diretorio)
+        indice.construir_de_lotes(lotes_documentos(self.documentos(200)))
+        novos = self.documentos(3, semente=1)
+        
+        # Act
+        indice.adicionar(novos)
+        reaberto = IndiceSimilares(diretorio)
+        vizinho = reaberto.buscar(novos[2]["parametros_monitoramento"], k=1)[0]
+        
+        # Assert
+        assert reaberto.total == 203
+        assert vizinho["record_id"] == str(novos[2]["_id"])
+        assert IndiceSimilares(str(tmp_path / "vazio")).disponivel is False
+    
+    def test_insercoes_durante_construcao(self, tmp_path):
+        """
+        Teste: Exames inseridos enquanto o índice é reconstruído
+        Objetivo: Verificar que os exames acima da marca d'água entram logo após a troca e
+                  que uma nova anexação do mesmo exame é ignorada
+        """
+        from bson import ObjectId
+        from banco.similaridade import IndiceSimilares, lotes_documentos
+        
+        # Arrange
+        diretorio = str(tmp_path / "indice")
+        existentes = self.documentos(60)
+        inseridos = self.documentos(3, semente=3)
+        colecao_documentos = list(existentes)
+        indice = IndiceSimilares(diretorio)
+        indice.construir_de_lotes(lotes_documentos(existentes[:50]))
+        outro_processo = IndiceSimilares(diretorio)
+        
+        def lotes_com_insercao():
+            for numero, lote in enumerate(lotes_documentos(existentes, tamanho=20)):
+                if numero == 1:
+                    # Anexado ao diretório antigo, que a troca descarta
+                    outro_processo.adicionar(inseridos[:1])
+                    colecao_documentos.extend(inseridos)
+                yield lote
+        
+        def find(filtro, projection=None):
+            minimo = filtro.get("_id", {}).get("$gt", ObjectId(b"\x00" * 12))
+            cursor = MagicMock()
+            cursor.sort.return_value.batch_size.return_value = cursor
+            cursor.__iter__.return_value = iter([d for d in colecao_documentos if d["_id"] > minimo])
+            return cursor
+        
+        collection = MagicMock()
+        collection.find.side_effect = find
+        
+        # Act
+        total = indice.construir_de_lotes(lotes_com_insercao(), collection)
+        repetido = outro_processo.adicionar(inseridos[:1])
+        
+        # Assert
+        assert total == 63
+        assert indice.ultimo_id == inseridos[-1]["_id"]
+        assert repetido == 0
+        assert outro_processo.total == IndiceSimilares(diretorio).total == 63
+        assert indice.buscar(inseridos[0]["parametros_monitoramento"], k=1)[0]["record_id"] == str(inseridos[0]["_id"])
+    
+    def test_detalhar_descarta_arquivados(self):
+        """
+        Teste: Vizinhos sem documento
+        Objetivo: Verificar que vizinhos arquivados são descartados e o resultado é limitado a k
+        """
+        from bson import ObjectId
+        from banco.similaridade import detalhar_vizinhos
+        
+        # Arrange
+        ids = [ObjectId() for _ in range(4)]
+        vizinhos = [{"record_id": str(i), "distancia": d} for d, i in enumerate(ids)]
+        collection = MagicMock()
+        collection.find.return_value = [{"_id": ids[0]}, {"_id": ids[2]}, {"_id": ids[3]}]
+        
+        # Act
+        detalhados = detalhar_vizinhos(vizinhos, collection, k=2)
+        
+        # Assert
+        assert [v["record_id"] for v in detalhados] == [str(ids[0]), str(ids[2])]
+
+
+class TestSnapshotAnalitico:
+    """Testes do snapshot colunar e das consultas vetorizadas"""
+    
+    @staticmethod
+    def documentos(quantidade, deslocamento=0):
+        from datetime import datetime, timedelta
+        from bson import ObjectId
+        
+        status_ml = ["Normal", "Suspeito", "Patológico"]
+        status_saude = ["Normal", "Em Risco", "Risco Crítico"]
+        return [{
+            "_id": ObjectId(),
+            "data_exame": datetime(2025, 1, 1) + timedelta(hours=i + deslocamento),
+            "dados_gestante": {"gestational_age": 24 + i % 16, "patient_age": 30},
+            "parametros_monitoramento": {"baseline_value": 110 + i % 50, "histogram_tendency": "normal"},
+            "resultado_ml": {"prediction": 1 + i % 3, "confidence": 40.0 + i % 60, "status": status_ml[i % 3]},
+            "saude_feto": {"status_saude": status_saude[(i // 3) % 3], "nivel_risco": "BAIXO"}
+        } for i in range(quantidade)]
+    
+    def test_consultas_equivalentes_aos_documentos(self, tmp_path):
+        """
+        Teste: Filtros, agrupamentos e histograma
+        Objetivo: Verificar que as consultas colunares batem com a contagem direta nos documentos
+        """
+        from datetime import datetime
+        from banco.analitico import SnapshotAnalitico, lotes_documentos
+        from banco.rollups import faixa_idade_gestacional
+        
+        # Arrange
+        documentos = self.documentos(600)
+        snapshot = SnapshotAnalitico(str(tmp_path / "snapshot"))
+        snapshot.construir_de_lotes(lotes_documentos(documentos, tamanho=128))
+        
+        # Act
+        resultado = snapshot.consultar(
+            filtros={"resultado_ml.status": ["Suspeito", "Patológico"]},
+            agrupar_por=["dados_gestante.faixa_idade_gestacional", "saude_feto.status_saude"],
+            metrica="resultado_ml.confidence",
+            inicio=datetime(2025, 1, 3)
+        )
+        histograma = snapshot.consultar(histograma={"coluna": "parametros_monitoramento.baseline_value",
+                                                    "bins": 5, "min": 110, "max": 160})
+        
+        # Assert
+        selecionados = [d for d in documentos
+                        if d["resultado_ml"]["status"] != "Normal" and d["data_exame"] >= datetime(2025, 1, 3)]
+        esperado = {}
+        for d in selecionados:
+            chave = (faixa_idade_gestacional(d["dados_gestante"]["gestational_age"]), d["saude_feto"]["status_saude"])
+            esperado.setdefault(chave, []).append(d["resultado_ml"]["confidence"])
+        obtido = {(g["dados_gestante.faixa_idade_gestacional"], g["saude_feto.status_saude"]): g
+                  for g in resultado["grupos"]}
+        assert resultado["total"] == len(selecionados)
+        assert set(obtido) == set(esperado)
+        for chave, valores in esperado.items():
+            assert obtido[chave]["total"] == len(valores)
+            assert obtido[chave]["resultado_ml.confidence"]["media"] == pytest.approx(sum(valores) / len(valores), abs=1e-3)
+        assert histograma["histograma"]["contagens"] == [120] * 5
+    
+    def test_anexar_e_recarregar(self, tmp_path):
+        """
+        Teste: Anexação incremental e persistência
+        Objetivo: Verificar marca d'água, novos valores de dicionário e reabertura do snapshot
+        """
+        from banco.analitico import SnapshotAnalitico, lotes_documentos
+        
+        # Arrange
+        diretorio = str(tmp_path / "snapshot")
+        snapshot = SnapshotAnalitico(diretorio)
+        snapshot.construir_de_lotes(lotes_documentos(self.documentos(100)))
+        novos = self.documentos(10, deslocamento=100)
+        novos[0]["saude_feto"]["status_saude"] = "Indeterminado"
+        
+        # Act
+        anexados = snapshot.anexar(novos)
+        repetidos = snapshot.anexar(novos)
+        reaberto = SnapshotAnalitico(diretorio)
+        resultado = reaberto.consultar(filtros={"saude_feto.status_saude": "Indeterminado"})
+        
+        # Assert
+        assert (anexados, repetidos) == (10, 0)
+        assert reaberto.total == 110
+        assert reaberto.ultimo_id == max(d["_id"] for d in novos)
+        assert resultado["total"] == 1
+        with pytest.raises(ValueError):
+            reaberto.consultar(agrupar_por=["coluna_inexistente"])
+    
+    def test_valores_ausentes_ficam_de_fora(self, tmp_path):
+        """
+        Teste: Colunas inteiras sem valor (AUSENTE = -1)
+        Objetivo: Verificar que o marcador não entra em métricas, histogramas, agrupamentos nem filtros de faixa
+        """
+        from banco.analitico import SnapshotAnalitico, lotes_documentos
+        
+        # Arrange
+        documentos = self.documentos(20)
+        for documento in documentos[:5]:
+            del documento["dados_gestante"]["gestational_age"]
+            documento["dados_gestante"]["patient_age"] = None
+        snapshot = SnapshotAnalitico(str(tmp_path / "snapshot"))
+        snapshot.construir_de_lotes(lotes_documentos(documentos))
+        idades = [d["dados_gestante"]["gestational_age"] for d in documentos[5:]]
+        
+        # Act
+        metrica = snapshot.consultar(metrica="dados_gestante.gestational_age")
+        histograma = snapshot.consultar(histograma={"coluna": "dados_gestante.patient_age", "bins": 4})
+        grupos = snapshot.consultar(agrupar_por=["dados_gestante.gestational_age"])
+        faixa = snapshot.consultar(filtros={"dados_gestante.gestational_age": {"max": 30}})
+        
+        # Assert
+        assert metrica["dados_gestante.gestational_age"]["min"] == min(idades)
+        assert metrica["dados_gestante.gestational_age"]["media"] == pytest.approx(sum(idades) / len(idades), abs=1e-3)
+        assert histograma["histograma"]["bordas"][0] == 30
+        assert sum(histograma["histograma"]["contagens"]) == 15
+        assert grupos["total"] == 20
+        assert sum(g["total"] for g in grupos["grupos"]) == 15
+        assert all(g["dados_gestante.gestational_age"] >= 0 for g in grupos["grupos"])
+        assert faixa["total"] == sum(1 for idade in idades if idade <= 30)
+
+
+class TestDiretorioVersionado:
+    """Testes da base comum do índice de similares e do snapshot analítico"""
+    
+    @staticmethod
+    def diretorio_contador(diretorio):
+        import numpy as np
+        from banco.diretorio_versionado import DiretorioVersionado, gravar_a_partir
+        
+        class Contador(DiretorioVersionado):
+            """Diretório mínimo: um arquivo de inteiros e o total no meta.json"""
+            
+            def __init__(self, diretorio):
+                super().__init__(diretorio)
+                self.total = 0
+                self.carregar()
+            
+            def _aplicar_meta(self, meta):
+                self.total = meta["total"]
+            
+            def _montar_meta(self):
+                return {"total": self.total}
+            
+            def construir(self, valores):
+                def gravar(novo):
+                    for i, valor in enumerate(valores):
+                        if valor is None:
+                            raise RuntimeError("lote interrompido")
+                        gravar_a_partir(os.path.join(novo, "valores.bin"), i * 8, np.array([valor], dtype=np.int64))
+                    return {"total": len(valores)}
+                return self._construir_versao(gravar)
+            
+            def anexar(self, valores):
+                with self._travar_anexacao():
+                    gravar_a_partir(os.path.join(self.diretorio, "valores.bin"), self.total * 8,
+                                    np.array(valores, dtype=np.int64))
+                    self.total += len(valores)
+                    self._salvar_meta(self.diretorio)
+            
+            def valores(self):
+                self._sincronizar()
+                return np.fromfile(os.path.join(self.diretorio, "valores.bin"), dtype=np.int64)[:self.total].tolist()
+        
+        return Contador(diretorio)
+    
+    def test_construir_e_trocar(self, tmp_path):
+        """
+        Teste: Construção em .novo e troca pelo atual
+        Objetivo: Verificar que a nova versão substitui a anterior sem deixar .novo ou .antigo
+        """
+        # Arrange
+        diretorio = str(tmp_path / "versionado")
+        contador = self.diretorio_contador(diretorio)
+        contador.construir([1, 2, 3])
+        
+        # Act
+        construido = contador.construir([7, 8])
+        
+        # Assert
+        assert construido is True
+        assert contador.valores() == [7, 8]
+        assert self.diretorio_contador(diretorio).total == 2
+        assert not (tmp_path / "versionado.novo").exists()
+        assert not (tmp_path / "versionado.antigo").exists()
+    
+    def test_construcao_com_falha_remove_novo(self, tmp_path):
+        """
+        Teste: Falha no meio da construção
+        Objetivo: Verificar que o diretório .novo é removido e a versão atual continua intacta
+        """
+        # Arrange
+        diretorio = str(tmp_path / "versionado")
+        contador = self.diretorio_contador(diretorio)
+        contador.construir([1, 2, 3])
+        
+        # Act & Assert
+        with pytest.raises(RuntimeError):
+            contador.construir([4, None])
+        assert not (tmp_path / "versionado.novo").exists()
+        assert self.diretorio_contador(diretorio).valores() == [1, 2, 3]
+    
+    def test_processos_compartilham_diretorio(self, tmp_path):
+        """
+        Teste: Duas instâncias sobre o mesmo diretório
+        Objetivo: Verificar que cada instância relê o meta.json após anexações e reconstruções da outra
+        """
+        # Arrange
+        diretorio = str(tmp_path / "versionado")
+        primeiro = self.diretorio_contador(diretorio)
+        primeiro.construir([1, 2])
+        segundo = self.diretorio_contador(diretorio)
+        
+        # Act
+        primeiro.anexar([3])
+        segundo.anexar([4, 5])
+        anexados = primeiro.valores()
+        segundo.construir([9])
+        reconstruidos = primeiro.valores()
+        
+        # Assert
+        assert anexados == [1, 2, 3, 4, 5]
+        assert reconstruidos == [9]
+    
+    def test_construcao_concorrente_ignorada(self, tmp_path):
+        """
+        Teste: Reconstrução já em andamento em outro processo
+        Objetivo: Verificar que a segunda construção retorna False sem alterar o diretório
+        """
+        from banco.trava import travar_construcao
+        
+        # Arrange
+        diretorio = str(tmp_path / "versionado")
+        contador = self.diretorio_contador(diretorio)
+        contador.construir([1])
+        
+        # Act
+        with travar_construcao(diretorio) as obtida:
+            construido = contador.construir([2, 3])
+        
+        # Assert
+        assert obtida is True
+        assert construido is False
+        assert contador.valores() == [1]
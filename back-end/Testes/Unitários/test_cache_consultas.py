@@ -0,0 +1,142 @@
+"""
+Testes Cache de Consultas - Sistema FetalCare
+Cache em processo com invalidação por versão da collection
+
+Cobertura:
+- Normalização das chaves
+- Invalidação por escrita e descarte de consultas concorrentes
+- Limite de entradas (LRU) e TTL
+- Métricas de hit rate
+- Cópias independentes dos valores
+- Invalidação por escritas de outros processos (marcador)
+"""
+
+import pytest
+import time
+import sys
+import os
+
+# Adicionar path do projeto
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from banco.cache import CacheConsultas, sinalizar_escrita
+
+
+class TestCacheConsultas:
+    """Testes do cache de consultas de registros"""
+
+    def test_chave_normalizada(self):
+        """
+        Teste: Normalização da chave
+        Objetivo: Verificar que a ordem dos parâmetros não altera a chave
+        """
+        # Act & Assert
+        assert CacheConsultas.chave("records", skip=0, limit=10) == CacheConsultas.chave("records", limit=10, skip=0)
+        assert CacheConsultas.chave("records", skip=0) != CacheConsultas.chave("records", skip=10)
+
+    def test_invalidacao_por_escrita(self):
+        """
+        Teste: Invalidação por versão
+        Objetivo: Verificar que entradas anteriores a uma escrita não são servidas
+        """
+        # Arrange
+        cache = CacheConsultas()
+        chave = cache.chave("buscar_por_cpf", cpf="12345678901")
+        cache.armazenar(chave, ["registro"], cache.versao)
+
+        # Act
+        antes = cache.obter(chave)
+        versao_consulta = cache.versao
+        cache.invalidar()
+        cache.armazenar(chave, ["registro antigo"], versao_consulta)  # consulta iniciada antes da escrita
+        depois = cache.obter(chave)
+
+        # Assert
+        assert antes == (True, ["registro"])
+        assert depois == (False, None)
+
+    def test_limite_e_ttl(self):
+        """
+        Teste: Limite de entradas e TTL
+        Objetivo: Verificar descarte LRU e expiração
+        """
+        # Arrange
+        cache = CacheConsultas(max_entradas=2, ttl_segundos=0.05)
+
+        # Act
+        for i in range(3):
+            cache.armazenar(i, i, cache.versao)
+        descartada = cache.obter(0)
+        presente = cache.obter(2)
+        time.sleep(0.06)
+        expirada = cache.obter(2)
+
+        # Assert
+        assert descartada == (False, None)
+        assert presente == (True, 2)
+        assert expirada == (False, None)
+
+    def test_metricas(self):
+        """
+        Teste: Métricas do cache
+        Objetivo: Verificar contagem de hits, misses e hit rate
+        """
+        # Arrange
+        cache = CacheConsultas()
+        cache.armazenar("a", 1, cache.versao)
+
+        # Act
+        for _ in range(3):
+            cache.obter("a")
+        cache.obter("b")
+        metricas = cache.metricas()
+
+        # Assert
+        assert metricas["hits"] == 3
+        assert metricas["misses"] == 1
+        assert metricas["hit_rate"] == 0.75
+        assert metricas["entradas"] == 1
+
+    def test_obter_retorna_copia(self):
+        """
+        Teste: Valores congelados
+        Objetivo: Verificar que alterar o valor retornado não altera o cache
+        """
+        # Arrange
+        cache = CacheConsultas()
+        cache.armazenar("records", {"records": [{"_id": "1"}], "total": 1}, cache.versao)
+        cache.armazenar("stats", b'{"total":1}', cache.versao)
+
+        # Act
+        _, valor = cache.obter("records")
+        valor["records"].append({"_id": "2"})
+        valor["total"] = 2
+
+        # Assert
+        assert cache.obter("records") == (True, {"records": [{"_id": "1"}], "total": 1})
+        assert cache.obter("stats") == (True, b'{"total":1}')
+
+    def test_invalidacao_entre_processos(self, tmp_path):
+        """
+        Teste: Marcador compartilhado
+        Objetivo: Verificar que escritas de outro processo (outro cache ou job) invalidam as entradas
+        """
+        # Arrange
+        marcador = str(tmp_path / "cache_versao")
+        worker_a = CacheConsultas(marcador=marcador)
+        worker_b = CacheConsultas(marcador=marcador)
+        worker_a.armazenar("records", ["registro"], worker_a.versao)
+        versao_consulta = worker_a.versao
+
+        # Act
+        worker_b.invalidar()
+        apos_worker = worker_a.obter("records")
+        worker_a.armazenar("records", ["registro antigo"], versao_consulta)  # consulta iniciada antes da escrita
+        worker_a.armazenar("records", ["registro"], worker_a.versao)
+        sinalizar_escrita(marcador)  # ex: job de arquivamento
+        apos_job = worker_a.obter("records")
+
+        # Assert
+        assert apos_worker == (False, None)
+        assert apos_job == (False, None)
+        assert worker_a.metricas()["invalidacoes_externas"] == 2
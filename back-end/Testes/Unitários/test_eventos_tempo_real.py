@@ -0,0 +1,243 @@
+"""
+Testes Eventos em Tempo Real - Sistema FetalCare
+Difusão de novos exames para clientes SSE
+
+Cobertura:
+- Formato text/event-stream e deltas das estatísticas
+- Difusão a partir do caminho de inserção do processo
+- Descarte de eventos para clientes lentos
+- Hub de predições: tópicos, coalescência e escala
+"""
+
+import pytest
+import json
+import sys
+import os
+from datetime import datetime
+
+# Adicionar path do projeto
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from banco.eventos import DifusorRegistros, formatar_evento, delta_estatisticas
+from banco.sse import FilaAssinante
+from modelo.hub_predicoes import HubPredicoes, AssinanteCoalescente
+
+
+@pytest.fixture
+def registro_inserido():
+    """Documento como gravado por save_prediction_to_database"""
+    from bson import ObjectId
+
+    return {
+        "_id": ObjectId(),
+        "dados_gestante": {"patient_name": "Maria Silva", "patient_cpf": "12345678901"},
+        "saude_feto": {"status_saude": "Em Risco", "confidence_value": 60.0, "nivel_risco": "MODERADO"},
+        "data_exame": datetime(2025, 7, 3, 12, 0)
+    }
+
+
+class TestDifusorRegistros:
+    """Testes da difusão de novos exames"""
+
+    def test_formatar_evento(self, registro_inserido):
+        """
+        Teste: Formato SSE
+        Objetivo: Verificar linhas event/data e datas UTC explícitas
+        """
+        # Act
+        mensagem = formatar_evento("record", {"data_exame": registro_inserido["data_exame"]})
+
+        # Assert
+        assert mensagem == 'event: record\ndata: {"data_exame":"2025-07-03T12:00:00Z"}\n\n'
+        assert delta_estatisticas(registro_inserido) == {
+            "total_records": 1,
+            "by_health_status": {"Em Risco": 1},
+            "by_risk_level": {"MODERADO": 1}
+        }
+
+    def test_difusao_pelo_processo(self, registro_inserido):
+        """
+        Teste: Fan-out a partir do insert do processo
+        Objetivo: Verificar que todos os assinantes recebem o exame e o delta
+        """
+        # Arrange
+        difusor = DifusorRegistros(fonte="processo")
+        assinantes = [difusor.assinar() for _ in range(3)]
+
+        # Act
+        difusor.publicar_insercao(registro_inserido)
+
+        # Assert
+        for assinante in assinantes:
+            record, stats = assinante.fila.get_nowait().strip().split("\n\n")
+            assert json.loads(record.split("data: ", 1)[1])["_id"] == str(registro_inserido["_id"])
+            assert stats.startswith("event: stats")
+        assert difusor.metricas()["fonte"] == "processo"
+        assert difusor.metricas()["publicados"] == 1
+
+    def test_cliente_lento_descarta(self, registro_inserido):
+        """
+        Teste: Fila limitada
+        Objetivo: Verificar que um cliente lento perde eventos sem bloquear a fonte
+        """
+        # Arrange
+        assinante = FilaAssinante(tamanho_fila=2)
+
+        # Act
+        for i in range(5):
+            assinante.entregar(f"evento {i}")
+
+        # Assert
+        assert assinante.fila.qsize() == 2
+        assert assinante.descartados == 3
+
+    def test_desconexao_remove_assinante(self):
+        """
+        Teste: Desconexão do cliente
+        Objetivo: Verificar que o fechamento do fluxo remove o assinante
+        """
+        # Arrange
+        difusor = DifusorRegistros(fonte="processo")
+        assinante = difusor.assinar()
+        assinante.descartados = 2
+        fluxo = difusor.transmitir(assinante, intervalo_heartbeat=0.01)
+
+        # Act
+        primeiro = next(fluxo)
+        heartbeat = next(fluxo)
+        fluxo.close()
+
+        # Assert
+        assert primeiro.startswith("event: ready")
+        assert heartbeat == ": heartbeat\n\n"
+        assert difusor.metricas()["assinantes"] == 0
+        assert difusor.metricas()["descartados"] == 2
+
+
+def predicao(patient_id, ward="UTI", confidence=90.0):
+    """Predição publicada por /predict"""
+    return {"patient_id": patient_id, "ward": ward, "prediction": 1, "confidence": confidence}
+
+
+class TestHubPredicoes:
+    """Testes do hub de predições por paciente e por setor"""
+
+    def test_roteamento_por_topico(self):
+        """
+        Teste: Tópicos de paciente e setor
+        Objetivo: Verificar que cada assinante recebe apenas os seus tópicos, sem duplicatas
+        """
+        # Arrange
+        hub = HubPredicoes()
+        uti = hub.assinar(["setor:UTI"])
+        paciente = hub.assinar(["paciente:P1", "setor:UTI"])
+        outro_setor = hub.assinar(["setor:Maternidade"])
+
+        # Act
+        hub.publicar(predicao("P1"))
+
+        # Assert
+        assert uti.pendentes() == 1
+        assert paciente.pendentes() == 1
+        assert outro_setor.pendentes() == 0
+        assert '"patient_id":"P1"' in uti.proxima(0)
+
+    def test_coalescencia_por_paciente(self):
+        """
+        Teste: Coalescência de rajadas
+        Objetivo: Verificar que o assinante recebe apenas o estado mais recente de cada paciente
+        """
+        # Arrange
+        hub = HubPredicoes()
+        central = hub.assinar(["todos"])
+
+        # Act
+        for confidence in (90.0, 80.0, 70.0):
+            hub.publicar(predicao("P1", confidence=confidence))
+        hub.publicar(predicao("P2"))
+        mensagens = [central.proxima(0), central.proxima(0), central.proxima(0)]
+
+        # Assert
+        assert '"confidence":70.0' in mensagens[0]
+        assert '"patient_id":"P2"' in mensagens[1]
+        assert mensagens[2] is None
+        assert central.coalescidas == 2
+
+    def test_cliente_lento_descarta_mais_antigo(self):
+        """
+        Teste: Limite de pendências
+        Objetivo: Verificar que um cliente lento perde as pendências mais antigas
+        """
+        # Arrange
+        assinante = AssinanteCoalescente(["todos"], max_pendentes=2)
+
+        # Act
+        for paciente in ("P1", "P2", "P3"):
+            assinante.entregar(paciente, paciente)
+
+        # Assert
+        assert [assinante.proxima(0), assinante.proxima(0)] == ["P2", "P3"]
+        assert assinante.descartadas == 1
+
+    def test_estado_inicial_na_assinatura(self):
+        """
+        Teste: Carga inicial da central
+        Objetivo: Verificar que novos assinantes recebem o último estado de cada paciente
+        """
+        # Arrange
+        hub = HubPredicoes()
+        hub.publicar(predicao("P1", confidence=60.0))
+        hub.publicar(predicao("P1", confidence=95.0))
+        hub.publicar(predicao("P2", ward="Maternidade"))
+
+        # Act
+        assinante = hub.assinar(["setor:UTI"])
+
+        # Assert
+        assert assinante.pendentes() == 1
+        assert '"confidence":95.0' in assinante.proxima(0)
+        assert [p["patient_id"] for p in hub.ultimos_estados(["todos"])] == ["P1", "P2"]
+
+    def test_estado_inicial_limitado_a_fila(self):
+        """
+        Teste: Carga inicial maior que a fila do assinante
+        Objetivo: Verificar que só os estados mais recentes que cabem na fila são reenviados, sem descartes
+        """
+        # Arrange
+        hub = HubPredicoes(max_pendentes=2)
+        for paciente in ("P1", "P2", "P3", "P4"):
+            hub.publicar(predicao(paciente, ward="Maternidade" if paciente == "P3" else "UTI"))
+
+        # Act
+        assinante = hub.assinar(["setor:UTI"])
+
+        # Assert
+        mensagens = [assinante.proxima(0), assinante.proxima(0)]
+        assert '"patient_id":"P2"' in mensagens[0]
+        assert '"patient_id":"P4"' in mensagens[1]
+        assert assinante.descartadas == 0
+
+    @pytest.mark.performance
+    def test_publicacao_para_milhares_de_assinantes(self):
+        """
+        Teste: Escala do fan-out
+        Objetivo: Verificar publicação rápida para milhares de assinantes
+        """
+        import time
+
+        # Arrange
+        hub = HubPredicoes()
+        assinantes = [hub.assinar(["setor:UTI"]) for _ in range(5000)]
+
+        # Act
+        inicio = time.perf_counter()
+        for i in range(10):
+            hub.publicar(predicao(f"P{i % 3}"))
+        tempo_ms = (time.perf_counter() - inicio) * 1000 / 10
+
+        # Assert
+        assert all(a.pendentes() == 3 for a in assinantes)
+        assert hub.metricas()["coalescidas"] == 5000 * 7
+        assert tempo_ms < 200
+
+        print(f"✅ Publicação para 5000 assinantes: {tempo_ms:.2f}ms por predição")
@@ -0,0 +1,406 @@
+"""
+Testes Explicação das Predições - Sistema FetalCare
+Contribuições por feature a partir dos caminhos de decisão da RandomForest
+
+Cobertura:
+- Floresta plana: paridade com predict_proba do sklearn
+- Decomposição: viés + contribuições == probabilidades
+- Cache por linha e lotes parciais
+- Custo de uma explicação comparado a uma predição
+- Curvas e grades what-if com limites no servidor
+- Monitor de drift: PSI/KS contra o perfil de referência e custo por registro
+- Triagem com parada antecipada: classe e status idênticos à avaliação completa
+"""
+
+import pytest
+import sys
+import os
+import numpy as np
+
+# Adicionar path do projeto
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from modelo.floresta import FlorestaPlana
+from modelo.explicacao import ExplicadorFloresta, exames_da_requisicao, EXPLICACAO_MAX_LOTE
+from modelo.preditor import EXPECTED_FEATURES, determinar_status_saude, montar_matriz, predict_proba
+from modelo.sensibilidade import calcular_sensibilidade, SENSIBILIDADE_MAX_PONTOS_EIXO
+from modelo.drift import MonitorDrift, criar_perfil, nivel_psi
+from modelo.triagem import TriagemFloresta, faixa_confianca, STATUS_POR_FAIXA
+
+
+@pytest.fixture(scope="module")
+def matriz_exames():
+    """Exames sintéticos cobrindo as três classes"""
+    rng = np.random.RandomState(42)
+    return rng.normal(scale=30, size=(400, len(EXPECTED_FEATURES)))
+
+
+@pytest.fixture
+def explicador(ml_model):
+    return ExplicadorFloresta(ml_model, versao="teste")
+
+
+class TestFlorestaPlana:
+    """Testes do percurso vetorizado"""
+
+    def test_paridade_predict_proba(self, ml_model, matriz_exames):
+        """
+        Teste: Paridade com o sklearn
+        Objetivo: Verificar que o percurso simultâneo reproduz predict_proba
+        """
+        # Arrange
+        floresta = FlorestaPlana.de_modelo(ml_model)
+
+        # Act
+        probabilidades = floresta.predict_proba(matriz_exames)
+
+        # Assert
+        np.testing.assert_allclose(probabilidades, predict_proba(ml_model, matriz_exames), atol=1e-12)
+        assert floresta.n_arvores == len(ml_model.estimators_)
+
+
+class TestExplicadorFloresta:
+    """Testes das contribuições por feature"""
+
+    def test_decomposicao_fecha(self, explicador, ml_model, matriz_exames):
+        """
+        Teste: Decomposição exata
+        Objetivo: Verificar que viés + soma das contribuições == predict_proba
+        """
+        # Act
+        probabilidades, contribuicoes = explicador.contribuicoes(matriz_exames)
+
+        # Assert
+        np.testing.assert_allclose(probabilidades, predict_proba(ml_model, matriz_exames), atol=1e-12)
+        np.testing.assert_allclose(explicador.vies + contribuicoes.sum(axis=1), probabilidades, atol=1e-9)
+
+    def test_formato_explicacao(self, explicador, parametros_monitoramento_validos):
+        """
+        Teste: Formato da resposta
+        Objetivo: Verificar predição, top-N e ordenação pelo impacto na classe prevista
+        """
+        # Act
+        explicacao = explicador.explicar(montar_matriz([parametros_monitoramento_validos]), top=5)[0]
+
+        # Assert
+        impactos = [abs(c["contribution"]) for c in explicacao["contributions"]]
+        assert len(impactos) == 5
+        assert impactos == sorted(impactos, reverse=True)
+        assert explicacao["status"] in explicacao["probabilities"]
+        assert explicacao["contributions"][0]["feature"] in EXPECTED_FEATURES
+
+    def test_cache_lote_parcial(self, explicador, matriz_exames):
+        """
+        Teste: Cache por linha
+        Objetivo: Verificar que um lote só calcula as linhas ainda não explicadas
+        """
+        # Act
+        explicador.explicar_matriz(matriz_exames[:10])
+        probabilidades, contribuicoes = explicador.explicar_matriz(matriz_exames[5:15])
+        metricas = explicador.metricas()["cache"]
+
+        # Assert
+        esperadas, contribuicoes_esperadas = explicador.contribuicoes(matriz_exames[5:15])
+        np.testing.assert_allclose(probabilidades, esperadas)
+        np.testing.assert_allclose(contribuicoes, contribuicoes_esperadas)
+        assert metricas["hits"] == 5
+        assert metricas["misses"] == 15
+
+    def test_requisicao_invalida(self):
+        """
+        Teste: Corpo de /explain
+        Objetivo: Verificar exame único, lote e rejeição de lotes inválidos
+        """
+        # Act & Assert
+        assert exames_da_requisicao({"baseline_value": 140}) == ([{"baseline_value": 140}], False)
+        assert exames_da_requisicao({"exams": [{}, {}]})[1] is True
+        with pytest.raises(ValueError):
+            exames_da_requisicao({"exams": "x"})
+        with pytest.raises(ValueError):
+            exames_da_requisicao({"exams": [{}] * (EXPLICACAO_MAX_LOTE + 1)})
+
+    @pytest.mark.performance
+    def test_custo_explicacao(self, explicador, ml_model, matriz_exames):
+        """
+        Teste: Custo de uma explicação
+        Objetivo: Verificar que explicar um exame custa no máximo o mesmo que predizê-lo
+        """
+        import time
+
+        # Arrange
+        exame = matriz_exames[:1]
+
+        # Act
+        inicio = time.perf_counter()
+        for _ in range(50):
+            explicador.contribuicoes(exame)
+        tempo_explicacao = (time.perf_counter() - inicio) / 50
+
+        inicio = time.perf_counter()
+        for _ in range(50):
+            predict_proba(ml_model, exame)
+        tempo_predicao = (time.perf_counter() - inicio) / 50
+
+        # Assert
+        assert tempo_explicacao < tempo_predicao * 2
+
+        print(f"✅ Explicação: {tempo_explicacao * 1000:.2f}ms | predict_proba: {tempo_predicao * 1000:.2f}ms")
+
+
+class TestSensibilidade:
+    """Testes das curvas e grades what-if"""
+
+    def test_curva_um_parametro(self, ml_model, parametros_monitoramento_validos):
+        """
+        Teste: Curva de uma feature
+        Objetivo: Verificar que cada ponto da curva coincide com um predict_proba isolado
+        """
+        # Act
+        curva = calcular_sensibilidade(ml_model, parametros_monitoramento_validos,
+                                       [{"feature": "baseline_value", "min": 100, "max": 180, "points": 9}])
+
+        # Assert
+        assert curva["shape"] == [9]
+        assert curva["axes"][0]["values"][4] == 140.0
+        exame = dict(parametros_monitoramento_validos, baseline_value=120.0)
+        esperado = predict_proba(ml_model, montar_matriz([exame]))[0]
+        assert curva["probabilities"]["Normal"][2] == pytest.approx(esperado[0], abs=1e-6)
+        assert curva["current"]["values"] == {"baseline_value": 140.0}
+
+    def test_grade_dois_parametros(self, ml_model, parametros_monitoramento_validos):
+        """
+        Teste: Grade de duas features
+        Objetivo: Verificar formato [eixo 1][eixo 2] e probabilidades somando 1
+        """
+        # Act
+        grade = calcular_sensibilidade(ml_model, parametros_monitoramento_validos,
+                                       ["accelerations", {"feature": "abnormal_short_term_variability", "points": 30}])
+
+        # Assert
+        soma = sum(np.asarray(p) for p in grade["probabilities"].values())
+        assert grade["shape"] == [25, 30]
+        assert np.asarray(grade["prediction"]).shape == (25, 30)
+        np.testing.assert_allclose(soma, 1.0, atol=1e-5)
+
+    def test_limites_da_grade(self, ml_model, parametros_monitoramento_validos):
+        """
+        Teste: Limites no servidor
+        Objetivo: Verificar rejeição de features desconhecidas, eixos e grades grandes demais
+        """
+        # Act & Assert
+        for varreduras in (["inexistente"], ["baseline_value"] * 2, [],
+                           [{"feature": "baseline_value", "points": SENSIBILIDADE_MAX_PONTOS_EIXO + 1}],
+                           [{"feature": "baseline_value", "min": 150, "max": 100}]):
+            with pytest.raises(ValueError):
+                calcular_sensibilidade(ml_model, parametros_monitoramento_validos, varreduras)
+
+
+@pytest.fixture(scope="module")
+def perfil_drift():
+    """Perfil de referência a partir de exames sintéticos com classes conhecidas"""
+    rng = np.random.RandomState(7)
+    matriz = rng.normal(loc=100, scale=10, size=(5000, len(EXPECTED_FEATURES)))
+    matriz[:, 1] = rng.randint(0, 3, size=5000)  # feature discreta
+    return criar_perfil(matriz, rng.choice([1, 2, 3], size=5000, p=[0.8, 0.15, 0.05]), origem="teste")
+
+
+class TestMonitorDrift:
+    """Testes do monitor de drift"""
+
+    def test_perfil_feature_discreta(self, perfil_drift):
+        """
+        Teste: Bins de feature discreta
+        Objetivo: Verificar que quantis repetidos são unidos e as proporções somam 1
+        """
+        # Assert
+        discreta = perfil_drift["features"][EXPECTED_FEATURES[1]]
+        assert discreta["bordas"] == [0.0, 1.0, 2.0]
+        assert sum(discreta["proporcoes"]) == pytest.approx(1.0)
+        assert len(perfil_drift["features"][EXPECTED_FEATURES[0]]["proporcoes"]) == 10
+
+    def test_mesma_distribuicao_estavel(self, perfil_drift):
+        """
+        Teste: Exames da mesma distribuição
+        Objetivo: Verificar PSI/KS baixos para todas as features e para as classes
+        """
+        # Arrange
+        rng = np.random.RandomState(8)
+        monitor = MonitorDrift(perfil_drift, janela_segundos=60)
+        matriz = rng.normal(loc=100, scale=10, size=(2000, len(EXPECTED_FEATURES)))
+        matriz[:, 1] = rng.randint(0, 3, size=2000)
+        classes = rng.choice([1, 2, 3], size=2000, p=[0.8, 0.15, 0.05])
+
+        # Act
+        for linha, classe in zip(matriz, classes):
+            monitor.registrar(linha, int(classe), instante=1000)
+        relatorio = monitor.relatorio()
+
+        # Assert
+        assert relatorio["atual"]["total"] == 2000
+        assert relatorio["pid"] == os.getpid()
+        assert relatorio["atual"]["psi_max"] < 0.1
+        assert relatorio["atual"]["nivel_classes"] == "estavel"
+        assert all(f["ks"] < 0.05 for f in relatorio["atual"]["features"].values())
+
+    def test_deslocamento_detectado(self, perfil_drift):
+        """
+        Teste: Deslocamento de uma feature e das classes
+        Objetivo: Verificar drift significativo apenas na feature deslocada e nas classes
+        """
+        # Arrange
+        rng = np.random.RandomState(9)
+        monitor = MonitorDrift(perfil_drift, janela_segundos=60)
+        matriz = rng.normal(loc=100, scale=10, size=(1000, len(EXPECTED_FEATURES)))
+        matriz[:, 1] = rng.randint(0, 3, size=1000)
+        matriz[:, 5] += 15
+
+        # Act
+        for linha in matriz:
+            monitor.registrar(linha, 3, instante=1000)
+        atual = monitor.relatorio()["atual"]
+
+        # Assert
+        assert atual["features"][EXPECTED_FEATURES[5]]["nivel"] == "significativo"
+        assert atual["features"][EXPECTED_FEATURES[5]]["ks"] > 0.4
+        assert atual["features"][EXPECTED_FEATURES[0]]["nivel"] == "estavel"
+        assert atual["nivel_classes"] == "significativo"
+        assert atual["classes"]["Patológico"] == 1000
+
+    def test_janelas_limitadas(self, perfil_drift):
+        """
+        Teste: Janelas de tempo
+        Objetivo: Verificar que só as janelas mais recentes são mantidas (memória constante)
+        """
+        # Arrange
+        monitor = MonitorDrift(perfil_drift, janela_segundos=60, max_janelas=3)
+        exame = np.full(len(EXPECTED_FEATURES), 100.0)
+
+        # Act
+        for minuto in range(10):
+            monitor.registrar(exame, 1, instante=minuto * 60)
+        relatorio = monitor.relatorio(janelas=2)
+
+        # Assert
+        assert len(relatorio["serie"]) == 3
+        assert relatorio["atual"]["total"] == 2
+        assert relatorio["registrados"] == 10
+        assert nivel_psi(0.05) == "estavel" and nivel_psi(0.3) == "significativo"
+
+    @pytest.mark.performance
+    def test_custo_registro(self, perfil_drift):
+        """
+        Teste: Custo por registro
+        Objetivo: Verificar overhead bem abaixo de 1ms por predição
+        """
+        import time
+
+        # Arrange
+        monitor = MonitorDrift(perfil_drift)
+        exame = np.full(len(EXPECTED_FEATURES), 100.0)
+
+        # Act
+        inicio = time.perf_counter()
+        for _ in range(2000):
+            monitor.registrar(exame, 1)
+        tempo = (time.perf_counter() - inicio) / 2000
+
+        # Assert
+        assert tempo < 0.0002
+
+        print(f"✅ Registro no monitor de drift: {tempo * 1e6:.1f}µs")
+
+
+class TestTriagemFloresta:
+    """Testes da avaliação antecipada da floresta"""
+
+    @pytest.mark.parametrize("bloco", [1, 10, 200])
+    def test_classe_e_faixa_exatas(self, ml_model, matriz_exames, bloco):
+        """
+        Teste: Exatidão da parada antecipada
+        Objetivo: Verificar classe e faixa de status iguais às do predict_proba completo
+        """
+        # Arrange
+        triagem = TriagemFloresta.de_modelo(ml_model, bloco=bloco)
+        probabilidades = predict_proba(ml_model, matriz_exames)
+        confiancas = np.round(probabilidades.max(axis=1) * 100, 2)
+
+        # Act
+        avaliacao = triagem.avaliar(matriz_exames)
+
+        # Assert
+        np.testing.assert_array_equal(avaliacao["prediction"], ml_model.classes_[probabilidades.argmax(axis=1)])
+        np.testing.assert_array_equal(avaliacao["faixa"], faixa_confianca(confiancas))
+        assert np.all(avaliacao["confidence_min"] <= confiancas)
+        assert np.all(confiancas <= avaliacao["confidence_max"])
+        assert np.all(avaliacao["trees_evaluated"] > len(ml_model.estimators_) // 2)
+        assert np.all(avaliacao["trees_evaluated"] <= len(ml_model.estimators_))
+
+    def test_parada_antecipada(self, ml_model, matriz_exames):
+        """
+        Teste: Árvores avaliadas
+        Objetivo: Verificar que parte das linhas para antes do fim e que o critério
+                  só de classe nunca avalia mais árvores que o de classe e faixa
+        """
+        # Arrange
+        floresta = FlorestaPlana.de_modelo(ml_model)
+
+        # Act
+        completa = TriagemFloresta(floresta, bloco=10).avaliar(matriz_exames)
+        classe = TriagemFloresta(floresta, bloco=10, apenas_classe=True).avaliar(matriz_exames)
+
+        # Assert
+        assert np.any(completa["trees_evaluated"] < floresta.n_arvores)
+        assert np.all(classe["trees_evaluated"] <= completa["trees_evaluated"])
+        np.testing.assert_array_equal(classe["prediction"], completa["prediction"])
+        indefinidas = classe["faixa"] == -1
+        assert np.all(classe["confidence_min"][indefinidas] < classe["confidence_max"][indefinidas])
+
+    def test_lote_pequeno_em_passada_completa(self, ml_model, matriz_exames):
+        """
+        Teste: Lotes menores que min_linhas
+        Objetivo: Verificar a passada única por todas as árvores, com a confiança exata do predict_proba
+        """
+        # Arrange
+        triagem = TriagemFloresta.de_modelo(ml_model, bloco=10, min_linhas=16)
+        probabilidades = predict_proba(ml_model, matriz_exames[:15])
+
+        # Act
+        avaliacao = triagem.avaliar(matriz_exames[:15])
+
+        # Assert
+        np.testing.assert_array_equal(avaliacao["trees_evaluated"], len(ml_model.estimators_))
+        np.testing.assert_array_equal(avaliacao["confidence_min"], np.round(probabilidades.max(axis=1) * 100, 2))
+        np.testing.assert_array_equal(avaliacao["confidence_max"], avaliacao["confidence_min"])
+        np.testing.assert_array_equal(avaliacao["prediction"], ml_model.classes_[probabilidades.argmax(axis=1)])
+
+    @pytest.mark.parametrize("confidence", [0.0, 40.0, 55.0, 55.01, 55.5, 55.99, 56.0, 60.0, 65.0, 65.01, 66.0, 100.0])
+    def test_faixas_iguais_status_saude(self, confidence):
+        """
+        Teste: Faixas de status
+        Objetivo: Verificar que as faixas reproduzem determinar_status_saude, inclusive entre 55 e 56
+        """
+        # Act
+        faixa = int(faixa_confianca(confidence))
+
+        # Assert
+        assert STATUS_POR_FAIXA[faixa] == determinar_status_saude(confidence)
+
+    def test_triar_formato_resposta(self, ml_model, matriz_exames):
+        """
+        Teste: Resultado de triagem
+        Objetivo: Verificar campos de status, intervalo de confiança e contagem de árvores
+        """
+        # Arrange
+        triagem = TriagemFloresta.de_modelo(ml_model)
+
+        # Act
+        resultados = triagem.triar(matriz_exames[:5])
+
+        # Assert
+        assert len(resultados) == 5
+        for resultado in resultados:
+            assert resultado["prediction"] in (1, 2, 3)
+            assert resultado["nivel_risco"] in ("CRÍTICO", "MODERADO", "BAIXO")
+            assert resultado["confidence_range"][0] <= resultado["confidence_range"][1]
+            assert resultado["total_trees"] == len(ml_model.estimators_)
+            assert 0 < resultado["trees_evaluated"] <= resultado["total_trees"]
@@ -8,6 +8,10 @@ Cobertura:
 - Extração e tratamento de features
 - Performance e casos extremos
 - Análise de confiabilidade
+- Formato binário float32 de /predict
+- Floresta exportada para o navegador (paridade com o sklearn via node)
+- Compressão da floresta: poda por profundidade, seleção de árvores na tolerância e conjunto de validação
+- Floresta discretizada (bins uint8/uint16): paridade bit a bit com predict_proba
 """
 
 import pytest
@@ -41,6 +45,19 @@ class TestModeloML:
         print(f"   • Método predict: ✓")
         print(f"   • Método predict_proba: ✓")
     
+    def test_definicoes_unicas_do_preditor(self):
+        """
+        Teste: Definição única das features e do mapeamento de resultados
+        Objetivo: Verificar que a API JSON usa a mesma ordem de features do formato binário, drift e exportação
+        """
+        import app
+        from modelo import preditor
+
+        # Assert
+        assert app.EXPECTED_FEATURES is preditor.EXPECTED_FEATURES
+        assert app.HEALTH_STATUS is preditor.HEALTH_STATUS
+        assert app.RECOMMENDATIONS is preditor.RECOMMENDATIONS
+
     def test_predicao_features_normais(self, ml_model, features_ml_normais, suppress_warnings):
         """
         Teste: Predição com features normais
@@ -428,6 +445,350 @@ class TestAnaliseConfiabilidade:
         print(f"   • Confidence: {confidence*100:.2f}%")
 
 
+
+class TestFormatoBinario:
+    """Testes do formato binário float32 para dispositivos"""
+
+    def test_ida_e_volta(self, ml_model, features_ml_normais, features_ml_criticas, suppress_warnings):
+        """
+        Teste: Requisição e resposta binárias
+        Objetivo: Verificar decodificação sem cópia e mesmo resultado do caminho JSON
+        """
+        from modelo.binario import codificar_exames, decodificar_exames, codificar_resultados, decodificar_resultados
+
+        # Arrange
+        matriz = np.array([features_ml_normais, features_ml_criticas], dtype=np.float64)
+
+        # Act
+        for cabecalho in (True, False):
+            corpo = codificar_exames(matriz, cabecalho=cabecalho)
+            entrada = decodificar_exames(corpo)
+            probabilidades = ml_model.predict_proba(entrada)
+            resultados = decodificar_resultados(codificar_resultados(ml_model.classes_, probabilidades))
+
+            # Assert
+            assert entrada.dtype == np.float32 and not entrada.flags.owndata
+            assert len(corpo) == 2 * 84 + (8 if cabecalho else 0)
+            np.testing.assert_array_equal(resultados["prediction"], ml_model.predict(matriz))
+            np.testing.assert_allclose(resultados["probabilities"], ml_model.predict_proba(matriz), atol=1e-6)
+            np.testing.assert_allclose(resultados["confidence"], probabilidades.max(axis=1) * 100, atol=1e-4)
+
+    def test_triagem_em_lote(self, ml_model, features_ml_normais, features_ml_criticas, suppress_warnings):
+        """
+        Teste: Resposta binária da triagem (/predict?triage=1)
+        Objetivo: Verificar classe, intervalo de confiança e árvores avaliadas após a ida e volta
+        """
+        from modelo.binario import codificar_exames, decodificar_exames, codificar_triagem, decodificar_triagem
+        from modelo.triagem import TriagemFloresta
+
+        # Arrange
+        triagem = TriagemFloresta.de_modelo(ml_model, min_linhas=2)
+        matriz = np.array([features_ml_normais, features_ml_criticas] * 4, dtype=np.float64)
+        entrada = decodificar_exames(codificar_exames(matriz))
+
+        # Act
+        avaliacao = triagem.avaliar(entrada)
+        resultados, total_arvores = decodificar_triagem(codificar_triagem(avaliacao, triagem.floresta.n_arvores))
+
+        # Assert
+        assert total_arvores == len(ml_model.estimators_)
+        np.testing.assert_array_equal(resultados["prediction"], ml_model.predict(matriz))
+        np.testing.assert_array_equal(resultados["faixa"], avaliacao["faixa"])
+        np.testing.assert_array_equal(resultados["trees_evaluated"], avaliacao["trees_evaluated"])
+        assert (resultados["confidence_min"] <= resultados["confidence_max"]).all()
+        assert (resultados["trees_evaluated"] <= total_arvores).all()
+        with pytest.raises(ValueError):
+            decodificar_triagem(codificar_triagem(avaliacao, total_arvores)[:-1])
+
+    def test_corpos_invalidos(self, features_ml_normais):
+        """
+        Teste: Corpos binários inválidos
+        Objetivo: Verificar rejeição de tamanho, versão de esquema, número de features e NaN
+        """
+        import struct
+        from modelo.binario import codificar_exames, decodificar_exames, CABECALHO, MAGIC_REQUISICAO
+
+        # Arrange
+        corpo = codificar_exames(np.array([features_ml_normais]), cabecalho=False)
+        invalidos = [
+            b"",
+            corpo[:-4],
+            CABECALHO.pack(MAGIC_REQUISICAO, 2, 21) + corpo,
+            CABECALHO.pack(MAGIC_REQUISICAO, 1, 20) + corpo,
+            corpo[:-4] + struct.pack("<f", float("nan")),
+        ]
+
+        # Act & Assert
+        for invalido in invalidos:
+            with pytest.raises(ValueError):
+                decodificar_exames(invalido)
+
+
+class TestExportacaoFloresta:
+    """Testes da floresta exportada para o front-end"""
+
+    FRONT_END = os.path.join(os.path.dirname(__file__), '../../../front-end')
+
+    def test_paridade_avaliador_js(self, ml_model, tmp_path, suppress_warnings):
+        """
+        Teste: Avaliador JavaScript (floresta.js)
+        Objetivo: Verificar as mesmas probabilidades e classes do predict_proba do sklearn
+        """
+        import json
+        import shutil
+        import subprocess
+        from modelo.exportar_floresta import exportar_floresta
+
+        node = shutil.which('node')
+        if node is None:
+            pytest.skip("node não instalado")
+
+        # Arrange
+        rng = np.random.RandomState(3)
+        matriz = np.vstack([
+            rng.normal(loc=[140, 3, 4, 2, 1, 0, 0, 40, 1.5, 10, 8, 70, 90, 160, 4, 0, 140, 138, 140, 15, 0],
+                       scale=[15, 3, 4, 2, 2, 0.3, 0.5, 20, 1, 20, 5, 40, 30, 20, 3, 1, 15, 15, 15, 30, 0.7],
+                       size=(300, 21)),
+            rng.normal(scale=50, size=(100, 21))
+        ])
+        caminho = tmp_path / "floresta.bin"
+        caminho.write_bytes(exportar_floresta(ml_model, "teste"))
+        script = """
+            const fs = require('fs');
+            const { LocalForest } = require(process.argv[1]);
+            const bytes = fs.readFileSync(process.argv[2]);
+            const forest = new LocalForest(bytes.buffer.slice(bytes.byteOffset, bytes.byteOffset + bytes.byteLength));
+            const rows = JSON.parse(fs.readFileSync(0, 'utf8'));
+            console.log(JSON.stringify(rows.map(row => Array.from(forest.predictProba(Float32Array.from(row))))));
+        """
+
+        # Act
+        saida = subprocess.run(
+            [node, '-e', script, os.path.abspath(os.path.join(self.FRONT_END, 'floresta.js')), str(caminho)],
+            input=json.dumps(matriz.tolist()), capture_output=True, text=True, check=True
+        )
+        probabilidades_js = np.array(json.loads(saida.stdout))
+        probabilidades = ml_model.predict_proba(matriz)
+
+        # Assert
+        np.testing.assert_allclose(probabilidades_js, probabilidades, atol=1e-6)
+        assert (probabilidades_js.argmax(axis=1) == probabilidades.argmax(axis=1)).all()
+
+    def test_arquivo_publicado_atualizado(self):
+        """
+        Teste: front-end/modelo/floresta.bin
+        Objetivo: Verificar que o arquivo servido ao navegador corresponde ao model.sav atual
+        """
+        import json
+        import struct
+        from modelo.preditor import calcular_versao_modelo
+
+        # Arrange
+        with open(os.path.join(self.FRONT_END, 'modelo', 'floresta.bin'), 'rb') as arquivo:
+            conteudo = arquivo.read()
+
+        # Act
+        tamanho, = struct.unpack_from('<I', conteudo, 4)
+        cabecalho = json.loads(conteudo[8:8 + tamanho])
+
+        # Assert
+        assert conteudo[:4] == b'FCRF'
+        assert cabecalho['versao_modelo'] == calcular_versao_modelo(os.path.join(os.path.dirname(__file__), '../../IA/model.sav'))
+        assert cabecalho['n_arvores'] == 200
+
+        print(f"\n📊 floresta.bin: {len(conteudo) / 1024:.0f} KB, {cabecalho['n_nos']} nós, {cabecalho['n_folhas']} folhas")
+
+@pytest.fixture(scope="module")
+def exames_rotulados(ml_model):
+    """Exames sintéticos rotulados com as predições do modelo original"""
+    from modelo.preditor import predict_proba
+
+    matriz = np.random.RandomState(42).normal(scale=30, size=(400, 21))
+    return matriz, ml_model.classes_[predict_proba(ml_model, matriz).argmax(axis=1)]
+
+class TestCompressaoModelo:
+    """Testes da compressão da floresta"""
+
+    @pytest.mark.parametrize("profundidade", [1, 4, 12])
+    def test_poda_igual_floresta_plana(self, ml_model, exames_rotulados, profundidade):
+        """
+        Teste: Árvores podadas
+        Objetivo: Verificar que o modelo podado prevê os valores usados na seleção (nós na profundidade de corte)
+        """
+        from modelo.floresta import FlorestaPlana
+        from modelo.compressao import montar_modelo, nos_por_profundidade
+
+        # Arrange
+        matriz, _ = exames_rotulados
+        floresta = FlorestaPlana.de_modelo(ml_model)
+        arvores = [0, 5, 7]
+
+        # Act
+        compacto = montar_modelo(ml_model, arvores, profundidade)
+        esperado = floresta.valor[nos_por_profundidade(floresta, matriz)[profundidade][:, arvores]].mean(axis=1)
+
+        # Assert
+        np.testing.assert_allclose(compacto.predict_proba(matriz), esperado, atol=1e-12)
+        assert all(estimador.tree_.max_depth <= profundidade for estimador in compacto.estimators_)
+        assert len(ml_model.estimators_) == 200
+
+    def test_compressao_dentro_da_tolerancia(self, ml_model, exames_rotulados, tmp_path):
+        """
+        Teste: Modelo compacto
+        Objetivo: Verificar métricas dentro da tolerância, menos nós e artefato recarregável
+        """
+        import joblib
+        from modelo.compressao import comprimir, montar_modelo, calcular_metricas
+        from modelo.exportar_floresta import exportar_floresta
+
+        # Arrange
+        matriz, rotulos = exames_rotulados
+        tolerancia = 0.02
+
+        # Act
+        resultado = comprimir(ml_model, matriz, rotulos, tolerancia, profundidades=[6, 8, 12])
+        caminho = tmp_path / "compacto.sav"
+        joblib.dump(montar_modelo(ml_model, resultado["arvores"], resultado["profundidade"]), caminho)
+        compacto = joblib.load(caminho)
+        metricas = calcular_metricas(rotulos, compacto.predict(matriz), compacto.classes_)
+
+        # Assert
+        assert resultado["nos"] < resultado["nos_original"]
+        assert len(compacto.estimators_) == len(resultado["arvores"]) < 200
+        assert metricas == resultado["metricas"]
+        assert metricas["acuracia"] >= resultado["referencia"]["acuracia"] - tolerancia
+        for classe, recall in resultado["referencia"]["recall"].items():
+            assert metricas["recall"][classe] >= recall - tolerancia
+        assert exportar_floresta(compacto)[:4] == b"FCRF"
+
+        print(f"\n🗜️ {len(compacto.estimators_)} árvores, profundidade {resultado['profundidade']}, "
+              f"{resultado['nos']}/{resultado['nos_original']} nós")
+
+    def test_tolerancia_impossivel(self, ml_model, exames_rotulados):
+        """
+        Teste: Orçamento inviável
+        Objetivo: Verificar erro quando nenhuma profundidade atinge as métricas do original
+        """
+        from modelo.compressao import comprimir
+
+        # Arrange
+        matriz, rotulos = exames_rotulados
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            comprimir(ml_model, matriz, rotulos, tolerancia=-0.5, profundidades=[2])
+        with pytest.raises(ValueError):
+            comprimir(ml_model, matriz, rotulos, profundidades=[0, 4])
+
+    def test_separar_validacao(self, exames_rotulados):
+        """
+        Teste: Conjunto de validação
+        Objetivo: Verificar partição disjunta, estratificada por classe e reprodutível
+        """
+        from modelo.compressao import separar_validacao
+
+        # Arrange
+        _, rotulos = exames_rotulados
+
+        # Act
+        selecao, validacao = separar_validacao(rotulos, 0.25)
+        repetida = separar_validacao(rotulos, 0.25)
+
+        # Assert
+        assert len(np.intersect1d(selecao, validacao)) == 0
+        assert len(selecao) + len(validacao) == len(rotulos)
+        for classe in np.unique(rotulos):
+            assert np.sum(rotulos[validacao] == classe) == round(np.sum(rotulos == classe) * 0.25)
+        np.testing.assert_array_equal(repetida[1], validacao)
+        assert len(separar_validacao(rotulos, 0)[1]) == 0
+        with pytest.raises(ValueError):
+            separar_validacao(rotulos, 1.0)
+
+@pytest.fixture(scope="module")
+def discretizada(ml_model):
+    """Floresta discretizada do modelo original (construída uma vez por módulo)"""
+    from modelo.discretizacao import FlorestaDiscretizada
+    return FlorestaDiscretizada.de_modelo(ml_model)
+
+class TestFlorestaDiscretizada:
+    """Testes da floresta sobre features discretizadas"""
+
+    def test_paridade_bit_a_bit(self, ml_model, discretizada, suppress_warnings):
+        """
+        Teste: Paridade com o sklearn
+        Objetivo: Verificar probabilidades idênticas, inclusive em blocos parciais
+        """
+        # Arrange
+        rng = np.random.RandomState(11)
+        matriz = np.vstack([rng.normal(scale=60, size=(3000, 21)), rng.normal(loc=100, scale=50, size=(3000, 21))])
+
+        # Act
+        bins = discretizada.codificar(matriz)
+        probabilidades = discretizada.predict_proba(bins, bloco=1000)
+
+        # Assert
+        assert bins.dtype in (np.uint8, np.uint16)
+        np.testing.assert_array_equal(probabilidades, ml_model.predict_proba(matriz))
+        np.testing.assert_array_equal(discretizada.predict(bins), ml_model.predict(matriz))
+
+    def test_valores_nos_thresholds(self, ml_model, discretizada, suppress_warnings):
+        """
+        Teste: Valores sobre os cortes
+        Objetivo: Verificar o lado correto de cada threshold (igual, vizinhos float64 e float32)
+        """
+        # Arrange
+        cortes = discretizada.cortes
+        matriz = np.array([[c[i % len(c)] for c in cortes] for i in range(600)])
+        matriz32 = matriz.astype(np.float32)
+        vizinhos = np.vstack([
+            matriz,
+            np.nextafter(matriz, np.inf),
+            np.nextafter(matriz, -np.inf),
+            np.nextafter(matriz32, np.float32(np.inf)).astype(np.float64),
+            np.nextafter(matriz32, np.float32(-np.inf)).astype(np.float64),
+        ])
+
+        # Act
+        probabilidades = discretizada.predict_proba(discretizada.codificar(vizinhos))
+
+        # Assert
+        np.testing.assert_array_equal(probabilidades, ml_model.predict_proba(vizinhos))
+
+    def test_entrada_invalida(self, discretizada):
+        """
+        Teste: Entrada inválida
+        Objetivo: Verificar rejeição de valores não finitos e de colunas faltando
+        """
+        # Arrange
+        matriz = np.zeros((2, 21))
+        matriz[1, 3] = np.nan
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            discretizada.codificar(matriz)
+        with pytest.raises(ValueError):
+            discretizada.codificar(np.zeros((2, 20)))
+
+    @pytest.mark.performance
+    def test_memoria_matriz_codificada(self, discretizada):
+        """
+        Teste: Memória da entrada
+        Objetivo: Verificar a matriz codificada ao menos 4x menor que a float64
+        """
+        # Arrange
+        matriz = np.random.RandomState(5).normal(loc=100, scale=50, size=(100000, 21))
+
+        # Act
+        inicio = time.perf_counter()
+        bins = discretizada.codificar(matriz)
+        tempo = time.perf_counter() - inicio
+
+        # Assert
+        assert matriz.nbytes / bins.nbytes >= 4
+
+        print(f"\n📦 {bins.dtype.name}: {bins.nbytes / 2**20:.1f} MB vs {matriz.nbytes / 2**20:.1f} MB float64, "
+              f"codificação {len(matriz) / tempo / 1e6:.1f} M linhas/s")
+
 # Hooks pytest para coleta de métricas
 @pytest.fixture(autouse=True)
 def collect_ml_metrics(request):
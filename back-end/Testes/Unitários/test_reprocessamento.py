@@ -0,0 +1,184 @@
+"""
+Testes Reprocessamento - Sistema FetalCare
+Re-pontuação vetorizada de registros históricos
+
+Cobertura:
+- Montagem da matriz de features a partir dos documentos
+- Paridade da pontuação em lote com o modelo
+- Montagem das operações de bulk_write
+- Reconstrução de resumos e rollups ao concluir
+- Limitador de taxa
+"""
+
+import pytest
+import time
+import warnings
+import numpy as np
+import sys
+import os
+
+# Adicionar path do projeto
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from modelo.preditor import EXPECTED_FEATURES, converter_feature, montar_matriz, pontuar_lote
+from banco.reprocessamento import LimitadorTaxa, ReprocessadorRegistros
+from banco.database import COLLECTION_NAME
+
+
+class TestPontuacaoLote:
+    """Testes da pontuação vetorizada"""
+
+    def test_montar_matriz(self, parametros_monitoramento_validos, features_ml_normais):
+        """
+        Teste: Montagem da matriz de features
+        Objetivo: Verificar ordem, conversão de tendency e campos faltantes
+        """
+        # Arrange
+        incompleto = {'baseline_value': 150.0, 'histogram_tendency': 'decreasing'}
+
+        # Act
+        matriz = montar_matriz([parametros_monitoramento_validos, incompleto, None])
+
+        # Assert
+        assert matriz.shape == (3, len(EXPECTED_FEATURES))
+        assert matriz.dtype == np.float64
+        assert matriz[0].tolist() == [float(v) for v in features_ml_normais]
+        assert matriz[1, 0] == 150.0
+        assert matriz[1, -1] == -1
+        assert not matriz[2].any()
+
+    @pytest.mark.parametrize("tendency, esperado", [
+        ("increasing", 1.0), ("decreasing", -1.0), ("stable", 0.0), ("desconhecida", 0.0),
+        (1, 0.0), (-1, 0.0), (None, 0.0)
+    ])
+    def test_conversao_tendency_original(self, tendency, esperado):
+        """
+        Teste: Conversão de histogram_tendency
+        Objetivo: Verificar a regra original dos apps (só textos do mapa; números viram 0)
+        """
+        # Act
+        valor = converter_feature('histogram_tendency', tendency)
+
+        # Assert
+        assert valor == esperado
+
+    def test_paridade_pontuar_lote(self, ml_model, features_ml_normais, features_ml_criticas, suppress_warnings):
+        """
+        Teste: Paridade da pontuação em lote
+        Objetivo: Verificar que o lote reproduz predict/predict_proba linha a linha
+        """
+        # Arrange
+        matriz = np.array([features_ml_normais, features_ml_criticas] * 50, dtype=np.float64)
+
+        # Act
+        start_time = time.time()
+        resultados = pontuar_lote(ml_model, matriz)
+        tempo_lote = time.time() - start_time
+
+        # Assert
+        predicoes = ml_model.predict(matriz)
+        confiancas = ml_model.predict_proba(matriz).max(axis=1)
+        assert len(resultados) == len(matriz)
+        for resultado, predicao, confianca in zip(resultados, predicoes, confiancas):
+            assert resultado['prediction'] == int(predicao)
+            assert resultado['confidence'] == round(float(confianca) * 100, 2)
+            assert resultado['recommendations']
+
+        print(f"\n📊 Pontuação em lote:")
+        print(f"   • Registros: {len(matriz)}")
+        print(f"   • Tempo: {tempo_lote*1000:.3f}ms")
+
+
+class TestReprocessador:
+    """Testes do job de reprocessamento"""
+
+    def test_montar_atualizacoes(self, ml_model, parametros_monitoramento_validos):
+        """
+        Teste: Operações de atualização
+        Objetivo: Verificar versão anterior/nova e saude_feto recalculada
+        """
+        # Arrange
+        database = {COLLECTION_NAME: None, 'reprocessamento_checkpoints': None}
+        reprocessador = ReprocessadorRegistros(ml_model, 'v2', database=database)
+        documentos = [{
+            '_id': 1,
+            'parametros_monitoramento': parametros_monitoramento_validos,
+            'resultado_ml': {'prediction': 2, 'confidence': 50.0, 'versao_modelo': 'v1'}
+        }]
+
+        # Act
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore")
+            operacoes = reprocessador.montar_atualizacoes(documentos)
+
+        # Assert
+        assert len(operacoes) == 1
+        update = operacoes[0]._doc['$set']
+        assert operacoes[0]._filter == {'_id': 1}
+        assert update['resultado_ml']['versao_modelo'] == 'v2'
+        assert update['reprocessamento']['versao_anterior'] == 'v1'
+        assert update['reprocessamento']['versao_nova'] == 'v2'
+        assert update['saude_feto']['confidence_value'] == update['resultado_ml']['confidence']
+
+    @pytest.mark.parametrize("checkpoint,documentos,reconstroi", [
+        (None, 2, True),
+        ({'versao_modelo': 'v2', 'ultimo_id': 5, 'processados': 5, 'concluido': False}, 0, True),
+        ({'versao_modelo': 'v2', 'ultimo_id': 5, 'processados': 5, 'concluido': True}, 0, False),
+    ])
+    def test_executar_reconstroi_derivados(self, monkeypatch, ml_model, parametros_monitoramento_validos,
+                                           checkpoint, documentos, reconstroi):
+        """
+        Teste: Resumos e rollups após o reprocessamento
+        Objetivo: Verificar que o job concluído reconstrói os dados derivados de saude_feto
+                  quando algum exame foi regravado (nesta execução ou numa anterior interrompida)
+        """
+        from unittest.mock import MagicMock
+        import banco.reprocessamento as reprocessamento
+
+        # Arrange
+        chamadas = []
+        monkeypatch.setattr(reprocessamento, 'reconstruir_resumos',
+                            lambda database, tamanho_lote: chamadas.append('resumos') or {})
+        monkeypatch.setattr(reprocessamento, 'reconstruir_rollups',
+                            lambda database, tamanho_lote: chamadas.append('rollups') or {})
+        monkeypatch.setattr(reprocessamento, 'sinalizar_escrita', lambda: None)
+        database = {COLLECTION_NAME: MagicMock(), 'reprocessamento_checkpoints': MagicMock()}
+        database['reprocessamento_checkpoints'].find_one.return_value = checkpoint
+        cursor = MagicMock()
+        cursor.sort.return_value.batch_size.return_value = cursor
+        cursor.__iter__.return_value = iter([
+            {'_id': 10 + i, 'parametros_monitoramento': parametros_monitoramento_validos, 'resultado_ml': {}}
+            for i in range(documentos)
+        ])
+        database[COLLECTION_NAME].find.return_value = cursor
+        database[COLLECTION_NAME].bulk_write.return_value.modified_count = documentos
+        reprocessador = ReprocessadorRegistros(ml_model, 'v2', database=database, ops_por_segundo=None)
+
+        # Act
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore")
+            resultado = reprocessador.executar()
+
+        # Assert
+        assert resultado['concluido']
+        assert chamadas == (['resumos', 'rollups'] if reconstroi else [])
+        assert (resultado['derivados'] is not None) == reconstroi
+
+    @pytest.mark.performance
+    def test_limitador_taxa(self):
+        """
+        Teste: Limitador de taxa
+        Objetivo: Verificar que a vazão respeita o limite de ops/segundo
+        """
+        # Arrange
+        limitador = LimitadorTaxa(ops_por_segundo=1000)
+
+        # Act
+        start_time = time.time()
+        for _ in range(5):
+            limitador.aguardar(20)
+        duracao = time.time() - start_time
+
+        # Assert - 100 operações a 1000 ops/s levam ao menos ~80ms (a primeira reserva é imediata)
+        assert duracao >= 0.075
+        assert LimitadorTaxa(None).aguardar(10 ** 6) == 0.0
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
 import joblib
 import numpy as np
@@ -6,12 +6,25 @@ import os
 import logging
 from datetime import datetime
 
+from modelo.preditor import (
+    EXPECTED_FEATURES, HEALTH_STATUS, STATUS_DESCONHECIDO, RECOMMENDATIONS,
+    calcular_versao_modelo, converter_feature, montar_matriz, predict_proba
+)
+from modelo.explicacao import ExplicadorFloresta, exames_da_requisicao
+from modelo.sensibilidade import calcular_sensibilidade
+from modelo.drift import criar_monitor
+from modelo.triagem import TriagemFloresta
+from modelo.binario import CONTENT_TYPE_BINARIO, decodificar_exames, codificar_resultados, codificar_triagem
+from banco.json_rapido import instalar_codec, FragmentoJSON, resposta_json
+from banco.condicional import RecursoVersionado, responder_condicional
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
+json_codec = instalar_codec(app)
 
 # Carregar o modelo ML
 model_path = os.path.join('IA', 'model.sav')
@@ -32,54 +45,53 @@ try:
         logger.info("Método predict_proba disponível")
     else:
         logger.warning("Método predict_proba não disponível - usando confiança padrão")
+
+    MODEL_VERSION = calcular_versao_modelo(model_path)
+    logger.info(f"Versão do modelo: {MODEL_VERSION}")
+
+    # Explicações por feature (arrays dos nós pré-calculados uma única vez)
+    explainer = ExplicadorFloresta(model, versao=MODEL_VERSION)
+
+    # Triagem com parada antecipada (reutiliza a floresta plana do explicador)
+    triage = TriagemFloresta(explainer.floresta)
         
 except Exception as e:
     logger.error(f"Erro ao carregar o modelo: {e}")
     logger.error(f"Caminho do modelo: {os.path.abspath(model_path)}")
     logger.error(f"Arquivo existe: {os.path.exists(model_path)}")
     model = None
+    MODEL_VERSION = None
+    explainer = None
+    triage = None
+
+# Monitor de drift das entradas de /predict (None se o perfil de referência não existir).
+# O sketch é por processo: com vários workers, /drift mostra só o do worker que respondeu (campo "pid")
+drift_monitor = criar_monitor()
 
-# Mapeamento dos resultados do modelo
-HEALTH_STATUS = {
-    1: {"status": "Normal", "description": "Feto saudável - sem indicações de risco", "color": "success"},
-    2: {"status": "Suspeito", "description": "Necessita acompanhamento médico mais próximo", "color": "warning"},
-    3: {"status": "Patológico", "description": "Requer intervenção médica imediata", "color": "danger"}
+# Parte constante da resposta de /predict por classe, serializada uma única vez
+PREDICTION_FRAGMENTS = {
+    prediction: FragmentoJSON(json_codec, {
+        "prediction": prediction,
+        **HEALTH_STATUS[prediction],
+        "recommendations": RECOMMENDATIONS[prediction]
+    })
+    for prediction in HEALTH_STATUS
 }
 
-# Lista dos campos esperados pelo modelo (na ordem correta)
-EXPECTED_FEATURES = [
-    'baseline_value',
-    'accelerations', 
-    'fetal_movement',
-    'uterine_contractions',
-    'light_decelerations',
-    'severe_decelerations',
-    'prolongued_decelerations',
-    'abnormal_short_term_variability',
-    'mean_value_of_short_term_variability',
-    'percentage_of_time_with_abnormal_long_term_variability',
-    'mean_value_of_long_term_variability',
-    'histogram_width',
-    'histogram_min',
-    'histogram_max',
-    'histogram_number_of_peaks',
-    'histogram_number_of_zeroes',
-    'histogram_mode',
-    'histogram_mean',
-    'histogram_median',
-    'histogram_variance',
-    'histogram_tendency'
-]
+# Parte de / que só muda com o modelo; o timestamp é acrescentado a cada resposta
+HEALTH_FRAGMENT = FragmentoJSON(json_codec, {
+    "status": "healthy",
+    "service": "FetalCare ML API",
+    "model_loaded": model is not None
+})
+HEALTH_ETAG = f"health-{MODEL_VERSION}"
 
 @app.route('/')
 def health_check():
     """Endpoint para verificar se o serviço está funcionando"""
-    return jsonify({
-        "status": "healthy",
-        "service": "FetalCare ML API",
-        "model_loaded": model is not None,
-        "timestamp": datetime.now().isoformat()
-    })
+    return responder_condicional(
+        app, HEALTH_ETAG, lambda: HEALTH_FRAGMENT.com(timestamp=datetime.now().isoformat()), fraca=True
+    )
 
 @app.route('/predict', methods=['POST'])
 def predict():
@@ -91,6 +103,10 @@ def predict():
                 "status": "error"
             }), 500
 
+        # Formato binário dos monitores (N x 21 float32)
+        if request.mimetype == CONTENT_TYPE_BINARIO:
+            return predict_binary()
+
         # Obter dados do request
         data = request.get_json()
         
@@ -106,18 +122,8 @@ def predict():
         
         for feature in EXPECTED_FEATURES:
             if feature in data:
-                # Converter histogram_tendency para valor numérico se necessário
-                if feature == 'histogram_tendency':
-                    tendency_map = {
-                        'normal': 0,
-                        'increasing': 1,
-                        'decreasing': -1,
-                        'stable': 0
-                    }
-                    value = tendency_map.get(data[feature], 0)
-                else:
-                    value = float(data[feature])
-                features.append(value)
+                # histogram_tendency aceita o nome da tendência (TENDENCY_MAP)
+                features.append(converter_feature(feature, data[feature]))
             else:
                 missing_features.append(feature)
                 features.append(0)  # Valor padrão para features faltantes
@@ -146,19 +152,16 @@ def predict():
             except:
                 confidence = 0.85  # Confiança padrão se não conseguir calcular
 
+        if drift_monitor is not None:
+            drift_monitor.registrar(features_array[0], int(prediction))
+
         # Mapear resultado
-        result = HEALTH_STATUS.get(int(prediction), {
-            "status": "Desconhecido",
-            "description": "Resultado não mapeado",
-            "color": "secondary"
-        })
+        result = HEALTH_STATUS.get(int(prediction), STATUS_DESCONHECIDO)
 
-        # Preparar resposta
-        response = {
-            "prediction": int(prediction),
-            "status": result["status"],
-            "description": result["description"],
-            "color": result["color"],
+        logger.info(f"Predição realizada: {result['status']} (confiança: {confidence:.2%})")
+
+        # Campos dinâmicos da resposta; status, descrição e recomendações vêm pré-serializados
+        dynamic_fields = {
             "confidence": round(confidence * 100, 2),
             "timestamp": datetime.now().isoformat(),
             "patient_data": {
@@ -167,30 +170,16 @@ def predict():
                 "fetal_movement": data.get('fetal_movement')
             }
         }
+        fragment = PREDICTION_FRAGMENTS.get(int(prediction))
+        if fragment is not None:
+            return resposta_json(app, fragment.com(**dynamic_fields))
 
-        # Adicionar recomendações baseadas no resultado
-        if prediction == 1:
-            response["recommendations"] = [
-                "Continue o monitoramento de rotina",
-                "Mantenha consultas pré-natais regulares",
-                "Acompanhe os movimentos fetais diariamente"
-            ]
-        elif prediction == 2:
-            response["recommendations"] = [
-                "Aumente a frequência do monitoramento",
-                "Considere realizar cardiotocografia adicional",
-                "Agende consulta médica em 24-48 horas"
-            ]
-        else:  # prediction == 3
-            response["recommendations"] = [
-                "URGENTE: Contate médico imediatamente",
-                "Considere internação hospitalar",
-                "Monitoramento contínuo necessário"
-            ]
-
-        logger.info(f"Predição realizada: {result['status']} (confiança: {confidence:.2%})")
-        
-        return jsonify(response)
+        return jsonify({
+            "prediction": int(prediction),
+            **result,
+            **dynamic_fields,
+            "recommendations": RECOMMENDATIONS[3]
+        })
 
     except Exception as e:
         logger.error(f"Erro na predição: {e}")
@@ -199,127 +188,221 @@ def predict():
             "status": "error"
         }), 500
 
+def predict_binary():
+    """
+    Predição em lote no formato binário: corpo float32 decodificado sem cópia e resposta binária
+
+    Com ?triage=1, o lote passa pela triagem com parada antecipada
+    (modelo/triagem.py): classe e faixa de status exatas, confiança como
+    intervalo e árvores avaliadas por exame. A triagem só é oferecida em
+    lotes, onde a parada antecipada pode poupar árvores.
+    """
+    try:
+        features_matrix = decodificar_exames(request.get_data(cache=False))
+    except ValueError as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
+
+    if triage is not None and request.args.get('triage', '').lower() in ('1', 'true', 'yes'):
+        avaliacao = triage.avaliar(features_matrix)
+        if drift_monitor is not None:
+            drift_monitor.registrar_lote(features_matrix, avaliacao["prediction"])
+        return Response(codificar_triagem(avaliacao, triage.floresta.n_arvores), mimetype=CONTENT_TYPE_BINARIO)
+
+    probabilities = predict_proba(model, features_matrix)
+    if drift_monitor is not None:
+        drift_monitor.registrar_lote(features_matrix, model.classes_[probabilities.argmax(axis=1)])
+
+    return Response(codificar_resultados(model.classes_, probabilities), mimetype=CONTENT_TYPE_BINARIO)
+
+# Cenários de teste pré-definidos (resposta constante, serializada uma única vez)
+TEST_SCENARIOS = {
+    "normal": {
+        "name": "Feto Saudável",
+        "data": {
+            "baseline_value": 140,
+            "accelerations": 3,
+            "fetal_movement": 4,
+            "uterine_contractions": 0,
+            "light_decelerations": 0,
+            "severe_decelerations": 0,
+            "prolongued_decelerations": 0,
+            "abnormal_short_term_variability": 0,
+            "mean_value_of_short_term_variability": 5.5,
+            "percentage_of_time_with_abnormal_long_term_variability": 10,
+            "mean_value_of_long_term_variability": 25,
+            "histogram_width": 120,
+            "histogram_min": 90,
+            "histogram_max": 180,
+            "histogram_number_of_peaks": 3,
+            "histogram_number_of_zeroes": 0,
+            "histogram_mode": 140,
+            "histogram_mean": 140,
+            "histogram_median": 140,
+            "histogram_variance": 15,
+            "histogram_tendency": "normal"
+        }
+    },
+    "suspicious": {
+        "name": "Feto Suspeito",
+        "data": {
+            "baseline_value": 160,
+            "accelerations": 1,
+            "fetal_movement": 2,
+            "uterine_contractions": 2,
+            "light_decelerations": 2,
+            "severe_decelerations": 0,
+            "prolongued_decelerations": 0,
+            "abnormal_short_term_variability": 15,
+            "mean_value_of_short_term_variability": 3.2,
+            "percentage_of_time_with_abnormal_long_term_variability": 25,
+            "mean_value_of_long_term_variability": 18,
+            "histogram_width": 80,
+            "histogram_min": 110,
+            "histogram_max": 170,
+            "histogram_number_of_peaks": 2,
+            "histogram_number_of_zeroes": 5,
+            "histogram_mode": 160,
+            "histogram_mean": 158,
+            "histogram_median": 160,
+            "histogram_variance": 25,
+            "histogram_tendency": "decreasing"
+        }
+    },
+    "pathological": {
+        "name": "Feto Patológico",
+        "data": {
+            "baseline_value": 110,
+            "accelerations": 0,
+            "fetal_movement": 0,
+            "uterine_contractions": 5,
+            "light_decelerations": 5,
+            "severe_decelerations": 3,
+            "prolongued_decelerations": 2,
+            "abnormal_short_term_variability": 45,
+            "mean_value_of_short_term_variability": 1.8,
+            "percentage_of_time_with_abnormal_long_term_variability": 60,
+            "mean_value_of_long_term_variability": 8,
+            "histogram_width": 40,
+            "histogram_min": 80,
+            "histogram_max": 130,
+            "histogram_number_of_peaks": 1,
+            "histogram_number_of_zeroes": 15,
+            "histogram_mode": 110,
+            "histogram_mean": 108,
+            "histogram_median": 110,
+            "histogram_variance": 45,
+            "histogram_tendency": "decreasing"
+        }
+    }
+}
+TEST_SCENARIOS_RESOURCE = RecursoVersionado(json_codec, TEST_SCENARIOS, versao="scenarios")
+
 @app.route('/test-scenarios', methods=['GET'])
 def get_test_scenarios():
     """Endpoint para obter cenários de teste pré-definidos"""
-    scenarios = {
-        "normal": {
-            "name": "Feto Saudável",
-            "data": {
-                "baseline_value": 140,
-                "accelerations": 3,
-                "fetal_movement": 4,
-                "uterine_contractions": 0,
-                "light_decelerations": 0,
-                "severe_decelerations": 0,
-                "prolongued_decelerations": 0,
-                "abnormal_short_term_variability": 0,
-                "mean_value_of_short_term_variability": 5.5,
-                "percentage_of_time_with_abnormal_long_term_variability": 10,
-                "mean_value_of_long_term_variability": 25,
-                "histogram_width": 120,
-                "histogram_min": 90,
-                "histogram_max": 180,
-                "histogram_number_of_peaks": 3,
-                "histogram_number_of_zeroes": 0,
-                "histogram_mode": 140,
-                "histogram_mean": 140,
-                "histogram_median": 140,
-                "histogram_variance": 15,
-                "histogram_tendency": "normal"
-            }
-        },
-        "suspicious": {
-            "name": "Feto Suspeito",
-            "data": {
-                "baseline_value": 160,
-                "accelerations": 1,
-                "fetal_movement": 2,
-                "uterine_contractions": 2,
-                "light_decelerations": 2,
-                "severe_decelerations": 0,
-                "prolongued_decelerations": 0,
-                "abnormal_short_term_variability": 15,
-                "mean_value_of_short_term_variability": 3.2,
-                "percentage_of_time_with_abnormal_long_term_variability": 25,
-                "mean_value_of_long_term_variability": 18,
-                "histogram_width": 80,
-                "histogram_min": 110,
-                "histogram_max": 170,
-                "histogram_number_of_peaks": 2,
-                "histogram_number_of_zeroes": 5,
-                "histogram_mode": 160,
-                "histogram_mean": 158,
-                "histogram_median": 160,
-                "histogram_variance": 25,
-                "histogram_tendency": "decreasing"
-            }
-        },
-        "pathological": {
-            "name": "Feto Patológico",
-            "data": {
-                "baseline_value": 110,
-                "accelerations": 0,
-                "fetal_movement": 0,
-                "uterine_contractions": 5,
-                "light_decelerations": 5,
-                "severe_decelerations": 3,
-                "prolongued_decelerations": 2,
-                "abnormal_short_term_variability": 45,
-                "mean_value_of_short_term_variability": 1.8,
-                "percentage_of_time_with_abnormal_long_term_variability": 60,
-                "mean_value_of_long_term_variability": 8,
-                "histogram_width": 40,
-                "histogram_min": 80,
-                "histogram_max": 130,
-                "histogram_number_of_peaks": 1,
-                "histogram_number_of_zeroes": 15,
-                "histogram_mode": 110,
-                "histogram_mean": 108,
-                "histogram_median": 110,
-                "histogram_variance": 45,
-                "histogram_tendency": "decreasing"
-            }
-        }
-    }
-    
-    return jsonify(scenarios)
+    return TEST_SCENARIOS_RESOURCE.responder(app)
 
-@app.route('/model-info', methods=['GET'])
-def get_model_info():
-    """Endpoint para obter informações sobre o modelo"""
+@app.route('/explain', methods=['POST'])
+def explain():
+    """Endpoint para explicar predições pela contribuição de cada parâmetro"""
+    if explainer is None:
+        return jsonify({
+            "error": "Modelo não está carregado",
+            "status": "error"
+        }), 500
+
+    try:
+        exams, batch = exames_da_requisicao(request.get_json(silent=True))
+        top = request.args.get('top', type=int)
+        explanations = explainer.explicar(montar_matriz(exams), top=top)
+    except ValueError as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
+    except Exception as e:
+        logger.error(f"Erro na explicação: {e}")
+        return jsonify({"error": str(e), "status": "error"}), 500
+
+    if not batch:
+        response = explanations[0]
+        response["model_version"] = explainer.versao
+        return jsonify(response)
+    return jsonify({
+        "explanations": explanations,
+        "total": len(explanations),
+        "model_version": explainer.versao
+    })
+
+@app.route('/explain/metrics', methods=['GET'])
+def get_explain_metrics():
+    """Endpoint para obter as métricas do explicador e do seu cache"""
+    if explainer is None:
+        return jsonify({"error": "Modelo não carregado", "status": "error"}), 500
+    return jsonify(explainer.metricas())
+
+@app.route('/what-if', methods=['POST'])
+def what_if():
+    """Endpoint para curvas (1 feature) ou grades (2 features) de sensibilidade de um exame"""
     if model is None:
         return jsonify({
-            "error": "Modelo não carregado",
+            "error": "Modelo não está carregado",
             "status": "error"
         }), 500
-    
+
+    data = request.get_json(silent=True) or {}
     try:
-        model_info = {
-            "model_type": str(type(model).__name__),
-            "features_count": len(EXPECTED_FEATURES),
-            "features": EXPECTED_FEATURES,
-            "health_classes": HEALTH_STATUS,
-            "model_loaded": True,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        # Tentar obter mais informações do modelo se disponível
-        if hasattr(model, 'n_features_in_'):
-            model_info["n_features_in"] = model.n_features_in_
-        
-        if hasattr(model, 'classes_'):
-            model_info["classes"] = model.classes_.tolist()
-            
-        return jsonify(model_info)
-        
+        response = calcular_sensibilidade(model, data.get('exam'), data.get('sweep'))
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
     except Exception as e:
-        logger.error(f"Erro ao obter informações do modelo: {e}")
+        logger.error(f"Erro na análise de sensibilidade: {e}")
+        return jsonify({"error": str(e), "status": "error"}), 500
+
+    return jsonify(response)
+
+@app.route('/drift', methods=['GET'])
+def get_drift():
+    """Endpoint para obter os scores de drift (PSI/KS) das janelas recentes do worker atual contra o perfil de referência"""
+    if drift_monitor is None:
+        return jsonify({
+            "error": "Perfil de referência de drift não encontrado",
+            "status": "error"
+        }), 503
+    janelas = request.args.get('janelas', default=1, type=int)
+    return jsonify(drift_monitor.relatorio(janelas=max(1, janelas)))
+
+def build_model_info():
+    """Informações do modelo carregado (calculadas uma única vez por versão do modelo)"""
+    model_info = {
+        "model_type": str(type(model).__name__),
+        "model_version": MODEL_VERSION,
+        "features_count": len(EXPECTED_FEATURES),
+        "features": EXPECTED_FEATURES,
+        "health_classes": HEALTH_STATUS,
+        "model_loaded": True,
+        "timestamp": datetime.now().isoformat()
+    }
+
+    # Tentar obter mais informações do modelo se disponível
+    if hasattr(model, 'n_features_in_'):
+        model_info["n_features_in"] = model.n_features_in_
+
+    if hasattr(model, 'classes_'):
+        model_info["classes"] = model.classes_.tolist()
+
+    return model_info
+
+MODEL_INFO_RESOURCE = RecursoVersionado(json_codec, build_model_info(), versao=MODEL_VERSION) if model is not None else None
+
+@app.route('/model-info', methods=['GET'])
+def get_model_info():
+    """Endpoint para obter informações sobre o modelo"""
+    if MODEL_INFO_RESOURCE is None:
         return jsonify({
-            "error": f"Erro ao obter informações: {str(e)}",
+            "error": "Modelo não carregado",
             "status": "error"
         }), 500
 
+    return MODEL_INFO_RESOURCE.responder(app)
+
 # Endpoint para servir arquivos estáticos do front-end
 @app.route('/frontend/<path:filename>')
 def serve_frontend(filename):
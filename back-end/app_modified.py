@@ -6,6 +6,13 @@ import os
 import logging
 from datetime import datetime
 
+from banco.json_rapido import instalar_codec, FragmentoJSON
+from banco.condicional import RecursoVersionado, responder_condicional
+from modelo.preditor import (
+    EXPECTED_FEATURES, HEALTH_STATUS, STATUS_DESCONHECIDO, RECOMMENDATIONS,
+    calcular_versao_modelo, converter_feature
+)
+
 # Importar função de salvamento
 try:
     from banco.database import get_sync_collection
@@ -48,6 +55,7 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
+json_codec = instalar_codec(app)
 
 # Carregar o modelo ML
 model_path = os.path.join('IA', 'model.sav')
@@ -68,54 +76,30 @@ try:
         logger.info("Método predict_proba disponível")
     else:
         logger.warning("Método predict_proba não disponível - usando confiança padrão")
+
+    MODEL_VERSION = calcular_versao_modelo(model_path)
         
 except Exception as e:
     logger.error(f"Erro ao carregar o modelo: {e}")
     logger.error(f"Caminho do modelo: {os.path.abspath(model_path)}")
     logger.error(f"Arquivo existe: {os.path.exists(model_path)}")
     model = None
+    MODEL_VERSION = None
 
-# Mapeamento dos resultados do modelo
-HEALTH_STATUS = {
-    1: {"status": "Normal", "description": "Feto saudável - sem indicações de risco", "color": "success"},
-    2: {"status": "Suspeito", "description": "Necessita acompanhamento médico mais próximo", "color": "warning"},
-    3: {"status": "Patológico", "description": "Requer intervenção médica imediata", "color": "danger"}
-}
-
-# Lista dos campos esperados pelo modelo (na ordem correta)
-EXPECTED_FEATURES = [
-    'baseline_value',
-    'accelerations', 
-    'fetal_movement',
-    'uterine_contractions',
-    'light_decelerations',
-    'severe_decelerations',
-    'prolongued_decelerations',
-    'abnormal_short_term_variability',
-    'mean_value_of_short_term_variability',
-    'percentage_of_time_with_abnormal_long_term_variability',
-    'mean_value_of_long_term_variability',
-    'histogram_width',
-    'histogram_min',
-    'histogram_max',
-    'histogram_number_of_peaks',
-    'histogram_number_of_zeroes',
-    'histogram_mode',
-    'histogram_mean',
-    'histogram_median',
-    'histogram_variance',
-    'histogram_tendency'
-]
+# Parte de / que só muda com o modelo; o timestamp é acrescentado a cada resposta
+HEALTH_FRAGMENT = FragmentoJSON(json_codec, {
+    "status": "healthy",
+    "service": "FetalCare ML API",
+    "model_loaded": model is not None
+})
+HEALTH_ETAG = f"health-{MODEL_VERSION}"
 
 @app.route('/')
 def health_check():
     """Endpoint para verificar se o serviço está funcionando"""
-    return jsonify({
-        "status": "healthy",
-        "service": "FetalCare ML API",
-        "model_loaded": model is not None,
-        "timestamp": datetime.now().isoformat()
-    })
+    return responder_condicional(
+        app, HEALTH_ETAG, lambda: HEALTH_FRAGMENT.com(timestamp=datetime.now().isoformat()), fraca=True
+    )
 
 @app.route('/predict', methods=['POST'])
 def predict():
@@ -142,18 +126,8 @@ def predict():
         
         for feature in EXPECTED_FEATURES:
             if feature in data:
-                # Converter histogram_tendency para valor numérico se necessário
-                if feature == 'histogram_tendency':
-                    tendency_map = {
-                        'normal': 0,
-                        'increasing': 1,
-                        'decreasing': -1,
-                        'stable': 0
-                    }
-                    value = tendency_map.get(data[feature], 0)
-                else:
-                    value = float(data[feature])
-                features.append(value)
+                # histogram_tendency aceita o nome da tendência (TENDENCY_MAP)
+                features.append(converter_feature(feature, data[feature]))
             else:
                 missing_features.append(feature)
                 features.append(0)  # Valor padrão para features faltantes
@@ -183,11 +157,7 @@ def predict():
                 confidence = 0.85  # Confiança padrão se não conseguir calcular
 
         # Mapear resultado
-        result = HEALTH_STATUS.get(int(prediction), {
-            "status": "Desconhecido",
-            "description": "Resultado não mapeado",
-            "color": "secondary"
-        })
+        result = HEALTH_STATUS.get(int(prediction), STATUS_DESCONHECIDO)
 
         # Preparar resposta
         response = {
@@ -205,24 +175,7 @@ def predict():
         }
 
         # Adicionar recomendações baseadas no resultado
-        if prediction == 1:
-            response["recommendations"] = [
-                "Continue o monitoramento de rotina",
-                "Mantenha consultas pré-natais regulares",
-                "Acompanhe os movimentos fetais diariamente"
-            ]
-        elif prediction == 2:
-            response["recommendations"] = [
-                "Aumente a frequência do monitoramento",
-                "Considere realizar cardiotocografia adicional",
-                "Agende consulta médica em 24-48 horas"
-            ]
-        else:  # prediction == 3
-            response["recommendations"] = [
-                "URGENTE: Contate médico imediatamente",
-                "Considere internação hospitalar",
-                "Monitoramento contínuo necessário"
-            ]
+        response["recommendations"] = list(RECOMMENDATIONS.get(int(prediction), RECOMMENDATIONS[3]))
 
         # Salvar no banco
         record_id = save_to_database(data, response)
@@ -243,126 +196,127 @@ def predict():
             "status": "error"
         }), 500
 
+# Cenários de teste pré-definidos (resposta constante, serializada uma única vez)
+TEST_SCENARIOS = {
+    "normal": {
+        "name": "Feto Saudável",
+        "data": {
+            "baseline_value": 140,
+            "accelerations": 3,
+            "fetal_movement": 4,
+            "uterine_contractions": 0,
+            "light_decelerations": 0,
+            "severe_decelerations": 0,
+            "prolongued_decelerations": 0,
+            "abnormal_short_term_variability": 0,
+            "mean_value_of_short_term_variability": 5.5,
+            "percentage_of_time_with_abnormal_long_term_variability": 10,
+            "mean_value_of_long_term_variability": 25,
+            "histogram_width": 120,
+            "histogram_min": 90,
+            "histogram_max": 180,
+            "histogram_number_of_peaks": 3,
+            "histogram_number_of_zeroes": 0,
+            "histogram_mode": 140,
+            "histogram_mean": 140,
+            "histogram_median": 140,
+            "histogram_variance": 15,
+            "histogram_tendency": "normal"
+        }
+    },
+    "suspicious": {
+        "name": "Feto Suspeito",
+        "data": {
+            "baseline_value": 160,
+            "accelerations": 1,
+            "fetal_movement": 2,
+            "uterine_contractions": 2,
+            "light_decelerations": 2,
+            "severe_decelerations": 0,
+            "prolongued_decelerations": 0,
+            "abnormal_short_term_variability": 15,
+            "mean_value_of_short_term_variability": 3.2,
+            "percentage_of_time_with_abnormal_long_term_variability": 25,
+            "mean_value_of_long_term_variability": 18,
+            "histogram_width": 80,
+            "histogram_min": 110,
+            "histogram_max": 170,
+            "histogram_number_of_peaks": 2,
+            "histogram_number_of_zeroes": 5,
+            "histogram_mode": 160,
+            "histogram_mean": 158,
+            "histogram_median": 160,
+            "histogram_variance": 25,
+            "histogram_tendency": "decreasing"
+        }
+    },
+    "pathological": {
+        "name": "Feto Patológico",
+        "data": {
+            "baseline_value": 110,
+            "accelerations": 0,
+            "fetal_movement": 0,
+            "uterine_contractions": 5,
+            "light_decelerations": 5,
+            "severe_decelerations": 3,
+            "prolongued_decelerations": 2,
+            "abnormal_short_term_variability": 45,
+            "mean_value_of_short_term_variability": 1.8,
+            "percentage_of_time_with_abnormal_long_term_variability": 60,
+            "mean_value_of_long_term_variability": 8,
+            "histogram_width": 40,
+            "histogram_min": 80,
+            "histogram_max": 130,
+            "histogram_number_of_peaks": 1,
+            "histogram_number_of_zeroes": 15,
+            "histogram_mode": 110,
+            "histogram_mean": 108,
+            "histogram_median": 110,
+            "histogram_variance": 45,
+            "histogram_tendency": "decreasing"
+        }
+    }
+}
+TEST_SCENARIOS_RESOURCE = RecursoVersionado(json_codec, TEST_SCENARIOS, versao="scenarios")
+
 @app.route('/test-scenarios', methods=['GET'])
 def get_test_scenarios():
     """Endpoint para obter cenários de teste pré-definidos"""
-    scenarios = {
-        "normal": {
-            "name": "Feto Saudável",
-            "data": {
-                "baseline_value": 140,
-                "accelerations": 3,
-                "fetal_movement": 4,
-                "uterine_contractions": 0,
-                "light_decelerations": 0,
-                "severe_decelerations": 0,
-                "prolongued_decelerations": 0,
-                "abnormal_short_term_variability": 0,
-                "mean_value_of_short_term_variability": 5.5,
-                "percentage_of_time_with_abnormal_long_term_variability": 10,
-                "mean_value_of_long_term_variability": 25,
-                "histogram_width": 120,
-                "histogram_min": 90,
-                "histogram_max": 180,
-                "histogram_number_of_peaks": 3,
-                "histogram_number_of_zeroes": 0,
-                "histogram_mode": 140,
-                "histogram_mean": 140,
-                "histogram_median": 140,
-                "histogram_variance": 15,
-                "histogram_tendency": "normal"
-            }
-        },
-        "suspicious": {
-            "name": "Feto Suspeito",
-            "data": {
-                "baseline_value": 160,
-                "accelerations": 1,
-                "fetal_movement": 2,
-                "uterine_contractions": 2,
-                "light_decelerations": 2,
-                "severe_decelerations": 0,
-                "prolongued_decelerations": 0,
-                "abnormal_short_term_variability": 15,
-                "mean_value_of_short_term_variability": 3.2,
-                "percentage_of_time_with_abnormal_long_term_variability": 25,
-                "mean_value_of_long_term_variability": 18,
-                "histogram_width": 80,
-                "histogram_min": 110,
-                "histogram_max": 170,
-                "histogram_number_of_peaks": 2,
-                "histogram_number_of_zeroes": 5,
-                "histogram_mode": 160,
-                "histogram_mean": 158,
-                "histogram_median": 160,
-                "histogram_variance": 25,
-                "histogram_tendency": "decreasing"
-            }
-        },
-        "pathological": {
-            "name": "Feto Patológico",
-            "data": {
-                "baseline_value": 110,
-                "accelerations": 0,
-                "fetal_movement": 0,
-                "uterine_contractions": 5,
-                "light_decelerations": 5,
-                "severe_decelerations": 3,
-                "prolongued_decelerations": 2,
-                "abnormal_short_term_variability": 45,
-                "mean_value_of_short_term_variability": 1.8,
-                "percentage_of_time_with_abnormal_long_term_variability": 60,
-                "mean_value_of_long_term_variability": 8,
-                "histogram_width": 40,
-                "histogram_min": 80,
-                "histogram_max": 130,
-                "histogram_number_of_peaks": 1,
-                "histogram_number_of_zeroes": 15,
-                "histogram_mode": 110,
-                "histogram_mean": 108,
-                "histogram_median": 110,
-                "histogram_variance": 45,
-                "histogram_tendency": "decreasing"
-            }
-        }
+    return TEST_SCENARIOS_RESOURCE.responder(app)
+
+def build_model_info():
+    """Informações do modelo carregado (calculadas uma única vez por versão do modelo)"""
+    model_info = {
+        "model_type": str(type(model).__name__),
+        "model_version": MODEL_VERSION,
+        "features_count": len(EXPECTED_FEATURES),
+        "features": EXPECTED_FEATURES,
+        "health_classes": HEALTH_STATUS,
+        "model_loaded": True,
+        "timestamp": datetime.now().isoformat()
     }
-    
-    return jsonify(scenarios)
+
+    # Tentar obter mais informações do modelo se disponível
+    if hasattr(model, 'n_features_in_'):
+        model_info["n_features_in"] = model.n_features_in_
+
+    if hasattr(model, 'classes_'):
+        model_info["classes"] = model.classes_.tolist()
+
+    return model_info
+
+MODEL_INFO_RESOURCE = RecursoVersionado(json_codec, build_model_info(), versao=MODEL_VERSION) if model is not None else None
 
 @app.route('/model-info', methods=['GET'])
 def get_model_info():
     """Endpoint para obter informações sobre o modelo"""
-    if model is None:
+    if MODEL_INFO_RESOURCE is None:
         return jsonify({
             "error": "Modelo não carregado",
             "status": "error"
         }), 500
-    
-    try:
-        model_info = {
-            "model_type": str(type(model).__name__),
-            "features_count": len(EXPECTED_FEATURES),
-            "features": EXPECTED_FEATURES,
-            "health_classes": HEALTH_STATUS,
-            "model_loaded": True,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        # Tentar obter mais informações do modelo se disponível
-        if hasattr(model, 'n_features_in_'):
-            model_info["n_features_in"] = model.n_features_in_
-        
-        if hasattr(model, 'classes_'):
-            model_info["classes"] = model.classes_.tolist()
-            
-        return jsonify(model_info)
-        
-    except Exception as e:
-        logger.error(f"Erro ao obter informações do modelo: {e}")
-        return jsonify({
-            "error": f"Erro ao obter informações: {str(e)}",
-            "status": "error"
-        }), 500
+
+    return MODEL_INFO_RESOURCE.responder(app)
 
 # Endpoint para servir arquivos estáticos do front-end
 @app.route('/frontend/<path:filename>')
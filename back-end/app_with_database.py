@@ -1,12 +1,27 @@
 # -*- coding: utf-8 -*-
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 import joblib
 import numpy as np
 import os
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 import warnings
+import threading
+import tempfile
+
+from modelo.preditor import (
+    EXPECTED_FEATURES, HEALTH_STATUS, STATUS_DESCONHECIDO, RECOMMENDATIONS,
+    calcular_versao_modelo, converter_feature, montar_matriz
+)
+from modelo.explicacao import ExplicadorFloresta, exames_da_requisicao
+from modelo.sensibilidade import calcular_sensibilidade
+from modelo.drift import criar_monitor
+from modelo.hub_predicoes import HubPredicoes, TOPICO_TODOS
+from modelo.alertas import MotorAlertas, SinkLog, SinkSSE, SinkWebhook, ALERTAS_WEBHOOK_URL
+from banco.json_rapido import instalar_codec
+from banco.condicional import responder_condicional
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -14,17 +29,69 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
+json_codec = instalar_codec(app)
+
+# Hub das predições em tempo real (um por worker)
+predictions_hub = HubPredicoes()
+
+# Motor de alertas clínicos (entrega assíncrona para log, SSE e webhook opcional)
+alerts_hub = HubPredicoes()
+alert_sinks = [SinkLog(), SinkSSE(alerts_hub)]
+if ALERTAS_WEBHOOK_URL:
+    alert_sinks.append(SinkWebhook(ALERTAS_WEBHOOK_URL))
+alert_engine = MotorAlertas(sinks=alert_sinks)
 
 # Importar módulos do banco de dados
 try:
+    from banco.cache import CacheConsultas, ler_marcador
     from banco.database import get_sync_collection
+    from banco.gestantes import chave_gestante, normalizar_cpf
+    from banco.indices import garantir_indices
     from banco.models import determinar_status_saude
+    from banco.resumo_gestante import operacao_atualizar_resumo, buscar_linha_do_tempo
+    from banco.rollups import operacoes_rollups, consultar_rollups, DIMENSOES
+    from banco.database import RESUMOS_COLLECTION_NAME, ROLLUPS_COLLECTION_NAME
+    from banco import exportacao
+    from banco.arquivamento import consultar_arquivo, horizonte_arquivo
+    from banco.eventos import DifusorRegistros
+    from banco.similaridade import IndiceSimilares, detalhar_vizinhos, K_PADRAO, K_MAX
+    from banco.analitico import SnapshotAnalitico
+    from bson import ObjectId
+    from bson.errors import InvalidId
     DATABASE_AVAILABLE = True
+    records_cache = CacheConsultas()
+    records_events = DifusorRegistros(get_sync_collection)
+    similar_index = IndiceSimilares()
+    analytics_snapshot = SnapshotAnalitico()
     logger.info("Módulos do banco de dados importados com sucesso")
 except ImportError as e:
     logger.warning(f"Banco de dados não disponível: {e}")
     DATABASE_AVAILABLE = False
 
+def create_indexes_on_startup():
+    """Garante os índices declarados sem bloquear a inicialização do servidor"""
+    try:
+        garantir_indices()
+    except Exception as e:
+        logger.error(f"Erro ao criar índices: {e}")
+
+if DATABASE_AVAILABLE and os.environ.get('CREATE_INDEXES_ON_STARTUP', 'true').lower() == 'true':
+    threading.Thread(target=create_indexes_on_startup, daemon=True).start()
+
+def build_similar_index_on_startup():
+    """Constrói o índice de exames semelhantes na primeira execução (varredura em lote)"""
+    try:
+        similar_index.construir()
+    except Exception as e:
+        logger.error(f"Erro ao construir o índice de similares: {e}")
+
+if DATABASE_AVAILABLE and not similar_index.disponivel:
+    threading.Thread(target=build_similar_index_on_startup, daemon=True).start()
+
+# Snapshot colunar: incremental a cada SNAPSHOT_INTERVALO_SEGUNDOS, completo a cada SNAPSHOT_RECONSTRUCAO_HORAS
+if DATABASE_AVAILABLE:
+    analytics_snapshot.iniciar_atualizacao_periodica()
+
 # Carregar o modelo ML
 model_path = os.path.join('IA', 'model.sav')
 try:
@@ -34,31 +101,21 @@ try:
         model = joblib.load(model_path)
     logger.info("Modelo ML carregado com sucesso!")
     logger.info(f"Tipo do modelo: {type(model).__name__}")
+    MODEL_VERSION = calcular_versao_modelo(model_path)
+    logger.info(f"Versão do modelo: {MODEL_VERSION}")
+    explainer = ExplicadorFloresta(model, versao=MODEL_VERSION)
 except Exception as e:
     logger.error(f"Erro ao carregar o modelo: {e}")
     model = None
+    MODEL_VERSION = None
+    explainer = None
 
-# Mapeamento dos resultados do modelo
-HEALTH_STATUS = {
-    1: {"status": "Normal", "description": "Feto saudável - sem indicações de risco", "color": "success"},
-    2: {"status": "Suspeito", "description": "Necessita acompanhamento médico mais próximo", "color": "warning"},
-    3: {"status": "Patológico", "description": "Requer intervenção médica imediata", "color": "danger"}
-}
+# Monitor de drift das entradas de /predict (None se o perfil de referência não existir).
+# O sketch é por processo: com vários workers, /drift mostra só o do worker que respondeu (campo "pid")
+drift_monitor = criar_monitor()
 
-# Lista dos campos esperados pelo modelo
-EXPECTED_FEATURES = [
-    'baseline_value', 'accelerations', 'fetal_movement', 'uterine_contractions',
-    'light_decelerations', 'severe_decelerations', 'prolongued_decelerations',
-    'abnormal_short_term_variability', 'mean_value_of_short_term_variability',
-    'percentage_of_time_with_abnormal_long_term_variability',
-    'mean_value_of_long_term_variability', 'histogram_width', 'histogram_min',
-    'histogram_max', 'histogram_number_of_peaks', 'histogram_number_of_zeroes',
-    'histogram_mode', 'histogram_mean', 'histogram_median', 'histogram_variance',
-    'histogram_tendency'
-]
-
-def save_prediction_to_database(data, prediction_result):
-    """Salva a predição no banco de dados"""
+def save_prediction_to_database(data, prediction_result, patient_id):
+    """Salva a predição no banco de dados (patient_id já resolvido por predict, inclusive o AUTO_)"""
     if not DATABASE_AVAILABLE:
         logger.warning("Banco de dados não disponível - dados não salvos")
         return None
@@ -69,22 +126,26 @@ def save_prediction_to_database(data, prediction_result):
         # Determinar status de saúde baseado na confidence
         status_saude, nivel_risco = determinar_status_saude(prediction_result['confidence'])
         
-        # Montar documento completo
+        dados_gestante = {
+            "patient_id": patient_id,
+            "patient_name": data.get('patient_name', 'Paciente Não Identificado'),
+            "patient_cpf": data.get('patient_cpf', '00000000000'),
+            "gestational_age": data.get('gestational_age', 0),
+            "patient_age": data.get('patient_age', 0)
+        }
+        
+        # Montar documento completo (apenas o resumo da gestante, referenciada por gestante_id)
         registro_data = {
-            "dados_gestante": {
-                "patient_id": data.get('patient_id', f"AUTO_{datetime.now().strftime('%Y%m%d_%H%M%S')}"),
-                "patient_name": data.get('patient_name', 'Paciente Não Identificado'),
-                "patient_cpf": data.get('patient_cpf', '00000000000'),
-                "gestational_age": data.get('gestational_age', 0),
-                "patient_age": data.get('patient_age', 0)
-            },
+            "gestante_id": chave_gestante(dados_gestante),
+            "dados_gestante": dados_gestante,
             "parametros_monitoramento": {key: data.get(key, 0) for key in EXPECTED_FEATURES},
             "resultado_ml": {
                 "prediction": prediction_result['prediction'],
                 "confidence": prediction_result['confidence'],
                 "status": prediction_result['status'],
                 "description": prediction_result['description'],
-                "recommendations": prediction_result.get('recommendations', [])
+                "recommendations": prediction_result.get('recommendations', []),
+                "versao_modelo": MODEL_VERSION
             },
             "saude_feto": {
                 "status_saude": status_saude,
@@ -98,30 +159,70 @@ def save_prediction_to_database(data, prediction_result):
         
         # Inserir no banco
         result = collection.insert_one(registro_data)
-        
-        logger.info(f"Registro salvo no banco com ID: {result.inserted_id}")
-        logger.info(f"Status saúde: {status_saude} (Confidence: {prediction_result['confidence']}%)")
-        
-        return str(result.inserted_id)
+        records_cache.invalidar()
         
     except Exception as e:
         logger.error(f"Erro ao salvar no banco: {e}")
         return None
+    
+    logger.info(f"Registro salvo no banco com ID: {result.inserted_id}")
+    logger.info(f"Status saúde: {status_saude} (Confidence: {prediction_result['confidence']}%)")
+    
+    # O exame já está gravado: falhas nas escritas derivadas não mudam a resposta
+    aplicar_escritas_derivadas(collection, registro_data)
+    
+    return str(result.inserted_id)
 
-@app.route('/')
-def health_check():
-    """Endpoint para verificar se o serviço está funcionando"""
+def aplicar_escritas_derivadas(collection, registro_data):
+    """
+    Atualiza os dados derivados de um exame recém-inserido (insert_one preencheu o _id)
+
+    Cada escrita é independente e best-effort: uma falha é registrada no log
+    e não impede as demais. Resumos e rollups podem ser reconstruídos pelos
+    scripts de backfill (banco.resumo_gestante e banco.rollups).
+    """
+    database = collection.database
+    escritas = [
+        ("resumo da gestante", lambda: database[RESUMOS_COLLECTION_NAME].bulk_write(
+            [operacao_atualizar_resumo(registro_data)])),
+        ("rollups", lambda: database[ROLLUPS_COLLECTION_NAME].bulk_write(
+            operacoes_rollups([registro_data]), ordered=False)),
+        ("evento de inserção", lambda: records_events.publicar_insercao(registro_data)),
+        ("índice de similares", lambda: similar_index.adicionar([registro_data])),
+    ]
+    for nome, escrita in escritas:
+        try:
+            escrita()
+        except Exception as e:
+            logger.error(f"Erro ao atualizar {nome} do registro {registro_data.get('_id')}: {e}")
+
+def data_version():
+    """
+    Versão dos dados para as ETags
+
+    Vem do marcador compartilhado do cache (inode e mtime), e não do
+    contador de cada processo: todos os workers do host geram a mesma ETag
+    para os mesmos dados. Escritas deste e dos outros processos do host
+    (records_cache.invalidar e sinalizar_escrita) mudam a versão na hora;
+    escritas de outros hosts aparecem no máximo após o TTL do cache.
+    """
+    marcador = ler_marcador(records_cache.marcador)
+    versao = f"{marcador[0]:x}-{marcador[1]:x}" if marcador else "0"
+    return f"{versao}.{int(time.time() // records_cache.ttl_segundos)}"
+
+def health_body():
+    """Corpo de / (consulta a contagem estimada do banco)"""
     database_status = "available" if DATABASE_AVAILABLE else "unavailable"
     
     try:
         if DATABASE_AVAILABLE:
             collection = get_sync_collection()
-            total_records = collection.count_documents({})
+            total_records = collection.estimated_document_count()
             database_status = f"available ({total_records} records)"
     except:
         database_status = "available but connection failed"
     
-    return jsonify({
+    return json_codec.dumps({
         "status": "healthy",
         "service": "FetalCare ML API with Database",
         "model_loaded": model is not None,
@@ -129,6 +230,12 @@ def health_check():
         "timestamp": datetime.now().isoformat()
     })
 
+@app.route('/')
+def health_check():
+    """Endpoint para verificar se o serviço está funcionando"""
+    etag = f"health-{MODEL_VERSION}-{data_version() if DATABASE_AVAILABLE else 'sem-banco'}"
+    return responder_condicional(app, etag, health_body, fraca=True)
+
 @app.route('/predict', methods=['POST'])
 def predict():
     """Endpoint principal para fazer predições de saúde fetal"""
@@ -150,12 +257,7 @@ def predict():
         features = []
         for feature in EXPECTED_FEATURES:
             if feature in data:
-                if feature == 'histogram_tendency':
-                    tendency_map = {'normal': 0, 'increasing': 1, 'decreasing': -1, 'stable': 0}
-                    value = tendency_map.get(data[feature], 0)
-                else:
-                    value = float(data[feature])
-                features.append(value)
+                features.append(converter_feature(feature, data[feature]))
             else:
                 features.append(0)
 
@@ -172,12 +274,11 @@ def predict():
             except:
                 confidence = 0.85
 
+        if drift_monitor is not None:
+            drift_monitor.registrar(features_array[0], int(prediction))
+
         # Mapear resultado
-        result = HEALTH_STATUS.get(int(prediction), {
-            "status": "Desconhecido",
-            "description": "Resultado não mapeado",
-            "color": "secondary"
-        })
+        result = HEALTH_STATUS.get(int(prediction), STATUS_DESCONHECIDO)
 
         # Preparar resposta
         response = {
@@ -195,35 +296,34 @@ def predict():
         }
 
         # Adicionar recomendações
-        if prediction == 1:
-            response["recommendations"] = [
-                "Continue o monitoramento de rotina",
-                "Mantenha consultas pré-natais regulares",
-                "Acompanhe os movimentos fetais diariamente",
-                "Mantenha estilo de vida saudável"
-            ]
-        elif prediction == 2:
-            response["recommendations"] = [
-                "Aumente a frequência do monitoramento",
-                "Considere realizar cardiotocografia adicional",
-                "Agende consulta médica em 24-48 horas",
-                "Monitore movimentos fetais de perto"
-            ]
-        else:  # prediction == 3
-            response["recommendations"] = [
-                "URGENTE: Contate médico imediatamente",
-                "Considere internação hospitalar",
-                "Monitoramento contínuo necessário",
-                "Avalie necessidade de parto de emergência"
-            ]
+        response["recommendations"] = list(RECOMMENDATIONS.get(int(prediction), RECOMMENDATIONS[3]))
 
+        # Identificador da paciente (o mesmo no banco, no hub e nos alertas)
+        patient_id = data.get('patient_id') or f"AUTO_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        
         # Salvar no banco de dados
-        record_id = save_prediction_to_database(data, response)
+        record_id = save_prediction_to_database(data, response, patient_id)
         
         # Adicionar informações sobre salvamento
         response["saved_to_database"] = record_id is not None
         if record_id:
             response["record_id"] = record_id
+        
+        # Publicar no hub (tópicos da paciente, do setor e geral) e avaliar os alertas
+        live_prediction = {
+            "patient_id": patient_id,
+            "patient_name": data.get('patient_name'),
+            "ward": data.get('ward'),
+            "bed": data.get('bed'),
+            "prediction": response["prediction"],
+            "status": response["status"],
+            "color": response["color"],
+            "confidence": response["confidence"],
+            "record_id": record_id,
+            "timestamp": response["timestamp"]
+        }
+        predictions_hub.publicar(live_prediction)
+        alert_engine.processar(live_prediction)
 
         logger.info(f"Predição realizada: {result['status']} (Confidence: {response['confidence']}%)")
         
@@ -236,9 +336,130 @@ def predict():
             "status": "error"
         }), 500
 
+@app.route('/explain', methods=['POST'])
+def explain():
+    """Endpoint para explicar predições pela contribuição de cada parâmetro"""
+    if explainer is None:
+        return jsonify({
+            "error": "Modelo não está carregado",
+            "status": "error"
+        }), 500
+
+    try:
+        exams, batch = exames_da_requisicao(request.get_json(silent=True))
+        top = request.args.get('top', type=int)
+        explanations = explainer.explicar(montar_matriz(exams), top=top)
+    except ValueError as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
+    except Exception as e:
+        logger.error(f"Erro na explicação: {e}")
+        return jsonify({"error": str(e), "status": "error"}), 500
+
+    if not batch:
+        response = explanations[0]
+        response["model_version"] = explainer.versao
+        return jsonify(response)
+    return jsonify({
+        "explanations": explanations,
+        "total": len(explanations),
+        "model_version": explainer.versao
+    })
+
+@app.route('/explain/metrics', methods=['GET'])
+def get_explain_metrics():
+    """Endpoint para obter as métricas do explicador e do seu cache"""
+    if explainer is None:
+        return jsonify({"error": "Modelo não carregado", "status": "error"}), 500
+    return jsonify(explainer.metricas())
+
+@app.route('/what-if', methods=['POST'])
+def what_if():
+    """Endpoint para curvas (1 feature) ou grades (2 features) de sensibilidade de um exame"""
+    if model is None:
+        return jsonify({
+            "error": "Modelo não está carregado",
+            "status": "error"
+        }), 500
+
+    data = request.get_json(silent=True) or {}
+    try:
+        response = calcular_sensibilidade(model, data.get('exam'), data.get('sweep'))
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
+    except Exception as e:
+        logger.error(f"Erro na análise de sensibilidade: {e}")
+        return jsonify({"error": str(e), "status": "error"}), 500
+
+    return jsonify(response)
+
+@app.route('/drift', methods=['GET'])
+def get_drift():
+    """Endpoint para obter os scores de drift (PSI/KS) das janelas recentes do worker atual contra o perfil de referência"""
+    if drift_monitor is None:
+        return jsonify({
+            "error": "Perfil de referência de drift não encontrado",
+            "status": "error"
+        }), 503
+    janelas = request.args.get('janelas', default=1, type=int)
+    return jsonify(drift_monitor.relatorio(janelas=max(1, janelas)))
+
+def prediction_topics():
+    """Tópicos pedidos na query string (?patient_id=...&ward=...); sem filtros, todos"""
+    topics = [f"paciente:{p}" for p in request.args.getlist('patient_id')]
+    topics += [f"setor:{w}" for w in request.args.getlist('ward')]
+    return topics or [TOPICO_TODOS]
+
+@app.route('/predictions/stream', methods=['GET'])
+def stream_predictions():
+    """Endpoint SSE com o estado mais recente de cada paciente dos tópicos pedidos"""
+    subscriber = predictions_hub.assinar(prediction_topics())
+    return Response(
+        stream_with_context(predictions_hub.transmitir(subscriber)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/predictions/latest', methods=['GET'])
+def get_latest_predictions():
+    """Endpoint com a última predição de cada paciente dos tópicos pedidos"""
+    return jsonify({"predictions": predictions_hub.ultimos_estados(prediction_topics())})
+
+@app.route('/predictions/metrics', methods=['GET'])
+def get_predictions_metrics():
+    """Endpoint para obter as métricas do hub de predições"""
+    return jsonify(predictions_hub.metricas())
+
+@app.route('/alerts/stream', methods=['GET'])
+def stream_alerts():
+    """Endpoint SSE com os alertas clínicos dos tópicos pedidos"""
+    subscriber = alerts_hub.assinar(prediction_topics())
+    return Response(
+        stream_with_context(alerts_hub.transmitir(subscriber)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/alerts/recent', methods=['GET'])
+def get_recent_alerts():
+    """Endpoint com os alertas mais recentes (mais novos primeiro)"""
+    return jsonify({"alerts": list(reversed(alert_engine.recentes))})
+
+@app.route('/alerts/metrics', methods=['GET'])
+def get_alerts_metrics():
+    """Endpoint com contadores e latências do motor de alertas"""
+    return jsonify(alert_engine.metricas())
+
 @app.route('/records', methods=['GET'])
 def get_records():
-    """Endpoint para buscar registros do banco de dados"""
+    """
+    Endpoint para buscar registros do banco de dados
+    
+    Os exames anteriores ao horizonte da retenção estão no arquivo Parquet e
+    vêm depois dos exames do banco na ordenação por data decrescente. O
+    arquivo só é lido quando a página passa do fim dos exames do banco e o
+    intervalo pedido alcança o horizonte; até lá, total conta apenas os
+    exames do banco e archived_records é None (não consultado).
+    """
     if not DATABASE_AVAILABLE:
         return jsonify({
             "error": "Banco de dados não disponível",
@@ -253,38 +474,53 @@ def get_records():
         limit = int(request.args.get('limit', 10))
         skip = int(request.args.get('skip', 0))
         
-        # Filtros
-        filters = {}
-        
-        # Filtro por CPF (busca parcial)
+        # Filtros (CPF com busca parcial, status de saúde e intervalo de datas)
         cpf = request.args.get('cpf')
-        if cpf:
-            # Permite busca parcial usando regex
-            filters['dados_gestante.patient_cpf'] = {'$regex': cpf, '$options': 'i'}
-        
-        # Filtro por status de saúde
         status_saude = request.args.get('status_saude')
-        if status_saude:
-            filters['saude_feto.status_saude'] = status_saude
+        try:
+            inicio = datetime.fromisoformat(request.args['inicio']) if request.args.get('inicio') else None
+            fim = datetime.fromisoformat(request.args['fim']) if request.args.get('fim') else None
+        except ValueError as e:
+            return jsonify({"error": f"Data inválida: {e}", "records": [], "total": 0}), 400
+        filters = exportacao.montar_filtro(cpf, status_saude, inicio, fim)
+        
+        cache_key = records_cache.chave(
+            "records", cpf=cpf, status_saude=status_saude, inicio=inicio, fim=fim, limit=limit, skip=skip
+        )
+        found, cached = records_cache.obter(cache_key)
+        if found:
+            return jsonify(cached)
+        version = records_cache.versao
         
         # Buscar registros
         cursor = collection.find(filters).sort('data_exame', -1).skip(skip).limit(limit)
         records = list(cursor)
         
-        # Converter ObjectId para string
-        for record in records:
-            record['_id'] = str(record['_id'])
+        # Contar total (sem filtros usa os metadados da collection)
+        total = collection.count_documents(filters) if filters else collection.estimated_document_count()
         
-        # Contar total
-        total = collection.count_documents(filters)
+        # O arquivo Parquet só entra quando a página passa do fim dos exames do banco
+        archived = None
+        horizonte = horizonte_arquivo() if exportacao.PYARROW_AVAILABLE and skip + limit > total else None
+        if horizonte and (inicio is None or inicio < horizonte):
+            archive_records, archived = consultar_arquivo(
+                inicio, min(fim or horizonte, horizonte), status_saude, cpf,
+                skip=max(0, skip - total), limit=limit - len(records)
+            )
+            records += archive_records
+            total += archived
         
-        return jsonify({
+        response = {
             "records": records,
             "total": total,
             "limit": limit,
             "skip": skip,
+            "archived_records": archived,
             "filters_applied": filters
-        })
+        }
+        records_cache.armazenar(cache_key, response, version)
+        
+        return jsonify(response)
         
     except Exception as e:
         logger.error(f"Erro ao buscar registros: {e}")
@@ -294,54 +530,302 @@ def get_records():
             "total": 0
         }), 500
 
-@app.route('/records/stats', methods=['GET'])
-def get_records_stats():
-    """Endpoint para obter estatísticas dos registros"""
+EXPORT_MIMETYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+@app.route('/records/export', methods=['GET'])
+def export_records():
+    """Endpoint para exportar registros em CSV, NDJSON ou Parquet (streaming)"""
     if not DATABASE_AVAILABLE:
-        return jsonify({
-            "error": "Banco de dados não disponível",
-            "total_records": 0
-        }), 503
+        return jsonify({"error": "Banco de dados não disponível"}), 503
+    
+    formato = request.args.get('format', 'csv').lower()
+    if formato not in exportacao.FORMATOS:
+        return jsonify({"error": f"Formato inválido. Use: {', '.join(exportacao.FORMATOS)}"}), 400
+    if formato == "parquet" and not exportacao.PYARROW_AVAILABLE:
+        return jsonify({"error": "Exportação Parquet requer o pacote pyarrow"}), 501
     
     try:
-        collection = get_sync_collection()
+        filtro = exportacao.montar_filtro(
+            request.args.get('cpf'),
+            request.args.get('status_saude'),
+            datetime.fromisoformat(request.args['inicio']) if request.args.get('inicio') else None,
+            datetime.fromisoformat(request.args['fim']) if request.args.get('fim') else None
+        )
+    except ValueError as e:
+        return jsonify({"error": f"Data inválida: {e}"}), 400
+    
+    cursor = exportacao.abrir_cursor(filtro, get_sync_collection())
+    nome_arquivo = f"registros_exames_{datetime.utcnow():%Y%m%d_%H%M%S}.{formato}"
+    
+    if formato == "parquet":
+        # Parquet é escrito em row groups num arquivo temporário e enviado em blocos
+        arquivo = tempfile.TemporaryFile()
+        try:
+            exportacao.escrever_parquet(cursor, arquivo)
+        finally:
+            cursor.close()
+        arquivo.seek(0)
         
-        # Total de registros
-        total_records = collection.count_documents({})
+        def gerar():
+            with arquivo:
+                while bloco := arquivo.read(1024 * 1024):
+                    yield bloco
+    else:
+        gerador = exportacao.gerar_csv if formato == "csv" else exportacao.gerar_ndjson
         
-        # Estatísticas por status de saúde
-        pipeline = [
-            {
-                "$group": {
-                    "_id": "$saude_feto.status_saude",
-                    "count": {"$sum": 1}
-                }
-            }
-        ]
-        
-        status_stats = list(collection.aggregate(pipeline))
-        by_health_status = {item['_id']: item['count'] for item in status_stats}
-        
-        # Estatísticas por nível de risco
-        pipeline_risk = [
-            {
-                "$group": {
-                    "_id": "$saude_feto.nivel_risco",
-                    "count": {"$sum": 1}
-                }
-            }
-        ]
+        def gerar():
+            try:
+                yield from gerador(cursor)
+            finally:
+                cursor.close()
+    
+    return Response(
+        stream_with_context(gerar()),
+        mimetype=EXPORT_MIMETYPES[formato],
+        headers={"Content-Disposition": f"attachment; filename={nome_arquivo}"}
+    )
+
+@app.route('/records/stream', methods=['GET'])
+def stream_records():
+    """Endpoint SSE com os novos exames e os deltas das estatísticas"""
+    if not DATABASE_AVAILABLE:
+        return jsonify({"error": "Banco de dados não disponível"}), 503
+    
+    assinante = records_events.assinar()
+    return Response(
+        stream_with_context(records_events.transmitir(assinante)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/records/stream/metrics', methods=['GET'])
+def get_records_stream_metrics():
+    """Endpoint para obter as métricas da difusão de eventos"""
+    if not DATABASE_AVAILABLE:
+        return jsonify({"error": "Banco de dados não disponível"}), 503
+    
+    return jsonify(records_events.metricas())
+
+@app.route('/records/cache', methods=['GET'])
+def get_records_cache():
+    """Endpoint para obter as métricas do cache de consultas de registros"""
+    if not DATABASE_AVAILABLE:
+        return jsonify({"error": "Banco de dados não disponível"}), 503
+    
+    return jsonify(records_cache.metricas())
+
+@app.route('/records/rollups', methods=['GET'])
+def get_records_rollups():
+    """Endpoint para consultas por intervalo somando os agregados por hora/dia"""
+    if not DATABASE_AVAILABLE:
+        return jsonify({"error": "Banco de dados não disponível"}), 503
+    
+    try:
+        # Intervalo: inicio/fim em ISO 8601 (UTC) ou os últimos N dias
+        fim = datetime.fromisoformat(request.args['fim']) if request.args.get('fim') else datetime.utcnow()
+        if request.args.get('inicio'):
+            inicio = datetime.fromisoformat(request.args['inicio'])
+        else:
+            inicio = fim - timedelta(days=int(request.args.get('dias', 30)))
+        
+        agrupar_por = [d for d in request.args.get('agrupar_por', 'status_saude').split(',') if d]
+        filtros = {dimensao: request.args[dimensao] for dimensao in DIMENSOES if request.args.get(dimensao)}
+        
+        resultado = consultar_rollups(
+            get_sync_collection().database,
+            inicio,
+            fim,
+            granularidade=request.args.get('granularidade', 'dia'),
+            agrupar_por=agrupar_por,
+            filtros=filtros,
+            serie=request.args.get('serie', 'false').lower() == 'true'
+        )
+        # Datas serializadas pelo codec JSON (banco/json_rapido.py)
+        return jsonify(resultado)
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro ao consultar agregados: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/records/analytics', methods=['POST'])
+def query_records_analytics():
+    """Endpoint para filtros, agrupamentos e histogramas sobre o snapshot colunar dos exames"""
+    if not DATABASE_AVAILABLE:
+        return jsonify({"error": "Banco de dados não disponível"}), 503
+    if not analytics_snapshot.disponivel:
+        return jsonify({"error": "Snapshot analítico em construção"}), 503
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        resultado = analytics_snapshot.consultar(
+            filtros=data.get('filtros'),
+            agrupar_por=data.get('agrupar_por'),
+            metrica=data.get('metrica'),
+            histograma=data.get('histograma'),
+            inicio=datetime.fromisoformat(data['inicio']) if data.get('inicio') else None,
+            fim=datetime.fromisoformat(data['fim']) if data.get('fim') else None
+        )
+        
+        return jsonify(resultado)
+        
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro na consulta analítica: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/records/analytics/metrics', methods=['GET'])
+def get_records_analytics_metrics():
+    """Endpoint para obter o estado do snapshot analítico"""
+    if not DATABASE_AVAILABLE:
+        return jsonify({"error": "Banco de dados não disponível"}), 503
+    
+    return jsonify(analytics_snapshot.metricas())
+
+@app.route('/records/patient/<patient_key>/timeline', methods=['GET'])
+def get_patient_timeline(patient_key):
+    """Endpoint para obter a linha do tempo da gestante (CPF ou ID:<patient_id>)"""
+    if not DATABASE_AVAILABLE:
+        return jsonify({"error": "Banco de dados não disponível"}), 503
+    
+    try:
+        gestante_id = patient_key if patient_key.startswith('ID:') else normalizar_cpf(patient_key)
+        if not gestante_id:
+            return jsonify({"error": "Informe o CPF ou ID:<patient_id> da gestante"}), 400
+        
+        # Uma única leitura por _id no resumo pré-calculado
+        timeline = buscar_linha_do_tempo(gestante_id, get_sync_collection().database)
+        if timeline is None:
+            return jsonify({"error": "Nenhum exame encontrado para a gestante"}), 404
         
-        risk_stats = list(collection.aggregate(pipeline_risk))
-        by_risk_level = {item['_id']: item['count'] for item in risk_stats}
+        return jsonify(timeline)
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter linha do tempo: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/records/similar', methods=['POST'])
+@app.route('/records/<record_id>/similar', methods=['GET'])
+def get_similar_records(record_id=None):
+    """Endpoint para obter os exames armazenados mais semelhantes (k-NN nos parâmetros padronizados)"""
+    if not DATABASE_AVAILABLE:
+        return jsonify({"error": "Banco de dados não disponível"}), 503
+    if not similar_index.disponivel:
+        return jsonify({"error": "Índice de similares em construção"}), 503
+    
+    try:
+        k = max(1, min(request.args.get('k', K_PADRAO, type=int), K_MAX))
+        
+        if record_id is None:
+            parametros = request.get_json(silent=True)
+            if not parametros:
+                return jsonify({"error": "Nenhum dado fornecido"}), 400
+        else:
+            try:
+                registro = get_sync_collection().find_one(
+                    {"_id": ObjectId(record_id)}, projection={"parametros_monitoramento": 1}
+                )
+            except InvalidId:
+                return jsonify({"error": "ID de registro inválido"}), 400
+            if registro is None:
+                return jsonify({"error": "Registro não encontrado"}), 404
+            parametros = registro.get("parametros_monitoramento") or {}
+        
+        start = datetime.now()
+        # Candidatos extras compensam vizinhos já arquivados, descartados no detalhamento
+        neighbours = similar_index.buscar(parametros, k=2 * k, excluir_id=record_id)
+        search_ms = (datetime.now() - start).total_seconds() * 1000
+        similar = detalhar_vizinhos(neighbours, k=k)
         
         return jsonify({
-            "total_records": total_records,
-            "by_health_status": by_health_status,
-            "by_risk_level": by_risk_level,
-            "timestamp": datetime.now().isoformat()
+            "record_id": record_id,
+            "similar": similar,
+            "total": len(similar),
+            "indexed_records": similar_index.total,
+            "search_ms": round(search_ms, 3)
         })
         
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro ao buscar exames semelhantes: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/records/similar/metrics', methods=['GET'])
+def get_similar_metrics():
+    """Endpoint para obter as métricas do índice de exames semelhantes"""
+    if not DATABASE_AVAILABLE:
+        return jsonify({"error": "Banco de dados não disponível"}), 503
+    
+    return jsonify(similar_index.metricas())
+
+def records_stats_body(version):
+    """Estatísticas dos registros serializadas (cacheadas por versão dos dados)"""
+    cache_key = records_cache.chave("stats")
+    found, cached = records_cache.obter(cache_key)
+    if found:
+        return cached
+
+    collection = get_sync_collection()
+    
+    # Total de registros
+    total_records = collection.estimated_document_count()
+    
+    # Estatísticas por status de saúde
+    pipeline = [
+        {
+            "$group": {
+                "_id": "$saude_feto.status_saude",
+                "count": {"$sum": 1}
+            }
+        }
+    ]
+    
+    status_stats = list(collection.aggregate(pipeline))
+    by_health_status = {item['_id']: item['count'] for item in status_stats}
+    
+    # Estatísticas por nível de risco
+    pipeline_risk = [
+        {
+            "$group": {
+                "_id": "$saude_feto.nivel_risco",
+                "count": {"$sum": 1}
+            }
+        }
+    ]
+    
+    risk_stats = list(collection.aggregate(pipeline_risk))
+    by_risk_level = {item['_id']: item['count'] for item in risk_stats}
+    
+    body = json_codec.dumps({
+        "total_records": total_records,
+        "by_health_status": by_health_status,
+        "by_risk_level": by_risk_level,
+        "timestamp": datetime.now().isoformat()
+    })
+    records_cache.armazenar(cache_key, body, version)
+    return body
+
+@app.route('/records/stats', methods=['GET'])
+def get_records_stats():
+    """Endpoint para obter estatísticas dos registros (If-None-Match responde 304 sem consultar o banco)"""
+    if not DATABASE_AVAILABLE:
+        return jsonify({
+            "error": "Banco de dados não disponível",
+            "total_records": 0
+        }), 503
+    
+    try:
+        etag = f"stats-{data_version()}"
+        version = records_cache.versao
+        return responder_condicional(app, etag, lambda: records_stats_body(version), fraca=True)
+        
     except Exception as e:
         logger.error(f"Erro ao obter estatísticas: {e}")
         return jsonify({
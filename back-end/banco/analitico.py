@@ -0,0 +1,621 @@
+"""
+Snapshot colunar de registros_exames para consultas analíticas
+
+Cada campo achatado dos exames ("subdocumento.campo", como na exportação)
+vira um array NumPy tipado gravado em um arquivo próprio e aberto com
+np.memmap. Campos de texto de baixa cardinalidade (status, nível de risco,
+faixa de idade gestacional) são codificados por dicionário em uint8.
+
+O snapshot é construído por uma varredura em lote e depois atualizado de
+forma incremental: exames com _id acima da marca d'água são anexados ao fim
+dos arquivos. Exclusões (ex: arquivamento) e mudanças de status e nível de
+risco em exames já anexados (ex: reprocessamento pelo novo modelo) só
+aparecem na próxima reconstrução completa, feita periodicamente pelo
+atualizador (SNAPSHOT_RECONSTRUCAO_HORAS, 24 h por padrão).
+
+Os workers compartilham o diretório (meta.json, troca atômica na
+reconstrução e releitura entre processos ficam em
+banco/diretorio_versionado.py); cada anexação ignora exames que outro
+processo já anexou e só um processo executa cada ciclo do atualizador.
+
+Filtros, agrupamentos e histogramas são calculados com máscaras booleanas
+e np.bincount sobre os arrays, sem passar pelo MongoDB.
+
+Uso (a partir do diretório back-end):
+    python -m banco.analitico --reconstruir
+"""
+
+import os
+import time
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from .database import get_sync_collection
+from .diretorio_versionado import DiretorioVersionado, gravar_a_partir
+from .trava import travar
+from .rollups import faixa_idade_gestacional
+from modelo.preditor import EXPECTED_FEATURES, montar_matriz
+
+logger = logging.getLogger(__name__)
+
+# Configurações do snapshot
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_ANALITICO_DIR", "snapshot_analitico")
+SNAPSHOT_INTERVALO_SEGUNDOS = float(os.getenv("SNAPSHOT_INTERVALO_SEGUNDOS", "30"))
+SNAPSHOT_RECONSTRUCAO_HORAS = float(os.getenv("SNAPSHOT_RECONSTRUCAO_HORAS", "24"))
+# Exames mais novos que isso ficam para o próximo ciclo (inserções concorrentes com _id menor)
+SNAPSHOT_ATRASO_SEGUNDOS = 2
+BATCH_SIZE = 5000
+MAX_BINS = 200
+MAX_GRUPOS = 10000
+
+# Colunas numéricas: nome -> dtype
+COLUNAS_NUMERICAS = {
+    "data_exame": np.int64,  # milissegundos desde a época (UTC)
+    "dados_gestante.gestational_age": np.int16,
+    "dados_gestante.patient_age": np.int16,
+    **{f"parametros_monitoramento.{feature}": np.float32 for feature in EXPECTED_FEATURES},
+    "resultado_ml.prediction": np.int8,
+    "resultado_ml.confidence": np.float32,
+}
+
+# Colunas codificadas por dicionário (uint8)
+COLUNAS_DICIONARIO = (
+    "resultado_ml.status",
+    "saude_feto.status_saude",
+    "saude_feto.nivel_risco",
+    "dados_gestante.faixa_idade_gestacional",
+)
+
+COLUNAS = {**COLUNAS_NUMERICAS, **{nome: np.uint8 for nome in COLUNAS_DICIONARIO}, "_id": np.uint8}
+AUSENTE = -1
+
+PROJECAO = {
+    "data_exame": 1, "dados_gestante.gestational_age": 1, "dados_gestante.patient_age": 1,
+    "parametros_monitoramento": 1, "resultado_ml.prediction": 1, "resultado_ml.confidence": 1,
+    "resultado_ml.status": 1, "saude_feto.status_saude": 1, "saude_feto.nivel_risco": 1
+}
+
+
+def _inteiro(valor: Any) -> int:
+    try:
+        return int(valor) if valor is not None else AUSENTE
+    except (TypeError, ValueError):
+        return AUSENTE
+
+
+def _milissegundos(data: Optional[datetime]) -> int:
+    if data is None:
+        return AUSENTE
+    return int((data - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+def _presentes(valores: np.ndarray) -> np.ndarray:
+    """Linhas com valor: colunas inteiras diferentes de AUSENTE, colunas float sem NaN"""
+    if np.issubdtype(valores.dtype, np.integer):
+        return valores != AUSENTE
+    return ~np.isnan(valores)
+
+
+def _maior_id(ids: np.ndarray, atual: Optional[ObjectId]) -> Optional[ObjectId]:
+    """Maior ObjectId entre a marca d'água atual e um lote N x 12 (comparação big-endian)"""
+    if not len(ids):
+        return atual
+    ids = np.ascontiguousarray(ids, dtype=np.uint8)
+    alto = ids[:, :8].copy().view(">u8").ravel()
+    baixo = ids[:, 8:].copy().view(">u4").ravel()
+    maior = ObjectId(ids[np.lexsort((baixo, alto))[-1]].tobytes())
+    return maior if atual is None or maior > atual else atual
+
+
+def colunas_documentos(documentos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Converte um lote de documentos em colunas
+
+    Returns:
+        Dict: arrays das colunas numéricas, "_id" (N x 12 uint8) e listas de
+            texto das colunas de dicionário (codificadas pelo snapshot)
+    """
+    dados = [d.get("dados_gestante") or {} for d in documentos]
+    resultados = [d.get("resultado_ml") or {} for d in documentos]
+    saude = [d.get("saude_feto") or {} for d in documentos]
+
+    colunas: Dict[str, Any] = {
+        "_id": np.frombuffer(b"".join(ObjectId(d["_id"]).binary for d in documentos),
+                             dtype=np.uint8).reshape(-1, 12),
+        "data_exame": np.array([_milissegundos(d.get("data_exame")) for d in documentos], dtype=np.int64),
+        "dados_gestante.gestational_age": np.array([_inteiro(g.get("gestational_age")) for g in dados], dtype=np.int16),
+        "dados_gestante.patient_age": np.array([_inteiro(g.get("patient_age")) for g in dados], dtype=np.int16),
+        "resultado_ml.prediction": np.array([_inteiro(r.get("prediction")) for r in resultados], dtype=np.int8),
+        "resultado_ml.confidence": np.array([r.get("confidence") or np.nan for r in resultados], dtype=np.float32),
+        "resultado_ml.status": [r.get("status") for r in resultados],
+        "saude_feto.status_saude": [s.get("status_saude") for s in saude],
+        "saude_feto.nivel_risco": [s.get("nivel_risco") for s in saude],
+        "dados_gestante.faixa_idade_gestacional": [faixa_idade_gestacional(g.get("gestational_age")) for g in dados],
+    }
+    matriz = montar_matriz(d.get("parametros_monitoramento") for d in documentos).astype(np.float32)
+    for i, feature in enumerate(EXPECTED_FEATURES):
+        colunas[f"parametros_monitoramento.{feature}"] = matriz[:, i]
+    return colunas
+
+
+def lotes_documentos(documentos: Iterable[Dict[str, Any]], tamanho: int = BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """Agrupa documentos em lotes de colunas"""
+    lote: List[Dict[str, Any]] = []
+    for documento in documentos:
+        lote.append(documento)
+        if len(lote) >= tamanho:
+            yield colunas_documentos(lote)
+            lote = []
+    if lote:
+        yield colunas_documentos(lote)
+
+
+class SnapshotAnalitico(DiretorioVersionado):
+    """Snapshot colunar mapeado em memória com API de consultas vetorizadas"""
+
+    def __init__(self, diretorio: str = SNAPSHOT_DIR):
+        super().__init__(diretorio)
+        self.total = 0
+        self.dicionarios: Dict[str, List[str]] = {nome: [] for nome in COLUNAS_DICIONARIO}
+        self.ultimo_id: Optional[ObjectId] = None
+        self.reconstruido_em: Optional[datetime] = None
+        self.atualizado_em: Optional[datetime] = None
+        self._parar = threading.Event()
+        self.consultas = 0
+        self.carregar()
+
+    @property
+    def disponivel(self) -> bool:
+        self._sincronizar()
+        return self.reconstruido_em is not None
+
+    def _aplicar_meta(self, meta: Dict[str, Any]):
+        self.total = meta["total"]
+        self.dicionarios = meta["dicionarios"]
+        self.ultimo_id = ObjectId(meta["ultimo_id"]) if meta["ultimo_id"] else None
+        self.reconstruido_em = datetime.fromisoformat(meta["reconstruido_em"])
+        self.atualizado_em = datetime.fromisoformat(meta["atualizado_em"])
+
+    def _montar_meta(self) -> Dict[str, Any]:
+        return {
+            "versao": 1,
+            "colunas": {nome: np.dtype(dtype).str for nome, dtype in COLUNAS.items()},
+            "dicionarios": self.dicionarios,
+            "total": self.total,
+            "ultimo_id": str(self.ultimo_id) if self.ultimo_id else None,
+            "reconstruido_em": self.reconstruido_em.isoformat(),
+            "atualizado_em": self.atualizado_em.isoformat()
+        }
+
+    @staticmethod
+    def _codificar(dicionario: List[str], nome: str, valores: List[Optional[str]]) -> np.ndarray:
+        """Codifica textos pelo dicionário da coluna, acrescentando valores novos"""
+        indices = {valor: i for i, valor in enumerate(dicionario)}
+        codigos = np.empty(len(valores), dtype=np.uint8)
+        for i, valor in enumerate(valores):
+            valor = "desconhecido" if valor is None else str(valor)
+            codigo = indices.get(valor)
+            if codigo is None:
+                if len(dicionario) >= 255:
+                    raise ValueError(f"Coluna {nome} excede 255 valores distintos")
+                codigo = indices[valor] = len(dicionario)
+                dicionario.append(valor)
+            codigos[i] = codigo
+        return codigos
+
+    def _gravar_lote(self, diretorio: str, colunas: Dict[str, Any], total_anterior: int,
+                     dicionarios: Dict[str, List[str]]):
+        """Grava um lote no fim dos arquivos (descartando bytes após o total confirmado)"""
+        for nome, dtype in COLUNAS.items():
+            valores = colunas[nome]
+            if nome in COLUNAS_DICIONARIO:
+                valores = self._codificar(dicionarios[nome], nome, valores)
+            largura = np.dtype(dtype).itemsize * (12 if nome == "_id" else 1)
+            gravar_a_partir(os.path.join(diretorio, f"{nome}.bin"), total_anterior * largura,
+                            np.ascontiguousarray(valores, dtype=dtype))
+
+    def construir_de_lotes(self, lotes: Iterable[Dict[str, Any]]) -> Optional[int]:
+        """
+        Constrói o snapshot em um diretório novo e o troca pelo atual
+
+        Só um processo constrói por vez; o diretório .novo é removido se a
+        construção falhar.
+
+        Args:
+            lotes: Lotes de colunas como os de lotes_documentos
+
+        Returns:
+            Optional[int]: Quantidade de exames no snapshot (None se outro processo
+                já está reconstruindo)
+        """
+        if not self._construir_versao(lambda novo: self._gravar_novo(novo, lotes)):
+            logger.info("⏳ Snapshot analítico já está sendo reconstruído por outro processo")
+            return None
+        logger.info(f"🧊 Snapshot analítico construído: {self.total} exames")
+        return self.total
+
+    def _gravar_novo(self, novo: str, lotes: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Grava os lotes em novo e retorna o novo estado (total, dicionários, maior _id, datas)"""
+        dicionarios: Dict[str, List[str]] = {nome: [] for nome in COLUNAS_DICIONARIO}
+        total = 0
+        ultimo_id = None
+        for colunas in lotes:
+            self._gravar_lote(novo, colunas, total, dicionarios)
+            total += len(colunas["data_exame"])
+            ultimo_id = _maior_id(colunas["_id"], ultimo_id)
+        if total == 0:
+            self._gravar_lote(novo, colunas_vazias(), 0, dicionarios)
+        agora = datetime.utcnow()
+        return {"total": total, "dicionarios": dicionarios, "ultimo_id": ultimo_id,
+                "reconstruido_em": agora, "atualizado_em": agora}
+
+    def reconstruir(self, collection=None, batch_size: int = BATCH_SIZE) -> Optional[int]:
+        """Reconstrói o snapshot a partir de uma varredura em lote de registros_exames"""
+        if collection is None:
+            collection = get_sync_collection()
+        cursor = collection.find({}, projection=PROJECAO).sort("_id", 1).batch_size(batch_size)
+        try:
+            return self.construir_de_lotes(lotes_documentos(cursor, batch_size))
+        finally:
+            cursor.close()
+
+    def anexar(self, documentos: List[Dict[str, Any]]) -> int:
+        """
+        Anexa documentos ao fim do snapshot e avança a marca d'água
+
+        Sob a trava do diretório, relê o meta.json e ignora documentos com
+        _id até a marca d'água (já anexados por outro processo).
+
+        Returns:
+            int: Quantidade de exames anexados
+        """
+        if not self.disponivel or not documentos:
+            return 0
+        with self._travar_anexacao():
+            if self.ultimo_id is not None:
+                documentos = [d for d in documentos if ObjectId(d["_id"]) > self.ultimo_id]
+            if not documentos:
+                return 0
+            colunas = colunas_documentos(documentos)
+            with self._lock:
+                dicionarios = {nome: list(valores) for nome, valores in self.dicionarios.items()}
+                self._gravar_lote(self.diretorio, colunas, self.total, dicionarios)
+                self.dicionarios = dicionarios
+                self.total += len(documentos)
+                self.ultimo_id = _maior_id(colunas["_id"], self.ultimo_id)
+                self.atualizado_em = datetime.utcnow()
+                self._salvar_meta(self.diretorio)
+                self._mapas = None
+        return len(documentos)
+
+    def atualizar(self, collection=None, batch_size: int = BATCH_SIZE) -> int:
+        """
+        Anexa os exames inseridos desde a última atualização
+
+        Returns:
+            int: Quantidade de exames anexados
+        """
+        if not self.disponivel:
+            return self.reconstruir(collection, batch_size)
+        if collection is None:
+            collection = get_sync_collection()
+
+        limite = datetime.utcnow() - timedelta(seconds=SNAPSHOT_ATRASO_SEGUNDOS)
+        filtro = {"_id": {"$lt": ObjectId.from_datetime(limite)}}
+        if self.ultimo_id is not None:
+            filtro["_id"]["$gt"] = self.ultimo_id
+        cursor = collection.find(filtro, projection=PROJECAO).sort("_id", 1).batch_size(batch_size)
+        anexados = 0
+        try:
+            lote: List[Dict[str, Any]] = []
+            for documento in cursor:
+                lote.append(documento)
+                if len(lote) >= batch_size:
+                    anexados += self.anexar(lote)
+                    lote = []
+            anexados += self.anexar(lote)
+        finally:
+            cursor.close()
+        return anexados
+
+    def iniciar_atualizacao_periodica(self, intervalo: float = SNAPSHOT_INTERVALO_SEGUNDOS,
+                                      reconstrucao_horas: float = SNAPSHOT_RECONSTRUCAO_HORAS) -> threading.Thread:
+        """
+        Atualiza o snapshot em segundo plano (incremental a cada intervalo, completo a cada reconstrucao_horas)
+
+        Cada ciclo roda em um único processo (trava <diretorio>.atualizador.lock);
+        nos demais workers o ciclo só relê o meta.json.
+        """
+        trava_atualizador = os.path.normpath(self.diretorio) + ".atualizador.lock"
+
+        def executar():
+            while not self._parar.is_set():
+                try:
+                    with travar(trava_atualizador, bloquear=False) as obtida:
+                        if obtida:
+                            self._ciclo(reconstrucao_horas)
+                        else:
+                            self._sincronizar()
+                except Exception as e:
+                    logger.error(f"Erro ao atualizar o snapshot analítico: {e}")
+                self._parar.wait(intervalo)
+
+        thread = threading.Thread(target=executar, daemon=True, name="snapshot-analitico")
+        thread.start()
+        return thread
+
+    def _ciclo(self, reconstrucao_horas: float):
+        """Um ciclo do atualizador: reconstrução completa se vencida, senão incremental"""
+        vencido = self.disponivel and datetime.utcnow() - self.reconstruido_em > timedelta(hours=reconstrucao_horas)
+        if not self.disponivel or vencido:
+            self.reconstruir()
+        else:
+            self.atualizar()
+
+    def parar(self):
+        self._parar.set()
+
+    def estado(self) -> Tuple[Dict[str, np.ndarray], Dict[str, List[str]]]:
+        """
+        Colunas mapeadas em memória e cópia dos dicionários do mesmo instante
+
+        Os mapas são refeitos após anexações; consultas em andamento continuam
+        com o par (mapas, dicionários) que obtiveram.
+        """
+        self._sincronizar()
+        with self._lock:
+            if self._mapas is None:
+                mapas = {}
+                for nome, dtype in COLUNAS.items():
+                    formato = (self.total, 12) if nome == "_id" else (self.total,)
+                    caminho = os.path.join(self.diretorio, f"{nome}.bin")
+                    mapas[nome] = (np.memmap(caminho, dtype=dtype, mode="r", shape=formato)
+                                   if self.total else np.empty(formato, dtype=dtype))
+                self._mapas = (mapas, {nome: list(valores) for nome, valores in self.dicionarios.items()})
+            return self._mapas
+
+    def _validar_coluna(self, nome: str, permitir_dicionario: bool = True) -> str:
+        if nome not in COLUNAS or nome == "_id" or (not permitir_dicionario and nome in COLUNAS_DICIONARIO):
+            raise ValueError(f"Coluna inválida: {nome}")
+        return nome
+
+    def _mascara(self, mapas: Dict[str, np.ndarray], dicionarios: Dict[str, List[str]], filtros: Dict[str, Any],
+                 inicio: Optional[datetime], fim: Optional[datetime]) -> Optional[np.ndarray]:
+        """Máscara booleana dos filtros (None = todas as linhas; AUSENTE nunca satisfaz um filtro numérico)"""
+        mascara = None
+
+        def combinar(condicao):
+            nonlocal mascara
+            mascara = condicao if mascara is None else mascara & condicao
+
+        if inicio is not None:
+            combinar(mapas["data_exame"] >= _milissegundos(inicio))
+        if fim is not None:
+            combinar((mapas["data_exame"] < _milissegundos(fim)) & (mapas["data_exame"] != AUSENTE))
+
+        for nome, condicao in (filtros or {}).items():
+            coluna = mapas[self._validar_coluna(nome)]
+            if nome in COLUNAS_DICIONARIO:
+                valores = condicao if isinstance(condicao, list) else [condicao]
+                dicionario = dicionarios[nome]
+                codigos = [dicionario.index(v) for v in valores if v in dicionario]
+                condicao_codigos = np.zeros(len(coluna), dtype=bool)
+                for codigo in codigos:
+                    condicao_codigos |= coluna == codigo
+                combinar(condicao_codigos)
+                continue
+            if np.issubdtype(coluna.dtype, np.integer):
+                combinar(coluna != AUSENTE)
+            if isinstance(condicao, dict):
+                if condicao.get("min") is not None:
+                    combinar(coluna >= float(condicao["min"]))
+                if condicao.get("max") is not None:
+                    combinar(coluna <= float(condicao["max"]))
+            elif isinstance(condicao, list):
+                combinar(np.isin(coluna, [float(v) for v in condicao]))
+            else:
+                combinar(coluna == float(condicao))
+        return mascara
+
+    def _grupos(self, mapas: Dict[str, np.ndarray], dicionarios: Dict[str, List[str]], colunas: List[str],
+                mascara: Optional[np.ndarray]):
+        """Índice de grupo de cada linha filtrada e o rótulo de cada grupo"""
+        indice = None
+        rotulos: List[Dict[str, Any]] = [{}]
+        for nome in colunas:
+            valores = mapas[self._validar_coluna(nome)]
+            valores = valores[mascara] if mascara is not None else np.asarray(valores)
+            if nome in COLUNAS_DICIONARIO:
+                codigos = valores
+                dominio = dicionarios[nome]
+            elif np.issubdtype(valores.dtype, np.integer) and len(valores):
+                # Inteiros de faixa pequena (ex: idade gestacional): deslocamento em vez de np.unique
+                minimo, maximo = int(valores.min()), int(valores.max())
+                if maximo - minimo >= MAX_GRUPOS:
+                    raise ValueError(f"Agrupamento excede {MAX_GRUPOS} grupos")
+                codigos = valores.astype(np.intp) - minimo
+                dominio = list(range(minimo, maximo + 1))
+            else:
+                unicos, codigos = np.unique(valores, return_inverse=True)
+                dominio = unicos.tolist()
+            if len(rotulos) * max(len(dominio), 1) > MAX_GRUPOS:
+                raise ValueError(f"Agrupamento excede {MAX_GRUPOS} grupos")
+            indice = codigos if indice is None else indice.astype(np.intp, copy=False) * len(dominio) + codigos
+            rotulos = [{**r, nome: v} for r in rotulos for v in dominio]
+        return indice, rotulos
+
+    def consultar(
+        self,
+        filtros: Optional[Dict[str, Any]] = None,
+        agrupar_por: Optional[List[str]] = None,
+        metrica: Optional[str] = None,
+        histograma: Optional[Dict[str, Any]] = None,
+        inicio: Optional[datetime] = None,
+        fim: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Consulta analítica vetorizada sobre o snapshot
+
+        Args:
+            filtros: {coluna: valor | [valores] | {"min", "max"}}
+            agrupar_por: Até duas colunas (dicionário ou inteiras; exames sem valor numa
+                coluna inteira ficam fora dos grupos, mas contam no total)
+            metrica: Coluna numérica cuja média/mín/máx é calculada por grupo (sem os valores ausentes)
+            histograma: {"coluna", "bins", "min", "max"} (por grupo, se houver agrupamento;
+                sem os valores ausentes)
+            inicio: data_exame inicial (inclusiva)
+            fim: data_exame final (exclusiva)
+
+        Returns:
+            Dict: Total filtrado, grupos e/ou histograma, tempo e estado do snapshot
+
+        Raises:
+            ValueError: Colunas ou parâmetros inválidos
+        """
+        if not self.disponivel:
+            raise RuntimeError("Snapshot analítico não construído")
+        agrupar_por = list(agrupar_por or [])
+        if len(agrupar_por) > 2:
+            raise ValueError("Agrupe por no máximo duas colunas")
+
+        comeco = time.perf_counter()
+        mapas, dicionarios = self.estado()
+        mascara = self._mascara(mapas, dicionarios, filtros, inicio, fim)
+        total = int(mascara.sum()) if mascara is not None else len(mapas["data_exame"])
+        resposta: Dict[str, Any] = {"total": total}
+        for nome in agrupar_por:
+            coluna = mapas[self._validar_coluna(nome)]
+            if nome not in COLUNAS_DICIONARIO and np.issubdtype(coluna.dtype, np.integer):
+                presentes = coluna != AUSENTE
+                mascara = presentes if mascara is None else mascara & presentes
+
+        def selecionar(nome: str) -> np.ndarray:
+            coluna = mapas[nome]
+            return coluna[mascara] if mascara is not None else np.asarray(coluna)
+
+        indice, rotulos = self._grupos(mapas, dicionarios, agrupar_por, mascara) if agrupar_por else (None, None)
+        if indice is not None:
+            if indice.dtype == np.uint8 and len(rotulos) <= 16:
+                # Poucos códigos de dicionário: comparações são mais rápidas que converter para bincount
+                contagens = [np.count_nonzero(indice == codigo) for codigo in range(len(rotulos))]
+            else:
+                indice = indice.astype(np.intp, copy=False)
+                contagens = np.bincount(indice, minlength=len(rotulos))
+            grupos = [{**rotulo, "total": int(c)} for rotulo, c in zip(rotulos, contagens)]
+            if metrica:
+                valores = selecionar(self._validar_coluna(metrica, permitir_dicionario=False))
+                validos = _presentes(valores)
+                valores = valores.astype(np.float64)
+                somas = np.bincount(indice[validos], weights=valores[validos], minlength=len(rotulos))
+                n_validos = np.bincount(indice[validos], minlength=len(rotulos))
+                minimos = np.full(len(rotulos), np.inf)
+                maximos = np.full(len(rotulos), -np.inf)
+                np.minimum.at(minimos, indice[validos], valores[validos])
+                np.maximum.at(maximos, indice[validos], valores[validos])
+                for i, grupo in enumerate(grupos):
+                    if n_validos[i]:
+                        grupo[metrica] = {"media": round(float(somas[i] / n_validos[i]), 4),
+                                          "min": float(minimos[i]), "max": float(maximos[i])}
+            resposta["grupos"] = [g for g in grupos if g["total"]]
+        elif metrica:
+            valores = selecionar(self._validar_coluna(metrica, permitir_dicionario=False))
+            valores = valores[_presentes(valores)].astype(np.float64)
+            if len(valores):
+                resposta[metrica] = {"media": round(float(valores.mean()), 4),
+                                     "min": float(valores.min()), "max": float(valores.max())}
+
+        if histograma:
+            nome = self._validar_coluna(histograma.get("coluna"), permitir_dicionario=False)
+            bins = int(histograma.get("bins", 20))
+            if not 1 <= bins <= MAX_BINS:
+                raise ValueError(f"bins deve estar entre 1 e {MAX_BINS}")
+            valores = selecionar(nome)
+            presentes = _presentes(valores)
+            com_valor = valores[presentes]
+            minimo = float(histograma["min"]) if histograma.get("min") is not None else (
+                float(com_valor.min()) if len(com_valor) else 0.0)
+            maximo = float(histograma["max"]) if histograma.get("max") is not None else (
+                float(com_valor.max()) if len(com_valor) else 1.0)
+            if not maximo > minimo:
+                maximo = minimo + 1.0
+            bordas = np.linspace(minimo, maximo, bins + 1)
+            # Bins uniformes: posição por aritmética (ausentes e valores fora da faixa ficam de fora)
+            posicoes = (valores - minimo) * (bins / (maximo - minimo))
+            dentro = (posicoes >= 0) & (posicoes <= bins) & presentes
+            todos_dentro = bool(dentro.all())
+            if not todos_dentro:
+                posicoes = posicoes[dentro]
+            np.minimum(posicoes, bins - 0.5, out=posicoes)
+
+            # Chave grupo * bins + bin em uint16 quando cabe (bincount mais barato que em intp)
+            n_grupos = len(rotulos) if indice is not None else 1
+            tipo = np.uint16 if n_grupos * bins <= np.iinfo(np.uint16).max else np.intp
+            chaves = posicoes.astype(tipo)
+            if indice is not None:
+                chaves += (indice if todos_dentro else indice[dentro]).astype(tipo) * tipo(bins)
+            contagens = np.bincount(chaves, minlength=n_grupos * bins).reshape(n_grupos, bins)
+
+            resposta["histograma"] = {"coluna": nome, "bordas": bordas.tolist()}
+            if indice is None:
+                resposta["histograma"]["contagens"] = contagens[0].tolist()
+            else:
+                resposta["histograma"]["grupos"] = [{**rotulo, "contagens": linha.tolist()}
+                                                    for rotulo, linha in zip(rotulos, contagens) if linha.any()]
+
+        self.consultas += 1
+        resposta["tempo_ms"] = round((time.perf_counter() - comeco) * 1000, 3)
+        resposta["snapshot"] = {"total": self.total, "atualizado_em": self.atualizado_em}
+        return resposta
+
+    def metricas(self) -> Dict[str, Any]:
+        """Retorna o estado do snapshot"""
+        return {
+            "disponivel": self.disponivel,
+            "total": self.total,
+            "ultimo_id": str(self.ultimo_id) if self.ultimo_id else None,
+            "reconstruido_em": self.reconstruido_em,
+            "atualizado_em": self.atualizado_em,
+            "consultas": self.consultas,
+            "colunas": list(COLUNAS_NUMERICAS) + list(COLUNAS_DICIONARIO),
+            "dicionarios": self.dicionarios,
+            "diretorio": os.path.abspath(self.diretorio)
+        }
+
+
+def colunas_vazias() -> Dict[str, Any]:
+    """Lote sem linhas (cria os arquivos de um snapshot vazio)"""
+    colunas: Dict[str, Any] = {nome: np.empty(0, dtype=dtype) for nome, dtype in COLUNAS_NUMERICAS.items()}
+    colunas["_id"] = np.empty((0, 12), dtype=np.uint8)
+    colunas.update({nome: [] for nome in COLUNAS_DICIONARIO})
+    return colunas
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="🧊 Snapshot analítico colunar - Sistema FetalCare")
+    parser.add_argument('--reconstruir', action='store_true', help='Reconstrói o snapshot a partir de registros_exames')
+    parser.add_argument('--diretorio', default=SNAPSHOT_DIR, help=f'Diretório do snapshot (padrão: {SNAPSHOT_DIR})')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f'Documentos por lote do cursor (padrão: {BATCH_SIZE})')
+    args = parser.parse_args()
+
+    snapshot = SnapshotAnalitico(args.diretorio)
+    if args.reconstruir or not snapshot.disponivel:
+        total = snapshot.reconstruir(batch_size=args.batch_size)
+        if total is None:
+            print(f"⏳ Outro processo já está reconstruindo o snapshot em {args.diretorio}")
+        else:
+            print(f"✅ Snapshot construído em {args.diretorio}: {total} exames")
+    else:
+        anexados = snapshot.atualizar(batch_size=args.batch_size)
+        print(f"✅ Snapshot atualizado: {anexados} exames anexados ({snapshot.total} no total)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Retenção em camadas: arquivamento de exames antigos em Parquet
+
+Exames com data_exame anterior ao período de retenção são gravados em
+arquivos Parquet (zstd) particionados por dia, registrados num manifesto
+e só então removidos de registros_exames em lotes. Cada arquivo guarda o
+documento inteiro (colunas achatadas + restante em Extended JSON) e é
+relido e comparado com os exames antes da exclusão. Consultas a intervalos
+anteriores ao horizonte do arquivo leem apenas as partições do intervalo,
+com filtro de data e status empurrado para as estatísticas dos row groups.
+
+Os resumos por gestante e os rollups não são alterados: continuam
+cobrindo o histórico completo.
+
+Requer o pacote opcional pyarrow (pip install pyarrow).
+
+Uso (a partir do diretório back-end):
+    python -m banco.arquivamento --retencao-dias 365
+"""
+
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from bson import json_util
+
+from .cache import sinalizar_escrita
+from .database import get_sync_database, COLLECTION_NAME
+from .exportacao import (
+    PYARROW_AVAILABLE,
+    LINHAS_POR_BLOCO,
+    OPCOES_JSON,
+    abrir_cursor,
+    desachatar,
+    escrever_parquet,
+    recompor,
+    schema_parquet
+)
+
+if PYARROW_AVAILABLE:
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# Configurações da retenção
+ARQUIVO_DIR = os.getenv("ARQUIVO_EXAMES_DIR", "arquivo_exames")
+RETENCAO_DIAS = int(os.getenv("RETENCAO_DIAS", "365"))
+MANIFESTO = "manifest.json"
+TAMANHO_LOTE_EXCLUSAO = 1000
+
+
+def carregar_manifesto(diretorio: str = ARQUIVO_DIR) -> Dict[str, Any]:
+    """Carrega o manifesto do arquivo (vazio se ainda não existir)"""
+    caminho = os.path.join(diretorio, MANIFESTO)
+    if not os.path.exists(caminho):
+        return {"versao": 1, "horizonte": None, "particoes": {}}
+    with open(caminho, "r", encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def salvar_manifesto(manifesto: Dict[str, Any], diretorio: str = ARQUIVO_DIR):
+    """Grava o manifesto de forma atômica (arquivo temporário + rename)"""
+    os.makedirs(diretorio, exist_ok=True)
+    caminho = os.path.join(diretorio, MANIFESTO)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False, indent=2)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, caminho)
+
+
+def horizonte_arquivo(diretorio: str = ARQUIVO_DIR) -> Optional[datetime]:
+    """Data a partir da qual os exames estão no banco (None se nada foi arquivado)"""
+    horizonte = carregar_manifesto(diretorio).get("horizonte")
+    return datetime.fromisoformat(horizonte) if horizonte else None
+
+
+def particoes_do_intervalo(
+    manifesto: Dict[str, Any],
+    inicio: Optional[datetime],
+    fim: Optional[datetime],
+    status_saude: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Seleciona pelo manifesto os arquivos que podem conter exames do filtro"""
+    selecionados = []
+    for arquivos in manifesto.get("particoes", {}).values():
+        for arquivo in arquivos:
+            if fim and datetime.fromisoformat(arquivo["min_data"]) >= fim:
+                continue
+            if inicio and datetime.fromisoformat(arquivo["max_data"]) < inicio:
+                continue
+            if status_saude and not arquivo["status"].get(status_saude):
+                continue
+            selecionados.append(arquivo)
+    return selecionados
+
+
+def assinatura(documento: Dict[str, Any]) -> bytes:
+    """Hash do documento em Extended JSON canônico (independe da ordem das chaves)"""
+    texto = json_util.dumps(documento, sort_keys=True, json_options=OPCOES_JSON)
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).digest()
+
+
+def verificar_arquivo(caminho: str, assinaturas: List[bytes]) -> bool:
+    """
+    Relê o arquivo e confere que recompõe exatamente os documentos gravados
+
+    Args:
+        caminho: Arquivo Parquet escrito no modo completo
+        assinaturas: Assinaturas dos documentos originais, na ordem de escrita
+
+    Returns:
+        bool: True se todas as linhas reproduzem os documentos, na mesma ordem
+    """
+    linhas = 0
+    for lote in pq.ParquetFile(caminho).iter_batches(batch_size=LINHAS_POR_BLOCO):
+        for linha in lote.to_pylist():
+            if linhas >= len(assinaturas) or assinatura(recompor(linha)) != assinaturas[linhas]:
+                return False
+            linhas += 1
+    return linhas == len(assinaturas)
+
+
+def consultar_arquivo(
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    status_saude: Optional[str] = None,
+    cpf: Optional[str] = None,
+    diretorio: str = ARQUIVO_DIR,
+    skip: int = 0,
+    limit: Optional[int] = None
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Consulta os exames arquivados (mais recentes primeiro)
+
+    Data e status são empurrados para a leitura dos arquivos; o CPF
+    (expressão regular sem distinção de maiúsculas, como o $regex de
+    /records) é filtrado na tabela já lida. A
+    paginação é aplicada sobre os índices ordenados, e só as linhas da
+    página são convertidas em documentos.
+
+    Args:
+        skip: Exames arquivados a pular
+        limit: Máximo de exames retornados (None: todos)
+
+    Returns:
+        Tuple[List[Dict], int]: Documentos da página no formato de registros_exames
+                                e total de exames arquivados que atendem ao filtro
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Consulta ao arquivo requer o pacote pyarrow (pip install pyarrow)")
+
+    arquivos = particoes_do_intervalo(carregar_manifesto(diretorio), inicio, fim, status_saude)
+    if not arquivos:
+        return [], 0
+
+    filtro = None
+    condicoes = []
+    if inicio:
+        condicoes.append(ds.field("data_exame") >= inicio)
+    if fim:
+        condicoes.append(ds.field("data_exame") < fim)
+    if status_saude:
+        condicoes.append(ds.field("saude_feto.status_saude") == status_saude)
+    for condicao in condicoes:
+        filtro = condicao if filtro is None else filtro & condicao
+
+    dataset = ds.dataset(
+        [os.path.join(diretorio, arquivo["arquivo"]) for arquivo in arquivos],
+        format="parquet",
+        schema=schema_parquet(completo=True)
+    )
+    tabela = dataset.to_table(filter=filtro)
+    if cpf:
+        coluna_cpf = tabela.column("dados_gestante.patient_cpf")
+        tabela = tabela.filter(pc.fill_null(pc.match_substring_regex(coluna_cpf, cpf, ignore_case=True), False))
+
+    total = tabela.num_rows
+    ordem = pc.sort_indices(tabela, sort_keys=[("data_exame", "descending")])
+    pagina = tabela.take(ordem.slice(skip, limit))
+
+    return [recompor(linha) for linha in pagina.to_pylist()], total
+
+
+class ArquivadorExames:
+    """Move exames anteriores ao período de retenção para o arquivo Parquet"""
+
+    def __init__(
+        self,
+        database=None,
+        diretorio: str = ARQUIVO_DIR,
+        retencao_dias: int = RETENCAO_DIAS,
+        tamanho_lote_exclusao: int = TAMANHO_LOTE_EXCLUSAO
+    ):
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("Arquivamento requer o pacote pyarrow (pip install pyarrow)")
+        self.database = database if database is not None else get_sync_database()
+        self.collection = self.database[COLLECTION_NAME]
+        self.diretorio = diretorio
+        self.retencao_dias = retencao_dias
+        self.tamanho_lote_exclusao = tamanho_lote_exclusao
+
+    def dias_pendentes(self, corte: datetime) -> List[datetime]:
+        """Dias com exames anteriores ao corte (agrupados no servidor pelo índice de data)"""
+        pipeline = [
+            {"$match": {"data_exame": {"$lt": corte}}},
+            {"$group": {"_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$data_exame"}}}},
+            {"$sort": {"_id": 1}}
+        ]
+        return [datetime.fromisoformat(item["_id"]) for item in self.collection.aggregate(pipeline)]
+
+    def _acompanhar(self, cursor, estatisticas: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Repassa os documentos do cursor coletando _ids, datas e contagem por status"""
+        for documento in cursor:
+            estatisticas["ids"].append(documento["_id"])
+            estatisticas["assinaturas"].append(assinatura(documento))
+            data = documento["data_exame"]
+            estatisticas["min_data"] = min(estatisticas["min_data"] or data, data)
+            estatisticas["max_data"] = max(estatisticas["max_data"] or data, data)
+            status = (documento.get("saude_feto") or {}).get("status_saude")
+            estatisticas["status"][status] = estatisticas["status"].get(status, 0) + 1
+            yield documento
+
+    def arquivar_dia(self, dia: datetime, corte: datetime) -> int:
+        """
+        Arquiva um dia: grava o Parquet, registra no manifesto e só então exclui
+
+        Returns:
+            int: Número de exames arquivados
+        """
+        fim = min(dia + timedelta(days=1), corte)
+        particao = f"data={dia:%Y-%m-%d}"
+        relativo = os.path.join(particao, f"exames-{datetime.utcnow():%Y%m%dT%H%M%S%f}.parquet")
+        caminho = os.path.join(self.diretorio, relativo)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+
+        estatisticas = {"ids": [], "assinaturas": [], "min_data": None, "max_data": None, "status": {}}
+        cursor = abrir_cursor({"data_exame": {"$gte": dia, "$lt": fim}}, self.collection, projecao=None)
+        try:
+            linhas = escrever_parquet(self._acompanhar(cursor, estatisticas), caminho, completo=True)
+        finally:
+            cursor.close()
+
+        if not linhas:
+            os.remove(caminho)
+            return 0
+
+        # Nada é excluído se o arquivo relido não reproduzir todos os exames
+        if not verificar_arquivo(caminho, estatisticas["assinaturas"]):
+            os.remove(caminho)
+            raise RuntimeError(f"{relativo} não reproduz os exames de {dia:%Y-%m-%d}; nenhum exame foi excluído")
+
+        manifesto = carregar_manifesto(self.diretorio)
+        manifesto["particoes"].setdefault(f"{dia:%Y-%m-%d}", []).append({
+            "arquivo": relativo,
+            "linhas": linhas,
+            "min_data": estatisticas["min_data"].isoformat(),
+            "max_data": estatisticas["max_data"].isoformat(),
+            "status": estatisticas["status"],
+            "criado_em": datetime.utcnow().isoformat()
+        })
+        horizonte = manifesto.get("horizonte")
+        if horizonte is None or datetime.fromisoformat(horizonte) < fim:
+            manifesto["horizonte"] = fim.isoformat()
+        salvar_manifesto(manifesto, self.diretorio)
+
+        # Exclusão em lotes apenas dos exames gravados no arquivo
+        ids = estatisticas["ids"]
+        for i in range(0, len(ids), self.tamanho_lote_exclusao):
+            self.collection.delete_many({"_id": {"$in": ids[i:i + self.tamanho_lote_exclusao]}})
+        sinalizar_escrita()
+
+        logger.info(f"📦 {dia:%Y-%m-%d}: {linhas} exames arquivados em {relativo}")
+        return linhas
+
+    def executar(self, corte: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Arquiva todos os dias anteriores ao corte (padrão: agora - retenção)
+
+        Returns:
+            Dict: Dias e exames arquivados e o novo horizonte
+        """
+        if corte is None:
+            corte = datetime.utcnow() - timedelta(days=self.retencao_dias)
+
+        dias = self.dias_pendentes(corte)
+        arquivados = sum(self.arquivar_dia(dia, corte) for dia in dias)
+
+        resultado = {
+            "corte": corte.isoformat(),
+            "dias": len(dias),
+            "exames_arquivados": arquivados,
+            "horizonte": carregar_manifesto(self.diretorio).get("horizonte")
+        }
+        logger.info(f"✅ Retenção concluída: {resultado}")
+        return resultado
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="📦 Retenção de exames em arquivo Parquet - Sistema FetalCare")
+    parser.add_argument('--retencao-dias', type=int, default=RETENCAO_DIAS,
+                        help=f'Dias mantidos no banco (padrão: {RETENCAO_DIAS})')
+    parser.add_argument('--diretorio', default=ARQUIVO_DIR,
+                        help=f'Diretório do arquivo (padrão: {ARQUIVO_DIR})')
+    args = parser.parse_args()
+
+    print(ArquivadorExames(diretorio=args.diretorio, retencao_dias=args.retencao_dias).executar())
+
+
+if __name__ == "__main__":
+    main()
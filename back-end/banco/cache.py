@@ -0,0 +1,176 @@
+import os
+import time
+import pickle
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Configurações do cache de consultas
+CACHE_MAX_ENTRADAS = int(os.getenv("CACHE_MAX_ENTRADAS", "1024"))
+CACHE_TTL_SEGUNDOS = float(os.getenv("CACHE_TTL_SEGUNDOS", "30"))
+# Arquivo marcador compartilhado pelos processos do mesmo host (workers e jobs)
+CACHE_MARCADOR_ARQUIVO = os.getenv(
+    "CACHE_MARCADOR_ARQUIVO", os.path.join(tempfile.gettempdir(), "fetalcare_cache_versao")
+)
+
+
+def ler_marcador(caminho: Optional[str] = CACHE_MARCADOR_ARQUIVO) -> Optional[Tuple[int, int]]:
+    """Identidade atual do marcador (inode, mtime em ns), ou None se não existir"""
+    if not caminho:
+        return None
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        return None
+    return (estado.st_ino, estado.st_mtime_ns)
+
+
+def sinalizar_escrita(caminho: Optional[str] = CACHE_MARCADOR_ARQUIVO):
+    """
+    Avisa os caches dos outros processos de que a collection mudou
+
+    Substitui o marcador por um arquivo novo (os.replace), o que muda o seu
+    inode e mtime. Deve ser chamada por toda escrita feita fora da API, como
+    os jobs de arquivamento, reprocessamento e migração.
+    """
+    if not caminho:
+        return
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}"
+    try:
+        with open(temporario, "w") as arquivo:
+            arquivo.write(str(time.time_ns()))
+        os.replace(temporario, caminho)
+    except OSError as e:
+        logger.warning(f"⚠️ Não foi possível sinalizar a escrita no marcador do cache: {e}")
+
+
+class CacheConsultas:
+    """
+    Cache em processo (LRU com TTL) para consultas de registros
+
+    Cada entrada guarda a versão da collection no momento em que a consulta
+    começou. Toda escrita chama invalidar(), que incrementa a versão; entradas
+    de versões anteriores nunca são servidas.
+
+    Escritas de outros processos do mesmo host (outros workers, jobs de
+    arquivamento e reprocessamento) chegam pelo arquivo marcador: invalidar()
+    e sinalizar_escrita() o substituem, e cada leitura da versão compara o
+    marcador com o último visto. Apenas escritas de outros hosts, que não
+    compartilham o marcador, continuam sendo vistas somente após o TTL.
+
+    Os valores são guardados serializados (bytes são guardados como estão) e
+    cada obter() devolve uma cópia nova, que o chamador pode alterar.
+    """
+
+    def __init__(self, max_entradas: int = CACHE_MAX_ENTRADAS, ttl_segundos: float = CACHE_TTL_SEGUNDOS,
+                 marcador: Optional[str] = CACHE_MARCADOR_ARQUIVO):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self.marcador = marcador
+        self._versao = 0
+        self._marcador_visto = ler_marcador(marcador)
+        self._entradas: "OrderedDict[Hashable, Tuple[int, float, bool, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expiradas = 0
+        self.invalidacoes = 0
+        self.invalidacoes_externas = 0
+
+    @property
+    def versao(self) -> int:
+        """Versão da collection, já considerando escritas de outros processos"""
+        with self._lock:
+            self._sincronizar()
+            return self._versao
+
+    def _sincronizar(self):
+        """Invalida as entradas se o marcador mudou desde a última leitura (com o lock)"""
+        marcador = ler_marcador(self.marcador)
+        if marcador != self._marcador_visto:
+            self._marcador_visto = marcador
+            self._versao += 1
+            self.invalidacoes_externas += 1
+            self._entradas.clear()
+
+    @staticmethod
+    def chave(consulta: str, **parametros) -> Tuple:
+        """
+        Monta a chave normalizada de uma consulta
+
+        Args:
+            consulta: Nome da consulta (ex: "buscar_por_cpf")
+            parametros: Filtros e paginação da consulta
+
+        Returns:
+            Tuple: Chave independente da ordem dos parâmetros
+        """
+        return (consulta, tuple(sorted(parametros.items())))
+
+    def obter(self, chave: Hashable) -> Tuple[bool, Any]:
+        """
+        Busca uma entrada válida no cache
+
+        Returns:
+            Tuple[bool, Any]: (encontrado, cópia do valor)
+        """
+        with self._lock:
+            self._sincronizar()
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                versao, expira_em, serializado, valor = entrada
+                if versao == self._versao and expira_em > time.monotonic():
+                    self._entradas.move_to_end(chave)
+                    self.hits += 1
+                    return True, pickle.loads(valor) if serializado else valor
+                del self._entradas[chave]
+                self.expiradas += 1
+            self.misses += 1
+            return False, None
+
+    def armazenar(self, chave: Hashable, valor: Any, versao: int):
+        """
+        Armazena o resultado de uma consulta iniciada na versão informada
+
+        Resultados de consultas que começaram antes de uma escrita (deste ou de
+        outro processo) são descartados.
+        """
+        serializado = not isinstance(valor, bytes)
+        congelado = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL) if serializado else valor
+        with self._lock:
+            self._sincronizar()
+            if versao != self._versao:
+                return
+            self._entradas[chave] = (versao, time.monotonic() + self.ttl_segundos, serializado, congelado)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self):
+        """Incrementa a versão da collection e avisa os outros processos"""
+        with self._lock:
+            self._versao += 1
+            self.invalidacoes += 1
+            self._entradas.clear()
+        sinalizar_escrita(self.marcador)
+
+    def metricas(self) -> Dict[str, Any]:
+        """Retorna as métricas de uso do cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "expiradas": self.expiradas,
+                "invalidacoes": self.invalidacoes,
+                "invalidacoes_externas": self.invalidacoes_externas,
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl_segundos,
+                "versao": self._versao
+            }
@@ -0,0 +1,58 @@
+"""
+GET condicional (ETag / If-None-Match) para recursos versionados
+
+Recursos que só mudam com a versão do modelo (/model-info, /test-scenarios,
+parte de /) são serializados uma única vez e servidos com ETag forte; um
+If-None-Match correspondente recebe 304 sem tocar no modelo nem no banco.
+Recursos derivados dos dados (/records/stats) usam ETag fraca montada a
+partir da versão dos dados, pois o corpo inclui o instante da consulta.
+"""
+
+import os
+import hashlib
+from typing import Any, Callable
+
+from flask import request
+
+from banco.json_rapido import resposta_json
+
+# Cache-Control dos recursos versionados pelo modelo e dos que sempre revalidam
+CACHE_CONTROL_MODELO = os.getenv("CACHE_CONTROL_MODELO", "public, max-age=300")
+CACHE_CONTROL_REVALIDAR = "no-cache"
+
+
+def responder_condicional(app, etag: str, gerar_corpo: Callable[[], bytes],
+                          cache_control: str = CACHE_CONTROL_REVALIDAR, fraca: bool = False):
+    """
+    Responde 304 se o If-None-Match corresponder à ETag; senão gera o corpo
+
+    Args:
+        app: App Flask
+        etag: Valor da ETag (sem aspas)
+        gerar_corpo: Função chamada apenas quando o corpo precisa ser enviado
+        cache_control: Valor do cabeçalho Cache-Control
+        fraca: ETag fraca (corpo pode variar em campos não semânticos, como timestamp)
+
+    Returns:
+        Response: 304 vazio ou 200 com o corpo JSON
+    """
+    if request.if_none_match.contains_weak(etag):
+        resposta = app.response_class(status=304)
+    else:
+        resposta = resposta_json(app, gerar_corpo())
+    resposta.set_etag(etag, weak=fraca)
+    resposta.headers["Cache-Control"] = cache_control
+    return resposta
+
+
+class RecursoVersionado:
+    """Resposta JSON constante para uma versão, serializada uma única vez com ETag forte"""
+
+    def __init__(self, codec, obj: Any, versao: str, cache_control: str = CACHE_CONTROL_MODELO):
+        self.corpo = codec.dumps(obj)
+        self.etag = f"{versao}-{hashlib.sha256(self.corpo).hexdigest()[:16]}"
+        self.cache_control = cache_control
+
+    def responder(self, app):
+        """Resposta 200 ou 304 conforme o If-None-Match da requisição atual"""
+        return responder_condicional(app, self.etag, lambda: self.corpo, self.cache_control)
@@ -1,9 +1,17 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Union
 from datetime import datetime
 import logging
 from bson import ObjectId
+from pymongo import UpdateOne, ReturnDocument
 
-from .database import get_collection
+from .cache import CacheConsultas
+from .database import get_collection, get_gestantes_collection, get_resumos_collection, get_rollups_collection
+from .gestantes import (
+    chave_gestante,
+    separar_dados_gestante,
+    operacao_upsert_gestante,
+    mesclar_perfis
+)
 from .models import (
     RegistroExame, 
     RegistroExameCreate, 
@@ -11,14 +19,20 @@ from .models import (
     criar_saude_feto,
     determinar_status_saude
 )
+from .resumo_gestante import operacao_atualizar_resumo, formatar_linha_do_tempo
+from .rollups import operacoes_rollups
 
 logger = logging.getLogger(__name__)
 
 class RegistroExameCRUD:
     """Operações CRUD para registros de exames fetais"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[CacheConsultas] = None):
         self._collection = None
+        self._gestantes = None
+        self._resumos = None
+        self._rollups = None
+        self.cache = cache if cache is not None else CacheConsultas()
     
     @property
     def collection(self):
@@ -27,6 +41,91 @@ class RegistroExameCRUD:
             self._collection = get_collection()
         return self._collection
     
+    @property
+    def gestantes(self):
+        """Lazy loading da collection de gestantes"""
+        if self._gestantes is None:
+            self._gestantes = get_gestantes_collection()
+        return self._gestantes
+    
+    @property
+    def resumos(self):
+        """Lazy loading da collection de resumos por gestante"""
+        if self._resumos is None:
+            self._resumos = get_resumos_collection()
+        return self._resumos
+    
+    @property
+    def rollups(self):
+        """Lazy loading da collection de agregados por período"""
+        if self._rollups is None:
+            self._rollups = get_rollups_collection()
+        return self._rollups
+    
+    async def _atualizar_agregados(self, documentos: List[Dict[str, Any]]):
+        """
+        Aplica os novos exames aos resumos das gestantes e aos rollups (um bulk_write em cada)
+
+        Os exames já estão gravados: cada escrita é best-effort e uma falha é
+        apenas registrada (os backfills de resumos e rollups as reconstroem).
+        """
+        # Exames sem chave de gestante não entram nos resumos
+        operacoes = [operacao_atualizar_resumo(documento) for documento in documentos if documento.get("gestante_id")]
+        try:
+            if operacoes:
+                await self.resumos.bulk_write(operacoes, ordered=True)
+        except Exception as e:
+            logger.error(f"❌ Erro ao atualizar resumos das gestantes: {e}")
+        try:
+            await self.rollups.bulk_write(operacoes_rollups(documentos), ordered=False)
+        except Exception as e:
+            logger.error(f"❌ Erro ao atualizar rollups: {e}")
+    
+    async def _salvar_gestantes(self, lista_dados_gestante: List[Dict[str, Any]]):
+        """Grava o cadastro das gestantes que trouxeram dados além do resumo"""
+        operacoes = {}
+        for dados in lista_dados_gestante:
+            _, perfil = separar_dados_gestante(dados)
+            chave = chave_gestante(dados)
+            if perfil and chave is not None:
+                operacoes[chave] = operacao_upsert_gestante(chave, dados, perfil)
+        
+        if operacoes:
+            await self.gestantes.bulk_write(list(operacoes.values()), ordered=False)
+    
+    async def _carregar_gestantes(self, registros: List[Dict[str, Any]]):
+        """Recompõe dados_gestante completo com uma única consulta em gestantes"""
+        chaves = {registro["gestante_id"] for registro in registros if registro.get("gestante_id")}
+        if not chaves:
+            return
+        
+        perfis = {}
+        async for perfil in self.gestantes.find({"_id": {"$in": list(chaves)}}):
+            perfis[perfil["_id"]] = perfil
+        mesclar_perfis(registros, perfis)
+    
+    def _para_modelo(self, registro: Dict[str, Any]) -> RegistroExame:
+        """Converte um documento do banco em RegistroExame"""
+        return RegistroExame(**{**registro, "_id": str(registro["_id"])})
+    
+    def _converter(
+        self,
+        registros: List[Dict[str, Any]],
+        brutos: bool
+    ) -> Union[List[RegistroExame], List[Dict[str, Any]]]:
+        """
+        Converte documentos lidos do banco
+        
+        Documentos de registros_exames já foram validados na escrita; em modo
+        bruto eles são devolvidos como dicts (com _id em string), sem montar
+        nem revalidar os modelos aninhados.
+        """
+        if brutos:
+            for registro in registros:
+                registro["_id"] = str(registro["_id"])
+            return registros
+        return [self._para_modelo(registro) for registro in registros]
+    
     async def criar_registro(
         self,
         dados_exame: RegistroExameCreate,
@@ -43,42 +142,109 @@ class RegistroExameCRUD:
             RegistroExame: Registro criado com ID
         """
         try:
-            # Calcula status de saúde baseado na confidence
-            saude_feto = criar_saude_feto(resultado_ml.confidence)
-            
-            # Monta o registro completo
-            registro_data = {
-                "dados_gestante": dados_exame.dados_gestante.model_dump(),
-                "parametros_monitoramento": dados_exame.parametros_monitoramento.model_dump(),
-                "resultado_ml": resultado_ml.model_dump(),
-                "saude_feto": saude_feto.model_dump(),
-                "data_exame": datetime.utcnow(),
-                "medico_responsavel": dados_exame.medico_responsavel,
-                "observacoes": dados_exame.observacoes
-            }
+            dados_gestante = dados_exame.dados_gestante.model_dump()
+            registro_data = self._montar_documento(dados_exame, resultado_ml, dados_gestante)
             
-            # Insere no banco
-            result = await self.collection.insert_one(registro_data)
+            # Cadastro da gestante só é gravado quando há dados além do resumo
+            await self._salvar_gestantes([dados_gestante])
             
-            # Busca o registro criado
-            registro_criado = await self.collection.find_one({"_id": result.inserted_id})
+            # Insere no banco e monta o modelo localmente (sem reler o documento)
+            result = await self.collection.insert_one(registro_data)
+            self.cache.invalidar()
+            await self._atualizar_agregados([registro_data])
             
             logger.info(f"✅ Registro criado com ID: {result.inserted_id}")
-            logger.info(f"📊 Status saúde: {saude_feto.status_saude} (Confidence: {resultado_ml.confidence}%)")
+            logger.info(f"📊 Status saúde: {registro_data['saude_feto']['status_saude']} (Confidence: {resultado_ml.confidence}%)")
             
-            return RegistroExame(**registro_criado)
+            return self._para_modelo({**registro_data, "dados_gestante": dados_gestante})
             
         except Exception as e:
             logger.error(f"❌ Erro ao criar registro: {e}")
             raise
     
+    async def criar_registros(
+        self,
+        exames: List[Tuple[RegistroExameCreate, ResultadoML]]
+    ) -> List[RegistroExame]:
+        """
+        Cria vários registros de exame com um único insert_many
+        
+        Args:
+            exames: Pares (dados do exame, resultado ML)
+            
+        Returns:
+            List[RegistroExame]: Registros criados, na mesma ordem da entrada
+        """
+        if not exames:
+            return []
+        
+        try:
+            lista_dados_gestante = [dados_exame.dados_gestante.model_dump() for dados_exame, _ in exames]
+            documentos = [
+                self._montar_documento(dados_exame, resultado_ml, dados_gestante)
+                for (dados_exame, resultado_ml), dados_gestante in zip(exames, lista_dados_gestante)
+            ]
+            
+            await self._salvar_gestantes(lista_dados_gestante)
+            
+            try:
+                result = await self.collection.insert_many(documentos, ordered=True)
+            finally:
+                self.cache.invalidar()
+            await self._atualizar_agregados(documentos)
+            
+            # insert_many preenche o _id de cada documento
+            registros = [
+                self._para_modelo({**documento, "dados_gestante": dados_gestante})
+                for documento, dados_gestante in zip(documentos, lista_dados_gestante)
+            ]
+            
+            logger.info(f"✅ {len(result.inserted_ids)} registros criados em lote")
+            
+            return registros
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao criar registros em lote: {e}")
+            raise
+    
+    def _montar_documento(
+        self,
+        dados_exame: RegistroExameCreate,
+        resultado_ml: ResultadoML,
+        dados_gestante: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Monta o documento do exame para inserção (com o resumo da gestante)"""
+        # Calcula status de saúde baseado na confidence
+        saude_feto = criar_saude_feto(resultado_ml.confidence)
+        
+        if dados_gestante is None:
+            dados_gestante = dados_exame.dados_gestante.model_dump()
+        resumo, _ = separar_dados_gestante(dados_gestante)
+        chave = chave_gestante(dados_gestante)
+        
+        documento = {
+            "gestante_id": chave,
+            # Sem chave não há cadastro a referenciar: o exame guarda os dados completos
+            "dados_gestante": resumo if chave is not None else dados_gestante,
+            "parametros_monitoramento": dados_exame.parametros_monitoramento.model_dump(),
+            "resultado_ml": resultado_ml.model_dump(),
+            "saude_feto": saude_feto.model_dump(),
+            "data_exame": datetime.utcnow(),
+            "medico_responsavel": dados_exame.medico_responsavel,
+            "observacoes": dados_exame.observacoes
+        }
+        if chave is None:
+            del documento["gestante_id"]
+        return documento
+    
     async def buscar_todos_registros(
         self,
         skip: int = 0,
         limit: int = 100,
         ordenar_por: str = "data_exame",
-        ordem_desc: bool = True
-    ) -> List[RegistroExame]:
+        ordem_desc: bool = True,
+        brutos: bool = False
+    ) -> Union[List[RegistroExame], List[Dict[str, Any]]]:
         """
         Busca todos os registros com paginação
         
@@ -87,17 +253,30 @@ class RegistroExameCRUD:
             limit: Limite de registros por página
             ordenar_por: Campo para ordenação
             ordem_desc: Se True, ordem decrescente
+            brutos: Se True, retorna os documentos sem montar os modelos
             
         Returns:
             List[RegistroExame]: Lista de registros
         """
+        chave = self.cache.chave(
+            "buscar_todos_registros", skip=skip, limit=limit,
+            ordenar_por=ordenar_por, ordem_desc=ordem_desc, brutos=brutos
+        )
+        encontrado, resultado = self.cache.obter(chave)
+        if encontrado:
+            return resultado
+        
         try:
+            versao = self.cache.versao
             ordem = -1 if ordem_desc else 1
             
             cursor = self.collection.find().sort(ordenar_por, ordem).skip(skip).limit(limit)
             registros = await cursor.to_list(length=limit)
+            await self._carregar_gestantes(registros)
             
-            return [RegistroExame(**registro) for registro in registros]
+            resultado = self._converter(registros, brutos)
+            self.cache.armazenar(chave, resultado, versao)
+            return resultado
             
         except Exception as e:
             logger.error(f"❌ Erro ao buscar registros: {e}")
@@ -107,8 +286,9 @@ class RegistroExameCRUD:
         self,
         cpf: str,
         skip: int = 0,
-        limit: int = 100
-    ) -> List[RegistroExame]:
+        limit: int = 100,
+        brutos: bool = False
+    ) -> Union[List[RegistroExame], List[Dict[str, Any]]]:
         """
         Busca registros por CPF da gestante
         
@@ -116,46 +296,87 @@ class RegistroExameCRUD:
             cpf: CPF para busca
             skip: Quantos registros pular
             limit: Limite de registros
+            brutos: Se True, retorna os documentos sem montar os modelos
             
         Returns:
             List[RegistroExame]: Registros da gestante
         """
+        # Remove caracteres especiais do CPF
+        cpf_limpo = ''.join(filter(str.isdigit, cpf))
+        
+        chave = self.cache.chave("buscar_por_cpf", cpf=cpf_limpo, skip=skip, limit=limit, brutos=brutos)
+        encontrado, resultado = self.cache.obter(chave)
+        if encontrado:
+            return resultado
+        
         try:
-            # Remove caracteres especiais do CPF
-            cpf_limpo = ''.join(filter(str.isdigit, cpf))
-            
+            versao = self.cache.versao
             filtro = {"dados_gestante.patient_cpf": {"$regex": cpf_limpo}}
             
             cursor = self.collection.find(filtro).sort("data_exame", -1).skip(skip).limit(limit)
             registros = await cursor.to_list(length=limit)
+            await self._carregar_gestantes(registros)
             
             logger.info(f"🔍 Encontrados {len(registros)} registros para CPF: {cpf}")
             
-            return [RegistroExame(**registro) for registro in registros]
+            resultado = self._converter(registros, brutos)
+            self.cache.armazenar(chave, resultado, versao)
+            return resultado
             
         except Exception as e:
             logger.error(f"❌ Erro ao buscar por CPF: {e}")
             raise
     
-    async def buscar_por_id(self, registro_id: str) -> Optional[RegistroExame]:
+    async def buscar_linha_do_tempo(self, gestante_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca a linha do tempo da gestante no resumo pré-calculado
+        
+        Args:
+            gestante_id: Chave da gestante (CPF normalizado ou "ID:<patient_id>")
+            
+        Returns:
+            Optional[Dict]: Linha do tempo ou None se a gestante não tiver exames
+        """
+        try:
+            resumo = await self.resumos.find_one({"_id": gestante_id})
+            return formatar_linha_do_tempo(resumo) if resumo else None
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao buscar linha do tempo: {e}")
+            raise
+    
+    async def buscar_por_id(
+        self,
+        registro_id: str,
+        brutos: bool = False
+    ) -> Union[RegistroExame, Dict[str, Any], None]:
         """
         Busca registro por ID
         
         Args:
             registro_id: ID do registro
+            brutos: Se True, retorna o documento sem montar o modelo
             
         Returns:
             RegistroExame: Registro encontrado ou None
         """
+        if not ObjectId.is_valid(registro_id):
+            return None
+        
+        chave = self.cache.chave("buscar_por_id", registro_id=registro_id, brutos=brutos)
+        encontrado, resultado = self.cache.obter(chave)
+        if encontrado:
+            return resultado
+        
         try:
-            if not ObjectId.is_valid(registro_id):
-                return None
-                
+            versao = self.cache.versao
             registro = await self.collection.find_one({"_id": ObjectId(registro_id)})
-            
             if registro:
-                return RegistroExame(**registro)
-            return None
+                await self._carregar_gestantes([registro])
+            
+            resultado = self._converter([registro], brutos)[0] if registro else None
+            self.cache.armazenar(chave, resultado, versao)
+            return resultado
             
         except Exception as e:
             logger.error(f"❌ Erro ao buscar por ID: {e}")
@@ -165,8 +386,9 @@ class RegistroExameCRUD:
         self,
         status: str,
         skip: int = 0,
-        limit: int = 100
-    ) -> List[RegistroExame]:
+        limit: int = 100,
+        brutos: bool = False
+    ) -> Union[List[RegistroExame], List[Dict[str, Any]]]:
         """
         Busca registros por status de saúde
         
@@ -174,17 +396,27 @@ class RegistroExameCRUD:
             status: Status de saúde (Normal, Em Risco, Risco Crítico)
             skip: Quantos registros pular
             limit: Limite de registros
+            brutos: Se True, retorna os documentos sem montar os modelos
             
         Returns:
             List[RegistroExame]: Registros com o status especificado
         """
+        chave = self.cache.chave("buscar_por_status_saude", status=status, skip=skip, limit=limit, brutos=brutos)
+        encontrado, resultado = self.cache.obter(chave)
+        if encontrado:
+            return resultado
+        
         try:
+            versao = self.cache.versao
             filtro = {"saude_feto.status_saude": status}
             
             cursor = self.collection.find(filtro).sort("data_exame", -1).skip(skip).limit(limit)
             registros = await cursor.to_list(length=limit)
+            await self._carregar_gestantes(registros)
             
-            return [RegistroExame(**registro) for registro in registros]
+            resultado = self._converter(registros, brutos)
+            self.cache.armazenar(chave, resultado, versao)
+            return resultado
             
         except Exception as e:
             logger.error(f"❌ Erro ao buscar por status: {e}")
@@ -212,19 +444,62 @@ class RegistroExameCRUD:
             # Adiciona timestamp de última atualização
             dados_atualizacao["ultima_atualizacao"] = datetime.utcnow()
             
-            result = await self.collection.update_one(
+            registro = await self.collection.find_one_and_update(
                 {"_id": ObjectId(registro_id)},
-                {"$set": dados_atualizacao}
+                {"$set": dados_atualizacao},
+                return_document=ReturnDocument.AFTER
             )
+            self.cache.invalidar()
             
-            if result.modified_count > 0:
-                return await self.buscar_por_id(registro_id)
+            if registro:
+                await self._carregar_gestantes([registro])
+                return self._para_modelo(registro)
             return None
             
         except Exception as e:
             logger.error(f"❌ Erro ao atualizar registro: {e}")
             raise
     
+    async def atualizar_registros(
+        self,
+        atualizacoes: Dict[str, Dict[str, Any]]
+    ) -> int:
+        """
+        Atualiza vários registros com um único bulk_write
+        
+        Args:
+            atualizacoes: Mapeamento ID do registro -> dados para atualizar
+            
+        Returns:
+            int: Número de registros modificados
+        """
+        agora = datetime.utcnow()
+        operacoes = [
+            UpdateOne(
+                {"_id": ObjectId(registro_id)},
+                {"$set": {**dados, "ultima_atualizacao": agora}}
+            )
+            for registro_id, dados in atualizacoes.items()
+            if ObjectId.is_valid(registro_id)
+        ]
+        
+        if not operacoes:
+            return 0
+        
+        try:
+            try:
+                result = await self.collection.bulk_write(operacoes, ordered=False)
+            finally:
+                self.cache.invalidar()
+            
+            logger.info(f"✏️ {result.modified_count} registros atualizados em lote")
+            
+            return result.modified_count
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao atualizar registros em lote: {e}")
+            raise
+    
     async def deletar_registro(self, registro_id: str) -> bool:
         """
         Deleta um registro
@@ -240,6 +515,7 @@ class RegistroExameCRUD:
                 return False
             
             result = await self.collection.delete_one({"_id": ObjectId(registro_id)})
+            self.cache.invalidar()
             
             if result.deleted_count > 0:
                 logger.info(f"🗑️ Registro {registro_id} deletado com sucesso")
@@ -250,6 +526,35 @@ class RegistroExameCRUD:
             logger.error(f"❌ Erro ao deletar registro: {e}")
             raise
     
+    async def deletar_registros(self, registro_ids: List[str]) -> int:
+        """
+        Deleta vários registros com um único delete_many
+        
+        Args:
+            registro_ids: IDs dos registros
+            
+        Returns:
+            int: Número de registros deletados
+        """
+        ids = [ObjectId(registro_id) for registro_id in registro_ids if ObjectId.is_valid(registro_id)]
+        
+        if not ids:
+            return 0
+        
+        try:
+            try:
+                result = await self.collection.delete_many({"_id": {"$in": ids}})
+            finally:
+                self.cache.invalidar()
+            
+            logger.info(f"🗑️ {result.deleted_count} registros deletados em lote")
+            
+            return result.deleted_count
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao deletar registros em lote: {e}")
+            raise
+    
     async def contar_registros(self, filtro: Dict[str, Any] = None) -> int:
         """
         Conta registros no banco
@@ -1,6 +1,6 @@
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import MongoClient
+from pymongo import MongoClient, IndexModel
 import logging
 from typing import Optional
 
@@ -16,6 +16,9 @@ class MongoDB:
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "fetalcare_db")
 COLLECTION_NAME = "registros_exames"
+GESTANTES_COLLECTION_NAME = "gestantes"
+RESUMOS_COLLECTION_NAME = "resumos_gestantes"
+ROLLUPS_COLLECTION_NAME = "rollups_exames"
 
 async def connect_to_mongo():
     """Conecta ao MongoDB"""
@@ -52,28 +55,87 @@ def get_collection():
     database = get_database()
     return database[COLLECTION_NAME]
 
+def get_gestantes_collection():
+    """Retorna a collection de gestantes"""
+    database = get_database()
+    return database[GESTANTES_COLLECTION_NAME]
+
+def get_resumos_collection():
+    """Retorna a collection de resumos longitudinais por gestante"""
+    database = get_database()
+    return database[RESUMOS_COLLECTION_NAME]
+
+def get_rollups_collection():
+    """Retorna a collection de agregados por período"""
+    database = get_database()
+    return database[ROLLUPS_COLLECTION_NAME]
+
+# Índices declarados da collection de registros (criados de forma idempotente)
+INDICES = [
+    # Índice no CPF para busca rápida
+    {"keys": [("dados_gestante.patient_cpf", 1)]},
+    # Índice no ID da gestante
+    {"keys": [("dados_gestante.patient_id", 1)]},
+    # Índice na data do exame (listagem ordenada de /records)
+    {"keys": [("data_exame", 1)]},
+    # Índice composto para busca por CPF e data
+    {"keys": [("dados_gestante.patient_cpf", 1), ("data_exame", -1)]},
+    # Listagem por data com filtro de CPF parcial (regex) aplicado nas chaves do índice
+    {"keys": [("data_exame", -1), ("dados_gestante.patient_cpf", 1)]},
+    # Índice no status de saúde para relatórios
+    {"keys": [("saude_feto.status_saude", 1)]},
+    # Filtro por status ordenado por data
+    {"keys": [("saude_feto.status_saude", 1), ("data_exame", -1)]},
+    # Índice no nível de risco
+    {"keys": [("saude_feto.nivel_risco", 1)]},
+    # Histórico da gestante pela referência à collection gestantes
+    {"keys": [("gestante_id", 1), ("data_exame", -1)]},
+]
+
+# Índices da collection de gestantes (o _id é o CPF normalizado ou o patient_id)
+INDICES_GESTANTES = [
+    {"keys": [("patient_id", 1)]},
+]
+
+# Índices da collection de agregados (consultas por granularidade e intervalo)
+INDICES_ROLLUPS = [
+    {"keys": [("granularidade", 1), ("inicio", 1)]},
+]
+
+def indices_declarados(indices: list = INDICES) -> list:
+    """Retorna os índices declarados como IndexModel"""
+    return [IndexModel(indice["keys"]) for indice in indices]
+
+# Sufixo das collections temporárias usadas nas reconstruções de dados derivados
+SUFIXO_RECONSTRUCAO = "_reconstrucao"
+
+def substituir_colecao(database, temporaria: str, destino: str):
+    """
+    Troca a collection destino pela temporária já preenchida
+
+    renameCollection com dropTarget substitui o destino em uma única
+    operação, sem a janela em que ele ficaria vazio (delete_many seguido
+    da regravação). Se a temporária não existe (nada foi gravado), o
+    destino é removido.
+
+    Args:
+        database: Banco síncrono
+        temporaria: Nome da collection reconstruída
+        destino: Nome da collection lida pela API
+    """
+    if database.list_collection_names(filter={"name": temporaria}):
+        database[temporaria].rename(destino, dropTarget=True)
+    else:
+        database[destino].drop()
+
 async def criar_indices():
     """Cria índices para otimização das consultas"""
     try:
         collection = get_collection()
         
-        # Índice no CPF para busca rápida
-        await collection.create_index("dados_gestante.patient_cpf")
-        
-        # Índice no ID da gestante
-        await collection.create_index("dados_gestante.patient_id")
-        
-        # Índice na data do exame
-        await collection.create_index("data_exame")
-        
-        # Índice composto para busca por CPF e data
-        await collection.create_index([
-            ("dados_gestante.patient_cpf", 1),
-            ("data_exame", -1)
-        ])
-        
-        # Índice no status de saúde para relatórios
-        await collection.create_index("saude_feto.status_saude")
+        await collection.create_indexes(indices_declarados())
+        await get_gestantes_collection().create_indexes(indices_declarados(INDICES_GESTANTES))
+        await get_rollups_collection().create_indexes(indices_declarados(INDICES_ROLLUPS))
         
         logger.info("📈 Índices criados com sucesso")
         
@@ -0,0 +1,128 @@
+"""
+Diretório versionado de arquivos mapeados em memória
+
+Base do índice de similares (banco/similaridade.py) e do snapshot analítico
+(banco/analitico.py). O estado de cada diretório fica em um meta.json
+gravado de forma atômica. A reconstrução grava <diretorio>.novo e o troca
+pelo atual sob a trava do diretório (banco/trava.py), com um único processo
+reconstruindo por vez. Cada processo relê o meta.json (e descarta os mapas)
+quando outro processo o altera, detectado pela identidade do arquivo.
+"""
+
+import os
+import json
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterator, Optional
+
+import numpy as np
+
+from .trava import identidade_arquivo, travar_construcao, travar_diretorio
+
+META = "meta.json"
+
+
+def gravar_a_partir(caminho: str, posicao: int, dados: np.ndarray):
+    """Grava os dados a partir do byte posicao, descartando o que houver depois (anexação interrompida)"""
+    with open(caminho, "r+b" if os.path.exists(caminho) else "wb") as arquivo:
+        arquivo.seek(posicao)
+        arquivo.write(np.ascontiguousarray(dados).tobytes())
+        arquivo.truncate()
+
+
+class DiretorioVersionado:
+    """meta.json, troca atômica e ressincronização entre processos de um diretório mapeado"""
+
+    def __init__(self, diretorio: str):
+        self.diretorio = diretorio
+        self._mapas = None
+        self._identidade_meta = None
+        self._lock = threading.Lock()
+
+    def _aplicar_meta(self, meta: Dict[str, Any]):
+        """Atualiza os atributos a partir do meta.json (chamado com self._lock)"""
+        raise NotImplementedError
+
+    def _montar_meta(self) -> Dict[str, Any]:
+        """Conteúdo do meta.json a partir dos atributos"""
+        raise NotImplementedError
+
+    def carregar(self):
+        """Lê o meta.json do diretório (nada muda se ainda não foi construído)"""
+        caminho = os.path.join(self.diretorio, META)
+        identidade = identidade_arquivo(caminho)
+        if identidade is None:
+            return
+        with open(caminho, "r", encoding="utf-8") as arquivo:
+            meta = json.load(arquivo)
+        with self._lock:
+            self._aplicar_meta(meta)
+            self._identidade_meta = identidade
+            self._mapas = None
+
+    def _sincronizar(self):
+        """Recarrega o meta.json se outro processo anexou dados ou reconstruiu o diretório"""
+        if identidade_arquivo(os.path.join(self.diretorio, META)) != self._identidade_meta:
+            self.carregar()
+
+    def _salvar_meta(self, diretorio: str):
+        """Grava o meta.json de forma atômica (arquivo temporário + rename)"""
+        caminho = os.path.join(diretorio, META)
+        temporario = caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(self._montar_meta(), arquivo, ensure_ascii=False)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, caminho)
+        if diretorio == self.diretorio:
+            self._identidade_meta = identidade_arquivo(caminho)
+
+    @contextmanager
+    def _travar_anexacao(self) -> Iterator[None]:
+        """Trava o diretório e relê o meta.json antes de anexar no fim dos arquivos"""
+        with travar_diretorio(self.diretorio):
+            self._sincronizar()
+            yield
+
+    def _construir_versao(self, gravar: Callable[[str], Dict[str, Any]],
+                          complementar: Optional[Callable[[], Any]] = None) -> bool:
+        """
+        Grava uma nova versão em <diretorio>.novo e a troca pela atual
+
+        Args:
+            gravar: Recebe o diretório novo (vazio), grava os arquivos e retorna
+                os atributos do novo estado; se falhar, o diretório novo é removido
+            complementar: Chamado após a troca, ainda sob a trava do diretório
+
+        Returns:
+            bool: False se outro processo já está reconstruindo
+        """
+        with travar_construcao(self.diretorio) as obtida:
+            if not obtida:
+                return False
+            novo = self.diretorio + ".novo"
+            shutil.rmtree(novo, ignore_errors=True)
+            os.makedirs(novo)
+            try:
+                estado = gravar(novo)
+            except BaseException:
+                shutil.rmtree(novo, ignore_errors=True)
+                raise
+
+            with travar_diretorio(self.diretorio):
+                with self._lock:
+                    for nome, valor in estado.items():
+                        setattr(self, nome, valor)
+                    self._salvar_meta(novo)
+                    antigo = self.diretorio + ".antigo"
+                    shutil.rmtree(antigo, ignore_errors=True)
+                    if os.path.exists(self.diretorio):
+                        os.replace(self.diretorio, antigo)
+                    os.replace(novo, self.diretorio)
+                    shutil.rmtree(antigo, ignore_errors=True)
+                    self._identidade_meta = identidade_arquivo(os.path.join(self.diretorio, META))
+                    self._mapas = None
+                if complementar is not None:
+                    complementar()
+        return True
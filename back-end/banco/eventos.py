@@ -0,0 +1,131 @@
+"""
+Eventos de novos exames em tempo real (Server-Sent Events)
+
+Cada worker mantém um único DifusorRegistros: uma fonte (change stream do
+MongoDB quando disponível, senão o próprio caminho de inserção do processo)
+alimenta as filas limitadas de todos os clientes conectados. Cada exame
+novo gera dois eventos: "record" (o documento) e "stats" (delta das
+contagens de /records/stats).
+
+Os deltas só cobrem inserções. O arquivamento (banco.arquivamento) remove
+exames e o reprocessamento (banco.reprocessamento) muda status e nível de
+risco sem gerar eventos, então os clientes devem reler /records/stats a
+cada conexão ("ready") e periodicamente, em vez de acumular deltas
+indefinidamente.
+"""
+
+import os
+import threading
+import logging
+from typing import Dict, Any, Iterator, List, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from .sse import SSE_INTERVALO_HEARTBEAT, FilaAssinante, formatar_evento, transmitir
+
+logger = logging.getLogger(__name__)
+
+# Fonte dos eventos: auto (change stream com fallback), change_stream ou processo
+SSE_FONTE = os.getenv("SSE_FONTE", "auto")
+
+
+def delta_estatisticas(registro: Dict[str, Any]) -> Dict[str, Any]:
+    """Delta das contagens de /records/stats causado por um novo exame (só inserções)"""
+    saude = registro.get("saude_feto") or {}
+    return {
+        "total_records": 1,
+        "by_health_status": {saude.get("status_saude"): 1},
+        "by_risk_level": {saude.get("nivel_risco"): 1}
+    }
+
+
+class DifusorRegistros:
+    """
+    Difusão dos novos exames para todos os clientes SSE do worker
+
+    A fonte é iniciada uma única vez, no primeiro cliente. Com o change
+    stream ativo, publicar_insercao() é ignorado para não duplicar eventos.
+    """
+
+    def __init__(self, collection_factory=None, fonte: str = SSE_FONTE):
+        self.collection_factory = collection_factory
+        self.fonte_configurada = fonte
+        self.fonte: Optional[str] = None
+        self._assinantes: List[FilaAssinante] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.publicados = 0
+        # Eventos descartados por clientes que já desconectaram
+        self._descartados_encerrados = 0
+
+    def _iniciar_fonte(self):
+        """Escolhe a fonte e, se for change stream, inicia a thread de leitura"""
+        if self.fonte_configurada == "processo" or self.collection_factory is None:
+            self.fonte = "processo"
+            return
+        try:
+            stream = self.collection_factory().watch([{"$match": {"operationType": "insert"}}])
+        except (OperationFailure, PyMongoError) as e:
+            if self.fonte_configurada == "change_stream":
+                raise
+            logger.info(f"Change stream indisponível ({e}); usando o caminho de inserção do processo")
+            self.fonte = "processo"
+            return
+        self.fonte = "change_stream"
+        self._thread = threading.Thread(target=self._ler_change_stream, args=(stream,), daemon=True)
+        self._thread.start()
+
+    def _ler_change_stream(self, stream):
+        """Thread única por worker que repassa as inserções do change stream"""
+        try:
+            with stream:
+                for mudanca in stream:
+                    self._difundir(mudanca["fullDocument"])
+        except PyMongoError as e:
+            logger.error(f"Change stream encerrado: {e}; voltando ao caminho de inserção do processo")
+            self.fonte = "processo"
+
+    def _difundir(self, registro: Dict[str, Any]):
+        """Entrega os eventos de um exame a todos os assinantes"""
+        mensagem = formatar_evento("record", registro) + formatar_evento("stats", delta_estatisticas(registro))
+        with self._lock:
+            assinantes = list(self._assinantes)
+            self.publicados += 1
+        for assinante in assinantes:
+            assinante.entregar(mensagem)
+
+    def publicar_insercao(self, registro: Dict[str, Any]):
+        """Chamado após cada insert do processo (ignorado quando o change stream é a fonte)"""
+        if self.fonte == "processo" and self._assinantes:
+            self._difundir(registro)
+
+    def assinar(self) -> FilaAssinante:
+        """Registra um novo cliente (inicia a fonte no primeiro)"""
+        with self._lock:
+            if self.fonte is None:
+                self._iniciar_fonte()
+            assinante = FilaAssinante()
+            self._assinantes.append(assinante)
+            return assinante
+
+    def cancelar(self, assinante: FilaAssinante):
+        """Remove um cliente desconectado"""
+        with self._lock:
+            if assinante in self._assinantes:
+                self._assinantes.remove(assinante)
+                self._descartados_encerrados += assinante.descartados
+
+    def transmitir(self, assinante: FilaAssinante, intervalo_heartbeat: float = SSE_INTERVALO_HEARTBEAT) -> Iterator[str]:
+        """Gera o fluxo text/event-stream de um cliente até a desconexão"""
+        return transmitir(assinante, formatar_evento("ready", {"fonte": self.fonte}),
+                          lambda: self.cancelar(assinante), intervalo_heartbeat)
+
+    def metricas(self) -> Dict[str, Any]:
+        """Retorna as métricas da difusão"""
+        with self._lock:
+            return {
+                "fonte": self.fonte,
+                "assinantes": len(self._assinantes),
+                "publicados": self.publicados,
+                "descartados": self._descartados_encerrados + sum(a.descartados for a in self._assinantes)
+            }
@@ -0,0 +1,335 @@
+"""
+Exportação de registros de exames em CSV, NDJSON e Parquet
+
+Os registros são lidos de um cursor com batch_size ajustado e escritos em
+blocos, sem carregar a collection na memória. Os subdocumentos
+(dados_gestante, parametros_monitoramento, resultado_ml, saude_feto) são
+achatados em colunas "subdocumento.campo".
+
+No modo completo (usado pelo arquivamento), uma coluna extra guarda em
+Extended JSON tudo o que as colunas não reproduzem exatamente (campos
+fora do schema, textos longos, tipos diferentes), e recompor() devolve o
+documento original.
+
+Parquet depende do pyarrow (opcional): pip install pyarrow
+
+Uso (a partir do diretório back-end):
+    python -m banco.exportacao --formato csv --saida exames.csv --inicio 2025-07-01 --status-saude "Em Risco"
+"""
+
+import io
+import csv
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+from bson import json_util
+
+from .database import get_sync_collection
+from .gestantes import CAMPOS_RESUMO
+from .models import ParametrosMonitoramento, ResultadoML, SaudeFeto
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ("csv", "ndjson", "parquet")
+
+# Documentos por ida ao banco e linhas por bloco escrito / row group
+BATCH_SIZE = 2000
+LINHAS_POR_BLOCO = 1000
+LINHAS_POR_ROW_GROUP = 50000
+
+# Campos de texto longo que não entram na exportação
+CAMPOS_IGNORADOS_RESULTADO = ("description", "recommendations")
+
+SUBDOCUMENTOS = {
+    "dados_gestante": list(CAMPOS_RESUMO),
+    "parametros_monitoramento": list(ParametrosMonitoramento.model_fields),
+    "resultado_ml": [campo for campo in ResultadoML.model_fields if campo not in CAMPOS_IGNORADOS_RESULTADO],
+    "saude_feto": list(SaudeFeto.model_fields),
+}
+
+CAMPOS_RAIZ = ["_id", "gestante_id", "data_exame", "medico_responsavel", "observacoes"]
+
+COLUNAS = CAMPOS_RAIZ + [
+    f"{subdocumento}.{campo}"
+    for subdocumento, campos in SUBDOCUMENTOS.items()
+    for campo in campos
+]
+
+PROJECAO = {campo: 1 for campo in CAMPOS_RAIZ if campo != "_id"}
+PROJECAO.update({coluna: 1 for coluna in COLUNAS if "." in coluna})
+
+# Modo completo: restante do documento em Extended JSON canônico (preserva int/float, datas e ObjectId)
+COLUNA_RESTANTE = "documento_restante"
+CHAVE_AUSENTES = "$ausentes"
+OPCOES_JSON = json_util.CANONICAL_JSON_OPTIONS
+
+
+def montar_filtro(
+    cpf: Optional[str] = None,
+    status_saude: Optional[str] = None,
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Monta o filtro de registros (mesma semântica de /records)
+
+    Args:
+        cpf: Busca parcial no CPF
+        status_saude: Status de saúde exato
+        inicio: Data mínima do exame (inclusiva)
+        fim: Data máxima do exame (exclusiva)
+
+    Returns:
+        Dict: Filtro do MongoDB
+    """
+    filtro: Dict[str, Any] = {}
+    if cpf:
+        filtro["dados_gestante.patient_cpf"] = {"$regex": cpf, "$options": "i"}
+    if status_saude:
+        filtro["saude_feto.status_saude"] = status_saude
+    if inicio or fim:
+        filtro["data_exame"] = {}
+        if inicio:
+            filtro["data_exame"]["$gte"] = inicio
+        if fim:
+            filtro["data_exame"]["$lt"] = fim
+    return filtro
+
+
+def abrir_cursor(
+    filtro: Dict[str, Any],
+    collection=None,
+    batch_size: int = BATCH_SIZE,
+    projecao: Optional[Dict[str, int]] = PROJECAO
+):
+    """Abre o cursor de exportação (ordem cronológica; projecao=None lê o documento inteiro)"""
+    if collection is None:
+        collection = get_sync_collection()
+    return collection.find(filtro, projection=projecao).sort("data_exame", 1).batch_size(batch_size)
+
+
+def achatar(documento: Dict[str, Any]) -> Dict[str, Any]:
+    """Achata um documento de exame nas colunas de exportação"""
+    linha = {campo: documento.get(campo) for campo in CAMPOS_RAIZ}
+    linha["_id"] = str(linha["_id"]) if linha["_id"] is not None else None
+    for subdocumento, campos in SUBDOCUMENTOS.items():
+        valores = documento.get(subdocumento) or {}
+        for campo in campos:
+            linha[f"{subdocumento}.{campo}"] = valores.get(campo)
+    return linha
+
+
+def desachatar(linha: Dict[str, Any]) -> Dict[str, Any]:
+    """Recompõe o documento de exame a partir das colunas achatadas"""
+    documento: Dict[str, Any] = {}
+    for coluna, valor in linha.items():
+        if "." in coluna:
+            subdocumento, campo = coluna.split(".", 1)
+            documento.setdefault(subdocumento, {})[campo] = valor
+        else:
+            documento[coluna] = valor
+    return documento
+
+
+def _diferenca(original: Dict[str, Any], recomposto: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos do original que o recomposto não reproduz exatamente (mesmo valor e tipo)"""
+    diferenca: Dict[str, Any] = {}
+    for campo, valor in original.items():
+        atual = recomposto.get(campo)
+        if isinstance(valor, dict) and isinstance(atual, dict):
+            subdiferenca = _diferenca(valor, atual)
+            if subdiferenca:
+                diferenca[campo] = subdiferenca
+        elif campo not in recomposto or type(valor) is not type(atual) or valor != atual:
+            diferenca[campo] = valor
+    # Colunas sem o campo correspondente no original (voltam como None)
+    ausentes = [campo for campo in recomposto if campo not in original]
+    if ausentes:
+        diferenca[CHAVE_AUSENTES] = ausentes
+    return diferenca
+
+
+def _mesclar(documento: Dict[str, Any], restante: Dict[str, Any]):
+    """Aplica o restante de _diferenca sobre o documento recomposto (in-place)"""
+    for campo, valor in restante.items():
+        if campo == CHAVE_AUSENTES:
+            for ausente in valor:
+                documento.pop(ausente, None)
+        elif isinstance(valor, dict) and isinstance(documento.get(campo), dict):
+            _mesclar(documento[campo], valor)
+        else:
+            documento[campo] = valor
+
+
+def recompor(linha: Dict[str, Any]) -> Dict[str, Any]:
+    """Recompõe o documento original de uma linha do modo completo (ou só as colunas, sem restante)"""
+    linha = dict(linha)
+    restante = linha.pop(COLUNA_RESTANTE, None)
+    documento = desachatar(linha)
+    if restante:
+        _mesclar(documento, json_util.loads(restante, json_options=OPCOES_JSON))
+    return documento
+
+
+def gerar_csv(documentos: Iterable[Dict[str, Any]], linhas_por_bloco: int = LINHAS_POR_BLOCO) -> Iterator[str]:
+    """Gera o CSV em blocos de texto (cabeçalho no primeiro bloco)"""
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=COLUNAS)
+    escritor.writeheader()
+    linhas = 0
+    for documento in documentos:
+        linha = achatar(documento)
+        if isinstance(linha["data_exame"], datetime):
+            linha["data_exame"] = linha["data_exame"].isoformat()
+        escritor.writerow(linha)
+        linhas += 1
+        if linhas % linhas_por_bloco == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def gerar_ndjson(documentos: Iterable[Dict[str, Any]], linhas_por_bloco: int = LINHAS_POR_BLOCO) -> Iterator[str]:
+    """Gera NDJSON (um objeto achatado por linha) em blocos de texto"""
+    bloco: List[str] = []
+    for documento in documentos:
+        bloco.append(json.dumps(achatar(documento), ensure_ascii=False, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v)))
+        if len(bloco) >= linhas_por_bloco:
+            yield "\n".join(bloco) + "\n"
+            bloco = []
+    if bloco:
+        yield "\n".join(bloco) + "\n"
+
+
+def schema_parquet(completo: bool = False):
+    """Schema Arrow das colunas exportadas (derivado dos modelos), com o restante no modo completo"""
+    tipos = {float: pa.float64(), int: pa.int64()}
+    campos = [
+        pa.field("_id", pa.string()),
+        pa.field("gestante_id", pa.string()),
+        pa.field("data_exame", pa.timestamp("ms")),
+        pa.field("medico_responsavel", pa.string()),
+        pa.field("observacoes", pa.string()),
+    ]
+    modelos = {"parametros_monitoramento": ParametrosMonitoramento, "resultado_ml": ResultadoML, "saude_feto": SaudeFeto}
+    for subdocumento, campos_sub in SUBDOCUMENTOS.items():
+        for campo in campos_sub:
+            if subdocumento == "dados_gestante":
+                tipo = pa.int64() if campo in ("gestational_age", "patient_age") else pa.string()
+            else:
+                tipo = tipos.get(modelos[subdocumento].model_fields[campo].annotation, pa.string())
+            campos.append(pa.field(f"{subdocumento}.{campo}", tipo))
+    if completo:
+        campos.append(pa.field(COLUNA_RESTANTE, pa.string()))
+    return pa.schema(campos)
+
+
+def _converter_coluna(valores: List[Any], tipo) -> List[Any]:
+    """Normaliza os valores de uma coluna para o tipo Arrow (ex: 1.0 -> 1 em colunas int)"""
+    if pa.types.is_integer(tipo):
+        return [int(v) if v is not None else None for v in valores]
+    if pa.types.is_floating(tipo):
+        return [float(v) if v is not None else None for v in valores]
+    if pa.types.is_string(tipo):
+        return [str(v) if v is not None else None for v in valores]
+    return valores
+
+
+def escrever_parquet(
+    documentos: Iterable[Dict[str, Any]],
+    destino,
+    linhas_por_row_group: int = LINHAS_POR_ROW_GROUP,
+    completo: bool = False
+) -> int:
+    """
+    Escreve os documentos em Parquet, um row group a cada N linhas
+
+    Args:
+        documentos: Documentos de exame (ex: cursor)
+        destino: Caminho ou arquivo binário
+        linhas_por_row_group: Linhas mantidas em memória por row group
+        completo: Guardar também o restante de cada documento (recompor() o devolve inteiro)
+
+    Returns:
+        int: Número de linhas escritas
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Exportação Parquet requer o pacote pyarrow (pip install pyarrow)")
+
+    schema = schema_parquet(completo)
+    tipos = {campo.name: campo.type for campo in schema}
+    total = 0
+    with pq.ParquetWriter(destino, schema, compression="zstd") as escritor:
+        colunas: Dict[str, List[Any]] = {campo.name: [] for campo in schema}
+
+        def gravar_row_group():
+            arrays = [pa.array(_converter_coluna(colunas[f.name], f.type), type=f.type) for f in schema]
+            escritor.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            for valores in colunas.values():
+                valores.clear()
+
+        linhas = 0
+        for documento in documentos:
+            linha = achatar(documento)
+            for coluna, valor in linha.items():
+                colunas[coluna].append(valor)
+            if completo:
+                # Compara com o que as colunas devolvem depois da conversão para o tipo Arrow
+                convertida = {coluna: _converter_coluna([valor], tipos[coluna])[0] for coluna, valor in linha.items()}
+                restante = _diferenca(documento, desachatar(convertida))
+                colunas[COLUNA_RESTANTE].append(json_util.dumps(restante, json_options=OPCOES_JSON) if restante else None)
+            linhas += 1
+            if linhas == linhas_por_row_group:
+                gravar_row_group()
+                total += linhas
+                linhas = 0
+        if linhas:
+            gravar_row_group()
+            total += linhas
+    return total
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="📤 Exportação de registros de exames - Sistema FetalCare")
+    parser.add_argument('--formato', choices=FORMATOS, default='csv', help='Formato de saída (padrão: csv)')
+    parser.add_argument('--saida', required=True, help='Arquivo de saída')
+    parser.add_argument('--cpf', help='Filtro por CPF (busca parcial)')
+    parser.add_argument('--status-saude', help='Filtro por status de saúde')
+    parser.add_argument('--inicio', type=datetime.fromisoformat, help='Data inicial (ISO 8601, inclusiva)')
+    parser.add_argument('--fim', type=datetime.fromisoformat, help='Data final (ISO 8601, exclusiva)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f'Documentos por lote do cursor (padrão: {BATCH_SIZE})')
+    args = parser.parse_args()
+
+    filtro = montar_filtro(args.cpf, args.status_saude, args.inicio, args.fim)
+    cursor = abrir_cursor(filtro, batch_size=args.batch_size)
+    try:
+        if args.formato == "parquet":
+            linhas = escrever_parquet(cursor, args.saida)
+        else:
+            gerador = gerar_csv(cursor) if args.formato == "csv" else gerar_ndjson(cursor)
+            with open(args.saida, "w", encoding="utf-8", newline="") as arquivo:
+                for bloco in gerador:
+                    arquivo.write(bloco)
+            linhas = cursor.retrieved
+    finally:
+        cursor.close()
+
+    print(f"✅ Exportação concluída: {args.saida} ({linhas} registros)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Collection normalizada de gestantes
+
+Cada exame guarda apenas a referência gestante_id e um resumo dos dados
+da gestante usado nas listagens; o cadastro completo (endereço, telefone,
+convênio, contato de emergência...) fica uma única vez em "gestantes".
+
+Uso da migração (a partir do diretório back-end):
+    python -m banco.gestantes --tamanho-lote 1000
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from .cache import sinalizar_escrita
+from .database import get_sync_database, COLLECTION_NAME, GESTANTES_COLLECTION_NAME
+from .models import DadosGestante
+
+logger = logging.getLogger(__name__)
+
+# Campos mantidos em cada exame (exibidos nas listagens e usados nos filtros)
+CAMPOS_RESUMO = ("patient_id", "patient_name", "patient_cpf", "gestational_age", "patient_age")
+
+# Campos do cadastro que vivem apenas na collection de gestantes
+CAMPOS_PERFIL = tuple(campo for campo in DadosGestante.model_fields if campo not in CAMPOS_RESUMO)
+
+CPF_NAO_INFORMADO = "00000000000"
+
+
+def normalizar_cpf(cpf: Optional[str]) -> str:
+    """Remove caracteres não numéricos do CPF"""
+    return ''.join(filter(str.isdigit, str(cpf or '')))
+
+
+def chave_gestante(dados_gestante: Dict[str, Any]) -> Optional[str]:
+    """
+    Determina o _id da gestante
+
+    Usa o CPF normalizado; quando o CPF não foi informado, usa o patient_id.
+
+    Args:
+        dados_gestante: Dados da gestante do exame
+
+    Returns:
+        Optional[str]: Chave da gestante, ou None se não houver CPF nem patient_id
+    """
+    cpf = normalizar_cpf(dados_gestante.get("patient_cpf"))
+    if cpf and cpf != CPF_NAO_INFORMADO:
+        return cpf
+    patient_id = str(dados_gestante.get("patient_id") or "").strip()
+    return f"ID:{patient_id}" if patient_id else None
+
+
+def separar_dados_gestante(dados_gestante: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Separa os dados da gestante em resumo (no exame) e perfil (na collection gestantes)
+
+    Returns:
+        Tuple[Dict, Dict]: (resumo, perfil com os campos preenchidos)
+    """
+    resumo = {campo: dados_gestante[campo] for campo in CAMPOS_RESUMO if campo in dados_gestante}
+    perfil = {
+        campo: dados_gestante[campo]
+        for campo in CAMPOS_PERFIL
+        if dados_gestante.get(campo) is not None
+    }
+    return resumo, perfil
+
+
+def operacao_upsert_gestante(chave: str, dados_gestante: Dict[str, Any], perfil: Dict[str, Any]) -> UpdateOne:
+    """Monta o upsert do cadastro da gestante"""
+    return UpdateOne(
+        {"_id": chave},
+        {
+            "$set": {
+                "patient_id": dados_gestante.get("patient_id"),
+                "patient_name": dados_gestante.get("patient_name"),
+                "patient_cpf": dados_gestante.get("patient_cpf"),
+                **perfil,
+                "atualizado_em": datetime.utcnow()
+            },
+            "$setOnInsert": {"criado_em": datetime.utcnow()}
+        },
+        upsert=True
+    )
+
+
+def mesclar_perfis(registros: Iterable[Dict[str, Any]], perfis: Dict[str, Dict[str, Any]]):
+    """
+    Recompõe dados_gestante completo nos documentos de exame (in-place)
+
+    Os valores do resumo do exame prevalecem sobre o cadastro.
+    """
+    for registro in registros:
+        perfil = perfis.get(registro.get("gestante_id"))
+        if perfil:
+            registro["dados_gestante"] = {
+                **{campo: perfil[campo] for campo in CAMPOS_PERFIL if campo in perfil},
+                **registro.get("dados_gestante", {})
+            }
+
+
+class MigradorGestantes:
+    """Migração em lotes dos exames com dados_gestante completo embutido"""
+
+    def __init__(self, database=None, tamanho_lote: int = 1000):
+        self.database = database if database is not None else get_sync_database()
+        self.exames = self.database[COLLECTION_NAME]
+        self.gestantes = self.database[GESTANTES_COLLECTION_NAME]
+        self.tamanho_lote = tamanho_lote
+        self.sem_chave = 0
+
+    def migrar_lote(self, documentos: List[Dict[str, Any]]) -> int:
+        """
+        Migra um lote: um bulk_write em gestantes e um em registros_exames
+
+        Como no CRUD, o cadastro só é gravado quando há dados além do resumo.
+        Exames sem CPF nem patient_id não têm chave e ficam como estão.
+
+        Returns:
+            int: Número de exames migrados
+        """
+        upserts = {}
+        atualizacoes = []
+        for documento in documentos:
+            dados = documento.get("dados_gestante") or {}
+            chave = chave_gestante(dados)
+            if chave is None:
+                self.sem_chave += 1
+                logger.warning(f"⚠️ Exame {documento['_id']} sem CPF nem patient_id: não migrado")
+                continue
+            resumo, perfil = separar_dados_gestante(dados)
+            if perfil:
+                # Exames mais recentes (maior _id) sobrescrevem o cadastro
+                upserts[chave] = operacao_upsert_gestante(chave, dados, perfil)
+            atualizacoes.append(UpdateOne(
+                {"_id": documento["_id"]},
+                {"$set": {"gestante_id": chave, "dados_gestante": resumo}}
+            ))
+
+        if not atualizacoes:
+            return 0
+
+        # O cadastro é gravado antes de remover os campos dos exames
+        if upserts:
+            self.gestantes.bulk_write(list(upserts.values()), ordered=False)
+        result = self.exames.bulk_write(atualizacoes, ordered=False)
+        sinalizar_escrita()
+        return result.modified_count
+
+    def executar(self) -> Dict[str, Any]:
+        """
+        Migra todos os exames ainda sem gestante_id (retomável por natureza)
+
+        Returns:
+            Dict: Resumo da migração
+        """
+        cursor = self.exames.find(
+            {"gestante_id": {"$exists": False}},
+            projection={"dados_gestante": 1}
+        ).sort("_id", 1).batch_size(self.tamanho_lote)
+
+        migrados = 0
+        lote: List[Dict[str, Any]] = []
+        try:
+            for documento in cursor:
+                lote.append(documento)
+                if len(lote) >= self.tamanho_lote:
+                    migrados += self.migrar_lote(lote)
+                    lote = []
+            if lote:
+                migrados += self.migrar_lote(lote)
+        finally:
+            cursor.close()
+
+        total_gestantes = self.gestantes.estimated_document_count()
+        logger.info(f"✅ Migração: {migrados} exames migrados, {total_gestantes} gestantes cadastradas, "
+                    f"{self.sem_chave} exames sem chave")
+
+        return {"exames_migrados": migrados, "exames_sem_chave": self.sem_chave, "gestantes": total_gestantes}
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="👩 Migração para a collection de gestantes - Sistema FetalCare")
+    parser.add_argument('--tamanho-lote', type=int, default=1000,
+                        help='Exames por lote de migração (padrão: 1000)')
+    args = parser.parse_args()
+
+    print(MigradorGestantes(tamanho_lote=args.tamanho_lote).executar())
+
+
+if __name__ == "__main__":
+    main()
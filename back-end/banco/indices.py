@@ -0,0 +1,208 @@
+"""
+Gerenciamento de índices e verificação de planos de consulta
+
+Cria de forma idempotente os índices declarados em database.INDICES
+(usado no startup dos apps Flask e no deploy) e roda explain() em cada
+formato de consulta emitido pela API, falhando se algum plano usar
+COLLSCAN ou ordenação em memória (SORT).
+
+Um IXSCAN pode percorrer o índice inteiro: é o caso das buscas de CPF
+parcial ($regex sem âncora e sem distinção de maiúsculas), cujos limites
+cobrem todas as strings. Esses planos não falham a verificação, mas são
+apontados como alerta quando um campo filtrado tem limites abertos.
+
+Uso (a partir do diretório back-end):
+    python -m banco.indices               # cria os índices
+    python -m banco.indices --verificar   # cria e verifica os planos
+"""
+
+import sys
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Set
+
+from bson import ObjectId
+
+from .database import (
+    get_sync_database,
+    COLLECTION_NAME,
+    GESTANTES_COLLECTION_NAME,
+    INDICES_GESTANTES,
+    ROLLUPS_COLLECTION_NAME,
+    INDICES_ROLLUPS,
+    indices_declarados
+)
+
+logger = logging.getLogger(__name__)
+
+ORDENACAO_DATA = [("data_exame", -1)]
+
+# Formatos de consulta emitidos pela API (valores são apenas exemplos)
+CONSULTAS_API: List[Dict[str, Any]] = [
+    {"nome": "/records sem filtro", "filtro": {}, "sort": ORDENACAO_DATA, "limit": 10},
+    {"nome": "/records por status", "filtro": {"saude_feto.status_saude": "Normal"},
+     "sort": ORDENACAO_DATA, "limit": 10},
+    {"nome": "/records por CPF parcial", "filtro": {"dados_gestante.patient_cpf": {"$regex": "123", "$options": "i"}},
+     "sort": ORDENACAO_DATA, "limit": 10},
+    {"nome": "/records por CPF e status", "filtro": {
+        "dados_gestante.patient_cpf": {"$regex": "123", "$options": "i"},
+        "saude_feto.status_saude": "Em Risco"
+    }, "sort": ORDENACAO_DATA, "limit": 10},
+    {"nome": "/records por intervalo de datas", "filtro": {"data_exame": {"$gte": datetime(2025, 1, 1)}},
+     "sort": ORDENACAO_DATA, "limit": 10},
+    {"nome": "total /records por status", "filtro": {"saude_feto.status_saude": "Normal"}, "contagem": True},
+    {"nome": "crud.buscar_por_id", "filtro": {"_id": ObjectId()}},
+    {"nome": "crud.buscar_por_cpf", "filtro": {"dados_gestante.patient_cpf": {"$regex": "12345678901"}},
+     "sort": ORDENACAO_DATA, "limit": 100},
+    {"nome": "crud.buscar_por_status_saude", "filtro": {"saude_feto.status_saude": "Risco Crítico"},
+     "sort": ORDENACAO_DATA, "limit": 100},
+    {"nome": "histórico por gestante_id", "filtro": {"gestante_id": "12345678901"},
+     "sort": ORDENACAO_DATA, "limit": 100},
+    {"nome": "contagem por nível de risco", "filtro": {"saude_feto.nivel_risco": "CRÍTICO"}, "contagem": True},
+]
+
+ESTAGIOS_PROIBIDOS = {"COLLSCAN", "SORT"}
+
+# Limites de IXSCAN que cobrem o campo inteiro (todos os valores ou todas as strings)
+LIMITES_ABERTOS = {"[MinKey, MaxKey]", "[MaxKey, MinKey]", '["", {})', '({}, ""]'}
+
+
+def garantir_indices(database=None) -> List[str]:
+    """
+    Cria os índices declarados (operação idempotente)
+
+    Args:
+        database: Banco síncrono (padrão: get_sync_database())
+
+    Returns:
+        List[str]: Nomes dos índices garantidos
+    """
+    if database is None:
+        database = get_sync_database()
+    nomes = database[COLLECTION_NAME].create_indexes(indices_declarados())
+    nomes += database[GESTANTES_COLLECTION_NAME].create_indexes(indices_declarados(INDICES_GESTANTES))
+    nomes += database[ROLLUPS_COLLECTION_NAME].create_indexes(indices_declarados(INDICES_ROLLUPS))
+    logger.info(f"📈 Índices garantidos: {', '.join(nomes)}")
+    return nomes
+
+
+def coletar_estagios(plano: Any, estagios: Optional[Set[str]] = None) -> Set[str]:
+    """Percorre um plano de explain() e coleta os nomes dos estágios"""
+    if estagios is None:
+        estagios = set()
+    if isinstance(plano, dict):
+        if isinstance(plano.get("stage"), str):
+            estagios.add(plano["stage"])
+        for valor in plano.values():
+            coletar_estagios(valor, estagios)
+    elif isinstance(plano, list):
+        for item in plano:
+            coletar_estagios(item, estagios)
+    return estagios
+
+
+def coletar_ixscans(plano: Any, ixscans: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Percorre um plano de explain() e coleta os estágios IXSCAN"""
+    if ixscans is None:
+        ixscans = []
+    if isinstance(plano, dict):
+        if plano.get("stage") == "IXSCAN":
+            ixscans.append(plano)
+        for valor in plano.values():
+            coletar_ixscans(valor, ixscans)
+    elif isinstance(plano, list):
+        for item in plano:
+            coletar_ixscans(item, ixscans)
+    return ixscans
+
+
+def campos_sem_limites(plano: Any, filtro: Dict[str, Any]) -> List[str]:
+    """
+    Campos do filtro cujo IXSCAN percorre todos os valores do índice
+
+    Args:
+        plano: winningPlan do explain()
+        filtro: Filtro da consulta (só os campos filtrados contam; campos
+            usados apenas na ordenação têm limites abertos de propósito)
+
+    Returns:
+        List[str]: Campos com limites abertos, ordenados
+    """
+    abertos = set()
+    for ixscan in coletar_ixscans(plano):
+        for campo, limites in (ixscan.get("indexBounds") or {}).items():
+            if campo in filtro and LIMITES_ABERTOS.intersection(limites):
+                abertos.add(campo)
+    return sorted(abertos)
+
+
+def explicar_consulta(database, consulta: Dict[str, Any]) -> Dict[str, Any]:
+    """Executa explain (queryPlanner) de um formato de consulta"""
+    if consulta.get("contagem"):
+        comando = {"count": COLLECTION_NAME, "query": consulta["filtro"]}
+    else:
+        comando = {"find": COLLECTION_NAME, "filter": consulta["filtro"]}
+        if consulta.get("sort"):
+            comando["sort"] = dict(consulta["sort"])
+        if consulta.get("limit"):
+            comando["limit"] = consulta["limit"]
+    return database.command("explain", comando, verbosity="queryPlanner")
+
+
+def verificar_planos(database=None, consultas: List[Dict[str, Any]] = CONSULTAS_API) -> List[Dict[str, Any]]:
+    """
+    Verifica o plano vencedor de cada formato de consulta da API
+
+    Returns:
+        List[Dict]: nome, estágios, ok, problemas (COLLSCAN/SORT) e alertas
+            (campos filtrados com IXSCAN sem limites) de cada consulta
+    """
+    if database is None:
+        database = get_sync_database()
+
+    resultados = []
+    for consulta in consultas:
+        explain = explicar_consulta(database, consulta)
+        plano = explain.get("queryPlanner", {}).get("winningPlan", {})
+        estagios = coletar_estagios(plano)
+        problemas = sorted(estagios & ESTAGIOS_PROIBIDOS)
+        resultados.append({
+            "nome": consulta["nome"],
+            "estagios": sorted(estagios),
+            "ok": not problemas,
+            "problemas": problemas,
+            "alertas": [f"IXSCAN sem limites em {campo}" for campo in campos_sem_limites(plano, consulta["filtro"])]
+        })
+    return resultados
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="📈 Índices e planos de consulta - Sistema FetalCare")
+    parser.add_argument('--verificar', action='store_true',
+                        help='Verifica os planos das consultas da API após criar os índices')
+    args = parser.parse_args()
+
+    database = get_sync_database()
+    garantir_indices(database)
+
+    if not args.verificar:
+        return 0
+
+    falhas = 0
+    for resultado in verificar_planos(database):
+        if resultado["ok"] and resultado["alertas"]:
+            print(f"⚠️ {resultado['nome']}: {', '.join(resultado['alertas'])} ({', '.join(resultado['estagios'])})")
+        elif resultado["ok"]:
+            print(f"✅ {resultado['nome']}: {', '.join(resultado['estagios'])}")
+        else:
+            falhas += 1
+            print(f"❌ {resultado['nome']}: {', '.join(resultado['problemas'])} ({', '.join(resultado['estagios'])})")
+
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
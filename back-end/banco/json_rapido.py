@@ -0,0 +1,183 @@
+"""
+Codec JSON das APIs Flask (orjson quando disponível)
+
+instalar_codec(app) troca o provedor JSON do Flask: request.get_json() e
+jsonify() passam a usar o codec escolhido em JSON_CODEC. ObjectId, datetime
+e escalares/arrays NumPy são serializados diretamente, sem laços de
+conversão nas rotas. Os dois codecs geram o mesmo formato:
+
+    ObjectId            -> "665f1c..." (hex)
+    datetime sem fuso   -> "2024-01-01T12:00:00Z" (o banco grava UTC)
+    np.float32/np.int64 -> número; np.ndarray -> lista
+
+Payloads constantes (cenários de teste, status e recomendações por classe)
+são serializados uma única vez com FragmentoJSON (com o codec orjson, os
+valores viram orjson.Fragment, disponível a partir do orjson 3.9).
+"""
+
+import os
+import json
+import logging
+from datetime import date, datetime
+from typing import Any
+
+import numpy as np
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# orjson.Fragment embute JSON já serializado em um dumps (orjson >= 3.9)
+ORJSON_FRAGMENT = ORJSON_AVAILABLE and hasattr(orjson, "Fragment")
+
+try:
+    from bson import ObjectId
+except ImportError:
+    ObjectId = None
+
+logger = logging.getLogger(__name__)
+
+# Codec das respostas e requisições: orjson (padrão, com fallback) ou json
+JSON_CODEC = os.getenv("JSON_CODEC", "orjson")
+
+
+def formatar_datetime(valor: datetime) -> str:
+    """ISO 8601 com "Z" para UTC (datetime sem fuso é tratado como UTC)"""
+    if valor.tzinfo is not None and valor.utcoffset():
+        return valor.isoformat()
+    return valor.replace(tzinfo=None).isoformat() + "Z"
+
+
+def valor_padrao(valor: Any) -> Any:
+    """Conversão dos tipos que o JSON não conhece (default dos codecs)"""
+    if ObjectId is not None and isinstance(valor, ObjectId):
+        return str(valor)
+    if isinstance(valor, datetime):
+        return formatar_datetime(valor)
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    raise TypeError(f"Tipo não serializável em JSON: {type(valor).__name__}")
+
+
+class CodecPadrao:
+    """Codec da biblioteca padrão (json)"""
+
+    nome = "json"
+
+    @staticmethod
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=valor_padrao).encode("utf-8")
+
+    @staticmethod
+    def loads(dados: Any) -> Any:
+        return json.loads(dados)
+
+
+class CodecOrjson:
+    """Codec orjson (datetime e NumPy nativos; default só para ObjectId e afins)"""
+
+    nome = "orjson"
+
+    def __init__(self):
+        self.opcoes = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+                       | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=valor_padrao, option=self.opcoes)
+
+    @staticmethod
+    def loads(dados: Any) -> Any:
+        return orjson.loads(dados)
+
+
+def criar_codec(nome: str = JSON_CODEC):
+    """
+    Cria o codec pelo nome
+
+    Args:
+        nome: "orjson" ou "json"
+
+    Returns:
+        CodecOrjson ou CodecPadrao (fallback quando o orjson não está instalado)
+    """
+    if nome == "orjson":
+        if ORJSON_AVAILABLE:
+            return CodecOrjson()
+        logger.warning("⚠️ orjson não instalado - usando o codec json da biblioteca padrão")
+    elif nome != "json":
+        raise ValueError(f"Codec JSON desconhecido: {nome}")
+    return CodecPadrao()
+
+
+class ProvedorJSON(JSONProvider):
+    """Provedor JSON do Flask delegando ao codec"""
+
+    mimetype = "application/json"
+
+    def __init__(self, app, codec):
+        super().__init__(app)
+        self.codec = codec
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self.codec.dumps(obj).decode("utf-8")
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return self.codec.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        corpo = self.codec.dumps(self._prepare_response_obj(args, kwargs))
+        return self._app.response_class(corpo, mimetype=self.mimetype)
+
+
+class FragmentoJSON:
+    """
+    Objeto JSON constante serializado uma única vez, opcionalmente estendido com campos dinâmicos
+
+    Com o codec orjson e orjson.Fragment disponível, cada valor do objeto é
+    guardado como Fragment e com() serializa só as chaves e os campos
+    dinâmicos; caso contrário, os campos são emendados no corpo em bytes.
+    """
+
+    def __init__(self, codec, obj: dict):
+        self.codec = codec
+        self.corpo = codec.dumps(obj)
+        self._vazio = not obj
+        self._valores = None
+        if ORJSON_FRAGMENT and isinstance(codec, CodecOrjson):
+            self._valores = {chave: orjson.Fragment(codec.dumps(valor)) for chave, valor in obj.items()}
+
+    def com(self, **campos: Any) -> bytes:
+        """Corpo com campos adicionais (as chaves não podem repetir as do fragmento)"""
+        if not campos:
+            return self.corpo
+        if self._valores is not None:
+            return self.codec.dumps({**self._valores, **campos})
+        extra = self.codec.dumps(campos)
+        if self._vazio:
+            return extra
+        return self.corpo[:-1] + b"," + extra[1:]
+
+
+def instalar_codec(app, nome: str = JSON_CODEC):
+    """
+    Instala o codec como provedor JSON do app Flask
+
+    Returns:
+        Codec instalado
+    """
+    codec = criar_codec(nome)
+    app.json = ProvedorJSON(app, codec)
+    logger.info(f"Codec JSON: {codec.nome}")
+    return codec
+
+
+def resposta_json(app, corpo: bytes, status: int = 200):
+    """Resposta com um corpo JSON já serializado"""
+    return app.response_class(corpo, status=status, mimetype=ProvedorJSON.mimetype)
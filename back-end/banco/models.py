@@ -1,8 +1,11 @@
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from bson import ObjectId
 
+# Regra de status de saúde definida junto do modelo ML (reexportada aqui)
+from modelo.preditor import determinar_status_saude
+
 class DadosGestante(BaseModel):
     """Dados básicos da gestante"""
     model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -58,6 +61,7 @@ class ResultadoML(BaseModel):
     status: str = Field(..., description="Status retornado pelo modelo")
     description: str = Field(..., description="Descrição do resultado")
     recommendations: list = Field(default_factory=list, description="Recomendações médicas")
+    versao_modelo: Optional[str] = Field(None, description="Versão do modelo que gerou o resultado")
 
 class SaudeFeto(BaseModel):
     """Status da saúde do feto baseado na confidence"""
@@ -103,22 +107,33 @@ class RegistroExameCreate(BaseModel):
     medico_responsavel: Optional[str] = None
     observacoes: Optional[str] = None
 
-def determinar_status_saude(confidence: float) -> tuple[str, str]:
+# Serializadores pré-compilados para respostas em lista
+REGISTROS_ADAPTER = TypeAdapter(List[RegistroExame])
+DOCUMENTOS_ADAPTER = TypeAdapter(List[Dict[str, Any]])
+
+def serializar_registros(registros: List[RegistroExame]) -> bytes:
+    """
+    Serializa uma lista de registros para JSON em uma única chamada
+    
+    Args:
+        registros: Registros a serializar
+        
+    Returns:
+        bytes: JSON com o ID no campo "_id", como no banco
+    """
+    return REGISTROS_ADAPTER.dump_json(registros, by_alias=True)
+
+def serializar_documentos(documentos: List[Dict[str, Any]]) -> bytes:
     """
-    Determina o status de saúde baseado na confidence do modelo ML
+    Serializa documentos brutos do banco para JSON sem montar os modelos
     
     Args:
-        confidence: Valor da confiança (0-100)
+        documentos: Documentos lidos do MongoDB (ObjectId é convertido para string)
         
     Returns:
-        tuple: (status_saude, nivel_risco)
+        bytes: JSON da lista de documentos
     """
-    if confidence <= 55:
-        return "Risco Crítico", "CRÍTICO"
-    elif 56 <= confidence <= 65:
-        return "Em Risco", "MODERADO"  
-    else:  # >= 66
-        return "Normal", "BAIXO"
+    return DOCUMENTOS_ADAPTER.dump_json(documentos, fallback=str)
 
 def criar_saude_feto(confidence: float) -> SaudeFeto:
     """
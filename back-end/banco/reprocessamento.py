@@ -0,0 +1,287 @@
+"""
+Reprocessamento de registros históricos quando o modelo ML muda
+
+Percorre registros_exames em ordem de _id, pontua os parâmetros de
+monitoramento em lotes vetorizados e regrava resultado_ml/saude_feto
+via bulk_write, guardando a versão anterior e a nova do modelo.
+O progresso é salvo por _id, permitindo retomar o job de onde parou.
+
+Os resumos por gestante e os rollups por período derivam de saude_feto e
+não são corrigidos exame a exame; ao concluir, o job os reconstrói
+(banco.resumo_gestante e banco.rollups), a menos que --sem-derivados seja
+usado, caso em que os scripts de reconstrução devem ser rodados à parte.
+
+Uso (a partir do diretório back-end):
+    python -m banco.reprocessamento --ops-por-segundo 2000
+"""
+
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from pymongo import UpdateOne
+
+from .cache import sinalizar_escrita
+from .database import get_sync_database, COLLECTION_NAME
+from .resumo_gestante import reconstruir_resumos
+from .rollups import reconstruir_rollups
+from modelo.preditor import (
+    MODEL_PATH,
+    carregar_modelo,
+    calcular_versao_modelo,
+    determinar_status_saude,
+    montar_matriz,
+    pontuar_lote
+)
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_COLLECTION = "reprocessamento_checkpoints"
+
+
+class LimitadorTaxa:
+    """Limita a vazão de operações por segundo para proteger o tráfego de produção"""
+
+    def __init__(self, ops_por_segundo: Optional[float]):
+        self.ops_por_segundo = ops_por_segundo
+        self._proximo_instante = time.monotonic()
+
+    def aguardar(self, operacoes: int) -> float:
+        """
+        Reserva capacidade para um número de operações, dormindo se necessário
+
+        Args:
+            operacoes: Número de operações que serão executadas
+
+        Returns:
+            float: Tempo dormido em segundos
+        """
+        if not self.ops_por_segundo or self.ops_por_segundo <= 0:
+            return 0.0
+
+        agora = time.monotonic()
+        inicio = max(self._proximo_instante, agora)
+        self._proximo_instante = inicio + operacoes / self.ops_por_segundo
+
+        espera = inicio - agora
+        if espera > 0:
+            time.sleep(espera)
+        return max(espera, 0.0)
+
+
+class ReprocessadorRegistros:
+    """Job resumível de re-pontuação dos registros de exames"""
+
+    def __init__(
+        self,
+        model,
+        versao_modelo: str,
+        database=None,
+        nome_job: str = "reprocessamento",
+        batch_size: int = 5000,
+        tamanho_lote: int = 1000,
+        ops_por_segundo: Optional[float] = 2000,
+        atualizar_derivados: bool = True
+    ):
+        self.model = model
+        self.versao_modelo = versao_modelo
+        self.database = database if database is not None else get_sync_database()
+        self.collection = self.database[COLLECTION_NAME]
+        self.checkpoints = self.database[CHECKPOINT_COLLECTION]
+        self.nome_job = nome_job
+        self.batch_size = batch_size
+        self.tamanho_lote = tamanho_lote
+        self.limitador = LimitadorTaxa(ops_por_segundo)
+        self.atualizar_derivados = atualizar_derivados
+
+    def carregar_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Retorna o checkpoint do job se ele pertence à versão atual do modelo"""
+        checkpoint = self.checkpoints.find_one({"_id": self.nome_job})
+        if checkpoint and checkpoint.get("versao_modelo") == self.versao_modelo:
+            return checkpoint
+        return None
+
+    def salvar_checkpoint(self, ultimo_id, processados: int, concluido: bool = False):
+        """Grava o último _id processado"""
+        self.checkpoints.update_one(
+            {"_id": self.nome_job},
+            {"$set": {
+                "ultimo_id": ultimo_id,
+                "versao_modelo": self.versao_modelo,
+                "processados": processados,
+                "concluido": concluido,
+                "atualizado_em": datetime.utcnow()
+            }},
+            upsert=True
+        )
+
+    def montar_atualizacoes(self, documentos: List[Dict[str, Any]]) -> List[UpdateOne]:
+        """
+        Pontua um lote de documentos e monta as operações de atualização
+
+        Args:
+            documentos: Documentos com _id, parametros_monitoramento e resultado_ml
+
+        Returns:
+            List[UpdateOne]: Uma operação por documento
+        """
+        matriz = montar_matriz(doc.get("parametros_monitoramento") for doc in documentos)
+        resultados = pontuar_lote(self.model, matriz)
+        agora = datetime.utcnow()
+
+        operacoes = []
+        for doc, resultado in zip(documentos, resultados):
+            anterior = doc.get("resultado_ml") or {}
+            status_saude, nivel_risco = determinar_status_saude(resultado["confidence"])
+
+            resultado["versao_modelo"] = self.versao_modelo
+            operacoes.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {
+                    "resultado_ml": resultado,
+                    "saude_feto": {
+                        "status_saude": status_saude,
+                        "confidence_value": resultado["confidence"],
+                        "nivel_risco": nivel_risco
+                    },
+                    "reprocessamento": {
+                        "versao_anterior": anterior.get("versao_modelo"),
+                        "versao_nova": self.versao_modelo,
+                        "prediction_anterior": anterior.get("prediction"),
+                        "confidence_anterior": anterior.get("confidence"),
+                        "data": agora
+                    }
+                }}
+            ))
+        return operacoes
+
+    def _gravar_lote(self, documentos: List[Dict[str, Any]]) -> int:
+        """Aplica o throttle e grava um lote via bulk_write"""
+        operacoes = self.montar_atualizacoes(documentos)
+        self.limitador.aguardar(len(operacoes))
+        result = self.collection.bulk_write(operacoes, ordered=False)
+        sinalizar_escrita()
+        return result.modified_count
+
+    def reconstruir_derivados(self) -> Dict[str, Any]:
+        """Reconstrói resumos e rollups a partir dos exames re-pontuados"""
+        derivados = {
+            "resumos": reconstruir_resumos(self.database, tamanho_lote=self.tamanho_lote),
+            "rollups": reconstruir_rollups(self.database, tamanho_lote=self.tamanho_lote)
+        }
+        sinalizar_escrita()
+        return derivados
+
+    def executar(self, limite: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Executa (ou retoma) o reprocessamento
+
+        Args:
+            limite: Número máximo de registros nesta execução
+
+        Returns:
+            Dict: Resumo da execução
+        """
+        checkpoint = self.carregar_checkpoint()
+        ultimo_id = checkpoint.get("ultimo_id") if checkpoint else None
+        processados = checkpoint.get("processados", 0) if checkpoint else 0
+
+        filtro: Dict[str, Any] = {"resultado_ml.versao_modelo": {"$ne": self.versao_modelo}}
+        if ultimo_id is not None:
+            filtro["_id"] = {"$gt": ultimo_id}
+            logger.info(f"🔁 Retomando reprocessamento após _id {ultimo_id} ({processados} já processados)")
+
+        cursor = self.collection.find(
+            filtro,
+            projection={"parametros_monitoramento": 1, "resultado_ml": 1}
+        ).sort("_id", 1).batch_size(self.batch_size)
+        if limite:
+            cursor = cursor.limit(limite)
+
+        inicio = time.monotonic()
+        modificados = 0
+        nesta_execucao = 0
+        lote: List[Dict[str, Any]] = []
+
+        try:
+            for documento in cursor:
+                lote.append(documento)
+                if len(lote) >= self.tamanho_lote:
+                    modificados += self._gravar_lote(lote)
+                    nesta_execucao += len(lote)
+                    processados += len(lote)
+                    ultimo_id = lote[-1]["_id"]
+                    self.salvar_checkpoint(ultimo_id, processados)
+                    lote = []
+
+            if lote:
+                modificados += self._gravar_lote(lote)
+                nesta_execucao += len(lote)
+                processados += len(lote)
+                ultimo_id = lote[-1]["_id"]
+        finally:
+            cursor.close()
+
+        concluido = not limite or nesta_execucao < limite
+        self.salvar_checkpoint(ultimo_id, processados, concluido=concluido)
+
+        duracao = time.monotonic() - inicio
+        logger.info(
+            f"✅ Reprocessamento: {nesta_execucao} registros ({modificados} modificados) "
+            f"em {duracao:.1f}s - versão {self.versao_modelo}"
+        )
+
+        # Reconstrói ao concluir se esta execução ou uma anterior interrompida gravou algo
+        pendente = nesta_execucao > 0 or bool(checkpoint and not checkpoint.get("concluido"))
+        derivados = self.reconstruir_derivados() if self.atualizar_derivados and concluido and pendente else None
+
+        return {
+            "versao_modelo": self.versao_modelo,
+            "processados_execucao": nesta_execucao,
+            "processados_total": processados,
+            "modificados": modificados,
+            "concluido": concluido,
+            "duracao_segundos": round(duracao, 2),
+            "registros_por_segundo": round(nesta_execucao / duracao, 1) if duracao > 0 else None,
+            "derivados": derivados
+        }
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="🔁 Reprocessamento de registros - Sistema FetalCare")
+    parser.add_argument('--modelo', default=MODEL_PATH,
+                        help=f'Caminho do modelo (padrão: {MODEL_PATH})')
+    parser.add_argument('--batch-size', type=int, default=5000,
+                        help='batch_size do cursor MongoDB (padrão: 5000)')
+    parser.add_argument('--tamanho-lote', type=int, default=1000,
+                        help='Registros por lote de predição/bulk_write (padrão: 1000)')
+    parser.add_argument('--ops-por-segundo', type=float, default=2000,
+                        help='Limite de atualizações por segundo, 0 = sem limite (padrão: 2000)')
+    parser.add_argument('--limite', type=int, default=None,
+                        help='Máximo de registros nesta execução')
+    parser.add_argument('--nome-job', default='reprocessamento',
+                        help='Identificador do checkpoint (padrão: reprocessamento)')
+    parser.add_argument('--sem-derivados', action='store_true',
+                        help='Não reconstrói resumos e rollups ao concluir')
+
+    args = parser.parse_args()
+
+    model = carregar_modelo(args.modelo)
+    reprocessador = ReprocessadorRegistros(
+        model,
+        calcular_versao_modelo(args.modelo),
+        nome_job=args.nome_job,
+        batch_size=args.batch_size,
+        tamanho_lote=args.tamanho_lote,
+        ops_por_segundo=args.ops_por_segundo,
+        atualizar_derivados=not args.sem_derivados
+    )
+    print(reprocessador.executar(limite=args.limite))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Resumo longitudinal por gestante
+
+Um documento por gestante (resumos_gestantes, _id = gestante_id) mantido
+de forma incremental a cada novo exame com um único update: contagem por
+status, pior status até o momento, somas para médias gerais e os últimos
+N exames (confidence, status e features principais) para a linha do tempo.
+
+Reconstrução a partir dos exames existentes (a partir do diretório back-end):
+    python -m banco.resumo_gestante --tamanho-lote 1000
+
+O reprocessamento (banco.reprocessamento) regrava saude_feto dos exames
+já resumidos e dispara esta reconstrução ao concluir.
+"""
+
+import os
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+from pymongo import UpdateOne
+
+from .database import (
+    get_sync_database,
+    substituir_colecao,
+    COLLECTION_NAME,
+    RESUMOS_COLLECTION_NAME,
+    SUFIXO_RECONSTRUCAO
+)
+
+logger = logging.getLogger(__name__)
+
+# Quantidade de exames mantidos na linha do tempo de cada gestante
+TAMANHO_HISTORICO = int(os.getenv("RESUMO_TAMANHO_HISTORICO", "50"))
+
+# Features acompanhadas com médias móveis
+FEATURES_RESUMO = ("baseline_value", "abnormal_short_term_variability")
+
+# Gravidade de cada status de saúde (maior = pior)
+GRAVIDADE_STATUS = {"Normal": 0, "Em Risco": 1, "Risco Crítico": 2}
+STATUS_POR_GRAVIDADE = {gravidade: status for status, gravidade in GRAVIDADE_STATUS.items()}
+
+# Variação mínima de confidence por exame para indicar tendência
+LIMIAR_TENDENCIA = 1.0
+
+
+def operacao_atualizar_resumo(registro: Dict[str, Any]) -> UpdateOne:
+    """
+    Monta o update incremental do resumo a partir de um exame recém-gravado
+
+    Args:
+        registro: Documento do exame (com _id, gestante_id, saude_feto...)
+
+    Returns:
+        UpdateOne: Upsert do resumo da gestante
+    """
+    saude = registro.get("saude_feto") or {}
+    resultado = registro.get("resultado_ml") or {}
+    parametros = registro.get("parametros_monitoramento") or {}
+    dados = registro.get("dados_gestante") or {}
+    status = saude.get("status_saude", "Normal")
+    confidence = float(saude.get("confidence_value", resultado.get("confidence", 0.0)) or 0.0)
+    data_exame = registro.get("data_exame") or datetime.utcnow()
+
+    valores = {feature: float(parametros.get(feature) or 0) for feature in FEATURES_RESUMO}
+    ponto = {
+        "registro_id": str(registro.get("_id")),
+        "data_exame": data_exame,
+        "confidence": confidence,
+        "status_saude": status,
+        "prediction": resultado.get("prediction"),
+        **valores
+    }
+
+    return UpdateOne(
+        {"_id": registro["gestante_id"]},
+        {
+            "$inc": {
+                "total_exames": 1,
+                f"contagem_status.{status}": 1,
+                "soma_confidence": confidence,
+                **{f"soma_features.{feature}": valor for feature, valor in valores.items()}
+            },
+            "$max": {"pior_gravidade": GRAVIDADE_STATUS.get(status, 0), "ultimo_exame_em": data_exame},
+            "$min": {"primeiro_exame_em": data_exame},
+            "$set": {
+                "patient_id": dados.get("patient_id"),
+                "patient_name": dados.get("patient_name"),
+                "ultimos_parametros": parametros,
+                "atualizado_em": datetime.utcnow()
+            },
+            "$push": {"historico": {"$each": [ponto], "$slice": -TAMANHO_HISTORICO}}
+        },
+        upsert=True
+    )
+
+
+def calcular_tendencia(confidences: List[float]) -> Dict[str, Any]:
+    """
+    Calcula a tendência da confidence pela inclinação da reta nos últimos exames
+
+    Returns:
+        Dict: inclinação por exame e direção (subindo, estável, caindo)
+    """
+    if len(confidences) < 2:
+        return {"inclinacao": 0.0, "direcao": "estável"}
+
+    inclinacao = float(np.polyfit(np.arange(len(confidences)), np.asarray(confidences, dtype=float), 1)[0])
+    if inclinacao >= LIMIAR_TENDENCIA:
+        direcao = "subindo"
+    elif inclinacao <= -LIMIAR_TENDENCIA:
+        direcao = "caindo"
+    else:
+        direcao = "estável"
+    return {"inclinacao": round(inclinacao, 3), "direcao": direcao}
+
+
+def formatar_linha_do_tempo(resumo: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Monta a resposta da linha do tempo a partir do documento de resumo
+
+    Args:
+        resumo: Documento de resumos_gestantes
+
+    Returns:
+        Dict: Linha do tempo com contagens, médias e tendência
+    """
+    historico = resumo.get("historico", [])
+    total = resumo.get("total_exames", 0)
+    confidences = [ponto["confidence"] for ponto in historico]
+
+    return {
+        "gestante_id": resumo["_id"],
+        "patient_id": resumo.get("patient_id"),
+        "patient_name": resumo.get("patient_name"),
+        "total_exames": total,
+        "contagem_status": resumo.get("contagem_status", {}),
+        "pior_status": STATUS_POR_GRAVIDADE.get(resumo.get("pior_gravidade", 0)),
+        "primeiro_exame_em": resumo.get("primeiro_exame_em"),
+        "ultimo_exame_em": resumo.get("ultimo_exame_em"),
+        "confidence_media": round(resumo.get("soma_confidence", 0.0) / total, 2) if total else None,
+        "medias_gerais": {
+            feature: round(soma / total, 2) if total else None
+            for feature, soma in resumo.get("soma_features", {}).items()
+        },
+        "medias_moveis": {
+            feature: round(float(np.mean([ponto[feature] for ponto in historico])), 2) if historico else None
+            for feature in FEATURES_RESUMO
+        },
+        "ultimas_confidences": confidences,
+        "tendencia_confidence": calcular_tendencia(confidences),
+        "ultimos_parametros": resumo.get("ultimos_parametros", {}),
+        "linha_do_tempo": historico
+    }
+
+
+def buscar_linha_do_tempo(gestante_id: str, database=None) -> Optional[Dict[str, Any]]:
+    """Busca a linha do tempo da gestante com uma única leitura por _id"""
+    if database is None:
+        database = get_sync_database()
+    resumo = database[RESUMOS_COLLECTION_NAME].find_one({"_id": gestante_id})
+    return formatar_linha_do_tempo(resumo) if resumo else None
+
+
+def aplicar_exames(database, resumos, filtro_data: Dict[str, Any], tamanho_lote: int) -> int:
+    """
+    Aplica os updates incrementais dos exames de um intervalo de datas, em ordem
+
+    Args:
+        database: Banco síncrono
+        resumos: Collection de destino dos resumos
+        filtro_data: Condição sobre data_exame
+        tamanho_lote: Exames por bulk_write
+
+    Returns:
+        int: Número de exames aplicados
+    """
+    cursor = database[COLLECTION_NAME].find(
+        {"gestante_id": {"$exists": True}, "data_exame": filtro_data},
+        projection={"gestante_id": 1, "dados_gestante": 1, "parametros_monitoramento": 1,
+                    "resultado_ml": 1, "saude_feto": 1, "data_exame": 1}
+    ).sort("data_exame", 1).batch_size(tamanho_lote)
+
+    processados = 0
+    operacoes: List[UpdateOne] = []
+    try:
+        for registro in cursor:
+            operacoes.append(operacao_atualizar_resumo(registro))
+            if len(operacoes) >= tamanho_lote:
+                # ordered=True preserva a ordem cronológica do histórico
+                resumos.bulk_write(operacoes, ordered=True)
+                processados += len(operacoes)
+                operacoes = []
+        if operacoes:
+            resumos.bulk_write(operacoes, ordered=True)
+            processados += len(operacoes)
+    finally:
+        cursor.close()
+    return processados
+
+
+def reconstruir_resumos(database=None, tamanho_lote: int = 1000) -> Dict[str, Any]:
+    """
+    Reconstrói todos os resumos a partir dos exames, em ordem de data
+
+    Os resumos são montados em uma collection temporária e trocados pelos
+    atuais com renameCollection, então a linha do tempo segue disponível
+    (com os valores anteriores) durante a reconstrução. Exames gravados
+    depois do início entram numa segunda passada antes da troca; apenas os
+    gravados entre essa passada e o rename ficam de fora até a próxima
+    reconstrução.
+
+    Args:
+        database: Banco síncrono (padrão: get_sync_database())
+        tamanho_lote: Exames por bulk_write
+
+    Returns:
+        Dict: Número de exames processados e de resumos gerados
+    """
+    if database is None:
+        database = get_sync_database()
+    nome_temporaria = RESUMOS_COLLECTION_NAME + SUFIXO_RECONSTRUCAO
+    temporaria = database[nome_temporaria]
+    temporaria.drop()
+
+    corte = datetime.utcnow()
+    # $not também seleciona exames sem data_exame (gravados com a data atual)
+    processados = aplicar_exames(database, temporaria, {"$not": {"$gte": corte}}, tamanho_lote)
+    processados += aplicar_exames(database, temporaria, {"$gte": corte}, tamanho_lote)
+    substituir_colecao(database, nome_temporaria, RESUMOS_COLLECTION_NAME)
+
+    total = database[RESUMOS_COLLECTION_NAME].estimated_document_count()
+    logger.info(f"✅ Resumos reconstruídos: {total} gestantes a partir de {processados} exames")
+    return {"exames_processados": processados, "resumos": total}
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="📈 Reconstrução dos resumos por gestante - Sistema FetalCare")
+    parser.add_argument('--tamanho-lote', type=int, default=1000,
+                        help='Exames por lote (padrão: 1000)')
+    args = parser.parse_args()
+
+    print(reconstruir_resumos(tamanho_lote=args.tamanho_lote))
+
+
+if __name__ == "__main__":
+    main()
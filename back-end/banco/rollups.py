@@ -0,0 +1,331 @@
+"""
+Agregados pré-calculados por período (rollups)
+
+Cada exame incrementa dois documentos em rollups_exames, um por hora e um
+por dia, chaveados por período × status de saúde × nível de risco × faixa de
+idade gestacional. Consultas por intervalo (ex: últimos 30 dias por status)
+somam esses documentos em vez de varrer registros_exames.
+
+Reconstrução a partir dos exames existentes (a partir do diretório back-end):
+    python -m banco.rollups
+
+O reprocessamento (banco.reprocessamento) muda status e nível de risco de
+exames já agregados e dispara esta reconstrução ao concluir.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from .database import (
+    get_sync_database,
+    indices_declarados,
+    substituir_colecao,
+    COLLECTION_NAME,
+    ROLLUPS_COLLECTION_NAME,
+    INDICES_ROLLUPS,
+    SUFIXO_RECONSTRUCAO
+)
+
+logger = logging.getLogger(__name__)
+
+GRANULARIDADES = ("hora", "dia")
+
+# Dimensões dos agregados (nome na resposta -> campo do documento de rollup)
+DIMENSOES = ("status_saude", "nivel_risco", "faixa_idade_gestacional")
+
+# Faixas de idade gestacional em semanas: (limite superior inclusivo, rótulo)
+FAIXAS_IDADE_GESTACIONAL = [
+    (27, "<28"),
+    (31, "28-31"),
+    (36, "32-36"),
+    (None, "37+"),
+]
+
+# Limite de pontos de uma consulta (evita séries horárias de anos inteiros)
+MAX_PERIODOS = 24 * 92
+
+
+def faixa_idade_gestacional(semanas: Optional[int]) -> str:
+    """Retorna o rótulo da faixa de idade gestacional (ausente ou não positiva: desconhecida)"""
+    if semanas is None or semanas <= 0:
+        return "desconhecida"
+    for limite, rotulo in FAIXAS_IDADE_GESTACIONAL:
+        if limite is None or semanas <= limite:
+            return rotulo
+    return "desconhecida"
+
+
+def inicio_periodo(data: datetime, granularidade: str) -> datetime:
+    """Trunca a data no início da hora ou do dia"""
+    if granularidade == "hora":
+        return data.replace(minute=0, second=0, microsecond=0)
+    return data.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def alinhar_intervalo(inicio: datetime, fim: datetime, granularidade: str) -> Tuple[datetime, datetime]:
+    """
+    Expande o intervalo para períodos inteiros da granularidade
+
+    Os rollups só existem por hora/dia completos: um início no meio do
+    período passa a incluir o período inteiro, e um fim no meio do período
+    avança até o início do seguinte.
+
+    Returns:
+        Tuple[datetime, datetime]: Início e fim (exclusivo) efetivos
+    """
+    passo = timedelta(hours=1) if granularidade == "hora" else timedelta(days=1)
+    fim_alinhado = inicio_periodo(fim, granularidade)
+    if fim_alinhado < fim:
+        fim_alinhado += passo
+    return inicio_periodo(inicio, granularidade), fim_alinhado
+
+
+def chave_rollup(granularidade: str, inicio: datetime, status: str, nivel: str, faixa: str) -> str:
+    """Monta o _id do documento de rollup"""
+    return f"{granularidade}|{inicio.isoformat()}|{status}|{nivel}|{faixa}"
+
+
+def dimensoes_exame(registro: Dict[str, Any]) -> Tuple[datetime, str, str, str, float, Any]:
+    """Extrai data, dimensões, confidence e predição de um documento de exame"""
+    saude = registro.get("saude_feto") or {}
+    resultado = registro.get("resultado_ml") or {}
+    dados = registro.get("dados_gestante") or {}
+    return (
+        registro.get("data_exame") or datetime.utcnow(),
+        saude.get("status_saude", "Normal"),
+        saude.get("nivel_risco", "BAIXO"),
+        faixa_idade_gestacional(dados.get("gestational_age")),
+        float(saude.get("confidence_value", resultado.get("confidence", 0.0)) or 0.0),
+        resultado.get("prediction")
+    )
+
+
+def operacoes_atualizar_rollups(registro: Dict[str, Any]) -> List[UpdateOne]:
+    """
+    Monta os upserts incrementais (hora e dia) de um exame recém-gravado
+
+    Args:
+        registro: Documento do exame
+
+    Returns:
+        List[UpdateOne]: Um upsert por granularidade
+    """
+    data, status, nivel, faixa, confidence, prediction = dimensoes_exame(registro)
+    incrementos = {"total": 1, "soma_confidence": confidence}
+    if prediction is not None:
+        incrementos[f"contagem_prediction.{int(prediction)}"] = 1
+
+    operacoes = []
+    for granularidade in GRANULARIDADES:
+        inicio = inicio_periodo(data, granularidade)
+        operacoes.append(UpdateOne(
+            {"_id": chave_rollup(granularidade, inicio, status, nivel, faixa)},
+            {
+                "$inc": incrementos,
+                "$setOnInsert": {
+                    "granularidade": granularidade,
+                    "inicio": inicio,
+                    "status_saude": status,
+                    "nivel_risco": nivel,
+                    "faixa_idade_gestacional": faixa
+                }
+            },
+            upsert=True
+        ))
+    return operacoes
+
+
+def operacoes_rollups(registros: Iterable[Dict[str, Any]]) -> List[UpdateOne]:
+    """Junta os upserts de vários exames (para um único bulk_write)"""
+    return [operacao for registro in registros for operacao in operacoes_atualizar_rollups(registro)]
+
+
+def consultar_rollups(
+    database,
+    inicio: datetime,
+    fim: datetime,
+    granularidade: str = "dia",
+    agrupar_por: Iterable[str] = ("status_saude",),
+    filtros: Optional[Dict[str, str]] = None,
+    serie: bool = False
+) -> Dict[str, Any]:
+    """
+    Responde uma consulta por intervalo somando os documentos de rollup
+
+    Args:
+        database: Banco síncrono
+        inicio: Início do intervalo (inclusivo, alinhado ao início do período)
+        fim: Fim do intervalo (exclusivo, alinhado ao início do período seguinte)
+        granularidade: "hora" ou "dia"
+        agrupar_por: Dimensões da resposta (subconjunto de DIMENSOES)
+        filtros: Valores fixos de dimensões (ex: {"nivel_risco": "CRÍTICO"})
+        serie: Se True, também agrupa por período (série temporal)
+
+    Returns:
+        Dict: Intervalo efetivo, intervalo solicitado e totais por grupo
+            (e por período quando serie=True)
+    """
+    if granularidade not in GRANULARIDADES:
+        raise ValueError(f"Granularidade inválida: {granularidade}")
+    if fim <= inicio:
+        raise ValueError("O fim do intervalo deve ser posterior ao início")
+    agrupar_por = list(agrupar_por)
+    invalidas = [d for d in agrupar_por + list(filtros or {}) if d not in DIMENSOES]
+    if invalidas:
+        raise ValueError(f"Dimensões inválidas: {', '.join(invalidas)}")
+    solicitado = {"inicio": inicio, "fim": fim}
+    inicio, fim = alinhar_intervalo(inicio, fim, granularidade)
+    passo = timedelta(hours=1) if granularidade == "hora" else timedelta(days=1)
+    if serie and (fim - inicio) / passo > MAX_PERIODOS:
+        raise ValueError(f"Intervalo excede {MAX_PERIODOS} períodos de {granularidade}")
+
+    filtro = {"granularidade": granularidade, "inicio": {"$gte": inicio, "$lt": fim}, **(filtros or {})}
+    grupo = {dimensao: f"${dimensao}" for dimensao in agrupar_por}
+    if serie:
+        grupo["inicio"] = "$inicio"
+
+    pipeline = [
+        {"$match": filtro},
+        {"$group": {
+            "_id": grupo,
+            "total": {"$sum": "$total"},
+            "soma_confidence": {"$sum": "$soma_confidence"}
+        }},
+        {"$sort": {"_id.inicio": 1, "total": -1} if serie else {"total": -1}}
+    ]
+
+    grupos = []
+    total = 0
+    for item in database[ROLLUPS_COLLECTION_NAME].aggregate(pipeline):
+        total += item["total"]
+        grupos.append({
+            **item["_id"],
+            "total": item["total"],
+            "confidence_media": round(item["soma_confidence"] / item["total"], 2) if item["total"] else None
+        })
+
+    return {
+        "inicio": inicio,
+        "fim": fim,
+        "intervalo_solicitado": solicitado,
+        "granularidade": granularidade,
+        "agrupar_por": agrupar_por,
+        "filtros": filtros or {},
+        "total": total,
+        "grupos": grupos
+    }
+
+
+def reconstruir_rollups(database=None, tamanho_lote: int = 1000) -> Dict[str, Any]:
+    """
+    Reconstrói os agregados a partir dos exames
+
+    O agrupamento por hora é feito no servidor; apenas os grupos (não os
+    exames) trafegam. Os agregados são gravados em uma collection
+    temporária e trocados pelos atuais com renameCollection, sem janela
+    com a collection vazia. Exames gravados depois do início são somados
+    numa segunda passada antes da troca; apenas os gravados entre essa
+    passada e o rename ficam de fora até a próxima reconstrução.
+
+    Args:
+        database: Banco síncrono (padrão: get_sync_database())
+        tamanho_lote: Exames por bulk_write da segunda passada
+
+    Returns:
+        Dict: Número de exames considerados e de documentos gerados
+    """
+    if database is None:
+        database = get_sync_database()
+
+    corte = datetime.utcnow()
+    pipeline = [
+        {"$match": {"data_exame": {"$lt": corte}}},
+        {"$group": {
+            "_id": {
+                "hora": {"$dateToString": {"format": "%Y-%m-%dT%H:00:00", "date": "$data_exame"}},
+                "status_saude": "$saude_feto.status_saude",
+                "nivel_risco": "$saude_feto.nivel_risco",
+                "gestational_age": "$dados_gestante.gestational_age",
+                "prediction": "$resultado_ml.prediction"
+            },
+            "total": {"$sum": 1},
+            "soma_confidence": {"$sum": "$saude_feto.confidence_value"}
+        }}
+    ]
+
+    rollups: Dict[str, Dict[str, Any]] = {}
+    exames = 0
+    for grupo in database[COLLECTION_NAME].aggregate(pipeline, allowDiskUse=True):
+        chave = grupo["_id"]
+        if chave["hora"] is None:
+            continue
+        exames += grupo["total"]
+        hora = datetime.fromisoformat(chave["hora"])
+        faixa = faixa_idade_gestacional(chave.get("gestational_age"))
+        for granularidade in GRANULARIDADES:
+            inicio = inicio_periodo(hora, granularidade)
+            _id = chave_rollup(granularidade, inicio, chave["status_saude"], chave["nivel_risco"], faixa)
+            documento = rollups.setdefault(_id, {
+                "_id": _id,
+                "granularidade": granularidade,
+                "inicio": inicio,
+                "status_saude": chave["status_saude"],
+                "nivel_risco": chave["nivel_risco"],
+                "faixa_idade_gestacional": faixa,
+                "total": 0,
+                "soma_confidence": 0.0,
+                "contagem_prediction": {}
+            })
+            documento["total"] += grupo["total"]
+            documento["soma_confidence"] += grupo["soma_confidence"] or 0.0
+            if chave.get("prediction") is not None:
+                classe = str(int(chave["prediction"]))
+                documento["contagem_prediction"][classe] = documento["contagem_prediction"].get(classe, 0) + grupo["total"]
+
+    nome_temporaria = ROLLUPS_COLLECTION_NAME + SUFIXO_RECONSTRUCAO
+    temporaria = database[nome_temporaria]
+    temporaria.drop()
+    temporaria.create_indexes(indices_declarados(INDICES_ROLLUPS))
+    if rollups:
+        temporaria.insert_many(list(rollups.values()), ordered=False)
+
+    cursor = database[COLLECTION_NAME].find(
+        {"data_exame": {"$gte": corte}},
+        projection={"dados_gestante.gestational_age": 1, "resultado_ml": 1, "saude_feto": 1, "data_exame": 1}
+    ).batch_size(tamanho_lote)
+    lote: List[Dict[str, Any]] = []
+    try:
+        for registro in cursor:
+            lote.append(registro)
+            if len(lote) >= tamanho_lote:
+                temporaria.bulk_write(operacoes_rollups(lote), ordered=False)
+                exames += len(lote)
+                lote = []
+        if lote:
+            temporaria.bulk_write(operacoes_rollups(lote), ordered=False)
+            exames += len(lote)
+    finally:
+        cursor.close()
+
+    substituir_colecao(database, nome_temporaria, ROLLUPS_COLLECTION_NAME)
+
+    total = database[ROLLUPS_COLLECTION_NAME].estimated_document_count()
+    logger.info(f"✅ Rollups reconstruídos: {total} documentos a partir de {exames} exames")
+    return {"exames": exames, "rollups": total}
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="📊 Reconstrução dos agregados por período - Sistema FetalCare")
+    parser.parse_args()
+
+    print(reconstruir_rollups())
+
+
+if __name__ == "__main__":
+    main()
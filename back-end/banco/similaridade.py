@@ -0,0 +1,403 @@
+"""
+Índice de casos semelhantes (k-NN) sobre os parâmetros dos exames
+
+Os 21 parâmetros de monitoramento de cada exame são padronizados (média e
+desvio da construção) e gravados em arquivos binários contíguos, abertos
+com np.memmap:
+
+    vetores.f32   N x 21 float32 (padronizados)
+    normas.f32    N float32 (||v||², para a distância por produto interno)
+    ids.bin       N x 12 bytes (ObjectId)
+    status.u8     N códigos de saude_feto.status_saude
+    meta.json     média, desvio, total de linhas e maior _id indexado
+
+A construção lê a collection inteira por um cursor em lotes, em ordem de
+_id, e guarda o maior _id como marca d'água. Logo após a troca do
+diretório, os exames inseridos durante a construção (_id acima da marca)
+são anexados. Cada novo exame é anexado ao fim dos arquivos sem
+reconstruir o índice; exames até a marca d'água são ignorados. A busca é
+exata: ||v - q||² = ||v||² - 2 v·q + ||q||² em uma única multiplicação
+matriz-vetor seguida de argpartition.
+
+Os workers compartilham o diretório (meta.json, troca atômica na
+reconstrução e releitura entre processos ficam em
+banco/diretorio_versionado.py).
+
+Uso (a partir do diretório back-end):
+    python -m banco.similaridade --reconstruir
+"""
+
+import os
+import logging
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from .database import get_sync_collection
+from .diretorio_versionado import DiretorioVersionado, gravar_a_partir
+from modelo.preditor import EXPECTED_FEATURES, montar_matriz
+
+logger = logging.getLogger(__name__)
+
+# Configurações do índice
+INDICE_SIMILARES_DIR = os.getenv("INDICE_SIMILARES_DIR", "indice_similares")
+BATCH_SIZE = 5000
+K_PADRAO = 10
+K_MAX = 100
+
+STATUS_SAUDE = ["Normal", "Em Risco", "Risco Crítico"]
+STATUS_DESCONHECIDO = 255
+
+ARQUIVOS = {
+    "vetores": ("vetores.f32", np.float32, len(EXPECTED_FEATURES)),
+    "normas": ("normas.f32", np.float32, None),
+    "ids": ("ids.bin", np.uint8, 12),
+    "status": ("status.u8", np.uint8, None)
+}
+PROJECAO = {"parametros_monitoramento": 1, "saude_feto.status_saude": 1}
+
+
+def codificar_status(status: Optional[str]) -> int:
+    """Código uint8 de saude_feto.status_saude"""
+    return STATUS_SAUDE.index(status) if status in STATUS_SAUDE else STATUS_DESCONHECIDO
+
+
+def lotes_documentos(documentos: Iterable[Dict[str, Any]], tamanho: int = BATCH_SIZE
+                     ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Converte documentos de exames em lotes (matriz, ids, status)
+
+    Args:
+        documentos: Documentos com _id, parametros_monitoramento e saude_feto
+        tamanho: Documentos por lote
+
+    Yields:
+        Tuple: matriz N x 21 float64, ids N x 12 uint8 e códigos de status N uint8
+    """
+    lote: List[Dict[str, Any]] = []
+    for documento in documentos:
+        lote.append(documento)
+        if len(lote) >= tamanho:
+            yield _converter_lote(lote)
+            lote = []
+    if lote:
+        yield _converter_lote(lote)
+
+
+def _converter_lote(documentos: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    matriz = montar_matriz(d.get("parametros_monitoramento") for d in documentos)
+    ids = np.frombuffer(b"".join(ObjectId(d["_id"]).binary for d in documentos), dtype=np.uint8).reshape(-1, 12)
+    status = np.fromiter(
+        (codificar_status((d.get("saude_feto") or {}).get("status_saude")) for d in documentos),
+        dtype=np.uint8, count=len(documentos)
+    )
+    return matriz, ids, status
+
+
+class IndiceSimilares(DiretorioVersionado):
+    """Índice k-NN exato, persistido em arquivos mapeáveis em memória"""
+
+    def __init__(self, diretorio: str = INDICE_SIMILARES_DIR):
+        super().__init__(diretorio)
+        self.media: Optional[np.ndarray] = None
+        self.desvio: Optional[np.ndarray] = None
+        self.total = 0
+        self.ultimo_id: Optional[ObjectId] = None
+        self.buscas = 0
+        self.anexados = 0
+        self.carregar()
+
+    @property
+    def disponivel(self) -> bool:
+        self._sincronizar()
+        return self.media is not None
+
+    def _aplicar_meta(self, meta: Dict[str, Any]):
+        self.media = np.asarray(meta["media"], dtype=np.float64)
+        self.desvio = np.asarray(meta["desvio"], dtype=np.float64)
+        self.total = meta["total"]
+        self.ultimo_id = ObjectId(meta["ultimo_id"]) if meta.get("ultimo_id") else None
+
+    def _montar_meta(self) -> Dict[str, Any]:
+        return {
+            "versao": 1,
+            "features": EXPECTED_FEATURES,
+            "media": self.media.tolist(),
+            "desvio": self.desvio.tolist(),
+            "total": self.total,
+            "ultimo_id": str(self.ultimo_id) if self.ultimo_id else None
+        }
+
+    def padronizar(self, matriz: np.ndarray) -> np.ndarray:
+        return ((matriz - self.media) / self.desvio).astype(np.float32)
+
+    def construir_de_lotes(self, lotes: Iterable[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+                           collection=None) -> Optional[int]:
+        """
+        Constrói o índice em um diretório novo e o troca pelo atual
+
+        Os vetores brutos são gravados em uma primeira passada (acumulando
+        soma e soma dos quadrados) e padronizados em blocos na segunda. Só um
+        processo constrói por vez; o diretório .novo é removido se a
+        construção falhar.
+
+        Args:
+            lotes: Lotes (matriz, ids, status) como os de lotes_documentos, em
+                ordem crescente de _id (o último _id vira a marca d'água)
+            collection: Se informada, os exames com _id acima da marca d'água
+                (inseridos durante a construção) são anexados logo após a
+                troca, ainda sob a trava do diretório
+
+        Returns:
+            Optional[int]: Quantidade de exames indexados (None se outro processo
+                já está reconstruindo)
+        """
+        construido = self._construir_versao(
+            lambda novo: self._gravar_novo(novo, lotes),
+            (lambda: self._complementar(collection)) if collection is not None else None
+        )
+        if not construido:
+            logger.info("⏳ Índice de similares já está sendo reconstruído por outro processo")
+            return None
+        logger.info(f"🧭 Índice de similares construído: {self.total} exames")
+        return self.total
+
+    def _complementar(self, collection) -> int:
+        """Anexa os exames acima da marca d'água (chamado após a troca, com a trava do diretório)"""
+        filtro = {"_id": {"$gt": self.ultimo_id}} if self.ultimo_id is not None else {}
+        cursor = collection.find(filtro, projection=PROJECAO).sort("_id", 1).batch_size(BATCH_SIZE)
+        anexados = 0
+        try:
+            lote: List[Dict[str, Any]] = []
+            for documento in cursor:
+                lote.append(documento)
+                if len(lote) >= BATCH_SIZE:
+                    anexados += self._anexar(lote)
+                    lote = []
+            anexados += self._anexar(lote)
+        finally:
+            cursor.close()
+        if anexados:
+            logger.info(f"🧭 {anexados} exames inseridos durante a construção anexados ao índice")
+        return anexados
+
+    def _gravar_novo(self, novo: str, lotes: Iterable[Tuple[np.ndarray, np.ndarray, np.ndarray]]
+                     ) -> Dict[str, Any]:
+        """Grava os arquivos padronizados em novo e retorna o novo estado (total, média, desvio, último _id)"""
+        total = 0
+        ultimo_id = None
+        soma = np.zeros(len(EXPECTED_FEATURES))
+        soma_quadrados = np.zeros(len(EXPECTED_FEATURES))
+        with open(os.path.join(novo, ARQUIVOS["vetores"][0]), "wb") as vetores, \
+                open(os.path.join(novo, ARQUIVOS["ids"][0]), "wb") as ids, \
+                open(os.path.join(novo, ARQUIVOS["status"][0]), "wb") as status:
+            for matriz, ids_lote, status_lote in lotes:
+                soma += matriz.sum(axis=0)
+                soma_quadrados += (matriz ** 2).sum(axis=0)
+                vetores.write(matriz.astype(np.float32).tobytes())
+                ids.write(np.ascontiguousarray(ids_lote, dtype=np.uint8).tobytes())
+                status.write(np.ascontiguousarray(status_lote, dtype=np.uint8).tobytes())
+                total += len(matriz)
+                if len(ids_lote):
+                    ultimo_id = ObjectId(np.ascontiguousarray(ids_lote[-1], dtype=np.uint8).tobytes())
+
+        media = soma / total if total else np.zeros(len(EXPECTED_FEATURES))
+        variancia = soma_quadrados / total - media ** 2 if total else np.ones(len(EXPECTED_FEATURES))
+        desvio = np.sqrt(np.maximum(variancia, 0))
+        desvio[desvio < 1e-9] = 1.0
+
+        # Segunda passada: padronização em blocos e normas
+        with open(os.path.join(novo, ARQUIVOS["normas"][0]), "wb") as normas:
+            if total:
+                vetores = np.memmap(os.path.join(novo, ARQUIVOS["vetores"][0]), dtype=np.float32,
+                                    mode="r+", shape=(total, len(EXPECTED_FEATURES)))
+                for inicio in range(0, total, BATCH_SIZE * 20):
+                    bloco = vetores[inicio:inicio + BATCH_SIZE * 20]
+                    bloco[:] = ((bloco - media) / desvio).astype(np.float32)
+                    normas.write(np.einsum("ij,ij->i", bloco, bloco).astype(np.float32).tobytes())
+                vetores.flush()
+                del vetores
+        return {"total": total, "media": media, "desvio": desvio, "ultimo_id": ultimo_id}
+
+    def construir(self, collection=None, batch_size: int = BATCH_SIZE) -> Optional[int]:
+        """Constrói o índice a partir de uma varredura em lote de registros_exames (em ordem de _id)"""
+        if collection is None:
+            collection = get_sync_collection()
+        cursor = collection.find({}, projection=PROJECAO).sort("_id", 1).batch_size(batch_size)
+        try:
+            return self.construir_de_lotes(lotes_documentos(cursor, batch_size), collection)
+        finally:
+            cursor.close()
+
+    def adicionar(self, documentos: List[Dict[str, Any]]) -> int:
+        """
+        Anexa exames recém-inseridos ao fim dos arquivos
+
+        Usa a média e o desvio da última construção. Sob a trava do
+        diretório, relê o meta.json (outro processo pode ter anexado ou
+        reconstruído), ignora exames com _id até a marca d'água (já
+        indexados) e grava a partir da linha total, descartando bytes de
+        uma anexação interrompida antes de atualizar o meta.json.
+
+        Returns:
+            int: Quantidade de exames anexados (0 se o índice não foi construído)
+        """
+        if not self.disponivel or not documentos:
+            return 0
+        with self._travar_anexacao():
+            return self._anexar(documentos)
+
+    def _anexar(self, documentos: List[Dict[str, Any]]) -> int:
+        """Grava documentos acima da marca d'água no fim dos arquivos (chamado com a trava do diretório)"""
+        if self.ultimo_id is not None:
+            documentos = [d for d in documentos if ObjectId(d["_id"]) > self.ultimo_id]
+        if not documentos:
+            return 0
+        matriz, ids, status = _converter_lote(documentos)
+        vetores = self.padronizar(matriz)
+        normas = np.einsum("ij,ij->i", vetores, vetores).astype(np.float32)
+        with self._lock:
+            for nome, dados in (("vetores", vetores), ("normas", normas), ("ids", ids), ("status", status)):
+                arquivo_nome, dtype, colunas = ARQUIVOS[nome]
+                gravar_a_partir(os.path.join(self.diretorio, arquivo_nome),
+                                self.total * (colunas or 1) * np.dtype(dtype).itemsize, dados)
+            self.total += len(matriz)
+            self.anexados += len(matriz)
+            # Os documentos restantes estão todos acima da marca d'água anterior
+            self.ultimo_id = max(ObjectId(d["_id"]) for d in documentos)
+            self._salvar_meta(self.diretorio)
+            self._mapas = None
+        return len(matriz)
+
+    def mapas(self) -> Dict[str, np.ndarray]:
+        """Arrays do índice mapeados em memória (remapeados após anexações e reconstruções)"""
+        self._sincronizar()
+        with self._lock:
+            if self._mapas is None:
+                self._mapas = {}
+                for nome, (arquivo, dtype, colunas) in ARQUIVOS.items():
+                    formato = (self.total, colunas) if colunas else (self.total,)
+                    caminho = os.path.join(self.diretorio, arquivo)
+                    self._mapas[nome] = (np.memmap(caminho, dtype=dtype, mode="r", shape=formato)
+                                         if self.total else np.empty(formato, dtype=dtype))
+            return self._mapas
+
+    def buscar(self, parametros: Dict[str, Any], k: int = K_PADRAO,
+               excluir_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Exames mais semelhantes a um conjunto de parâmetros
+
+        Args:
+            parametros: parametros_monitoramento do exame de referência
+            k: Quantidade de vizinhos (até K_MAX)
+            excluir_id: _id a ignorar (o próprio exame de referência)
+
+        Returns:
+            List[Dict]: record_id, distancia (espaço padronizado) e status_saude,
+                do mais próximo ao mais distante
+        """
+        if not self.disponivel:
+            raise RuntimeError("Índice de similares não construído")
+        k = max(1, min(int(k), K_MAX))
+        mapas = self.mapas()
+        total = len(mapas["normas"])
+        if total == 0:
+            return []
+
+        consulta = self.padronizar(montar_matriz([parametros]))[0]
+        distancias = mapas["normas"] - 2 * (mapas["vetores"] @ consulta) + consulta @ consulta
+        quantidade = min(k + (1 if excluir_id else 0), total)
+        candidatos = np.argpartition(distancias, quantidade - 1)[:quantidade]
+        candidatos = candidatos[np.argsort(distancias[candidatos], kind="stable")]
+
+        excluido = ObjectId(excluir_id).binary if excluir_id else None
+        vizinhos = []
+        for indice in candidatos:
+            id_binario = mapas["ids"][indice].tobytes()
+            if id_binario == excluido:
+                continue
+            codigo = int(mapas["status"][indice])
+            vizinhos.append({
+                "record_id": str(ObjectId(id_binario)),
+                "distancia": round(float(np.sqrt(max(distancias[indice], 0.0))), 4),
+                "status_saude": STATUS_SAUDE[codigo] if codigo < len(STATUS_SAUDE) else None
+            })
+        self.buscas += 1
+        return vizinhos[:k]
+
+    def metricas(self) -> Dict[str, Any]:
+        """Retorna as métricas do índice"""
+        return {
+            "disponivel": self.disponivel,
+            "total": self.total,
+            "anexados": self.anexados,
+            "ultimo_id": str(self.ultimo_id) if self.ultimo_id else None,
+            "buscas": self.buscas,
+            "diretorio": os.path.abspath(self.diretorio)
+        }
+
+
+def detalhar_vizinhos(vizinhos: List[Dict[str, Any]], collection=None,
+                      k: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Completa os vizinhos com gestante, data e resultado do modelo (uma consulta por _id)
+
+    Vizinhos sem documento em registros_exames (arquivados ou removidos depois
+    da construção do índice) são descartados.
+
+    Args:
+        vizinhos: Resultado de IndiceSimilares.buscar
+        collection: Collection de exames (padrão: registros_exames)
+        k: Máximo de vizinhos retornados (peça mais candidatos a buscar para compensar os descartados)
+
+    Returns:
+        List[Dict]: Vizinhos com documento, do mais próximo ao mais distante
+    """
+    if not vizinhos:
+        return vizinhos
+    if collection is None:
+        collection = get_sync_collection()
+    documentos = {
+        str(d["_id"]): d for d in collection.find(
+            {"_id": {"$in": [ObjectId(v["record_id"]) for v in vizinhos]}},
+            projection={"dados_gestante.patient_name": 1, "data_exame": 1,
+                        "resultado_ml.prediction": 1, "resultado_ml.status": 1, "saude_feto": 1}
+        )
+    }
+    detalhados = []
+    for vizinho in vizinhos:
+        documento = documentos.get(vizinho["record_id"])
+        if documento is None:
+            continue
+        vizinho["patient_name"] = (documento.get("dados_gestante") or {}).get("patient_name")
+        vizinho["data_exame"] = documento.get("data_exame")
+        vizinho["resultado_ml"] = documento.get("resultado_ml")
+        vizinho["saude_feto"] = documento.get("saude_feto")
+        detalhados.append(vizinho)
+    return detalhados[:k]
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="🧭 Índice de exames semelhantes - Sistema FetalCare")
+    parser.add_argument('--reconstruir', action='store_true', help='Reconstrói o índice a partir de registros_exames')
+    parser.add_argument('--diretorio', default=INDICE_SIMILARES_DIR, help=f'Diretório do índice (padrão: {INDICE_SIMILARES_DIR})')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f'Documentos por lote do cursor (padrão: {BATCH_SIZE})')
+    args = parser.parse_args()
+
+    indice = IndiceSimilares(args.diretorio)
+    if args.reconstruir or not indice.disponivel:
+        total = indice.construir(batch_size=args.batch_size)
+        if total is None:
+            print(f"⏳ Outro processo já está reconstruindo o índice em {args.diretorio}")
+        else:
+            print(f"✅ Índice construído em {args.diretorio}: {total} exames")
+    else:
+        print(f"📊 Índice em {args.diretorio}: {indice.total} exames")
+
+
+if __name__ == "__main__":
+    main()
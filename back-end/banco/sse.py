@@ -0,0 +1,77 @@
+"""
+Server-Sent Events: formato, fila por cliente e laço de transmissão
+
+Compartilhado pela difusão de novos exames (banco/eventos.py) e pelo hub
+de predições (modelo/hub_predicoes.py). Os dados dos eventos usam o codec
+das respostas JSON (banco/json_rapido.py), então ObjectId, datetime e
+tipos NumPy saem no mesmo formato das rotas.
+"""
+
+import os
+import queue
+import logging
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from .json_rapido import criar_codec
+
+logger = logging.getLogger(__name__)
+
+# Configurações dos fluxos SSE
+SSE_TAMANHO_FILA = int(os.getenv("SSE_TAMANHO_FILA", "256"))
+SSE_INTERVALO_HEARTBEAT = float(os.getenv("SSE_INTERVALO_HEARTBEAT", "15"))
+
+# Comentário SSE que mantém a conexão viva através de proxies
+HEARTBEAT = ": heartbeat\n\n"
+
+_codec = criar_codec()
+
+
+def formatar_evento(evento: str, dados: Dict[str, Any]) -> str:
+    """Formata um evento no protocolo text/event-stream"""
+    return f"event: {evento}\ndata: {_codec.dumps(dados).decode('utf-8')}\n\n"
+
+
+class FilaAssinante:
+    """Fila limitada de um cliente conectado"""
+
+    def __init__(self, tamanho_fila: int = SSE_TAMANHO_FILA):
+        self.fila: "queue.Queue[str]" = queue.Queue(maxsize=tamanho_fila)
+        self.descartados = 0
+
+    def entregar(self, mensagem: str):
+        """Enfileira sem bloquear a fonte; clientes lentos perdem eventos"""
+        try:
+            self.fila.put_nowait(mensagem)
+        except queue.Full:
+            self.descartados += 1
+
+    def proxima(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Retira a próxima mensagem (None se o timeout expirar)"""
+        try:
+            return self.fila.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+def transmitir(
+    assinante,
+    evento_inicial: str,
+    ao_encerrar: Callable[[], None],
+    intervalo_heartbeat: float = SSE_INTERVALO_HEARTBEAT
+) -> Iterator[str]:
+    """
+    Gera o fluxo text/event-stream de um cliente até a desconexão
+
+    Args:
+        assinante: Objeto com proxima(timeout) -> Optional[str]
+        evento_inicial: Primeiro evento enviado (ex: "ready")
+        ao_encerrar: Chamado quando o cliente desconecta (cancela a assinatura)
+        intervalo_heartbeat: Segundos sem mensagens até enviar um heartbeat
+    """
+    try:
+        yield evento_inicial
+        while True:
+            mensagem = assinante.proxima(intervalo_heartbeat)
+            yield mensagem if mensagem is not None else HEARTBEAT
+    finally:
+        ao_encerrar()
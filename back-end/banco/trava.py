@@ -0,0 +1,88 @@
+"""
+Trava exclusiva entre processos para os diretórios mapeados em memória
+
+Os workers do gunicorn e os scripts de linha de comando compartilham os
+diretórios do índice de similares e do snapshot analítico. Anexações e a
+troca do diretório numa reconstrução passam por uma trava fcntl.flock num
+arquivo irmão (<diretorio>.lock), que sobrevive à troca do diretório.
+
+Sem fcntl (Windows), a trava vale apenas entre as threads do processo.
+"""
+
+import os
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Travas entre threads do processo (flock é por descritor, não por thread)
+_travas_locais: Dict[str, threading.Lock] = {}
+_travas_lock = threading.Lock()
+
+
+def _trava_local(caminho: str) -> threading.Lock:
+    with _travas_lock:
+        return _travas_locais.setdefault(caminho, threading.Lock())
+
+
+@contextmanager
+def travar(caminho: str, bloquear: bool = True) -> Iterator[bool]:
+    """
+    Trava exclusiva no arquivo informado
+
+    Args:
+        caminho: Arquivo da trava (criado se não existir)
+        bloquear: Esperar a trava; se False, retorna na hora
+
+    Yields:
+        bool: True se a trava foi obtida (sempre True com bloquear=True)
+    """
+    caminho = os.path.abspath(caminho)
+    local = _trava_local(caminho)
+    if not local.acquire(blocking=bloquear):
+        yield False
+        return
+    try:
+        if not FCNTL_AVAILABLE:
+            yield True
+            return
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, "a") as arquivo:
+            try:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX if bloquear else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+    finally:
+        local.release()
+
+
+def travar_diretorio(diretorio: str, bloquear: bool = True):
+    """Trava das alterações de um diretório (anexações e troca na reconstrução)"""
+    return travar(os.path.normpath(diretorio) + ".lock", bloquear)
+
+
+def travar_construcao(diretorio: str, bloquear: bool = False):
+    """Trava de reconstrução (um único processo reconstrói; os demais seguem com o atual)"""
+    return travar(os.path.normpath(diretorio) + ".construcao.lock", bloquear)
+
+
+def identidade_arquivo(caminho: str):
+    """(inode, mtime em ns) do arquivo, ou None se não existir; muda a cada os.replace"""
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        return None
+    return (estado.st_ino, estado.st_mtime_ns)
@@ -0,0 +1,341 @@
+"""
+Motor de alertas clínicos sobre o fluxo de predições
+
+Cada predição é avaliada de forma incremental contra regras que mantêm um
+estado compacto por paciente em memória (sem consultas ao banco). Alertas
+repetidos são suprimidos por um intervalo (deduplicação) e limitados por
+paciente; a entrega é feita por uma thread própria para os sinks
+configurados (log, webhook, SSE), sem atrasar a resposta de /predict.
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+import logging
+import urllib.request
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, Any, Deque, List, Optional
+
+from modelo.preditor import determinar_status_saude
+
+logger = logging.getLogger(__name__)
+
+# Configurações do motor de alertas
+ALERTAS_WEBHOOK_URL = os.getenv("ALERTAS_WEBHOOK_URL")
+ALERTAS_INTERVALO_DEDUP = float(os.getenv("ALERTAS_INTERVALO_DEDUP", "600"))
+ALERTAS_MAX_POR_PACIENTE = int(os.getenv("ALERTAS_MAX_POR_PACIENTE", "5"))
+ALERTAS_JANELA_LIMITE = float(os.getenv("ALERTAS_JANELA_LIMITE", "3600"))
+ALERTAS_MAX_PACIENTES = int(os.getenv("ALERTAS_MAX_PACIENTES", "50000"))
+ALERTAS_TAMANHO_FILA = int(os.getenv("ALERTAS_TAMANHO_FILA", "10000"))
+
+PREDICAO_SUSPEITO = 2
+PREDICAO_PATOLOGICO = 3
+
+# Amostras mantidas para os percentis de latência
+AMOSTRAS_LATENCIA = 1000
+
+
+class EstadoPaciente:
+    """Estado compacto de uma paciente usado pelas regras"""
+
+    __slots__ = ("ultima_confidence", "suspeitos", "alertas")
+
+    def __init__(self):
+        self.ultima_confidence: Optional[float] = None
+        self.suspeitos: Deque[float] = deque()
+        # Instante dos alertas emitidos (limite por paciente)
+        self.alertas: Deque[float] = deque()
+
+
+class Regra(ABC):
+    """Regra incremental: recebe o estado da paciente e a nova predição"""
+
+    nome = "regra"
+    severidade = "media"
+
+    @abstractmethod
+    def avaliar(self, estado: EstadoPaciente, predicao: Dict[str, Any], instante: float) -> Optional[str]:
+        """Retorna a mensagem do alerta ou None"""
+
+    def atualizar(self, estado: EstadoPaciente, predicao: Dict[str, Any], instante: float):
+        """Atualiza o estado após todas as regras serem avaliadas"""
+
+
+class RegraPatologico(Regra):
+    """Resultado Patológico (prediction == 3)"""
+
+    nome = "patologico"
+    severidade = "critica"
+
+    def avaliar(self, estado, predicao, instante):
+        if predicao["prediction"] == PREDICAO_PATOLOGICO:
+            return "Resultado Patológico: requer intervenção médica imediata"
+        return None
+
+
+class RegraSuspeitosRecorrentes(Regra):
+    """N resultados Suspeito dentro de uma janela de tempo"""
+
+    nome = "suspeitos_recorrentes"
+    severidade = "alta"
+
+    def __init__(self, quantidade: int = 3, janela_segundos: float = 2 * 3600):
+        self.quantidade = quantidade
+        self.janela_segundos = janela_segundos
+
+    def avaliar(self, estado, predicao, instante):
+        while estado.suspeitos and estado.suspeitos[0] <= instante - self.janela_segundos:
+            estado.suspeitos.popleft()
+        if predicao["prediction"] != PREDICAO_SUSPEITO:
+            return None
+        estado.suspeitos.append(instante)
+        if len(estado.suspeitos) >= self.quantidade:
+            horas = self.janela_segundos / 3600
+            return f"{len(estado.suspeitos)} resultados Suspeito em {horas:g}h"
+        return None
+
+
+class RegraQuedaConfidence(Regra):
+    """Confidence cruzando para Risco Crítico (limiar de determinar_status_saude)"""
+
+    nome = "queda_confidence"
+    severidade = "alta"
+
+    def avaliar(self, estado, predicao, instante):
+        confidence = predicao["confidence"]
+        if determinar_status_saude(confidence)[0] != "Risco Crítico":
+            return None
+        anterior = estado.ultima_confidence
+        if anterior is None or determinar_status_saude(anterior)[0] != "Risco Crítico":
+            origem = f"{anterior}%" if anterior is not None else "primeiro exame"
+            return f"Confidence caiu para {confidence}% (Risco Crítico; anterior: {origem})"
+        return None
+
+    def atualizar(self, estado, predicao, instante):
+        estado.ultima_confidence = predicao["confidence"]
+
+
+REGRAS_PADRAO = (RegraPatologico, RegraSuspeitosRecorrentes, RegraQuedaConfidence)
+
+
+class SinkLog:
+    """Entrega os alertas no log da aplicação"""
+
+    nome = "log"
+
+    def enviar(self, alerta: Dict[str, Any]):
+        logger.warning(f"🚨 Alerta {alerta['regra']} ({alerta['severidade']}) - "
+                       f"paciente {alerta['patient_id']}: {alerta['mensagem']}")
+
+
+class SinkWebhook:
+    """Envia os alertas em JSON por POST para uma URL"""
+
+    nome = "webhook"
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def enviar(self, alerta: Dict[str, Any]):
+        corpo = json.dumps(alerta, ensure_ascii=False, default=str).encode("utf-8")
+        requisicao = urllib.request.Request(
+            self.url, data=corpo, headers={"Content-Type": "application/json"}, method="POST"
+        )
+        with urllib.request.urlopen(requisicao, timeout=self.timeout) as resposta:
+            resposta.read()
+
+
+class SinkSSE:
+    """Publica os alertas num HubPredicoes (sem coalescência entre alertas)"""
+
+    nome = "sse"
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def enviar(self, alerta: Dict[str, Any]):
+        self.hub.publicar(alerta, evento="alert", chave=alerta["id"])
+
+
+class EstatisticaLatencia:
+    """Contagem, média e percentis das últimas amostras (microssegundos)"""
+
+    def __init__(self):
+        self.total = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+        self.amostras: Deque[float] = deque(maxlen=AMOSTRAS_LATENCIA)
+
+    def registrar(self, microssegundos: float):
+        self.total += 1
+        self.soma += microssegundos
+        self.maximo = max(self.maximo, microssegundos)
+        self.amostras.append(microssegundos)
+
+    def resumo(self) -> Dict[str, Any]:
+        ordenadas = sorted(self.amostras)
+        percentil = lambda p: round(ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))], 2) if ordenadas else None
+        return {
+            "total": self.total,
+            "media_us": round(self.soma / self.total, 2) if self.total else None,
+            "p50_us": percentil(0.50),
+            "p95_us": percentil(0.95),
+            "p99_us": percentil(0.99),
+            "max_us": round(self.maximo, 2)
+        }
+
+
+class MotorAlertas:
+    """Avaliação incremental das regras, deduplicação, limite e entrega assíncrona"""
+
+    def __init__(
+        self,
+        regras: Optional[List[Regra]] = None,
+        sinks: Optional[list] = None,
+        intervalo_dedup: float = ALERTAS_INTERVALO_DEDUP,
+        max_por_paciente: int = ALERTAS_MAX_POR_PACIENTE,
+        janela_limite: float = ALERTAS_JANELA_LIMITE,
+        max_pacientes: int = ALERTAS_MAX_PACIENTES,
+        iniciar: bool = True
+    ):
+        self.regras = regras if regras is not None else [regra() for regra in REGRAS_PADRAO]
+        self.sinks = sinks if sinks is not None else [SinkLog()]
+        self.intervalo_dedup = intervalo_dedup
+        self.max_por_paciente = max_por_paciente
+        self.janela_limite = janela_limite
+        self.max_pacientes = max_pacientes
+
+        self._estados: "OrderedDict[str, EstadoPaciente]" = OrderedDict()
+        # Último envio de cada (paciente, regra) para a deduplicação
+        self._ultimos_envios: "OrderedDict[tuple, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Itens da fila: (instante de enfileiramento, alerta)
+        self._fila: "queue.Queue[tuple]" = queue.Queue(maxsize=ALERTAS_TAMANHO_FILA)
+        self.recentes: Deque[Dict[str, Any]] = deque(maxlen=100)
+
+        self.latencia_regras = {regra.nome: EstatisticaLatencia() for regra in self.regras}
+        self.latencia_entrega = EstatisticaLatencia()
+        self.contadores = {"avaliadas": 0, "emitidos": 0, "deduplicados": 0,
+                           "limitados": 0, "descartados": 0, "falhas_entrega": 0}
+        self._sequencia = 0
+
+        self._thread: Optional[threading.Thread] = None
+        if iniciar:
+            self.iniciar()
+
+    def iniciar(self):
+        """Inicia a thread de entrega"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._entregar, daemon=True)
+            self._thread.start()
+
+    def _estado(self, patient_id: str) -> EstadoPaciente:
+        estado = self._estados.get(patient_id)
+        if estado is None:
+            estado = self._estados[patient_id] = EstadoPaciente()
+            while len(self._estados) > self.max_pacientes:
+                self._estados.popitem(last=False)
+        else:
+            self._estados.move_to_end(patient_id)
+        return estado
+
+    def _permitir(self, estado: EstadoPaciente, patient_id: str, regra: Regra, instante: float) -> bool:
+        """Aplica deduplicação por (paciente, regra) e limite de alertas por paciente"""
+        chave = (patient_id, regra.nome)
+        ultimo = self._ultimos_envios.get(chave)
+        if ultimo is not None and instante - ultimo < self.intervalo_dedup:
+            self.contadores["deduplicados"] += 1
+            return False
+        while estado.alertas and estado.alertas[0] <= instante - self.janela_limite:
+            estado.alertas.popleft()
+        if len(estado.alertas) >= self.max_por_paciente:
+            self.contadores["limitados"] += 1
+            return False
+        estado.alertas.append(instante)
+        self._ultimos_envios[chave] = instante
+        self._ultimos_envios.move_to_end(chave)
+        while len(self._ultimos_envios) > self.max_pacientes * len(self.regras):
+            self._ultimos_envios.popitem(last=False)
+        return True
+
+    def processar(self, predicao: Dict[str, Any], instante: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Avalia uma predição e enfileira os alertas gerados
+
+        Args:
+            predicao: patient_id, prediction, confidence (e opcionalmente ward, record_id)
+            instante: Momento da predição em segundos (padrão: time.time())
+
+        Returns:
+            List[Dict]: Alertas emitidos para esta predição
+        """
+        instante = time.time() if instante is None else instante
+        patient_id = str(predicao["patient_id"])
+        emitidos = []
+
+        with self._lock:
+            estado = self._estado(patient_id)
+            self.contadores["avaliadas"] += 1
+            for regra in self.regras:
+                inicio = time.perf_counter()
+                mensagem = regra.avaliar(estado, predicao, instante)
+                self.latencia_regras[regra.nome].registrar((time.perf_counter() - inicio) * 1e6)
+                if mensagem and self._permitir(estado, patient_id, regra, instante):
+                    self._sequencia += 1
+                    emitidos.append({
+                        "id": f"{int(instante * 1000)}-{self._sequencia}",
+                        "regra": regra.nome,
+                        "severidade": regra.severidade,
+                        "mensagem": mensagem,
+                        "patient_id": patient_id,
+                        "ward": predicao.get("ward"),
+                        "record_id": predicao.get("record_id"),
+                        "prediction": predicao["prediction"],
+                        "confidence": predicao["confidence"],
+                        "timestamp": datetime.fromtimestamp(instante).isoformat()
+                    })
+            for regra in self.regras:
+                regra.atualizar(estado, predicao, instante)
+            self.contadores["emitidos"] += len(emitidos)
+
+        for alerta in emitidos:
+            self.recentes.append(alerta)
+            try:
+                self._fila.put_nowait((time.perf_counter(), alerta))
+            except queue.Full:
+                self.contadores["descartados"] += 1
+        return emitidos
+
+    def _entregar(self):
+        """Thread de entrega: envia cada alerta a todos os sinks"""
+        while True:
+            enfileirado_em, alerta = self._fila.get()
+            for sink in self.sinks:
+                try:
+                    sink.enviar(alerta)
+                except Exception as e:
+                    self.contadores["falhas_entrega"] += 1
+                    logger.error(f"Erro ao entregar alerta via {sink.nome}: {e}")
+            self.latencia_entrega.registrar((time.perf_counter() - enfileirado_em) * 1e6)
+            self._fila.task_done()
+
+    def aguardar_entregas(self):
+        """Bloqueia até a fila de entrega esvaziar"""
+        self._fila.join()
+
+    def metricas(self) -> Dict[str, Any]:
+        """Retorna contadores e latências de avaliação e entrega"""
+        with self._lock:
+            return {
+                **self.contadores,
+                "pacientes_com_estado": len(self._estados),
+                "fila_entrega": self._fila.qsize(),
+                "sinks": [sink.nome for sink in self.sinks],
+                "latencia_regras": {nome: stats.resumo() for nome, stats in self.latencia_regras.items()},
+                "latencia_entrega": self.latencia_entrega.resumo()
+            }
@@ -0,0 +1,189 @@
+"""
+Formato binário compacto de /predict para integração com monitores
+
+Requisição (Content-Type: application/x-fetalcare-f32):
+    [cabeçalho opcional, 8 bytes] magic b"FCTG" | uint16 versão do esquema | uint16 número de features
+    [corpo] N x 21 float32 little-endian, na ordem de EXPECTED_FEATURES
+            (histogram_tendency já numérico: -1, 0, 1)
+
+Sem cabeçalho, o corpo é interpretado na versão atual do esquema. O magic
+lido como float32 daria um baseline_value de ~54339 bpm, então não há
+ambiguidade com um corpo sem cabeçalho.
+
+Resposta (mesmo Content-Type):
+    [cabeçalho, 8 bytes] magic b"FCTR" | uint16 versão do esquema | uint16 número de classes
+    [corpo] N registros de resultado_dtype: uint8 prediction, float32 confidence (%),
+            float32 probabilidades por classe (ordem de model.classes_)
+
+Resposta da triagem (/predict?triage=1, mesmo Content-Type):
+    [cabeçalho, 8 bytes] magic b"FCTT" | uint16 versão do esquema | uint16 total de árvores
+    [corpo] N registros de TRIAGEM_DTYPE: uint8 prediction, int8 faixa de status
+            (modelo/triagem.py; -1 se indefinida), float32 confidence_min e
+            confidence_max (%), uint16 árvores avaliadas
+
+O corpo da requisição é decodificado sem cópia com np.frombuffer; como a
+RandomForest do sklearn trabalha em float32, a matriz chega ao modelo sem
+conversões intermediárias.
+"""
+
+import os
+import struct
+from typing import Tuple
+
+import numpy as np
+
+from modelo.preditor import EXPECTED_FEATURES
+
+# Formato binário
+CONTENT_TYPE_BINARIO = "application/x-fetalcare-f32"
+VERSAO_ESQUEMA = 1
+MAGIC_REQUISICAO = b"FCTG"
+MAGIC_RESPOSTA = b"FCTR"
+MAGIC_TRIAGEM = b"FCTT"
+CABECALHO = struct.Struct("<4sHH")
+BINARIO_MAX_LOTE = int(os.getenv("BINARIO_MAX_LOTE", "10000"))
+
+ENTRADA_DTYPE = np.dtype("<f4")
+BYTES_POR_EXAME = ENTRADA_DTYPE.itemsize * len(EXPECTED_FEATURES)
+
+
+def resultado_dtype(n_classes: int) -> np.dtype:
+    """Registro de um resultado na resposta binária (sem padding)"""
+    return np.dtype([
+        ("prediction", "u1"),
+        ("confidence", "<f4"),
+        ("probabilities", "<f4", (n_classes,))
+    ])
+
+
+# Registro de um resultado na resposta binária da triagem (sem padding)
+TRIAGEM_DTYPE = np.dtype([
+    ("prediction", "u1"),
+    ("faixa", "i1"),
+    ("confidence_min", "<f4"),
+    ("confidence_max", "<f4"),
+    ("trees_evaluated", "<u2")
+])
+
+
+def decodificar_exames(corpo: bytes) -> np.ndarray:
+    """
+    Decodifica o corpo binário de /predict sem copiar os dados
+
+    Args:
+        corpo: Bytes da requisição (com ou sem cabeçalho)
+
+    Returns:
+        np.ndarray: Matriz N x 21 float32 somente leitura, apontando para o corpo
+
+    Raises:
+        ValueError: Se o cabeçalho, o tamanho ou os valores forem inválidos
+    """
+    inicio = 0
+    if corpo[:len(MAGIC_REQUISICAO)] == MAGIC_REQUISICAO:
+        if len(corpo) < CABECALHO.size:
+            raise ValueError("Cabeçalho binário incompleto")
+        _, versao, n_features = CABECALHO.unpack_from(corpo)
+        if versao != VERSAO_ESQUEMA:
+            raise ValueError(f"Versão de esquema não suportada: {versao} (suportada: {VERSAO_ESQUEMA})")
+        if n_features != len(EXPECTED_FEATURES):
+            raise ValueError(f"Esperadas {len(EXPECTED_FEATURES)} features por exame, recebidas {n_features}")
+        inicio = CABECALHO.size
+
+    tamanho = len(corpo) - inicio
+    if tamanho == 0 or tamanho % BYTES_POR_EXAME:
+        raise ValueError(f"Corpo deve conter N x {BYTES_POR_EXAME} bytes ({len(EXPECTED_FEATURES)} float32 por exame)")
+    if tamanho // BYTES_POR_EXAME > BINARIO_MAX_LOTE:
+        raise ValueError(f"Máximo de {BINARIO_MAX_LOTE} exames por requisição")
+
+    matriz = np.frombuffer(corpo, dtype=ENTRADA_DTYPE, offset=inicio).reshape(-1, len(EXPECTED_FEATURES))
+    if not np.isfinite(matriz).all():
+        raise ValueError("Valores NaN ou infinitos no corpo binário")
+    return matriz
+
+
+def codificar_exames(matriz: np.ndarray, cabecalho: bool = True) -> bytes:
+    """Codifica uma matriz N x 21 no formato de requisição (lado do dispositivo)"""
+    corpo = np.ascontiguousarray(matriz, dtype=ENTRADA_DTYPE).tobytes()
+    if not cabecalho:
+        return corpo
+    return CABECALHO.pack(MAGIC_REQUISICAO, VERSAO_ESQUEMA, len(EXPECTED_FEATURES)) + corpo
+
+
+def codificar_resultados(classes: np.ndarray, probabilidades: np.ndarray) -> bytes:
+    """
+    Codifica a resposta binária de um lote
+
+    Args:
+        classes: Classes do modelo (model.classes_)
+        probabilidades: Saída de predict_proba (N x C)
+
+    Returns:
+        bytes: Cabeçalho + N registros de resultado_dtype
+    """
+    indices = probabilidades.argmax(axis=1)
+    resultados = np.empty(len(probabilidades), dtype=resultado_dtype(probabilidades.shape[1]))
+    resultados["prediction"] = np.asarray(classes)[indices]
+    resultados["confidence"] = probabilidades[np.arange(len(indices)), indices] * 100
+    resultados["probabilities"] = probabilidades
+    return CABECALHO.pack(MAGIC_RESPOSTA, VERSAO_ESQUEMA, probabilidades.shape[1]) + resultados.tobytes()
+
+
+def codificar_triagem(avaliacao: dict, total_arvores: int) -> bytes:
+    """
+    Codifica a resposta binária da triagem de um lote
+
+    Args:
+        avaliacao: Saída de TriagemFloresta.avaliar
+        total_arvores: Número de árvores da floresta
+
+    Returns:
+        bytes: Cabeçalho + N registros de TRIAGEM_DTYPE
+    """
+    resultados = np.empty(len(avaliacao["prediction"]), dtype=TRIAGEM_DTYPE)
+    for campo in TRIAGEM_DTYPE.names:
+        resultados[campo] = avaliacao[campo]
+    return CABECALHO.pack(MAGIC_TRIAGEM, VERSAO_ESQUEMA, total_arvores) + resultados.tobytes()
+
+
+def _ler_cabecalho_resposta(corpo: bytes, magic_esperado: bytes):
+    """Valida o cabeçalho de uma resposta binária e retorna o campo uint16 dele"""
+    if len(corpo) < CABECALHO.size:
+        raise ValueError("Resposta binária incompleta")
+    magic, versao, campo = CABECALHO.unpack_from(corpo)
+    if magic != magic_esperado or versao != VERSAO_ESQUEMA:
+        raise ValueError("Cabeçalho de resposta inválido")
+    return campo
+
+
+def _registros(corpo: bytes, dtype: np.dtype) -> np.ndarray:
+    """Registros do corpo de uma resposta binária (após o cabeçalho)"""
+    if (len(corpo) - CABECALHO.size) % dtype.itemsize:
+        raise ValueError("Tamanho da resposta binária inválido")
+    return np.frombuffer(corpo, dtype=dtype, offset=CABECALHO.size)
+
+
+def decodificar_resultados(corpo: bytes) -> np.ndarray:
+    """
+    Decodifica a resposta binária (lado do dispositivo)
+
+    Raises:
+        ValueError: Se o cabeçalho ou o tamanho forem inválidos
+    """
+    n_classes = _ler_cabecalho_resposta(corpo, MAGIC_RESPOSTA)
+    return _registros(corpo, resultado_dtype(n_classes))
+
+
+def decodificar_triagem(corpo: bytes) -> Tuple[np.ndarray, int]:
+    """
+    Decodifica a resposta binária da triagem (lado do dispositivo)
+
+    Returns:
+        Tuple: Registros de TRIAGEM_DTYPE e total de árvores da floresta
+
+    Raises:
+        ValueError: Se o cabeçalho ou o tamanho forem inválidos
+    """
+    total_arvores = _ler_cabecalho_resposta(corpo, MAGIC_TRIAGEM)
+    return _registros(corpo, TRIAGEM_DTYPE), total_arvores
+
@@ -0,0 +1,409 @@
+"""
+Compressão da RandomForest dentro de um orçamento de acurácia
+
+Avalia a floresta em um conjunto rotulado e, para cada profundidade
+candidata, seleciona árvores de forma gulosa (a cada passo entra a árvore
+que mais melhora a pior folga entre acurácia e recall por classe) até que
+o subconjunto fique dentro da tolerância das métricas do modelo original.
+Entre as profundidades viáveis, vence a de menor número de nós.
+
+As árvores podadas são reescritas em pré-ordem: os nós na profundidade de
+corte viram folhas com a distribuição de classes do próprio nó, que é
+exatamente o valor usado na seleção (FlorestaPlana.valor).
+
+Uso (a partir do diretório back-end):
+    python -m modelo.compressao --csv exames_rotulados.csv --tolerancia 0.01 --validacao 0.2
+
+O CSV tem as colunas de EXPECTED_FEATURES (na ordem) e, opcionalmente, a
+classe real (1, 2, 3) como última coluna; sem ela, as predições do modelo
+original são usadas como rótulos (compressão por fidelidade). Uma fração
+estratificada por classe (--validacao) fica fora da seleção e as métricas
+finais são medidas nela.
+"""
+
+import os
+import copy
+import time
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+import joblib
+import numpy as np
+from sklearn.tree._tree import Tree
+
+from modelo.floresta import FlorestaPlana
+from modelo.preditor import MODEL_PATH, predict_proba
+
+logger = logging.getLogger(__name__)
+
+# Queda máxima permitida na acurácia e no recall de cada classe
+COMPRESSAO_TOLERANCIA = float(os.getenv("COMPRESSAO_TOLERANCIA", "0.01"))
+# Fração dos exames reservada para medir o modelo compacto (fora da seleção)
+COMPRESSAO_VALIDACAO = float(os.getenv("COMPRESSAO_VALIDACAO", "0.2"))
+MODELO_COMPACTO_PATH = os.path.join('IA', 'model_compacto.sav')
+
+FOLHA = -1
+FEATURE_INDEFINIDA = -2
+
+
+def calcular_metricas(rotulos: np.ndarray, predicoes: np.ndarray, classes: Sequence) -> Dict[str, Any]:
+    """
+    Acurácia e recall por classe
+
+    Returns:
+        Dict: acuracia e recall ({classe: recall}, apenas classes presentes nos rótulos)
+    """
+    recall = {}
+    for classe in classes:
+        da_classe = rotulos == classe
+        if da_classe.any():
+            recall[int(classe)] = float(np.mean(predicoes[da_classe] == classe))
+    return {"acuracia": float(np.mean(predicoes == rotulos)), "recall": recall}
+
+
+def separar_validacao(rotulos: np.ndarray, fracao: float, semente: int = 0):
+    """
+    Separa índices de seleção e de validação, estratificados por classe
+
+    Args:
+        rotulos: Classe de cada linha
+        fracao: Fração de cada classe reservada para validação (0 desativa)
+        semente: Semente do embaralhamento
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Índices de seleção e de validação
+
+    Raises:
+        ValueError: Se a fração estiver fora de [0, 1)
+    """
+    if not 0 <= fracao < 1:
+        raise ValueError("A fração de validação deve estar em [0, 1)")
+    rng = np.random.RandomState(semente)
+    validacao = []
+    for classe in np.unique(rotulos):
+        da_classe = rng.permutation(np.flatnonzero(rotulos == classe))
+        validacao.append(da_classe[:int(round(len(da_classe) * fracao))])
+    validacao = np.sort(np.concatenate(validacao)) if validacao else np.empty(0, dtype=np.intp)
+    selecao = np.setdiff1d(np.arange(len(rotulos)), validacao)
+    return selecao, validacao
+
+
+def profundidade_nos(arvore) -> np.ndarray:
+    """Profundidade de cada nó de uma árvore do sklearn"""
+    profundidade = np.zeros(arvore.node_count, dtype=np.intp)
+    for no in range(arvore.node_count):
+        if arvore.children_left[no] != FOLHA:
+            profundidade[arvore.children_left[no]] = profundidade[no] + 1
+            profundidade[arvore.children_right[no]] = profundidade[no] + 1
+    return profundidade
+
+
+def podar_arvore(arvore, profundidade: int):
+    """
+    Corta uma árvore do sklearn na profundidade indicada
+
+    Args:
+        arvore: Tree (estimador.tree_)
+        profundidade: Nós nessa profundidade viram folhas
+
+    Returns:
+        Tree: Nova árvore em pré-ordem, com os valores dos nós de corte
+    """
+    estado = arvore.__getstate__()
+    nos, valores = estado["nodes"], estado["values"]
+
+    manter, folha = [], []
+    pilha = [(0, 0)]
+    while pilha:
+        no, nivel = pilha.pop()
+        corte = nos["left_child"][no] == FOLHA or nivel >= profundidade
+        manter.append(no)
+        folha.append(corte)
+        if not corte:
+            pilha.append((nos["right_child"][no], nivel + 1))
+            pilha.append((nos["left_child"][no], nivel + 1))
+
+    manter = np.asarray(manter)
+    folha = np.asarray(folha)
+    novo_indice = np.full(len(nos), FOLHA, dtype=np.int64)
+    novo_indice[manter] = np.arange(len(manter))
+
+    novos = nos[manter].copy()
+    novos["left_child"] = np.where(folha, FOLHA, novo_indice[novos["left_child"]])
+    novos["right_child"] = np.where(folha, FOLHA, novo_indice[novos["right_child"]])
+    novos["feature"][folha] = FEATURE_INDEFINIDA
+    novos["threshold"][folha] = FEATURE_INDEFINIDA
+    novos["missing_go_to_left"][folha] = 0
+
+    podada = Tree(arvore.n_features, np.asarray(arvore.n_classes, dtype=np.intp), arvore.n_outputs)
+    podada.__setstate__({
+        "max_depth": min(int(estado["max_depth"]), profundidade),
+        "node_count": len(manter),
+        "nodes": np.ascontiguousarray(novos),
+        "values": np.ascontiguousarray(valores[manter]),
+    })
+    return podada
+
+
+def montar_modelo(model, arvores: Sequence[int], profundidade: Optional[int] = None):
+    """
+    Cria uma cópia do modelo só com as árvores escolhidas, opcionalmente podadas
+
+    Args:
+        model: RandomForestClassifier original (não é alterada)
+        arvores: Índices das árvores mantidas
+        profundidade: Profundidade máxima (None mantém as árvores inteiras)
+
+    Returns:
+        RandomForestClassifier: Modelo compacto
+    """
+    compacto = copy.copy(model)
+    estimadores = []
+    for indice in arvores:
+        estimador = copy.deepcopy(model.estimators_[indice])
+        if profundidade is not None and profundidade < estimador.tree_.max_depth:
+            estimador.tree_ = podar_arvore(estimador.tree_, profundidade)
+            estimador.max_depth = profundidade
+        estimadores.append(estimador)
+    compacto.estimators_ = estimadores
+    compacto.n_estimators = len(estimadores)
+    if profundidade is not None:
+        compacto.max_depth = min(profundidade, model.max_depth or profundidade)
+    return compacto
+
+
+def nos_por_profundidade(floresta: FlorestaPlana, X: np.ndarray) -> List[np.ndarray]:
+    """
+    Nó alcançado por cada linha em cada árvore, para cada profundidade de corte
+
+    Returns:
+        List[np.ndarray]: Item d (1 a profundidade_max) com os nós N x T (int32)
+    """
+    X = floresta.preparar_entrada(X)
+    por_profundidade = [None]
+    for _, proximos in floresta.percorrer_niveis(X):
+        por_profundidade.append(proximos.astype(np.int32))
+    return por_profundidade
+
+
+def selecionar_arvores(probabilidades: np.ndarray, rotulos: np.ndarray, classes: np.ndarray,
+                       referencia: Dict[str, Any], tolerancia: float) -> Optional[List[int]]:
+    """
+    Seleção gulosa de árvores até atingir o orçamento
+
+    Args:
+        probabilidades: T x N x C (uma matriz de probabilidades por árvore)
+        rotulos: Classe real de cada linha
+        classes: Classes do modelo, na ordem das colunas
+        referencia: Métricas do modelo original
+        tolerancia: Queda máxima permitida
+
+    Returns:
+        List[int]: Índices escolhidos, na ordem de entrada; None se nem todas as árvores bastam
+    """
+    n_arvores = probabilidades.shape[0]
+    indices_rotulo = np.searchsorted(classes, rotulos)
+    if np.any(classes[np.minimum(indices_rotulo, len(classes) - 1)] != rotulos):
+        raise ValueError("Os rótulos têm classes que o modelo não conhece")
+    minimos = [referencia["acuracia"] - tolerancia]
+    mascaras = [np.ones(len(rotulos), dtype=bool)]
+    for classe, recall in referencia["recall"].items():
+        minimos.append(recall - tolerancia)
+        mascaras.append(rotulos == classe)
+    minimos = np.asarray(minimos)[:, None]
+
+    soma = np.zeros(probabilidades.shape[1:])
+    escolhidas: List[int] = []
+    disponiveis = np.ones(n_arvores, dtype=bool)
+    for _ in range(n_arvores):
+        candidatas = np.flatnonzero(disponiveis)
+        acertos = (soma + probabilidades[candidatas]).argmax(axis=2) == indices_rotulo
+        metricas = np.array([acertos[:, mascara].mean(axis=1) for mascara in mascaras])
+        folgas = (metricas - minimos).min(axis=0)
+        melhor = int(np.argmax(folgas))
+
+        escolhida = int(candidatas[melhor])
+        escolhidas.append(escolhida)
+        disponiveis[escolhida] = False
+        soma += probabilidades[escolhida]
+        if folgas[melhor] >= 0:
+            return escolhidas
+    return None
+
+
+def comprimir(model, X: np.ndarray, rotulos: np.ndarray, tolerancia: float = COMPRESSAO_TOLERANCIA,
+              profundidades: Optional[Sequence[int]] = None) -> Dict[str, Any]:
+    """
+    Escolhe o menor subconjunto de árvores/profundidade dentro da tolerância
+
+    Args:
+        model: RandomForestClassifier original
+        X: Matriz N x F do conjunto de avaliação
+        rotulos: Classe real de cada linha
+        tolerancia: Queda máxima permitida na acurácia e no recall por classe
+        profundidades: Profundidades candidatas (padrão: 1 até a profundidade máxima)
+
+    Returns:
+        Dict: arvores, profundidade, nos, metricas, referencia e candidatos avaliados
+
+    Raises:
+        ValueError: Se alguma profundidade for menor que 1 ou nada couber na tolerância
+    """
+    if profundidades is not None and any(int(p) < 1 for p in profundidades):
+        raise ValueError("As profundidades candidatas devem ser >= 1")
+    floresta = FlorestaPlana.de_modelo(model)
+    por_profundidade = nos_por_profundidade(floresta, X)
+    classes = floresta.classes
+    referencia = calcular_metricas(rotulos, classes[floresta.predict_proba(X).argmax(axis=1)], classes)
+    ausentes = [int(classe) for classe in classes if int(classe) not in referencia["recall"]]
+    if ausentes:
+        logger.warning(f"⚠️ Classes sem exemplos no conjunto (recall não verificado): {ausentes}")
+
+    # Profundidade de cada nó, para contar os nós mantidos em cada corte
+    niveis = [profundidade_nos(estimador.tree_) for estimador in model.estimators_]
+    if profundidades is None:
+        profundidades = range(1, floresta.profundidade_max + 1)
+
+    candidatos = []
+    for profundidade in profundidades:
+        profundidade = min(profundidade, floresta.profundidade_max)
+        probabilidades = floresta.valor[por_profundidade[profundidade].T]
+        escolhidas = selecionar_arvores(probabilidades, rotulos, classes, referencia, tolerancia)
+        if escolhidas is None:
+            logger.info(f"Profundidade {profundidade}: fora da tolerância mesmo com todas as árvores")
+            continue
+        nos = int(sum(np.count_nonzero(niveis[i] <= profundidade) for i in escolhidas))
+        predicoes = classes[probabilidades[escolhidas].sum(axis=0).argmax(axis=1)]
+        candidatos.append({
+            "profundidade": profundidade,
+            "arvores": escolhidas,
+            "nos": nos,
+            "metricas": calcular_metricas(rotulos, predicoes, classes),
+        })
+        logger.info(f"Profundidade {profundidade}: {len(escolhidas)} árvores, {nos} nós")
+
+    if not candidatos:
+        raise ValueError("Nenhuma combinação de árvores e profundidade ficou dentro da tolerância")
+
+    melhor = min(candidatos, key=lambda candidato: (candidato["nos"], len(candidato["arvores"])))
+    return {
+        **melhor,
+        "tolerancia": tolerancia,
+        "referencia": referencia,
+        "nos_original": int(floresta.feature.size),
+        "candidatos": [
+            {"profundidade": c["profundidade"], "arvores": len(c["arvores"]), "nos": c["nos"]}
+            for c in candidatos
+        ],
+    }
+
+
+def medir_modelo(caminho: str, X: np.ndarray, linhas_individuais: int = 200) -> Dict[str, Any]:
+    """
+    Tamanho, tempo de carga e latências (sklearn) de um artefato de modelo
+
+    Returns:
+        Dict: modelo carregado, bytes, carga_ms, latencia_linha_ms, latencia_lote_ms e probabilidades
+    """
+    inicio = time.perf_counter()
+    model = joblib.load(caminho)
+    carga = time.perf_counter() - inicio
+
+    predict_proba(model, X[:1])  # aquecimento
+    amostra = X[:linhas_individuais]
+    inicio = time.perf_counter()
+    for linha in amostra:
+        predict_proba(model, linha[None, :])
+    linha_ms = (time.perf_counter() - inicio) * 1000 / len(amostra)
+
+    inicio = time.perf_counter()
+    probabilidades = predict_proba(model, X)
+    lote_ms = (time.perf_counter() - inicio) * 1000
+
+    return {
+        "modelo": model,
+        "bytes": os.path.getsize(caminho),
+        "carga_ms": carga * 1000,
+        "latencia_linha_ms": linha_ms,
+        "latencia_lote_ms": lote_ms,
+        "probabilidades": probabilidades,
+    }
+
+
+def main():
+    """Função principal"""
+    import argparse
+    import warnings
+
+    parser = argparse.ArgumentParser(description="🗜️ Compressão da RandomForest - Sistema FetalCare")
+    parser.add_argument('--csv', required=True,
+                        help='CSV com as colunas de EXPECTED_FEATURES (na ordem) e, opcionalmente, a classe real no fim')
+    parser.add_argument('--modelo', default=MODEL_PATH, help=f'Modelo original (padrão: {MODEL_PATH})')
+    parser.add_argument('--saida', default=MODELO_COMPACTO_PATH, help=f'Modelo compacto (padrão: {MODELO_COMPACTO_PATH})')
+    parser.add_argument('--tolerancia', type=float, default=COMPRESSAO_TOLERANCIA,
+                        help=f'Queda máxima de acurácia e recall por classe (padrão: {COMPRESSAO_TOLERANCIA})')
+    parser.add_argument('--profundidades', type=int, nargs='+', help='Profundidades candidatas >= 1 (padrão: todas)')
+    parser.add_argument('--validacao', type=float, default=COMPRESSAO_VALIDACAO,
+                        help=f'Fração dos exames reservada para as métricas finais, 0 desativa (padrão: {COMPRESSAO_VALIDACAO})')
+    args = parser.parse_args()
+    if args.profundidades and min(args.profundidades) < 1:
+        parser.error("As profundidades devem ser >= 1")
+    if not 0 <= args.validacao < 1:
+        parser.error("--validacao deve estar em [0, 1)")
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    warnings.filterwarnings("ignore", category=UserWarning)
+    from modelo.preditor import EXPECTED_FEATURES
+
+    dados = np.loadtxt(args.csv, delimiter=",", skiprows=1, ndmin=2)
+    X = dados[:, :len(EXPECTED_FEATURES)]
+    original = medir_modelo(args.modelo, X)
+    model = original["modelo"]
+    if dados.shape[1] == len(EXPECTED_FEATURES) + 1:
+        rotulos = dados[:, -1]
+        origem_rotulos = "classe real"
+    elif dados.shape[1] == len(EXPECTED_FEATURES):
+        rotulos = model.classes_[original["probabilidades"].argmax(axis=1)]
+        origem_rotulos = "predições do modelo original"
+    else:
+        parser.error(f"O CSV deve ter {len(EXPECTED_FEATURES)} ou {len(EXPECTED_FEATURES) + 1} colunas")
+
+    selecao, validacao = separar_validacao(rotulos, args.validacao)
+    if len(selecao) == 0:
+        parser.error("Nenhum exame sobrou para a seleção; reduza --validacao")
+    resultado = comprimir(model, X[selecao], rotulos[selecao], args.tolerancia, args.profundidades)
+    compacto = montar_modelo(model, resultado["arvores"], resultado["profundidade"])
+    joblib.dump(compacto, args.saida)
+    reduzido = medir_modelo(args.saida, X)
+
+    # Métricas finais no conjunto de validação (no de seleção se --validacao 0)
+    avaliados = validacao if len(validacao) else selecao
+    classes_original = model.classes_[original["probabilidades"][avaliados].argmax(axis=1)]
+    classes_compacto = model.classes_[reduzido["probabilidades"][avaliados].argmax(axis=1)]
+    concordancia = np.mean(classes_original == classes_compacto)
+    referencia = calcular_metricas(rotulos[avaliados], classes_original, model.classes_)
+    metricas = calcular_metricas(rotulos[avaliados], classes_compacto, model.classes_)
+    conjunto = f"validação, {len(validacao)} exames" if len(validacao) else "seleção, sem validação separada"
+
+    print("=" * 70)
+    print(f"🗜️ Compressão de {args.modelo} ({len(X)} exames, rótulos: {origem_rotulos})")
+    print(f"   seleção: {len(selecao)} exames  validação: {len(validacao)} exames")
+    print("=" * 70)
+    print(f"🌲 Árvores: {len(model.estimators_)} -> {len(resultado['arvores'])}  "
+          f"profundidade: {model.max_depth} -> {resultado['profundidade']}  "
+          f"nós: {resultado['nos_original']} -> {resultado['nos']}")
+    print(f"{'':24}{'original':>12}{'compacto':>12}")
+    print(f"{'📦 tamanho (KB)':<24}{original['bytes'] / 1024:12.0f}{reduzido['bytes'] / 1024:12.0f}")
+    print(f"{'⏱️  carga (ms)':<24}{original['carga_ms']:12.1f}{reduzido['carga_ms']:12.1f}")
+    print(f"{'⏱️  1 exame (ms)':<24}{original['latencia_linha_ms']:12.2f}{reduzido['latencia_linha_ms']:12.2f}")
+    print(f"{'⏱️  lote (ms)':<24}{original['latencia_lote_ms']:12.1f}{reduzido['latencia_lote_ms']:12.1f}")
+    print(f"🎯 Métricas ({conjunto}):")
+    print(f"{'🎯 acurácia':<24}{referencia['acuracia']:12.4f}{metricas['acuracia']:12.4f}")
+    for classe, recall in referencia["recall"].items():
+        print(f"{f'🎯 recall classe {classe}':<24}{recall:12.4f}{metricas['recall'][classe]:12.4f}")
+    print(f"🤝 Concordância com o original ({conjunto}): {concordancia * 100:.2f}%")
+    print(f"✅ Modelo compacto salvo em {args.saida} (tolerância {args.tolerancia})")
+
+
+if __name__ == "__main__":
+    main()
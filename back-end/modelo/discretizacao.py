@@ -0,0 +1,149 @@
+"""
+Floresta sobre features discretizadas pelos thresholds do modelo
+
+Para cada feature, os thresholds usados em qualquer nó da floresta formam
+uma lista ordenada de cortes. A entrada é codificada uma única vez no
+índice do intervalo entre cortes (uint8 se todas as features têm até 256
+intervalos, senão uint16), e cada nó passa a comparar com o seu índice de
+corte k:
+
+    x <= threshold_k   <=>   bin(x) <= k   <=>   bin(x) <= k + 0.5
+
+com bin(x) = quantidade de cortes estritamente menores que float32(x), a
+mesma conversão que o sklearn faz antes de comparar. As árvores reescritas
+continuam sendo Tree do sklearn e o percurso é o compilado (tree_.predict),
+aplicado em blocos de linhas convertidos para float32 que cabem no cache.
+As probabilidades são acumuladas na mesma ordem do predict_proba da
+RandomForest e, portanto, são idênticas bit a bit.
+
+Para rescoring em massa e exportações, a matriz codificada ocupa 1 ou 2
+bytes por feature em vez dos 8 da matriz float64.
+"""
+
+import os
+import logging
+from typing import Iterable, List, Optional
+
+import numpy as np
+from sklearn.tree._tree import Tree
+
+logger = logging.getLogger(__name__)
+
+# Linhas convertidas para float32 e percorridas por vez
+DISCRETIZACAO_BLOCO_LINHAS = int(os.getenv("DISCRETIZACAO_BLOCO_LINHAS", "32768"))
+# Linhas convertidas por vez na codificação (limita a cópia float32 temporária)
+CODIFICACAO_BLOCO_LINHAS = 1 << 18
+
+FOLHA = -1
+
+
+class FlorestaDiscretizada:
+    """RandomForest com thresholds reescritos no espaço de bins"""
+
+    def __init__(self, cortes: List[np.ndarray], arvores: List[Tree], classes: np.ndarray):
+        self.cortes = cortes
+        self.arvores = arvores
+        self.classes = classes
+        self.n_features = len(cortes)
+        self.n_arvores = len(arvores)
+        maior = max(len(c) for c in cortes) + 1
+        self.dtype = np.dtype(np.uint8) if maior <= 256 else np.dtype(np.uint16)
+
+    @classmethod
+    def de_modelo(cls, model) -> "FlorestaDiscretizada":
+        """
+        Reescreve as árvores de uma RandomForestClassifier
+
+        Raises:
+            ValueError: Se alguma feature tiver mais de 65536 intervalos
+        """
+        n_features = model.n_features_in_
+        estados = [estimador.tree_.__getstate__() for estimador in model.estimators_]
+        internos = [estado["nodes"]["left_child"] != FOLHA for estado in estados]
+
+        nos = np.concatenate([estado["nodes"][interno] for estado, interno in zip(estados, internos)])
+        cortes = [np.unique(nos["threshold"][nos["feature"] == f]) for f in range(n_features)]
+        if max(len(c) for c in cortes) >= np.iinfo(np.uint16).max:
+            raise ValueError("Feature com thresholds demais para índices uint16")
+
+        arvores = []
+        for estimador, estado, interno in zip(model.estimators_, estados, internos):
+            novos = estado["nodes"].copy()
+            for f in range(n_features):
+                da_feature = interno & (novos["feature"] == f)
+                novos["threshold"][da_feature] = np.searchsorted(cortes[f], novos["threshold"][da_feature]) + 0.5
+
+            arvore = Tree(estimador.tree_.n_features, np.asarray(estimador.tree_.n_classes, dtype=np.intp),
+                          estimador.tree_.n_outputs)
+            arvore.__setstate__({**estado, "nodes": novos})
+            arvores.append(arvore)
+
+        floresta = cls(cortes, arvores, np.asarray(model.classes_))
+        logger.info(f"🧮 Floresta discretizada: {floresta.n_arvores} árvores, "
+                    f"{sum(len(c) for c in cortes)} cortes, entrada {floresta.dtype.name}")
+        return floresta
+
+    def codificar(self, X: np.ndarray, saida: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Codifica a matriz N x F nos índices de bin
+
+        Args:
+            X: Matriz de features (qualquer tipo numérico)
+            saida: Matriz N x F de self.dtype a preencher (opcional)
+
+        Returns:
+            np.ndarray: Índices de bin (self.dtype)
+
+        Raises:
+            ValueError: Se houver valores não finitos ou número de colunas errado
+        """
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Esperada matriz N x {self.n_features}")
+        if saida is None:
+            saida = np.empty(X.shape, dtype=self.dtype)
+        for inicio in range(0, len(X), CODIFICACAO_BLOCO_LINHAS):
+            bloco = X[inicio:inicio + CODIFICACAO_BLOCO_LINHAS].astype(np.float32)
+            if not np.isfinite(bloco).all():
+                raise ValueError("A matriz contém valores não finitos")
+            for f, cortes in enumerate(self.cortes):
+                saida[inicio:inicio + len(bloco), f] = np.searchsorted(cortes, bloco[:, f].astype(np.float64))
+        return saida
+
+    def predict_proba(self, bins: np.ndarray, bloco: int = DISCRETIZACAO_BLOCO_LINHAS) -> np.ndarray:
+        """
+        Probabilidades por classe a partir da matriz codificada
+
+        Args:
+            bins: Matriz N x F retornada por codificar
+            bloco: Linhas percorridas por vez
+
+        Returns:
+            np.ndarray: N x C, idêntica ao predict_proba do modelo original
+        """
+        n_classes = len(self.classes)
+        probabilidades = np.zeros((len(bins), n_classes))
+        for inicio in range(0, len(bins), bloco):
+            entrada = np.ascontiguousarray(bins[inicio:inicio + bloco], dtype=np.float32)
+            soma = probabilidades[inicio:inicio + len(entrada)]
+            for arvore in self.arvores:
+                soma += arvore.predict(entrada)[:, :n_classes]
+        probabilidades /= self.n_arvores
+        return probabilidades
+
+    def predict(self, bins: np.ndarray, bloco: int = DISCRETIZACAO_BLOCO_LINHAS) -> np.ndarray:
+        """Classe prevista de cada linha da matriz codificada"""
+        return self.classes[self.predict_proba(bins, bloco).argmax(axis=1)]
+
+    def pontuar_blocos(self, blocos: Iterable[np.ndarray]) -> Iterable[np.ndarray]:
+        """
+        Codifica e pontua um fluxo de blocos de exames (rescoring em massa)
+
+        Args:
+            blocos: Matrizes N x F de features, lidas aos poucos
+
+        Yields:
+            np.ndarray: Probabilidades N x C de cada bloco
+        """
+        for X in blocos:
+            yield self.predict_proba(self.codificar(X))
@@ -0,0 +1,295 @@
+"""
+Monitor de drift das entradas e das predições do modelo
+
+Cada chamada a /predict alimenta um sketch de memória constante: para cada
+feature de EXPECTED_FEATURES, contagens em bins fixos definidos pelos quantis
+do perfil de referência, além da frequência das classes previstas. As
+contagens ficam em janelas de tempo (as mais antigas são descartadas).
+
+O sketch vive na memória de cada processo: com vários workers (gunicorn),
+cada um vê só as requisições que atendeu e /drift responde com o sketch do
+worker que recebeu a chamada, identificado pelo campo "pid" do relatório.
+Para uma visão global, consulte cada worker ou rode um único worker.
+
+Os scores comparam as janelas recentes com o perfil de referência:
+PSI (Population Stability Index) por feature e para as classes, e KS
+calculado sobre os histogramas (maior distância entre as CDFs por bin).
+
+O perfil de referência é gerado a partir de um CSV de exames com as colunas
+de EXPECTED_FEATURES (na ordem) e das predições do próprio modelo:
+    python -m modelo.drift --csv Testes/Carga/dados/parametros_ml.csv
+"""
+
+import os
+import json
+import time
+import threading
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional
+
+import numpy as np
+
+from modelo.preditor import EXPECTED_FEATURES, HEALTH_STATUS
+
+logger = logging.getLogger(__name__)
+
+# Configurações do monitor
+PERFIL_REFERENCIA_PATH = os.getenv("DRIFT_PERFIL_REFERENCIA", os.path.join('IA', 'perfil_referencia.json'))
+DRIFT_JANELA_SEGUNDOS = int(os.getenv("DRIFT_JANELA_SEGUNDOS", "3600"))
+DRIFT_MAX_JANELAS = int(os.getenv("DRIFT_MAX_JANELAS", "24"))
+QUANTIS_REFERENCIA = 10
+EPSILON = 1e-4
+
+# Faixas usuais de interpretação do PSI
+LIMIAR_PSI_MODERADO = 0.1
+LIMIAR_PSI_SIGNIFICATIVO = 0.25
+
+CLASSES = sorted(HEALTH_STATUS)
+
+
+def nivel_psi(psi: float) -> str:
+    """Classificação usual do PSI"""
+    if psi >= LIMIAR_PSI_SIGNIFICATIVO:
+        return "significativo"
+    if psi >= LIMIAR_PSI_MODERADO:
+        return "moderado"
+    return "estavel"
+
+
+def psi(esperado: np.ndarray, observado: np.ndarray) -> np.ndarray:
+    """
+    PSI entre proporções por bin (última dimensão), com suavização
+
+    Args:
+        esperado: Proporções de referência (..., B)
+        observado: Proporções observadas (..., B)
+
+    Returns:
+        np.ndarray: PSI por linha
+    """
+    esperado = np.maximum(esperado, EPSILON)
+    observado = np.maximum(observado, EPSILON)
+    return ((observado - esperado) * np.log(observado / esperado)).sum(axis=-1)
+
+
+def ks_histograma(esperado: np.ndarray, observado: np.ndarray) -> np.ndarray:
+    """Maior distância entre as CDFs acumuladas por bin (última dimensão)"""
+    return np.abs(np.cumsum(observado, axis=-1) - np.cumsum(esperado, axis=-1)).max(axis=-1)
+
+
+def criar_perfil(matriz: np.ndarray, predicoes: np.ndarray, origem: str,
+                 versao_modelo: Optional[str] = None, quantis: int = QUANTIS_REFERENCIA) -> Dict[str, Any]:
+    """
+    Cria o perfil de referência: bordas por quantis e proporções por bin
+
+    Features discretas (poucos valores distintos) ficam com menos bins, pois
+    quantis repetidos são unidos.
+
+    Args:
+        matriz: Exames de referência N x 21 (ordem de EXPECTED_FEATURES)
+        predicoes: Classes previstas pelo modelo para os exames
+        origem: Descrição da origem dos dados
+        versao_modelo: Versão do model.sav usada nas predições
+        quantis: Quantidade de bins por quantis
+
+    Returns:
+        Dict: Perfil serializável em JSON
+    """
+    features = {}
+    for i, feature in enumerate(EXPECTED_FEATURES):
+        valores = matriz[:, i]
+        bordas = np.unique(np.quantile(valores, np.linspace(0, 1, quantis + 1)[1:-1]))
+        posicoes = np.searchsorted(bordas, valores, side="right")
+        contagens = np.bincount(posicoes, minlength=len(bordas) + 1)
+        features[feature] = {
+            "bordas": bordas.tolist(),
+            "proporcoes": (contagens / len(valores)).tolist()
+        }
+    classes = np.asarray(predicoes).astype(int)
+    return {
+        "versao": 1,
+        "origem": origem,
+        "versao_modelo": versao_modelo,
+        "total": int(len(matriz)),
+        "criado_em": datetime.utcnow().isoformat(),
+        "features": features,
+        "classes": {str(c): float(np.mean(classes == c)) for c in CLASSES}
+    }
+
+
+def carregar_perfil(caminho: str = PERFIL_REFERENCIA_PATH) -> Optional[Dict[str, Any]]:
+    """Carrega o perfil de referência (None se não existir)"""
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, "r", encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+class JanelaDrift:
+    """Contagens de uma janela de tempo"""
+
+    __slots__ = ("inicio", "contagens", "classes", "total")
+
+    def __init__(self, inicio: int, n_features: int, n_bins: int):
+        self.inicio = inicio
+        self.contagens = np.zeros((n_features, n_bins), dtype=np.int64)
+        self.classes = np.zeros(len(CLASSES), dtype=np.int64)
+        self.total = 0
+
+
+class MonitorDrift:
+    """Sketch por janela das features e classes previstas, comparado ao perfil de referência"""
+
+    def __init__(self, perfil: Dict[str, Any], janela_segundos: int = DRIFT_JANELA_SEGUNDOS,
+                 max_janelas: int = DRIFT_MAX_JANELAS):
+        self.perfil = perfil
+        self.janela_segundos = janela_segundos
+        n_bins = max(len(perfil["features"][f]["proporcoes"]) for f in EXPECTED_FEATURES)
+        self.n_bins = n_bins
+
+        # Bordas em matriz F x (B - 1), completadas com +inf (bins extras nunca recebem valores)
+        self.bordas = np.full((len(EXPECTED_FEATURES), n_bins - 1), np.inf)
+        self.referencia = np.zeros((len(EXPECTED_FEATURES), n_bins))
+        for i, feature in enumerate(EXPECTED_FEATURES):
+            bordas = perfil["features"][feature]["bordas"]
+            self.bordas[i, :len(bordas)] = bordas
+            self.referencia[i, :len(bordas) + 1] = perfil["features"][feature]["proporcoes"]
+        self.referencia_classes = np.array([perfil["classes"].get(str(c), 0.0) for c in CLASSES])
+
+        self._linhas = np.arange(len(EXPECTED_FEATURES))
+        self._janelas: Deque[JanelaDrift] = deque(maxlen=max_janelas)
+        self._lock = threading.Lock()
+        self.registrados = 0
+
+    def registrar(self, features: np.ndarray, prediction: int, instante: Optional[float] = None):
+        """
+        Registra um exame (vetor de 21 features) e a classe prevista
+
+        Custo O(F x B) em NumPy, sem alocação proporcional ao histórico.
+        """
+        posicoes = (np.asarray(features, dtype=np.float64).reshape(-1)[:, None] >= self.bordas).sum(axis=1)
+        inicio = int(instante if instante is not None else time.time()) // self.janela_segundos * self.janela_segundos
+        with self._lock:
+            if not self._janelas or self._janelas[-1].inicio != inicio:
+                self._janelas.append(JanelaDrift(inicio, len(EXPECTED_FEATURES), self.n_bins))
+            janela = self._janelas[-1]
+            janela.contagens[self._linhas, posicoes] += 1
+            if prediction in CLASSES:
+                janela.classes[CLASSES.index(prediction)] += 1
+            janela.total += 1
+            self.registrados += 1
+
+    def registrar_lote(self, matriz: np.ndarray, predicoes: np.ndarray, instante: Optional[float] = None):
+        """Registra um lote de exames (N x 21) na janela atual com uma única contagem vetorizada"""
+        matriz = np.asarray(matriz, dtype=np.float64)
+        if len(matriz) == 0:
+            return
+        posicoes = (matriz[:, :, None] >= self.bordas).sum(axis=2) + self._linhas * self.n_bins
+        contagens = np.bincount(posicoes.ravel(), minlength=len(EXPECTED_FEATURES) * self.n_bins)
+        classes = np.array([np.count_nonzero(np.asarray(predicoes) == c) for c in CLASSES])
+        inicio = int(instante if instante is not None else time.time()) // self.janela_segundos * self.janela_segundos
+        with self._lock:
+            if not self._janelas or self._janelas[-1].inicio != inicio:
+                self._janelas.append(JanelaDrift(inicio, len(EXPECTED_FEATURES), self.n_bins))
+            janela = self._janelas[-1]
+            janela.contagens += contagens.reshape(len(EXPECTED_FEATURES), self.n_bins)
+            janela.classes += classes
+            janela.total += len(matriz)
+            self.registrados += len(matriz)
+
+    def _scores(self, contagens: np.ndarray, classes: np.ndarray, total: int) -> Dict[str, Any]:
+        observado = contagens / total
+        psi_features = psi(self.referencia, observado)
+        ks_features = ks_histograma(self.referencia, observado)
+        psi_classes = float(psi(self.referencia_classes, classes / total))
+        return {
+            "total": int(total),
+            "psi_classes": round(psi_classes, 4),
+            "nivel_classes": nivel_psi(psi_classes),
+            "classes": {HEALTH_STATUS[c]["status"]: int(n) for c, n in zip(CLASSES, classes)},
+            "psi_max": round(float(psi_features.max()), 4),
+            "features": {
+                feature: {"psi": round(float(p), 4), "ks": round(float(k), 4), "nivel": nivel_psi(float(p))}
+                for feature, p, k in zip(EXPECTED_FEATURES, psi_features, ks_features)
+            }
+        }
+
+    def relatorio(self, janelas: int = 1) -> Dict[str, Any]:
+        """
+        Scores das últimas janelas somadas e a série de PSI por janela
+
+        Cobre apenas as predições registradas neste processo (campo "pid").
+
+        Args:
+            janelas: Quantidade de janelas recentes somadas no relatório principal
+        """
+        with self._lock:
+            copias = [(j.inicio, j.contagens.copy(), j.classes.copy(), j.total) for j in self._janelas]
+
+        resposta: Dict[str, Any] = {
+            "referencia": {k: self.perfil.get(k) for k in ("origem", "versao_modelo", "total", "criado_em")},
+            "janela_segundos": self.janela_segundos,
+            "pid": os.getpid(),
+            "registrados": self.registrados
+        }
+        recentes = copias[-max(1, janelas):]
+        total = sum(t for _, _, _, t in recentes)
+        if total:
+            resposta["atual"] = self._scores(
+                sum(c for _, c, _, _ in recentes), sum(k for _, _, k, _ in recentes), total
+            )
+            resposta["atual"]["inicio"] = datetime.utcfromtimestamp(recentes[0][0]).isoformat()
+        resposta["serie"] = [
+            {
+                "inicio": datetime.utcfromtimestamp(inicio).isoformat(),
+                "total": int(t),
+                "psi_max": round(float(psi(self.referencia, c / t).max()), 4),
+                "psi_classes": round(float(psi(self.referencia_classes, k / t)), 4)
+            }
+            for inicio, c, k, t in copias if t
+        ]
+        return resposta
+
+
+def criar_monitor(caminho: str = PERFIL_REFERENCIA_PATH) -> Optional[MonitorDrift]:
+    """Cria o monitor a partir do perfil salvo (None se o perfil ainda não foi gerado)"""
+    try:
+        perfil = carregar_perfil(caminho)
+    except (OSError, ValueError) as e:
+        logger.error(f"Erro ao carregar o perfil de referência de drift: {e}")
+        return None
+    if perfil is None:
+        logger.warning(f"Perfil de referência de drift não encontrado em {caminho}")
+        return None
+    return MonitorDrift(perfil)
+
+
+def main():
+    """Função principal"""
+    import argparse
+    from modelo.preditor import MODEL_PATH, carregar_modelo, calcular_versao_modelo, predict_proba
+
+    parser = argparse.ArgumentParser(description="📉 Perfil de referência do monitor de drift - Sistema FetalCare")
+    parser.add_argument('--csv', required=True, help='CSV de exames com as colunas de EXPECTED_FEATURES (na ordem)')
+    parser.add_argument('--saida', default=PERFIL_REFERENCIA_PATH, help=f'Arquivo do perfil (padrão: {PERFIL_REFERENCIA_PATH})')
+    parser.add_argument('--quantis', type=int, default=QUANTIS_REFERENCIA, help=f'Bins por feature (padrão: {QUANTIS_REFERENCIA})')
+    args = parser.parse_args()
+
+    matriz = np.loadtxt(args.csv, delimiter=",", skiprows=1, ndmin=2)
+    if matriz.shape[1] != len(EXPECTED_FEATURES):
+        parser.error(f"O CSV deve ter {len(EXPECTED_FEATURES)} colunas")
+
+    model = carregar_modelo(MODEL_PATH)
+    predicoes = model.classes_[predict_proba(model, matriz).argmax(axis=1)]
+    perfil = criar_perfil(matriz, predicoes, origem=os.path.basename(args.csv),
+                          versao_modelo=calcular_versao_modelo(MODEL_PATH), quantis=args.quantis)
+
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(perfil, arquivo, ensure_ascii=False, indent=2)
+    print(f"✅ Perfil de referência salvo em {args.saida} ({perfil['total']} exames)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Explicação das predições por contribuição de cada parâmetro
+
+Decomposição dos caminhos de decisão da RandomForest (estilo treeinterpreter):
+em cada árvore, a probabilidade da folha é igual à da raiz mais a soma das
+variações entre nós consecutivos do caminho, e cada variação é atribuída à
+feature que dividiu o nó. A média sobre as árvores dá
+
+    predict_proba(x) = vies + soma(contribuicoes[feature])
+
+O cálculo reaproveita o percurso vetorizado da FlorestaPlana, então explicar
+um exame custa o mesmo que uma predição. Resultados ficam em um cache LRU por
+(versão do modelo, linha de entrada).
+"""
+
+import os
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from modelo.floresta import FlorestaPlana
+from modelo.preditor import EXPECTED_FEATURES, HEALTH_STATUS, STATUS_DESCONHECIDO
+
+logger = logging.getLogger(__name__)
+
+# Configurações das explicações
+EXPLICACAO_CACHE_MAX = int(os.getenv("EXPLICACAO_CACHE_MAX", "4096"))
+EXPLICACAO_MAX_LOTE = int(os.getenv("EXPLICACAO_MAX_LOTE", "1000"))
+
+
+def exames_da_requisicao(dados: Any) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Extrai os exames do corpo de /explain
+
+    Args:
+        dados: Um exame (parâmetros do /predict) ou {"exams": [exame, ...]}
+
+    Returns:
+        Tuple[List[Dict], bool]: (exames, se a requisição é em lote)
+
+    Raises:
+        ValueError: Se o corpo for inválido ou o lote exceder EXPLICACAO_MAX_LOTE
+    """
+    if not isinstance(dados, dict) or not dados:
+        raise ValueError("Nenhum dado fornecido")
+    if "exams" not in dados:
+        return [dados], False
+
+    exames = dados["exams"]
+    if not isinstance(exames, list) or not all(isinstance(e, dict) for e in exames):
+        raise ValueError("exams deve ser uma lista de objetos")
+    if len(exames) > EXPLICACAO_MAX_LOTE:
+        raise ValueError(f"Máximo de {EXPLICACAO_MAX_LOTE} exames por requisição")
+    return exames, True
+
+
+class CacheExplicacoes:
+    """Cache LRU de (probabilidades, contribuições) por linha de entrada"""
+
+    def __init__(self, max_entradas: int = EXPLICACAO_CACHE_MAX):
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[Hashable, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def obter(self, chave: Hashable) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        with self._lock:
+            valor = self._entradas.get(chave)
+            if valor is None:
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.hits += 1
+            return valor
+
+    def armazenar(self, chave: Hashable, valor: Tuple[np.ndarray, np.ndarray]):
+        with self._lock:
+            self._entradas[chave] = valor
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def metricas(self) -> Dict[str, Any]:
+        """Retorna as métricas de uso do cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas
+            }
+
+
+class ExplicadorFloresta:
+    """Contribuições por feature das predições de uma RandomForestClassifier"""
+
+    def __init__(self, model, versao: Optional[str] = None, cache: Optional[CacheExplicacoes] = None):
+        self.floresta = FlorestaPlana.de_modelo(model)
+        self.versao = versao
+        self.cache = cache if cache is not None else CacheExplicacoes()
+        self.vies = self.floresta.valor[self.floresta.raizes].mean(axis=0)
+
+    def contribuicoes(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calcula probabilidades e contribuições sem passar pelo cache
+
+        Args:
+            X: Matriz N x F de features
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: probabilidades N x C e contribuições N x F x C
+        """
+        floresta = self.floresta
+        X = floresta.preparar_entrada(X)
+        n_linhas, n_features = X.shape
+        n_classes = floresta.valor.shape[1]
+
+        # Índice (linha, feature) de cada passo e variação de probabilidade que ele causou
+        base_linha = (np.arange(n_linhas) * n_features)[:, None]
+        indices, variacoes = [], []
+        for nos, proximos in floresta.percorrer_niveis(X):
+            indices.append((base_linha + floresta.feature[nos]).ravel())
+            variacoes.append((floresta.valor[proximos] - floresta.valor[nos]).reshape(-1, n_classes))
+        indices = np.concatenate(indices)
+        variacoes = np.concatenate(variacoes)
+
+        contribuicoes = np.empty((n_linhas * n_features, n_classes))
+        for classe in range(n_classes):
+            contribuicoes[:, classe] = np.bincount(indices, weights=variacoes[:, classe],
+                                                   minlength=n_linhas * n_features)
+        contribuicoes = contribuicoes.reshape(n_linhas, n_features, n_classes) / floresta.n_arvores
+
+        # Após o último nível, proximos são as folhas alcançadas
+        probabilidades = floresta.valor[proximos].mean(axis=1)
+        return probabilidades, contribuicoes
+
+    def explicar_matriz(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Probabilidades e contribuições de um lote, calculando só as linhas fora do cache
+
+        Args:
+            X: Matriz N x F de features
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: probabilidades N x C e contribuições N x F x C
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        n_classes = self.floresta.valor.shape[1]
+        probabilidades = np.empty((len(X), n_classes))
+        contribuicoes = np.empty((len(X), X.shape[1], n_classes))
+
+        chaves = [(self.versao, linha.tobytes()) for linha in X]
+        pendentes = []
+        for i, chave in enumerate(chaves):
+            encontrado = self.cache.obter(chave)
+            if encontrado is None:
+                pendentes.append(i)
+            else:
+                probabilidades[i], contribuicoes[i] = encontrado
+
+        if pendentes:
+            novas_probabilidades, novas_contribuicoes = self.contribuicoes(X[pendentes])
+            for j, i in enumerate(pendentes):
+                probabilidades[i] = novas_probabilidades[j]
+                contribuicoes[i] = novas_contribuicoes[j]
+                self.cache.armazenar(chaves[i], (novas_probabilidades[j], novas_contribuicoes[j]))
+
+        return probabilidades, contribuicoes
+
+    def explicar(self, X: np.ndarray, top: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Explicação de cada linha no formato da API /explain
+
+        Args:
+            X: Matriz N x F de features (ordem de EXPECTED_FEATURES)
+            top: Quantidade máxima de features por explicação (padrão: todas)
+
+        Returns:
+            List[Dict]: Predição, probabilidades, viés e contribuições ordenadas
+                pelo impacto na classe prevista
+        """
+        probabilidades, contribuicoes = self.explicar_matriz(X)
+        classes = self.floresta.classes.astype(int)
+        nomes = [HEALTH_STATUS.get(int(c), STATUS_DESCONHECIDO)["status"] for c in classes]
+
+        explicacoes = []
+        for linha, proba, contrib in zip(X, probabilidades, contribuicoes):
+            indice = int(proba.argmax())
+            ordem = np.argsort(-np.abs(contrib[:, indice]), kind="stable")[:top]
+            explicacoes.append({
+                "prediction": int(classes[indice]),
+                "status": nomes[indice],
+                "confidence": round(float(proba[indice]) * 100, 2),
+                "probabilities": {nome: round(float(p), 6) for nome, p in zip(nomes, proba)},
+                "bias": {nome: round(float(v), 6) for nome, v in zip(nomes, self.vies)},
+                "contributions": [
+                    {
+                        "feature": EXPECTED_FEATURES[f],
+                        "value": float(linha[f]),
+                        "contribution": round(float(contrib[f, indice]), 6),
+                        "by_class": {nome: round(float(v), 6) for nome, v in zip(nomes, contrib[f])}
+                    }
+                    for f in ordem
+                ]
+            })
+        return explicacoes
+
+    def metricas(self) -> Dict[str, Any]:
+        """Retorna as métricas do explicador e do cache"""
+        return {
+            "model_version": self.versao,
+            "arvores": self.floresta.n_arvores,
+            "nos": int(len(self.floresta.feature)),
+            "profundidade_max": int(self.floresta.profundidade_max),
+            "cache": self.cache.metricas()
+        }
@@ -0,0 +1,141 @@
+"""
+Exportação da RandomForest para avaliação no navegador
+
+Gera um arquivo binário compacto (front-end/modelo/floresta.bin) lido por
+front-end/floresta.js com typed arrays, sem parse de JSON dos nós:
+
+    "FCRF" | uint32 tamanho do cabeçalho | cabeçalho JSON (UTF-8, completado até múltiplo de 4)
+    raizes    int32[T]    primeiro nó de cada árvore
+    direita   int32[N]    nó interno: filho direito (o esquerdo é sempre o nó seguinte);
+                          folha: índice da folha em valores
+    threshold float32[N]  maior float32 <= threshold do sklearn
+    feature   int8[N]     -1 nas folhas (completado até múltiplo de 4)
+    valores   float32[L x C] probabilidades normalizadas por folha
+
+O sklearn compara a entrada convertida para float32 com thresholds float64;
+arredondar o threshold para baixo em float32 preserva exatamente o
+resultado de x <= threshold para qualquer x float32.
+
+Uso (a partir do diretório back-end):
+    python -m modelo.exportar_floresta
+"""
+
+import os
+import json
+import struct
+import logging
+from typing import Any, Dict
+
+import numpy as np
+
+from modelo.preditor import EXPECTED_FEATURES
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"FCRF"
+VERSAO_FORMATO = 1
+FLORESTA_WEB_PATH = os.path.join('..', 'front-end', 'modelo', 'floresta.bin')
+
+
+def threshold_float32(threshold: np.ndarray) -> np.ndarray:
+    """Maior float32 menor ou igual a cada threshold float64"""
+    arredondado = threshold.astype(np.float32)
+    acima = arredondado.astype(np.float64) > threshold
+    arredondado[acima] = np.nextafter(arredondado[acima], np.float32(-np.inf))
+    return arredondado
+
+
+def exportar_floresta(model, versao_modelo: str = None) -> bytes:
+    """
+    Serializa uma RandomForestClassifier no formato de floresta.bin
+
+    Args:
+        model: RandomForestClassifier treinada
+        versao_modelo: Versão do model.sav (gravada no cabeçalho)
+
+    Returns:
+        bytes: Conteúdo do arquivo
+
+    Raises:
+        ValueError: Se alguma árvore não estiver em pré-ordem (filho esquerdo = nó seguinte)
+    """
+    raizes, direitas, thresholds, features, valores = [], [], [], [], []
+    deslocamento = 0
+    folhas = 0
+    for estimador in model.estimators_:
+        arvore = estimador.tree_
+        indices = np.arange(arvore.node_count)
+        folha = arvore.children_left == -1
+        if np.any(arvore.children_left[~folha] != indices[~folha] + 1):
+            raise ValueError("Árvore fora de pré-ordem: filho esquerdo não é o nó seguinte")
+
+        valor = arvore.value[folha, 0, :].astype(np.float64)
+        valor /= valor.sum(axis=1, keepdims=True)
+
+        indice_folha = np.cumsum(folha) - 1 + folhas
+        raizes.append(deslocamento)
+        direitas.append(np.where(folha, indice_folha, arvore.children_right + deslocamento))
+        thresholds.append(np.where(folha, 0.0, arvore.threshold))
+        features.append(np.where(folha, -1, arvore.feature))
+        valores.append(valor)
+        deslocamento += arvore.node_count
+        folhas += int(folha.sum())
+
+    n_classes = len(model.classes_)
+    arrays = [
+        ("raizes", np.asarray(raizes, dtype="<i4")),
+        ("direita", np.concatenate(direitas).astype("<i4")),
+        ("threshold", threshold_float32(np.concatenate(thresholds)).astype("<f4")),
+        ("feature", np.concatenate(features).astype("i1")),
+        ("valores", np.concatenate(valores).astype("<f4").ravel()),
+    ]
+
+    cabecalho: Dict[str, Any] = {
+        "versao_formato": VERSAO_FORMATO,
+        "versao_modelo": versao_modelo,
+        "features": EXPECTED_FEATURES,
+        "classes": [int(c) for c in model.classes_],
+        "n_arvores": len(raizes),
+        "n_nos": deslocamento,
+        "n_folhas": folhas,
+        "n_classes": n_classes,
+        "arrays": {}
+    }
+
+    # Offsets relativos ao início dos dados; cada array começa alinhado em 4 bytes
+    posicao = 0
+    for nome, array in arrays:
+        cabecalho["arrays"][nome] = {"offset": posicao, "tamanho": int(array.size)}
+        posicao += -(-array.nbytes // 4) * 4
+
+    texto = json.dumps(cabecalho, separators=(",", ":")).encode("utf-8")
+    texto += b" " * (-len(texto) % 4)
+    partes = [MAGIC, struct.pack("<I", len(texto)), texto]
+    for _, array in arrays:
+        dados = array.tobytes()
+        partes.append(dados + b"\0" * (-len(dados) % 4))
+    return b"".join(partes)
+
+
+def main():
+    """Função principal"""
+    import argparse
+    from modelo.preditor import MODEL_PATH, carregar_modelo, calcular_versao_modelo
+
+    parser = argparse.ArgumentParser(description="🌲 Exporta a RandomForest para o front-end - Sistema FetalCare")
+    parser.add_argument('--modelo', default=MODEL_PATH, help=f'Arquivo do modelo (padrão: {MODEL_PATH})')
+    parser.add_argument('--saida', default=FLORESTA_WEB_PATH, help=f'Arquivo gerado (padrão: {FLORESTA_WEB_PATH})')
+    args = parser.parse_args()
+
+    model = carregar_modelo(args.modelo)
+    conteudo = exportar_floresta(model, calcular_versao_modelo(args.modelo))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+    with open(args.saida, "wb") as arquivo:
+        arquivo.write(conteudo)
+    print(f"✅ Floresta exportada em {args.saida} ({len(conteudo) / 1024:.0f} KB, "
+          f"{len(model.estimators_)} árvores)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Representação plana da RandomForest para percursos vetorizados
+
+Os nós de todas as árvores são concatenados em arrays únicos (feature,
+threshold, filhos e probabilidades por classe). O percurso avança todas as
+árvores de todas as linhas ao mesmo tempo, um nível por iteração, e é
+reutilizado pelas explicações e outras análises que precisam dos caminhos
+de decisão, não só das folhas.
+"""
+
+import logging
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class FlorestaPlana:
+    """Nós da floresta concatenados em arrays NumPy"""
+
+    def __init__(self, feature, threshold, esquerda, direita, valor, raizes, profundidade_max, classes):
+        self.feature = feature
+        self.threshold = threshold
+        self.esquerda = esquerda
+        self.direita = direita
+        self.valor = valor
+        self.raizes = raizes
+        self.profundidade_max = profundidade_max
+        self.classes = classes
+        self.n_arvores = len(raizes)
+        self.n_features = None
+
+    @classmethod
+    def de_modelo(cls, model) -> "FlorestaPlana":
+        """
+        Concatena os nós das árvores de uma RandomForestClassifier
+
+        Folhas apontam para si mesmas (threshold +inf), de modo que o
+        percurso pode rodar profundidade_max níveis sem ramificações.
+        """
+        features, thresholds, esquerdas, direitas, valores, raizes = [], [], [], [], [], []
+        deslocamento = 0
+        for estimador in model.estimators_:
+            arvore = estimador.tree_
+            indices = np.arange(arvore.node_count)
+            folha = arvore.children_left == -1
+
+            valor = arvore.value[:, 0, :].astype(np.float64)
+            valor /= valor.sum(axis=1, keepdims=True)
+
+            features.append(np.where(folha, 0, arvore.feature).astype(np.intp))
+            thresholds.append(np.where(folha, np.inf, arvore.threshold))
+            esquerdas.append(np.where(folha, indices, arvore.children_left) + deslocamento)
+            direitas.append(np.where(folha, indices, arvore.children_right) + deslocamento)
+            valores.append(valor)
+            raizes.append(deslocamento)
+            deslocamento += arvore.node_count
+
+        floresta = cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            esquerda=np.concatenate(esquerdas),
+            direita=np.concatenate(direitas),
+            valor=np.concatenate(valores),
+            raizes=np.asarray(raizes, dtype=np.intp),
+            profundidade_max=max(estimador.tree_.max_depth for estimador in model.estimators_),
+            classes=np.asarray(model.classes_)
+        )
+        floresta.n_features = model.n_features_in_
+        logger.info(f"🌲 Floresta plana: {floresta.n_arvores} árvores, {deslocamento} nós")
+        return floresta
+
+    @staticmethod
+    def preparar_entrada(X: np.ndarray) -> np.ndarray:
+        """Converte para float32, como o sklearn faz antes de comparar com os thresholds"""
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def percorrer_niveis(self, X: np.ndarray, raizes: Optional[np.ndarray] = None
+                         ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Percorre todas as árvores de todas as linhas, um nível por vez
+
+        Args:
+            X: Matriz N x F já preparada (float32)
+            raizes: Raízes das árvores percorridas (padrão: todas)
+
+        Yields:
+            Tuple[np.ndarray, np.ndarray]: (nós atuais, próximos nós), ambos N x T
+        """
+        raizes = self.raizes if raizes is None else raizes
+        linhas = np.arange(X.shape[0])[:, None]
+        nos = np.broadcast_to(raizes, (X.shape[0], len(raizes)))
+        for _ in range(self.profundidade_max):
+            vai_esquerda = X[linhas, self.feature[nos]] <= self.threshold[nos]
+            proximos = np.where(vai_esquerda, self.esquerda[nos], self.direita[nos])
+            yield nos, proximos
+            nos = proximos
+
+    def folhas(self, X: np.ndarray, raizes: Optional[np.ndarray] = None) -> np.ndarray:
+        """Índices globais das folhas alcançadas (N x T), opcionalmente só nas árvores de raizes"""
+        X = self.preparar_entrada(X)
+        raizes = self.raizes if raizes is None else raizes
+        nos = np.broadcast_to(raizes, (X.shape[0], len(raizes)))
+        for _, proximos in self.percorrer_niveis(X, raizes):
+            nos = proximos
+        return nos
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Probabilidades por classe (média das folhas, como RandomForestClassifier)"""
+        return self.valor[self.folhas(X)].mean(axis=1)
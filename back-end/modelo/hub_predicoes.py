@@ -0,0 +1,182 @@
+"""
+Hub de publicação/assinatura das predições em tempo real
+
+Cada resultado de /predict é publicado nos tópicos da paciente
+("paciente:<patient_id>"), do setor ("setor:<ward>") e no tópico geral.
+A mensagem SSE é serializada uma única vez e entregue a todos os
+assinantes dos tópicos. Cada assinante guarda no máximo uma mensagem
+pendente por paciente: rajadas são coalescidas no estado mais recente e,
+se o limite de pacientes pendentes for atingido (cliente lento), a
+pendência mais antiga é descartada.
+"""
+
+import os
+import threading
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Set
+
+from banco.sse import SSE_INTERVALO_HEARTBEAT, formatar_evento, transmitir
+
+logger = logging.getLogger(__name__)
+
+# Configurações do hub
+HUB_MAX_PENDENTES = int(os.getenv("HUB_MAX_PENDENTES", "1024"))
+HUB_MAX_ESTADOS = int(os.getenv("HUB_MAX_ESTADOS", "10000"))
+
+TOPICO_TODOS = "todos"
+SETOR_PADRAO = "geral"
+
+
+def topicos_predicao(patient_id: str, ward: Optional[str]) -> List[str]:
+    """Tópicos em que uma predição é publicada"""
+    return [f"paciente:{patient_id}", f"setor:{ward or SETOR_PADRAO}", TOPICO_TODOS]
+
+
+class AssinanteCoalescente:
+    """Pendências de um cliente: no máximo uma mensagem por paciente"""
+
+    def __init__(self, topicos: Iterable[str], max_pendentes: int = HUB_MAX_PENDENTES):
+        self.topicos = frozenset(topicos)
+        self.max_pendentes = max_pendentes
+        self._pendentes: "OrderedDict[str, str]" = OrderedDict()
+        self._condicao = threading.Condition()
+        self.entregues = 0
+        self.coalescidas = 0
+        self.descartadas = 0
+
+    def entregar(self, chave: str, mensagem: str):
+        """Enfileira sem bloquear quem publica"""
+        with self._condicao:
+            if chave in self._pendentes:
+                # Mantém a posição na fila, mas apenas o estado mais recente
+                self._pendentes[chave] = mensagem
+                self.coalescidas += 1
+            else:
+                if len(self._pendentes) >= self.max_pendentes:
+                    self._pendentes.popitem(last=False)
+                    self.descartadas += 1
+                self._pendentes[chave] = mensagem
+            self._condicao.notify()
+
+    def proxima(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Retira a pendência mais antiga (None se o timeout expirar)"""
+        with self._condicao:
+            if not self._pendentes:
+                self._condicao.wait(timeout)
+            if not self._pendentes:
+                return None
+            _, mensagem = self._pendentes.popitem(last=False)
+            self.entregues += 1
+            return mensagem
+
+    def pendentes(self) -> int:
+        with self._condicao:
+            return len(self._pendentes)
+
+
+class HubPredicoes:
+    """Pub/sub em processo das predições por paciente e por setor"""
+
+    def __init__(self, max_pendentes: int = HUB_MAX_PENDENTES, max_estados: int = HUB_MAX_ESTADOS):
+        self.max_pendentes = max_pendentes
+        self.max_estados = max_estados
+        self._por_topico: Dict[str, Set[AssinanteCoalescente]] = defaultdict(set)
+        # Último estado de cada paciente: (tópicos, dados, mensagem SSE)
+        self._estados: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.publicadas = 0
+        # Contadores dos assinantes que já desconectaram
+        self._encerrados = {"entregues": 0, "coalescidas": 0, "descartadas": 0}
+
+    def publicar(self, predicao: Dict[str, Any], evento: str = "prediction", chave: Optional[str] = None):
+        """
+        Publica uma predição nos tópicos da paciente e do setor
+
+        Args:
+            predicao: Dados da predição (patient_id e ward definem os tópicos)
+            evento: Nome do evento SSE
+            chave: Chave de coalescência (padrão: patient_id); chaves únicas
+                desligam a coalescência e o registro do último estado
+        """
+        topicos = topicos_predicao(str(predicao["patient_id"]), predicao.get("ward"))
+        mensagem = formatar_evento(evento, predicao)
+        guardar_estado = chave is None
+        if chave is None:
+            chave = str(predicao["patient_id"])
+
+        with self._lock:
+            if guardar_estado:
+                self._estados[chave] = (topicos, predicao, mensagem)
+                self._estados.move_to_end(chave)
+                while len(self._estados) > self.max_estados:
+                    self._estados.popitem(last=False)
+            destinatarios = set()
+            for topico in topicos:
+                destinatarios.update(self._por_topico.get(topico, ()))
+            self.publicadas += 1
+
+        for assinante in destinatarios:
+            assinante.entregar(chave, mensagem)
+
+    def ultimos_estados(self, topicos: Iterable[str]) -> List[Dict[str, Any]]:
+        """Último estado de cada paciente dos tópicos (carga inicial da central)"""
+        topicos = set(topicos)
+        with self._lock:
+            return [dados for topicos_estado, dados, _ in self._estados.values() if topicos & set(topicos_estado)]
+
+    def assinar(self, topicos: Iterable[str]) -> AssinanteCoalescente:
+        """
+        Registra um assinante e já entrega o último estado dos pacientes dos tópicos
+
+        A carga inicial traz só os max_pendentes estados mais recentes (o que
+        cabe na fila sem descartes); a lista completa está em ultimos_estados().
+        """
+        assinante = AssinanteCoalescente(topicos or [TOPICO_TODOS], self.max_pendentes)
+        with self._lock:
+            for topico in assinante.topicos:
+                self._por_topico[topico].add(assinante)
+            recentes = []
+            for chave, (topicos_estado, _, mensagem) in reversed(self._estados.items()):
+                if len(recentes) >= assinante.max_pendentes:
+                    break
+                if assinante.topicos & set(topicos_estado):
+                    recentes.append((chave, mensagem))
+            for chave, mensagem in reversed(recentes):
+                assinante.entregar(chave, mensagem)
+        return assinante
+
+    def cancelar(self, assinante: AssinanteCoalescente):
+        """Remove um assinante desconectado"""
+        with self._lock:
+            inscrito = False
+            for topico in assinante.topicos:
+                inscritos = self._por_topico.get(topico)
+                if inscritos is not None and assinante in inscritos:
+                    inscrito = True
+                    inscritos.discard(assinante)
+                    if not inscritos:
+                        del self._por_topico[topico]
+            if inscrito:
+                for contador in self._encerrados:
+                    self._encerrados[contador] += getattr(assinante, contador)
+
+    def transmitir(self, assinante: AssinanteCoalescente,
+                   intervalo_heartbeat: float = SSE_INTERVALO_HEARTBEAT) -> Iterator[str]:
+        """Gera o fluxo text/event-stream de um assinante até a desconexão"""
+        return transmitir(assinante, formatar_evento("ready", {"topicos": sorted(assinante.topicos)}),
+                          lambda: self.cancelar(assinante), intervalo_heartbeat)
+
+    def metricas(self) -> Dict[str, Any]:
+        """Retorna as métricas do hub"""
+        with self._lock:
+            assinantes = set().union(*self._por_topico.values()) if self._por_topico else set()
+            return {
+                "publicadas": self.publicadas,
+                "topicos": len(self._por_topico),
+                "assinantes": len(assinantes),
+                "pacientes_com_estado": len(self._estados),
+                **{contador: total + sum(getattr(a, contador) for a in assinantes)
+                   for contador, total in self._encerrados.items()},
+                "pendentes": sum(a.pendentes() for a in assinantes)
+            }
@@ -0,0 +1,208 @@
+"""
+Núcleo de predição compartilhado pelos apps, scripts e jobs
+
+Concentra o que antes era repetido em app.py e app_with_database.py: a
+ordem de EXPECTED_FEATURES, a conversão das features (inclusive o mapa de
+histogram_tendency), o mapeamento das classes para status, cores e
+recomendações, as faixas de status de saúde pela confiança, a carga do
+modelo e a versão do artefato (SHA-256 do model.sav).
+"""
+
+import os
+import hashlib
+import logging
+import warnings
+from typing import Dict, Any, List, Iterable, Tuple
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Caminho padrão do modelo (relativo ao diretório back-end)
+MODEL_PATH = os.path.join('IA', 'model.sav')
+
+# Mapeamento dos resultados do modelo
+HEALTH_STATUS = {
+    1: {"status": "Normal", "description": "Feto saudável - sem indicações de risco", "color": "success"},
+    2: {"status": "Suspeito", "description": "Necessita acompanhamento médico mais próximo", "color": "warning"},
+    3: {"status": "Patológico", "description": "Requer intervenção médica imediata", "color": "danger"}
+}
+
+STATUS_DESCONHECIDO = {
+    "status": "Desconhecido",
+    "description": "Resultado não mapeado",
+    "color": "secondary"
+}
+
+# Faixas de status de saúde pela confidence (%): <= 55 crítico; 56-65 moderado;
+# demais (inclusive 55 < c < 56) normal
+LIMITE_CRITICO = 55
+LIMITE_MODERADO_MIN = 56
+LIMITE_MODERADO_MAX = 65
+
+# Recomendações por classe (mesmas gravadas pelo app_with_database.py)
+RECOMMENDATIONS = {
+    1: [
+        "Continue o monitoramento de rotina",
+        "Mantenha consultas pré-natais regulares",
+        "Acompanhe os movimentos fetais diariamente",
+        "Mantenha estilo de vida saudável"
+    ],
+    2: [
+        "Aumente a frequência do monitoramento",
+        "Considere realizar cardiotocografia adicional",
+        "Agende consulta médica em 24-48 horas",
+        "Monitore movimentos fetais de perto"
+    ],
+    3: [
+        "URGENTE: Contate médico imediatamente",
+        "Considere internação hospitalar",
+        "Monitoramento contínuo necessário",
+        "Avalie necessidade de parto de emergência"
+    ]
+}
+
+# Lista dos campos esperados pelo modelo (na ordem correta)
+EXPECTED_FEATURES = [
+    'baseline_value', 'accelerations', 'fetal_movement', 'uterine_contractions',
+    'light_decelerations', 'severe_decelerations', 'prolongued_decelerations',
+    'abnormal_short_term_variability', 'mean_value_of_short_term_variability',
+    'percentage_of_time_with_abnormal_long_term_variability',
+    'mean_value_of_long_term_variability', 'histogram_width', 'histogram_min',
+    'histogram_max', 'histogram_number_of_peaks', 'histogram_number_of_zeroes',
+    'histogram_mode', 'histogram_mean', 'histogram_median', 'histogram_variance',
+    'histogram_tendency'
+]
+
+TENDENCY_MAP = {'normal': 0, 'increasing': 1, 'decreasing': -1, 'stable': 0}
+
+
+def determinar_status_saude(confidence: float) -> Tuple[str, str]:
+    """
+    Determina o status de saúde baseado na confidence do modelo ML
+    
+    Args:
+        confidence: Valor da confiança (0-100)
+        
+    Returns:
+        tuple: (status_saude, nivel_risco)
+    """
+    if confidence <= LIMITE_CRITICO:
+        return "Risco Crítico", "CRÍTICO"
+    elif LIMITE_MODERADO_MIN <= confidence <= LIMITE_MODERADO_MAX:
+        return "Em Risco", "MODERADO"
+    else:  # >= 66
+        return "Normal", "BAIXO"
+
+
+def carregar_modelo(caminho: str = MODEL_PATH):
+    """Carrega o modelo ML suprimindo warnings de versão"""
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        warnings.filterwarnings("ignore", category=FutureWarning)
+        return joblib.load(caminho)
+
+
+def calcular_versao_modelo(caminho: str = MODEL_PATH) -> str:
+    """
+    Calcula a versão do modelo a partir do conteúdo do arquivo
+
+    Args:
+        caminho: Caminho do arquivo model.sav
+
+    Returns:
+        str: Primeiros 12 caracteres do SHA-256 do arquivo
+    """
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+            sha.update(bloco)
+    return sha.hexdigest()[:12]
+
+
+def converter_feature(feature: str, valor: Any) -> float:
+    """
+    Converte o valor de uma feature para o formato numérico do modelo
+
+    histogram_tendency segue a conversão original dos apps: só os textos de
+    TENDENCY_MAP são mapeados; qualquer outro valor, inclusive números como
+    1 e -1, vira 0.
+    """
+    if valor is None:
+        return 0.0
+    if feature == 'histogram_tendency':
+        return float(TENDENCY_MAP.get(valor, 0)) if isinstance(valor, str) else 0.0
+    return float(valor)
+
+
+def montar_matriz(parametros: Iterable[Dict[str, Any]]) -> np.ndarray:
+    """
+    Monta a matriz N x 21 de entrada do modelo
+
+    Args:
+        parametros: Dicionários de parâmetros de monitoramento
+
+    Returns:
+        np.ndarray: Matriz float64 na ordem de EXPECTED_FEATURES
+    """
+    linhas = [
+        [converter_feature(feature, (p or {}).get(feature, 0)) for feature in EXPECTED_FEATURES]
+        for p in parametros
+    ]
+    if not linhas:
+        return np.empty((0, len(EXPECTED_FEATURES)), dtype=np.float64)
+    return np.asarray(linhas, dtype=np.float64)
+
+
+def predict_proba(model, matriz: np.ndarray) -> np.ndarray:
+    """Executa predict_proba suprimindo o aviso de feature names do sklearn"""
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        return model.predict_proba(matriz)
+
+
+def montar_resultado(prediction: int, confidence: float) -> Dict[str, Any]:
+    """
+    Monta o resultado ML no formato gravado em resultado_ml
+
+    Args:
+        prediction: Classe prevista (1, 2, 3)
+        confidence: Confiança em percentual (0-100)
+
+    Returns:
+        Dict: prediction, confidence, status, description e recommendations
+    """
+    result = HEALTH_STATUS.get(prediction, STATUS_DESCONHECIDO)
+    return {
+        "prediction": prediction,
+        "confidence": confidence,
+        "status": result["status"],
+        "description": result["description"],
+        "recommendations": list(RECOMMENDATIONS.get(prediction, RECOMMENDATIONS[3]))
+    }
+
+
+def pontuar_lote(model, matriz: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Pontua um lote de exames em uma única chamada vetorizada
+
+    Args:
+        model: Modelo RandomForest carregado
+        matriz: Matriz N x 21 de features
+
+    Returns:
+        List[Dict]: Um resultado ML por linha da matriz
+    """
+    if len(matriz) == 0:
+        return []
+
+    probabilidades = predict_proba(model, matriz)
+    indices = probabilidades.argmax(axis=1)
+    classes = model.classes_[indices].astype(int)
+    confiancas = np.round(probabilidades[np.arange(len(indices)), indices] * 100, 2)
+
+    return [
+        montar_resultado(int(classe), float(confianca))
+        for classe, confianca in zip(classes, confiancas)
+    ]
@@ -0,0 +1,153 @@
+"""
+Curvas de sensibilidade (what-if) de um exame
+
+Varre um ou dois parâmetros do exame pela faixa fisiológica e devolve as
+probabilidades de cada classe em cada ponto. Todas as variações são montadas
+em uma única matriz (uma linha por ponto da grade) e avaliadas em uma única
+chamada a predict_proba. O tamanho da grade é limitado no servidor.
+"""
+
+import os
+import logging
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from modelo.preditor import EXPECTED_FEATURES, HEALTH_STATUS, STATUS_DESCONHECIDO, montar_matriz, predict_proba
+
+logger = logging.getLogger(__name__)
+
+# Limites das grades
+SENSIBILIDADE_MAX_PONTOS_EIXO = int(os.getenv("SENSIBILIDADE_MAX_PONTOS_EIXO", "200"))
+SENSIBILIDADE_MAX_LINHAS = int(os.getenv("SENSIBILIDADE_MAX_LINHAS", "10000"))
+PONTOS_PADRAO = {1: 50, 2: 25}
+
+# Faixas fisiológicas (mesmos limites dos campos do formulário em index.html)
+FAIXAS_PARAMETROS = {
+    'baseline_value': (80, 200),
+    'accelerations': (0, 20),
+    'fetal_movement': (0, 10),
+    'uterine_contractions': (0, 10),
+    'light_decelerations': (0, 10),
+    'severe_decelerations': (0, 10),
+    'prolongued_decelerations': (0, 10),
+    'abnormal_short_term_variability': (0, 100),
+    'mean_value_of_short_term_variability': (0, 50),
+    'percentage_of_time_with_abnormal_long_term_variability': (0, 100),
+    'mean_value_of_long_term_variability': (0, 100),
+    'histogram_width': (0, 200),
+    'histogram_min': (0, 200),
+    'histogram_max': (0, 200),
+    'histogram_number_of_peaks': (0, 20),
+    'histogram_number_of_zeroes': (0, 100),
+    'histogram_mode': (0, 200),
+    'histogram_mean': (0, 200),
+    'histogram_median': (0, 200),
+    'histogram_variance': (0, 1000),
+    'histogram_tendency': (-1, 1)
+}
+
+
+def montar_eixo(especificacao: Any, dimensoes: int) -> Tuple[str, np.ndarray]:
+    """
+    Monta os valores de um eixo da varredura
+
+    Args:
+        especificacao: Nome da feature ou {"feature", "min", "max", "points"}
+        dimensoes: 1 ou 2 (define a quantidade padrão de pontos)
+
+    Returns:
+        Tuple[str, np.ndarray]: (feature, valores do eixo)
+
+    Raises:
+        ValueError: Feature desconhecida, faixa inválida ou pontos fora do limite
+    """
+    if isinstance(especificacao, str):
+        especificacao = {"feature": especificacao}
+    if not isinstance(especificacao, dict):
+        raise ValueError("Cada varredura deve ser o nome de uma feature ou um objeto")
+
+    feature = especificacao.get("feature")
+    if feature not in FAIXAS_PARAMETROS:
+        raise ValueError(f"Feature desconhecida: {feature}")
+
+    minimo_padrao, maximo_padrao = FAIXAS_PARAMETROS[feature]
+    minimo = float(especificacao.get("min", minimo_padrao))
+    maximo = float(especificacao.get("max", maximo_padrao))
+    pontos = int(especificacao.get("points", PONTOS_PADRAO[dimensoes]))
+    if not minimo < maximo:
+        raise ValueError(f"Faixa inválida para {feature}: min deve ser menor que max")
+    if not 2 <= pontos <= SENSIBILIDADE_MAX_PONTOS_EIXO:
+        raise ValueError(f"points deve estar entre 2 e {SENSIBILIDADE_MAX_PONTOS_EIXO}")
+
+    return feature, np.linspace(minimo, maximo, pontos)
+
+
+def montar_grade(base: np.ndarray, eixos: List[Tuple[str, np.ndarray]]) -> np.ndarray:
+    """
+    Replica o exame base e substitui as features varridas (última feature varia mais rápido)
+
+    Args:
+        base: Vetor de 21 features do exame
+        eixos: Um ou dois eixos (feature, valores)
+
+    Returns:
+        np.ndarray: Matriz (pontos do eixo 1 x pontos do eixo 2) x 21
+    """
+    formato = tuple(len(valores) for _, valores in eixos)
+    grade = np.tile(base, (int(np.prod(formato)), 1))
+    malhas = np.meshgrid(*(valores for _, valores in eixos), indexing="ij")
+    for (feature, _), malha in zip(eixos, malhas):
+        grade[:, EXPECTED_FEATURES.index(feature)] = malha.ravel()
+    return grade
+
+
+def calcular_sensibilidade(model, exame: Dict[str, Any], varreduras: List[Any]) -> Dict[str, Any]:
+    """
+    Probabilidades por classe ao longo de uma curva (1 feature) ou grade (2 features)
+
+    Args:
+        model: Modelo RandomForest carregado
+        exame: Parâmetros do exame (mesmo formato do /predict)
+        varreduras: Uma ou duas especificações de eixo
+
+    Returns:
+        Dict: Eixos, probabilidades por classe (lista ou matriz [eixo 1][eixo 2])
+            e a classe prevista em cada ponto
+
+    Raises:
+        ValueError: Varreduras inválidas ou grade acima de SENSIBILIDADE_MAX_LINHAS
+    """
+    if not isinstance(exame, dict) or not exame:
+        raise ValueError("Nenhum exame fornecido")
+    if not isinstance(varreduras, list) or len(varreduras) not in (1, 2):
+        raise ValueError("Informe uma ou duas features em sweep")
+
+    eixos = [montar_eixo(especificacao, len(varreduras)) for especificacao in varreduras]
+    if len(eixos) == 2 and eixos[0][0] == eixos[1][0]:
+        raise ValueError("As duas features da grade devem ser diferentes")
+    formato = tuple(len(valores) for _, valores in eixos)
+    if int(np.prod(formato)) > SENSIBILIDADE_MAX_LINHAS:
+        raise ValueError(f"Grade com {int(np.prod(formato))} pontos excede o limite de {SENSIBILIDADE_MAX_LINHAS}")
+
+    base = montar_matriz([exame])
+    grade = montar_grade(base[0], eixos)
+    probabilidades = predict_proba(model, np.vstack([base, grade]))
+    atual, probabilidades = probabilidades[0], probabilidades[1:]
+
+    classes = model.classes_.astype(int)
+    nomes = [HEALTH_STATUS.get(int(c), STATUS_DESCONHECIDO)["status"] for c in classes]
+    previstas = classes[probabilidades.argmax(axis=1)].reshape(formato)
+    probabilidades = np.round(probabilidades, 6).reshape(formato + (len(classes),))
+
+    return {
+        "axes": [{"feature": feature, "values": valores.tolist()} for feature, valores in eixos],
+        "shape": list(formato),
+        "probabilities": {nome: probabilidades[..., i].tolist() for i, nome in enumerate(nomes)},
+        "prediction": previstas.tolist(),
+        "current": {
+            "prediction": int(classes[atual.argmax()]),
+            "probabilities": {nome: round(float(p), 6) for nome, p in zip(nomes, atual)},
+            "values": {feature: float(base[0, EXPECTED_FEATURES.index(feature)]) for feature, _ in eixos}
+        }
+    }
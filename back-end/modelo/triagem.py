@@ -0,0 +1,212 @@
+"""
+Avaliação antecipada (anytime) da floresta para o modo de triagem
+
+As árvores são avaliadas em blocos e a soma das probabilidades por classe é
+acumulada. Depois de cada bloco, uma linha é encerrada quando as árvores que
+faltam não podem mais mudar:
+
+    - a classe prevista: cada árvore restante soma no máximo 1 a uma classe,
+      então o líder está garantido se sua soma supera a de qualquer outra
+      classe mais o número de árvores restantes (empate desempata pelo menor
+      índice, como o argmax de predict_proba);
+    - a faixa de status de saúde: a confiança final fica entre soma/T e
+      (soma + restantes)/T; se os dois extremos caem na mesma faixa de
+      determinar_status_saude (modelo/preditor.py), o status está decidido.
+
+Como cada árvore move a soma de uma classe em no máximo 1, nenhuma classe
+pode estar garantida antes de metade das árvores; a primeira verificação
+acontece após T // 2 + 1 árvores e as seguintes a cada bloco.
+
+A classe e a faixa retornadas são exatamente as da avaliação completa; a
+confiança é retornada como intervalo, já que as árvores não avaliadas
+ainda a moveriam dentro da faixa.
+
+A parada antecipada é uma garantia de resultado, não um atalho de
+latência: com o modelo atual só ~6% das árvores são poupadas e cada bloco
+é um percurso vetorizado a mais. Lotes com menos de TRIAGEM_MIN_LINHAS
+linhas são avaliados em uma só passada por todas as árvores, o mesmo
+percurso de FlorestaPlana.predict_proba; os blocos só são usados em lotes
+maiores, onde a economia de árvores compensa as verificações. Por isso a
+API só oferece a triagem no lote binário de /predict (?triage=1 com
+application/x-fetalcare-f32, modelo/binario.py).
+"""
+
+import os
+import logging
+from typing import Any, Dict, List
+
+import numpy as np
+
+from modelo.floresta import FlorestaPlana
+from modelo.preditor import (
+    HEALTH_STATUS,
+    LIMITE_CRITICO,
+    LIMITE_MODERADO_MAX,
+    LIMITE_MODERADO_MIN,
+    STATUS_DESCONHECIDO,
+    determinar_status_saude
+)
+
+logger = logging.getLogger(__name__)
+
+# Árvores avaliadas entre duas verificações de parada
+TRIAGEM_BLOCO_ARVORES = int(os.getenv("TRIAGEM_BLOCO_ARVORES", "40"))
+# Lotes menores que isso são avaliados em uma passada completa (os blocos não compensam)
+TRIAGEM_MIN_LINHAS = int(os.getenv("TRIAGEM_MIN_LINHAS", "192"))
+
+# (status_saude, nivel_risco) por faixa de faixa_confianca, avaliado num ponto de cada faixa
+STATUS_POR_FAIXA = tuple(
+    determinar_status_saude(confianca)
+    for confianca in (LIMITE_CRITICO, (LIMITE_CRITICO + LIMITE_MODERADO_MIN) / 2, LIMITE_MODERADO_MIN, 100)
+)
+
+
+def faixa_confianca(confianca: np.ndarray) -> np.ndarray:
+    """
+    Faixa de determinar_status_saude de cada confiança
+
+    Args:
+        confianca: Confianças em percentual (já arredondadas em 2 casas)
+
+    Returns:
+        np.ndarray: 0 (<= 55), 1 (entre 55 e 56), 2 (56 a 65) ou 3 (> 65)
+    """
+    confianca = np.asarray(confianca)
+    return ((confianca > LIMITE_CRITICO).astype(np.intp) + (confianca >= LIMITE_MODERADO_MIN)
+            + (confianca > LIMITE_MODERADO_MAX))
+
+
+class TriagemFloresta:
+    """Predição com parada antecipada sobre a floresta plana"""
+
+    def __init__(self, floresta: FlorestaPlana, bloco: int = TRIAGEM_BLOCO_ARVORES,
+                 apenas_classe: bool = False, min_linhas: int = TRIAGEM_MIN_LINHAS):
+        """
+        Args:
+            floresta: Floresta plana do modelo
+            bloco: Árvores avaliadas entre duas verificações de parada
+            apenas_classe: Parar assim que a classe estiver garantida, sem exigir a faixa
+            min_linhas: Lotes menores são avaliados em uma passada completa
+        """
+        if bloco < 1:
+            raise ValueError("O bloco de árvores deve ser positivo")
+        self.floresta = floresta
+        self.bloco = bloco
+        self.apenas_classe = apenas_classe
+        self.min_linhas = min_linhas
+        self.n_classes = floresta.valor.shape[1]
+
+    @classmethod
+    def de_modelo(cls, model, bloco: int = TRIAGEM_BLOCO_ARVORES,
+                  apenas_classe: bool = False, min_linhas: int = TRIAGEM_MIN_LINHAS) -> "TriagemFloresta":
+        """Cria a triagem a partir de uma RandomForestClassifier"""
+        return cls(FlorestaPlana.de_modelo(model), bloco, apenas_classe, min_linhas)
+
+    def _decididas(self, soma: np.ndarray, restantes: int) -> np.ndarray:
+        """Linhas cuja classe (e faixa, se exigida) não muda com as árvores restantes"""
+        total = self.floresta.n_arvores
+        linhas = np.arange(len(soma))
+        lider = soma.argmax(axis=1)
+        soma_lider = soma[linhas, lider][:, None]
+
+        # O líder mantém o argmax mesmo que todas as árvores restantes votem na outra classe
+        outras = soma + restantes
+        desempate = lider[:, None] < np.arange(self.n_classes)
+        classe_fixa = ((soma_lider > outras) | (desempate & (soma_lider >= outras))).sum(axis=1) == self.n_classes - 1
+        if self.apenas_classe:
+            return classe_fixa
+
+        minima = np.round(soma_lider[:, 0] / total * 100, 2)
+        maxima = np.round((soma_lider[:, 0] + restantes) / total * 100, 2)
+        return classe_fixa & (faixa_confianca(minima) == faixa_confianca(maxima))
+
+    def avaliar(self, X: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Avalia as linhas em blocos de árvores até a decisão de cada uma
+
+        Lotes com menos de min_linhas linhas são avaliados em uma passada
+        completa (trees_evaluated = total de árvores e intervalo de confiança
+        de largura zero).
+
+        Args:
+            X: Matriz N x F de features
+
+        Returns:
+            Dict: prediction (classe), faixa (-1 se ainda indefinida, só possível
+                  com apenas_classe), confidence_min/confidence_max (%) e
+                  trees_evaluated por linha
+        """
+        floresta = self.floresta
+        X = floresta.preparar_entrada(X)
+        total = floresta.n_arvores
+
+        if X.shape[0] < self.min_linhas:
+            # Passada completa: o mesmo percurso de FlorestaPlana.predict_proba
+            soma = floresta.valor[floresta.folhas(X)].sum(axis=1)
+            lider = soma.argmax(axis=1)
+            confianca = np.round(soma.max(axis=1) / total * 100, 2)
+            return {
+                "prediction": floresta.classes[lider],
+                "faixa": faixa_confianca(confianca),
+                "confidence_min": confianca,
+                "confidence_max": confianca,
+                "trees_evaluated": np.full(X.shape[0], total, dtype=np.intp),
+            }
+
+        soma = np.zeros((X.shape[0], self.n_classes))
+        arvores = np.zeros(X.shape[0], dtype=np.intp)
+        ativas = np.arange(X.shape[0])
+        limites = [0, *range(total // 2 + 1, total, self.bloco), total]
+        for inicio, fim in zip(limites[:-1], limites[1:]):
+            folhas = floresta.folhas(X[ativas], raizes=floresta.raizes[inicio:fim])
+            soma[ativas] += floresta.valor[folhas].sum(axis=1)
+            arvores[ativas] = fim
+            if fim == total:
+                break
+            ativas = ativas[~self._decididas(soma[ativas], total - fim)]
+            if len(ativas) == 0:
+                break
+
+        lider = soma.argmax(axis=1)
+        soma_lider = soma[np.arange(len(soma)), lider]
+        minima = np.round(soma_lider / total * 100, 2)
+        maxima = np.round((soma_lider + total - arvores) / total * 100, 2)
+        faixa = faixa_confianca(minima)
+        return {
+            "prediction": floresta.classes[lider],
+            "faixa": np.where(faixa == faixa_confianca(maxima), faixa, -1),
+            "confidence_min": minima,
+            "confidence_max": maxima,
+            "trees_evaluated": arvores,
+        }
+
+    def triar(self, X: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Resultados de triagem no formato das respostas da API
+
+        Args:
+            X: Matriz N x F de features
+
+        Returns:
+            List[Dict]: Classe, status e nível de risco exatos (None se indefinidos),
+                        intervalo de confiança e número de árvores avaliadas por linha
+        """
+        avaliacao = self.avaliar(X)
+        resultados = []
+        for prediction, faixa, minima, maxima, arvores in zip(
+                avaliacao["prediction"], avaliacao["faixa"], avaliacao["confidence_min"],
+                avaliacao["confidence_max"], avaliacao["trees_evaluated"]):
+            status_saude, nivel_risco = STATUS_POR_FAIXA[faixa] if faixa >= 0 else (None, None)
+            result = HEALTH_STATUS.get(int(prediction), STATUS_DESCONHECIDO)
+            resultados.append({
+                "prediction": int(prediction),
+                "status": result["status"],
+                "description": result["description"],
+                "color": result["color"],
+                "status_saude": status_saude,
+                "nivel_risco": nivel_risco,
+                "confidence_range": [float(minima), float(maxima)],
+                "trees_evaluated": int(arvores),
+                "total_trees": self.floresta.n_arvores,
+            })
+        return resultados
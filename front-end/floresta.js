@@ -0,0 +1,119 @@
+// Avaliação local da RandomForest exportada por back-end/modelo/exportar_floresta.py
+//
+// O arquivo modelo/floresta.bin é lido uma única vez e mapeado em typed arrays;
+// cada predição percorre as árvores no navegador (prévia instantânea e modo
+// offline). O resultado do servidor continua sendo o oficial.
+
+const FLORESTA_URL = 'modelo/floresta.bin';
+const FLORESTA_MAGIC = 'FCRF';
+
+// Mesma conversão de histogram_tendency do servidor
+const HISTOGRAM_TENDENCY_MAP = { normal: 0, increasing: 1, decreasing: -1, stable: 0 };
+
+class LocalForest {
+    /**
+     * Criar floresta a partir do conteúdo de floresta.bin
+     */
+    constructor(buffer) {
+        const view = new DataView(buffer);
+        const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+        if (magic !== FLORESTA_MAGIC) {
+            throw new Error('Arquivo de floresta inválido');
+        }
+
+        const headerSize = view.getUint32(4, true);
+        const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerSize)));
+        const dataStart = 8 + headerSize;
+        const array = (Type, name) => {
+            const { offset, tamanho } = header.arrays[name];
+            return new Type(buffer, dataStart + offset, tamanho);
+        };
+
+        this.header = header;
+        this.version = header.versao_modelo;
+        this.features = header.features;
+        this.classes = header.classes;
+        this.roots = array(Int32Array, 'raizes');
+        this.right = array(Int32Array, 'direita');
+        this.threshold = array(Float32Array, 'threshold');
+        this.feature = array(Int8Array, 'feature');
+        this.values = array(Float32Array, 'valores');
+        this.input = new Float32Array(this.features.length);
+    }
+
+    /**
+     * Baixar floresta.bin (o navegador revalida pelo ETag do servidor estático)
+     */
+    static async load(url = FLORESTA_URL) {
+        const response = await fetch(url);
+        if (!response.ok) {
+            throw new Error(`Floresta indisponível (${response.status})`);
+        }
+        return new LocalForest(await response.arrayBuffer());
+    }
+
+    /**
+     * Montar a entrada na ordem das features (float32, como o sklearn)
+     */
+    toInput(data) {
+        this.features.forEach((name, i) => {
+            const value = data[name];
+            if (name === 'histogram_tendency') {
+                // Só os textos do mapa contam; números (1/-1) viram 0, como no servidor
+                this.input[i] = typeof value === 'string' ? (HISTOGRAM_TENDENCY_MAP[value] ?? 0) : 0;
+            } else {
+                this.input[i] = Number(value) || 0;
+            }
+        });
+        return this.input;
+    }
+
+    /**
+     * Probabilidades por classe (média das folhas, como predict_proba)
+     */
+    predictProba(data) {
+        const x = ArrayBuffer.isView(data) ? data : this.toInput(data);
+        const nClasses = this.classes.length;
+        const proba = new Float64Array(nClasses);
+
+        for (let t = 0; t < this.roots.length; t++) {
+            let node = this.roots[t];
+            let feature = this.feature[node];
+            while (feature >= 0) {
+                node = x[feature] <= this.threshold[node] ? node + 1 : this.right[node];
+                feature = this.feature[node];
+            }
+            const leaf = this.right[node] * nClasses;
+            for (let c = 0; c < nClasses; c++) {
+                proba[c] += this.values[leaf + c];
+            }
+        }
+
+        for (let c = 0; c < nClasses; c++) {
+            proba[c] /= this.roots.length;
+        }
+        return proba;
+    }
+
+    /**
+     * Classe prevista e confiança em percentual (mesmo formato do /predict)
+     */
+    predict(data) {
+        const proba = this.predictProba(data);
+        let best = 0;
+        for (let c = 1; c < proba.length; c++) {
+            if (proba[c] > proba[best]) {
+                best = c;
+            }
+        }
+        return {
+            prediction: this.classes[best],
+            confidence: Math.round(proba[best] * 10000) / 100,
+            probabilities: Array.from(proba)
+        };
+    }
+}
+
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = { LocalForest };
+}